@@ -4,17 +4,52 @@ Flask主程序
 AI网络监控分析智能体平台
 """
 
-from flask import Flask, render_template, request, jsonify, send_file  # Flask框架
+from flask import Flask, render_template, request, jsonify, send_file, Response, g  # Flask框架
 from flask_cors import CORS  # 跨域资源共享
+import gzip  # 响应压缩
+import json  # 采集节点上报的结果
+import logging  # 日志
 import threading  # 线程处理
 import os  # 系统操作
+import time  # 时间处理
+from functools import wraps  # 视图装饰器
 
 # 导入自定义模块
+from modules.log import setup_logging  # 结构化日志
 from config.settings import SettingsManager  # 配置管理器
-from modules.device_manager import DeviceManager  # 设备管理器
+from modules.device_manager import DeviceManager, normalize_site, parse_tags  # 设备管理器
 from modules.ai_assistant import AIAssistant  # AI助手
 from modules.inspection import InspectionManager  # 巡检管理器
 from modules.monitor import DeviceMonitor  # 设备监控器
+from modules.search_index import SearchIndex  # 全文检索索引
+from modules.interface_store import InterfaceStore  # 接口信息存储
+from modules.interface_rates import InterfaceRateCalculator  # 接口速率计算
+from modules.reachability import ReachabilityMonitor  # 设备可达性检测
+from modules.poll_scheduler import PollScheduler  # 自适应轮询调度
+from modules.alerting import AlertEngine  # 告警引擎
+from modules.notifier import NotificationDispatcher  # 告警通知
+from modules.backup import BackupManager  # 配置备份
+from modules.drift import DriftEngine  # 配置漂移检测
+from modules.bulk_push import BulkPushManager  # 批量命令下发
+from modules.discovery import DiscoveryManager  # 设备发现
+from modules.facts import FactsCollector, format_uptime  # 设备信息采集
+from modules.vault import CredentialVault  # 凭据保险库
+from modules.ssh_connector import SSHConnector  # SSH连接器
+from modules.cassette import CassetteRecorder, CassettePlayer, RECORD_DIR_ENV, REPLAY_DIR_ENV  # 会话录制回放
+from modules.metrics import metrics, STAGE_SECONDS  # 运行指标
+from modules.tracing import tracer, setup_tracing, parse_traceparent  # 链路追踪
+from modules.snapshot import VersionedSnapshot  # 列表接口的版本快照（ETag和增量响应）
+from modules.history import MetricHistory  # 指标历史（服务端降采样）
+from modules.groups import GroupIndex, DIMENSIONS as GROUP_DIMENSIONS  # 设备分组和分组汇总
+from modules.sharding import CollectorCoordinator, decode_batch, validate_batch, TOKEN_ENV as COLLECTOR_TOKEN_ENV, \
+    TOKEN_HEADER as COLLECTOR_TOKEN_HEADER  # 分布式采集节点
+from modules.parsers import normalize_vendor  # 厂商名称标准化
+
+# 配置日志（JSON日志文件 + 控制台，后台线程写入，不阻塞采集线程）
+setup_logging()
+logger = logging.getLogger(__name__)  # 主程序日志
+# 配置链路追踪（慢请求和失败请求的完整链路写入outputs/traces/，或发送到OTLP接收端）
+setup_tracing()
 
 # 创建Flask应用
 app = Flask(__name__)  # 创建Flask实例
@@ -23,13 +58,247 @@ CORS(app)  # 启用跨域支持
 
 # 初始化管理器
 settings_manager = SettingsManager()  # 配置管理器
-device_manager = DeviceManager()  # 设备管理器
-inspection_manager = InspectionManager()  # 巡检管理器
+credential_vault = CredentialVault()  # 凭据保险库（加密存储，设备按凭据ID引用）
+device_manager = DeviceManager(credential_store=credential_vault)  # 设备管理器（新增、导入的密码存入保险库）
+device_manager.migrate_credentials()  # 启动时将设备文件中遗留的明文密码迁移到保险库
+SSHConnector.credential_provider = credential_vault  # 所有SSH连接通过保险库解析登录信息
+if os.environ.get(RECORD_DIR_ENV):  # 录制模式：所有SSH会话的原始输出写入录制文件
+    SSHConnector.recorder = CassetteRecorder(os.environ[RECORD_DIR_ENV])
+if os.environ.get(REPLAY_DIR_ENV):  # 回放模式：不连接设备，从录制文件回放输出（零延迟）
+    SSHConnector.player = CassettePlayer(os.environ[REPLAY_DIR_ENV])
+search_index = SearchIndex()  # 全文检索索引
+inspection_manager = InspectionManager(search_index=search_index)  # 巡检管理器（写入文件时自动索引）
 monitor = DeviceMonitor()  # 监控器
+interface_store = InterfaceStore()  # 接口信息存储（每台设备最近一次采集的完整接口表）
+interface_rates = InterfaceRateCalculator()  # 接口速率计算和热点接口排行
+history_store = MetricHistory()  # 指标历史（CPU、内存、温度样本，按图表宽度降采样）
+group_index = GroupIndex()  # 设备分组索引（站点、角色、厂商、标签）和增量维护的分组汇总
+coordinator = CollectorCoordinator(token=os.environ.get(COLLECTOR_TOKEN_ENV))  # 采集节点（一致性哈希分配设备）
+reachability = ReachabilityMonitor()  # 设备可达性（并发端口探测 + 抖动抑制）
+alert_engine = AlertEngine()  # 告警引擎（每次采集后增量评估告警规则）
+notifier = NotificationDispatcher()  # 告警通知（异步队列 + 摘要合并 + 渠道限流）
+backup_manager = BackupManager()  # 配置备份（按内容哈希去重保存版本）
+drift_engine = DriftEngine(backup_manager)  # 配置漂移检测（缓存规范化后的段哈希）
+bulk_push_manager = BulkPushManager()  # 批量命令下发（金丝雀 + 分批推进）
+discovery_manager = DiscoveryManager(device_manager)  # 设备发现（后台并行获取主机名等信息）
+facts_collector = FactsCollector(device_manager)  # 设备信息（型号、序列号、版本）低频采集并缓存
 
 # 全局变量，用于存储任务进度
 task_progress = {}  # 任务进度字典
 
+# 设备详情页接口表每页条数
+INTERFACE_PAGE_SIZE = 50
+# 设备详情页实时图表的样本数
+HISTORY_RECENT_POINTS = 20
+# 仪表板热点接口排行条数
+TOP_INTERFACE_COUNT = 10
+# 可达性后台扫描间隔（秒），仪表板只对超过该时间未探测的设备补扫
+REACHABILITY_INTERVAL = 30
+# 后台轮询采集的慢链路阈值（秒）：一轮采集包含多条命令的固定等待，比HTTP请求的默认阈值长
+POLL_TRACE_SLOW = 30
+# 仪表板快照复用时间（秒）：多个页面同时刷新时只构建一次
+DASHBOARD_SNAPSHOT_AGE = 1
+# 启用gzip压缩的最小响应字节数
+COMPRESS_MIN_BYTES = 1024
+# 可压缩的响应类型
+COMPRESS_MIMETYPES = {'application/json', 'text/plain', 'text/html', 'text/css', 'application/javascript'}
+
+# 列表接口的版本快照（前端带ETag或 ?since=<版本> 刷新时只传输变化的部分）
+dashboard_snapshot = VersionedSnapshot(key='id', max_age=DASHBOARD_SNAPSHOT_AGE)
+devices_snapshot = VersionedSnapshot(key='id')
+inspection_files_snapshot = VersionedSnapshot(key='name')
+analysis_files_snapshot = VersionedSnapshot(key='name')
+
+# 分组索引随设备列表保存同步，分组汇总随可达性变化、采集样本和告警事件增量更新
+group_index.sync(device_manager.get_all_devices())
+device_manager.add_listener(group_index.sync)
+device_manager.add_listener(coordinator.devices_changed)  # 设备增删或登录信息变化时采集节点重新拉取分配
+reachability.add_listener(group_index.update_status)
+alert_engine.add_listener(group_index.update_alert)
+# 告警事件入队后由后台线程合并发送，不阻塞采集
+alert_engine.add_listener(notifier.enqueue)
+
+
+def collect_device(device):
+    """
+    采集一台设备的监控指标并保存接口表（由轮询调度器在线程池中调用）
+    :param device: 设备信息字典
+    :return: 监控结果字典
+    """
+    start = time.perf_counter()  # 采集开始时间
+    with tracer.span('poll.collect', slow_threshold=POLL_TRACE_SLOW, device=device['ip'],
+                     vendor=device.get('vendor')):  # 后台采集的根跨度
+        monitor_result = monitor.monitor_device(device, include_facts=facts_collector.is_due(device))  # 登录设备采集
+    save_result(device, monitor_result, time.perf_counter() - start)
+    return monitor_result
+
+
+def save_result(device, monitor_result, duration):
+    """
+    保存一次采集结果：接口表、设备信息、指标历史、分组汇总，并评估告警（本进程采集和采集节点上报共用）
+    :param device: 设备信息字典
+    :param monitor_result: 监控结果字典
+    :param duration: 采集耗时（秒）
+    """
+    STAGE_SECONDS.observe(duration, 'collect', normalize_vendor(device.get('vendor')), '')  # 整轮采集耗时
+    logger.debug("设备采集完成: %s", monitor_result.get('status') if monitor_result else None,
+                 extra={'device': device['ip'], 'vendor': device.get('vendor'), 'stage': 'collect',
+                        'duration': round(duration, 3)})  # 每轮每台设备一条，按位置抽样输出
+    if monitor_result and monitor_result.get('status') == 'online':
+        monitor_result['duration'] = round(duration, 3)  # 随采集结果保存，/metrics按设备输出
+        if 'facts' in monitor_result:  # 本次会话顺带采集了设备信息
+            facts_collector.record(device['id'], monitor_result.pop('facts'))
+        record_interfaces(device, monitor_result.get('interfaces'))  # 保存接口表并计算速率
+        history_store.record(device['id'], monitor_result)  # 保存指标历史
+        group_index.update_sample(device['id'], monitor_result)  # 更新分组汇总
+        alert_engine.evaluate(device, monitor_result)  # 评估告警规则
+
+
+# 后台自适应轮询：指标活跃的设备加密采集，不可达设备指数退避，全局限制每秒SSH会话数
+poll_scheduler = PollScheduler(
+    collect=collect_device,
+    get_devices=device_manager.get_all_devices,
+    is_reachable=lambda device_id: reachability.get_state(device_id)['status'] != 'offline',
+    thresholds=alert_engine.get_thresholds(),  # 接近告警阈值的设备加密采集
+    owns=lambda device_id: coordinator.owner(device_id) is None  # 分配给采集节点的设备不在本进程采集
+)
+# 后台任务是否已启动
+background_started = False
+
+
+def start_background():
+    """
+    启动后台任务（轮询采集、可达性扫描、告警通知、设备信息写回、全文索引同步）
+    导入模块时不启动：调试模式的重载器会在两个进程中各导入一次，后台任务只应在服务请求的进程中运行
+    """
+    global background_started
+    if background_started:  # 已启动
+        return
+    background_started = True
+    # 增量同步全文索引（索引启用前已存在的巡检文件和分析报告）
+    threading.Thread(target=inspection_manager.sync_search_index, daemon=True).start()
+    notifier.start()  # 告警通知发送线程
+    facts_collector.start()  # 周期将采集到的设备信息批量写回设备存储
+    reachability.start(device_manager.get_all_devices, interval=REACHABILITY_INTERVAL)  # 周期扫描全部设备的可达性
+    poll_scheduler.start()  # 自适应轮询采集
+
+
+def device_collect_durations():
+    """
+    各设备最近一次成功采集的耗时（/metrics仪表值）
+    :return: {(设备ID, IP, 厂商): 秒}
+    """
+    durations = {}
+    for device in device_manager.get_all_devices():
+        result = poll_scheduler.get_result(device['id'])
+        if result and result.get('duration') is not None:
+            durations[(device['id'], device['ip'], normalize_vendor(device.get('vendor')))] = result['duration']
+    return durations
+
+
+def count_by_status(jobs):
+    """
+    按状态统计任务数
+    :param jobs: 任务字典列表
+    :return: {(状态,): 任务数}
+    """
+    counts = {}
+    for job in jobs:
+        counts[(job['status'],)] = counts.get((job['status'],), 0) + 1
+    return counts
+
+
+# 队列、线程池和后台任务的仪表值（抓取/metrics时读取，平时无开销）
+metrics.gauge('network_monitor_poll_devices', '调度中的设备数', lambda: poll_scheduler.get_stats()['devices'])
+metrics.gauge('network_monitor_poll_due', '已到期等待派发的设备数', lambda: poll_scheduler.get_stats()['due'])
+metrics.gauge('network_monitor_poll_running', '正在采集的设备数', lambda: poll_scheduler.get_stats()['running'])
+metrics.gauge('network_monitor_poll_workers', '采集线程池大小', lambda: poll_scheduler.max_workers)
+metrics.gauge('network_monitor_notify_queue', '告警通知队列长度', lambda: notifier.get_stats()['queue_size'])
+metrics.gauge('network_monitor_facts_pending', '待写回的设备信息数', lambda: facts_collector.get_stats()['pending'])
+metrics.gauge('network_monitor_bulk_jobs', '批量下发任务数', lambda: count_by_status(bulk_push_manager.list_jobs()),
+              ('status',))
+metrics.gauge('network_monitor_discovery_jobs', '设备发现任务数',
+              lambda: {(status,): count for status, count in discovery_manager.get_stats().items()}, ('status',))
+metrics.gauge('network_monitor_inspection_tasks', '巡检和分析任务数（按阶段）',
+              lambda: count_by_status({'status': task['stage']} for task in list(task_progress.values())),
+              ('status',))
+metrics.gauge('network_monitor_device_collect_seconds', '各设备最近一次采集耗时（秒）', device_collect_durations,
+              ('device_id', 'ip', 'vendor'))
+metrics.gauge('network_monitor_collector_workers', '存活的采集节点数', lambda: len(coordinator.get_workers()))
+
+
+# ==================== 链路追踪 ====================
+@app.before_request
+def start_request_span():
+    """为每个请求开始根跨度（静态文件除外），请求头带traceparent时延续上游链路"""
+    if request.endpoint == 'static':
+        return
+    route = request.url_rule.rule if request.url_rule else request.path  # 路由模板（避免每个设备ID一个名称）
+    g.trace_span = tracer.start(f"{request.method} {route}",
+                                parent=parse_traceparent(request.headers.get('traceparent')),
+                                method=request.method, route=route,
+                                device_id=(request.view_args or {}).get('device_id'))
+
+
+@app.after_request
+def record_response_status(response):
+    """记录响应状态码，并在响应头中返回链路ID（便于在导出文件中查找）"""
+    span = g.get('trace_span')
+    if span is not None and span.trace_id:
+        span.set(status=response.status_code)
+        if response.status_code >= 500:
+            span.fail(f"HTTP {response.status_code}")
+        response.headers['X-Trace-Id'] = span.trace_id
+    return response
+
+
+@app.teardown_request
+def finish_request_span(error=None):
+    """结束请求根跨度（慢请求或失败请求导出整条链路）"""
+    span = g.pop('trace_span', None)
+    if span is not None:
+        tracer.finish(span, error)
+
+
+# ==================== 响应压缩与增量响应 ====================
+@app.after_request
+def compress_response(response):
+    """客户端支持gzip时压缩JSON和文本响应（文件下载等直通响应不处理）"""
+    if (response.status_code != 200 or response.direct_passthrough or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESS_MIMETYPES
+            or 'gzip' not in request.headers.get('Accept-Encoding', '').lower()):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:  # 太小不压缩
+        return response
+    response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def snapshot_response(snapshot, build, list_name, nested=False):
+    """
+    返回列表快照（If-None-Match与当前版本相同时返回304；带 ?since=<版本> 时只返回变化的条目和删除的主键）
+    :param snapshot: VersionedSnapshot
+    :param build: 构建函数，返回 (条目列表, 汇总字段字典)
+    :param list_name: 条目列表在响应中的字段名
+    :param nested: True时响应为 {'success', 'data': {...}}，否则字段直接放在顶层
+    :return: Flask响应
+    """
+    snapshot.refresh(build)
+    view = snapshot.view(request.args.get('since'))
+    if request.if_none_match.contains_weak(view['version']):  # 客户端已持有当前版本
+        response = Response(status=304)
+    else:
+        body = dict(view['meta'])
+        body.update({list_name: view['items'], 'version': view['version'], 'full': view['full'],
+                     'removed': view['removed']})
+        response = jsonify({'success': True, 'data': body} if nested else dict(success=True, **body))
+    response.set_etag(view['version'], weak=True)
+    response.headers['Cache-Control'] = 'no-cache'  # 浏览器每次都带If-None-Match重新验证
+    return response
+
 
 # ==================== 路由：主页 ====================
 @app.route('/')
@@ -45,91 +314,155 @@ def index():
 @app.route('/api/devices', methods=['GET'])
 def get_devices():
     """
-    获取所有设备
+    获取所有设备（支持ETag和 ?since=<版本> 增量获取）
     :return: JSON格式的设备列表
     """
-    devices = device_manager.get_all_devices()  # 获取所有设备
-    return jsonify({'success': True, 'devices': devices})  # 返回JSON
+    return snapshot_response(devices_snapshot, lambda: (public_devices(device_manager.get_all_devices()), {}),
+                             'devices')
+
+
+def public_devices(devices):
+    """
+    去掉设备信息中的密码字段（前端只提交密码，不读取）
+    :param devices: 设备信息字典列表
+    :return: 不含密码的设备信息字典列表
+    """
+    return [{key: value for key, value in device.items() if key != 'password'} for device in devices]
 
 
 @app.route('/api/dashboard/data', methods=['GET'])
 def get_dashboard_data():
     """
-    获取仪表板数据（设备统计、在线状态、CPU/内存等）
-    :return: JSON格式的仪表板数据
+    获取仪表板数据（设备统计、在线状态、CPU/内存等），支持ETag和 ?since=<版本> 只获取变化的设备
+    :return: JSON格式的仪表板数据（增量响应的devices只包含变化的设备，removed为删除的设备ID）
     """
     try:
-        # 获取所有设备
-        devices = device_manager.get_all_devices()
-        
-        # 初始化统计数据
-        total_devices = len(devices)
-        online_devices = 0
-        offline_devices = 0
-        
-        # 获取每个设备的详细信息（包括状态、CPU、内存等）
-        device_details = []
-        
-        for device in devices:
-            device_info = {
-                'id': device['id'],
-                'name': device.get('name', device['ip']),
-                'vendor': device['vendor'],
-                'ip': device['ip'],
-                'port': device.get('port', 22),
-                'status': 'unknown',
-                'cpu': None,
-                'memory': None,
-                'temperature': None
-            }
-            
-            try:
-                # 检查设备是否在线
-                import socket
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(2)
-                result = sock.connect_ex((device['ip'], int(device.get('port', 22))))
-                sock.close()
-                
-                if result == 0:  # 设备在线
-                    device_info['status'] = 'online'
-                    online_devices += 1
-                    
-                    # 尝试获取详细监控数据
-                    try:
-                        monitor_result = monitor.monitor_device(device)
-                        if monitor_result and monitor_result.get('status') == 'online':
-                            device_info['cpu'] = monitor_result.get('cpu')
-                            device_info['memory'] = monitor_result.get('memory')
-                            device_info['temperature'] = monitor_result.get('temperature')
-                    except Exception as e:
-                        print(f"获取设备{device['ip']}监控数据失败: {e}")
-                else:
-                    device_info['status'] = 'offline'
-                    offline_devices += 1
-                    
-            except Exception as e:
-                print(f"检查设备{device['ip']}状态失败: {e}")
-                device_info['status'] = 'offline'
-                offline_devices += 1
-                
-            device_details.append(device_info)
-        
-        # 构造返回数据
-        dashboard_data = {
-            'total': total_devices,
-            'online': online_devices,
-            'offline': offline_devices,
-            'devices': device_details
-        }
-        
-        return jsonify({'success': True, 'data': dashboard_data})
-        
+        return snapshot_response(dashboard_snapshot, build_dashboard, 'devices', nested=True)
     except Exception as e:
-        print(f"获取仪表板数据失败: {e}")
+        logger.exception("获取仪表板数据失败: %s", e)
         return jsonify({'success': False, 'message': f'获取仪表板数据失败: {str(e)}'}), 500
 
 
+def build_dashboard():
+    """
+    构建仪表板快照
+    :return: (设备状态列表, 汇总字段字典)
+    """
+    # 获取所有设备
+    devices = device_manager.get_all_devices()
+
+    # 初始化统计数据
+    total_devices = len(devices)
+    online_devices = 0
+    offline_devices = 0
+
+    # 读取可达性状态（并发补扫过期设备，耗时约为一次探测超时）
+    states = reachability.refresh(devices, max_age=REACHABILITY_INTERVAL)
+
+    # 获取每个设备的详细信息（包括状态、CPU、内存等）
+    device_details = []
+
+    for device in devices:
+        state = states[device['id']]  # 可达性状态
+        device_info = {
+            'id': device['id'],
+            'name': device.get('name', device['ip']),
+            'vendor': device['vendor'],
+            'ip': device['ip'],
+            'port': device.get('port', 22),
+            'status': state['status'],
+            'status_since': state['last_change'],  # 状态最近变化时间
+            'flapping': state['flapping'],  # 是否处于抖动抑制
+            'cpu': None,
+            'memory': None,
+            'temperature': None
+        }
+
+        if state['status'] == 'online':  # 设备在线
+            online_devices += 1
+
+            # 读取调度器最近一次采集结果（不在请求中登录设备）
+            monitor_result = poll_scheduler.get_result(device['id'])
+            if monitor_result:
+                device_info['cpu'] = monitor_result.get('cpu')
+                device_info['memory'] = monitor_result.get('memory')
+                device_info['temperature'] = monitor_result.get('temperature')
+                device_info['updated_at'] = monitor_result.get('timestamp')  # 采集时间
+            else:  # 尚未采集过，请求尽快采集
+                poll_scheduler.request(device['id'])
+        else:
+            device_info['status'] = 'offline'
+            offline_devices += 1
+
+        device_details.append(device_info)
+
+    # 汇总字段（每次响应都完整返回）
+    summary = {
+        'total': total_devices,
+        'online': online_devices,
+        'offline': offline_devices,
+        'alerts': alert_engine.get_summary(),  # 未恢复告警统计
+        'top_interfaces': {  # 热点接口排行（读取预计算索引）
+            'traffic': interface_rates.get_top('traffic', TOP_INTERFACE_COUNT),
+            'errors': interface_rates.get_top('errors', TOP_INTERFACE_COUNT)
+        }
+    }
+    return device_details, summary
+
+
+def record_interfaces(device, interfaces):
+    """
+    保存一次接口采集结果：计算相对上次采样的速率，并写入接口表
+    :param device: 设备信息字典
+    :param interfaces: 接口记录列表
+    """
+    if not interfaces:  # 无接口数据
+        return
+    rates = interface_rates.update(device['id'], device.get('name', device['ip']), interfaces)  # 计算速率
+    interface_store.update(device['id'], interfaces, rates=rates)  # 保存接口表
+
+
+@app.route('/api/interfaces/top', methods=['GET'])
+def get_top_interfaces():
+    """
+    获取全网热点接口排行
+    查询参数：ranking（traffic/errors，默认traffic）、limit（默认10）
+    :return: JSON格式的排行列表
+    """
+    ranking = request.args.get('ranking', 'traffic')  # 排行维度
+    if ranking not in interface_rates.RANKINGS:  # 维度不合法
+        return jsonify({'success': False, 'message': '排行维度只能是traffic或errors'}), 400
+    limit = request.args.get('limit', TOP_INTERFACE_COUNT, type=int)  # 返回条数
+    return jsonify({'success': True, 'ranking': ranking, 'interfaces': interface_rates.get_top(ranking, limit)})
+
+
+@app.route('/api/reachability', methods=['GET'])
+def get_reachability():
+    """
+    获取全部设备的可达性状态（读取后台扫描结果，不登录设备）
+    :return: JSON格式的状态字典和在线/离线统计
+    """
+    devices = device_manager.get_all_devices()  # 获取所有设备
+    states = reachability.get_states([device['id'] for device in devices])  # 读取状态
+    online = sum(1 for state in states.values() if state['status'] == 'online')  # 在线数
+    return jsonify({
+        'success': True,
+        'total': len(devices),
+        'online': online,
+        'offline': len(devices) - online,
+        'states': states
+    })
+
+
+@app.route('/api/monitor/schedule', methods=['GET'])
+def get_poll_schedule():
+    """
+    获取各设备的轮询调度信息（当前间隔、原因、下次采集时间、连续失败次数）
+    :return: JSON格式的调度字典
+    """
+    return jsonify({'success': True, 'schedule': poll_scheduler.get_schedule()})
+
+
 @app.route('/api/devices', methods=['POST'])
 def add_device():
     """
@@ -144,15 +477,86 @@ def add_device():
         password=data.get('password', ''),  # 密码
         vendor=data.get('vendor', ''),  # 厂商
         port=data.get('port', 22),  # 端口（默认22）
-        name=data.get('name', '')  # 设备名称
+        name=data.get('name', ''),  # 设备名称
+        credential_id=data.get('credential_id') or None,  # 凭据ID（可选）
+        site=data.get('site', ''),  # 站点（可选）
+        role=data.get('role', ''),  # 角色（可选）
+        tags=data.get('tags')  # 标签（可选）
     )
 
     if device:  # 如果添加成功
-        return jsonify({'success': True, 'message': '设备添加成功', 'device': device})  # 返回成功
+        job_id = discovery_manager.submit([device]) if device.get('name_pending') else None  # 后台获取主机名
+        return jsonify({'success': True, 'message': '设备添加成功', 'device': device, 'discovery_job': job_id})  # 返回成功
     else:  # 如果添加失败
         return jsonify({'success': False, 'message': '设备已存在或添加失败'})  # 返回失败
 
 
+@app.route('/api/devices/import', methods=['POST'])
+def import_devices():
+    """
+    批量导入设备（CSV/JSON），一次写入后在后台并行发现主机名
+    支持：multipart文件上传（file字段，按扩展名识别格式）；
+         JSON请求体 {"devices": [...]} 或 {"format": "csv", "content": "..."}
+    CSV列：name, ip, port, vendor, username, password, credential_id, model, serial_number, version, site, role, tags
+    :return: JSON格式的导入结果
+    """
+    try:
+        if 'file' in request.files:  # 文件上传
+            upload = request.files['file']
+            fmt = 'json' if upload.filename.lower().endswith('.json') else 'csv'
+            records = device_manager.parse_import(upload.read().decode('utf-8-sig'), fmt)
+        else:
+            data = request.json or {}  # 获取请求数据，如果为None则使用空字典
+            if isinstance(data.get('devices'), list):
+                records = data['devices']
+            else:
+                records = device_manager.parse_import(data.get('content', ''), data.get('format', 'csv'))
+    except (ValueError, UnicodeDecodeError) as e:  # 文件无法解析
+        return jsonify({'success': False, 'message': f'导入文件解析失败: {str(e)}'}), 400
+
+    known_credentials = {item['id'] for item in credential_vault.list_credentials()}
+    result = device_manager.import_devices(records, known_credentials)  # 校验并一次写入
+    job_id = discovery_manager.submit([device for device in result['added'] if device.get('name_pending')])
+    return jsonify({
+        'success': True,
+        'message': f"导入完成：新增{len(result['added'])}台，重复{len(result['skipped'])}条，无效{len(result['errors'])}条",
+        'added_count': len(result['added']),  # 新增数
+        'skipped': result['skipped'],  # 重复记录
+        'errors': result['errors'],  # 无效记录
+        'discovery_job': job_id  # 后台发现任务ID
+    })
+
+
+@app.route('/api/devices/export', methods=['GET'])
+def export_devices():
+    """
+    导出设备列表
+    查询参数：format（csv/json，默认csv）、include_password（1表示包含密码，默认不包含）
+    :return: 文件下载
+    """
+    fmt = 'json' if request.args.get('format') == 'json' else 'csv'
+    content = device_manager.export_devices(fmt, include_password=request.args.get('include_password') == '1')
+    mimetype = 'application/json' if fmt == 'json' else 'text/csv'
+    return Response(
+        ('\ufeff' + content) if fmt == 'csv' else content,  # CSV带BOM，便于Excel识别UTF-8
+        mimetype=f'{mimetype}; charset=utf-8',
+        headers={'Content-Disposition': f'attachment; filename=devices.{fmt}'}
+    )
+
+
+@app.route('/api/discovery/<job_id>', methods=['GET'])
+def get_discovery_job(job_id):
+    """
+    获取后台发现任务进度
+    :param job_id: 任务ID
+    :return: JSON格式的任务进度
+    """
+    job = discovery_manager.get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': '任务不存在'}), 404
+    return jsonify({'success': True, 'job': job})
+
+
 @app.route('/api/devices/<device_id>', methods=['DELETE'])
 def delete_device(device_id):
     """
@@ -162,6 +566,13 @@ def delete_device(device_id):
     """
     success = device_manager.delete_device(device_id)  # 删除设备
     if success:  # 如果删除成功
+        interface_store.remove(device_id)  # 清理接口表
+        interface_rates.remove(device_id)  # 清理速率和排行
+        history_store.remove(device_id)  # 清理指标历史
+        reachability.remove(device_id)  # 清理可达性状态
+        poll_scheduler.remove(device_id)  # 清理轮询调度
+        alert_engine.remove_device(device_id)  # 清理告警状态
+        facts_collector.remove(device_id)  # 丢弃尚未写回的设备信息
         return jsonify({'success': True, 'message': '设备删除成功'})  # 返回成功
     else:  # 如果删除失败
         return jsonify({'success': False, 'message': '设备不存在或删除失败'})  # 返回失败
@@ -175,41 +586,41 @@ def update_device(device_id):
     :return: JSON格式的结果
     """
     data = request.json or {}  # 获取请求数据，如果为None则使用空字典
-    
+
     # 获取现有设备信息
-    device = device_manager.get_device(device_id)
-    if not device:
+    if not device_manager.get_device(device_id):
         return jsonify({'success': False, 'message': '设备不存在'}), 404
 
-    # 更新设备信息
-    device['name'] = data.get('name', device['name'])
-    device['vendor'] = data.get('vendor', device['vendor'])
-    device['ip'] = data.get('ip', device['ip'])
-    device['port'] = data.get('port', device['port'])
-    device['username'] = data.get('username', device['username'])
-    
+    # 只收集请求中提供的字段，由设备管理器在锁内写入（不覆盖后台同时写回的设备信息）
+    changes = {key: data[key] for key in ('name', 'vendor', 'ip', 'port', 'username') if key in data}
+
     # 如果提供了新密码，则更新密码
     if 'password' in data and data['password']:
-        device['password'] = data['password']
-    
+        changes['password'] = data['password']
+
+    # 凭据引用（空字符串表示改回使用设备自身的用户名密码）
+    if 'credential_id' in data:
+        if data['credential_id'] and not credential_vault.get_summary(data['credential_id']):
+            return jsonify({'success': False, 'message': '凭据不存在'}), 400
+        changes['credential_id'] = data['credential_id'] or None
+        if changes['credential_id']:  # 不再保存明文密码
+            changes['password'] = ''
+
     # 更新扩展信息
-    if 'model' in data:
-        device['model'] = data['model']
-    if 'serial_number' in data:
-        device['serial_number'] = data['serial_number']
-    if 'version' in data:
-        device['version'] = data['version']
-
-    # 保存更新后的设备列表
-    devices = device_manager.load_devices()
-    for i, d in enumerate(devices):
-        if d['id'] == device_id:
-            devices[i] = device
-            break
-    
-    success = device_manager.save_devices(devices)
-    if success:
-        return jsonify({'success': True, 'message': '设备信息更新成功', 'device': device})
+    for key in ('model', 'serial_number', 'version'):
+        if key in data:
+            changes[key] = data[key]
+
+    # 更新分组字段（保存后分组索引自动同步）
+    if 'site' in data:
+        changes['site'] = normalize_site(data['site'])
+    if 'role' in data:
+        changes['role'] = str(data['role'] or '').strip()
+    if 'tags' in data:
+        changes['tags'] = parse_tags(data['tags'])
+
+    if device_manager.update_device(device_id, **changes):
+        return jsonify({'success': True, 'message': '设备信息更新成功', 'device': device_manager.get_device(device_id)})
     else:
         return jsonify({'success': False, 'message': '设备信息更新失败'})
 
@@ -221,13 +632,11 @@ def get_device_detail(device_id):
     :param device_id: 设备ID
     :return: JSON格式的设备详情
     """
-    from datetime import datetime, timedelta
-    import random
-
     # 获取设备基本信息
     device = device_manager.get_device(device_id)
     if not device:
         return jsonify({'success': False, 'message': '设备不存在'}), 404
+    device.update(facts_collector.get_pending(device_id) or {})  # 已采集但尚未写回的设备信息
 
     # 构建设备详情数据
     device_detail = {
@@ -244,574 +653,448 @@ def get_device_detail(device_id):
         'cpu': None,
         'memory': None,
         'temperature': None,
-        'uptime': None,
+        'uptime': format_uptime(device.get('boot_time')),
+        'facts_updated': device.get('facts_updated'),
         'interfaces': [],
-        'history': {
-            'timestamps': [],
-            'cpu': [],
-            'memory': []
-        }
+        'interface_total': 0,
+        'interface_pages': 1,
+        'history': {}
     }
 
     try:
         # 获取设备实时监控数据
-        import socket
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(2)
-        result = sock.connect_ex((device['ip'], int(device.get('port', 22))))
-        sock.close()
+        state = reachability.check(device)  # 探测设备端口并更新可达性状态
+        device_detail['status_since'] = state['last_change']  # 状态最近变化时间
 
-        if result == 0:  # 设备在线
+        if state['status'] == 'online':  # 设备在线
             device_detail['status'] = 'online'
 
             # 尝试获取详细监控数据
             try:
-                monitor_result = monitor.monitor_device(device)
+                # 设备信息读取缓存，只有到期（或从未采集）时才在本次会话中顺带采集
+                monitor_result = monitor.monitor_device(device, include_facts=facts_collector.is_due(device))
+                facts = monitor_result.pop('facts', None) if monitor_result else None
+                poll_scheduler.record(device_id, monitor_result)  # 实时采集结果同步给调度器
                 if monitor_result and monitor_result.get('status') == 'online':
                     device_detail['cpu'] = monitor_result.get('cpu')
                     device_detail['memory'] = monitor_result.get('memory')
                     device_detail['temperature'] = monitor_result.get('temperature')
                     device_detail['hostname'] = monitor_result.get('hostname')
-                    device_detail['model'] = monitor_result.get('model')
-                    device_detail['serial_number'] = monitor_result.get('serial_number')
-                    device_detail['version'] = monitor_result.get('version')
-                    device_detail['uptime'] = monitor_result.get('uptime')
-
-                    # 获取接口信息
-                    device_detail['interfaces'] = get_device_interfaces(device)
+                    if facts is not None:  # 刚采集的设备信息
+                        fields = facts_collector.record(device_id, facts)
+                        device_detail.update({key: fields[key] for key in ('model', 'serial_number', 'version')
+                                              if key in fields})
+                        device_detail['uptime'] = format_uptime(fields.get('boot_time'))
+                        device_detail['facts_updated'] = fields['facts_updated']
+
+                    # 保存同一会话中采集的完整接口表（无需再次登录设备）
+                    record_interfaces(device, monitor_result.get('interfaces'))
+                    history_store.record(device_id, monitor_result)  # 保存指标历史
+                    group_index.update_sample(device_id, monitor_result)  # 更新分组汇总
+                    alert_engine.evaluate(device, monitor_result)  # 评估告警规则
 
             except Exception as e:
-                print(f"获取设备详细信息失败: {e}")
+                logger.warning("获取设备详细信息失败: %s", e, extra={'device': device['ip']})
         else:
             device_detail['status'] = 'offline'
 
-        # 生成历史数据（最近20个数据点，间隔30秒）
-        # 注意：这里是模拟数据，实际应该从数据库或缓存中获取
-        now = datetime.now()
-        for i in range(20):
-            timestamp = now - timedelta(seconds=(19-i)*30)
-            device_detail['history']['timestamps'].append(
-                timestamp.strftime('%H:%M:%S')
-            )
+        # 接口表第一页（其余页通过 /api/devices/<device_id>/interfaces 分页获取）
+        interface_page = interface_store.query(device_id, page_size=INTERFACE_PAGE_SIZE)
+        device_detail['interfaces'] = interface_page['interfaces']
+        device_detail['interface_total'] = interface_page['total']
+        device_detail['interface_pages'] = interface_page['pages']
 
-            # 如果设备在线且有CPU/内存数据，生成模拟历史数据
-            if device_detail['status'] == 'online' and device_detail['cpu'] is not None:
-                # 在当前值附近波动
-                base_cpu = device_detail['cpu'] if isinstance(device_detail['cpu'], (int, float)) else 0
-                base_memory = device_detail['memory'] if isinstance(device_detail['memory'], (int, float)) else 50
-
-                device_detail['history']['cpu'].append(
-                    max(0, min(100, int(base_cpu) + random.randint(-10, 10)))
-                )
-                device_detail['history']['memory'].append(
-                    max(0, min(100, int(base_memory) + random.randint(-5, 5)))
-                )
-            else:
-                device_detail['history']['cpu'].append(None)
-                device_detail['history']['memory'].append(None)
+        # 最近的原始样本（实时图表；更长时间范围通过 /api/devices/<device_id>/history 降采样获取）
+        device_detail['history'] = history_store.recent(device_id, HISTORY_RECENT_POINTS)
 
         return jsonify({'success': True, 'data': device_detail})
 
     except Exception as e:
-        print(f"获取设备详情失败: {e}")
+        logger.exception("获取设备详情失败: %s", e)
         return jsonify({'success': False, 'message': f'获取设备详情失败: {str(e)}'}), 500
 
 
-def get_device_interfaces(device):
+@app.route('/api/devices/<device_id>/interfaces', methods=['GET'])
+def get_device_interface_page(device_id):
     """
-    获取设备接口信息
-    :param device: 设备信息
-    :return: 接口列表
+    分页获取设备接口表（读取最近一次采集结果，不登录设备）
+    查询参数：page、page_size、status（up/down）、q（接口名称或描述关键字）、sort、order（asc/desc）
+    :param device_id: 设备ID
+    :return: JSON格式的分页接口列表
     """
-    try:
-        from modules.ssh_connector import SSHConnector
-
-        # 创建SSH连接
-        ssh = SSHConnector(
-            host=device['ip'],
-            port=device.get('port', 22),
-            username=device['username'],
-            password=device['password']
-        )
+    if not device_manager.get_device(device_id):  # 设备不存在
+        return jsonify({'success': False, 'message': '设备不存在'}), 404
 
-        if not ssh.connect():
-            return []
+    result = interface_store.query(
+        device_id,
+        page=request.args.get('page', 1, type=int),  # 页码
+        page_size=request.args.get('page_size', INTERFACE_PAGE_SIZE, type=int),  # 每页条数
+        status=request.args.get('status') or None,  # 状态过滤
+        keyword=request.args.get('q') or None,  # 关键字过滤
+        sort=request.args.get('sort') or None,  # 排序列
+        descending=request.args.get('order') == 'desc'  # 是否降序
+    )
+    return jsonify({'success': True, 'data': result})
 
-        # 根据厂商获取接口信息命令
-        vendor = device.get('vendor', 'Huawei')
-        interface_command = get_interface_command(vendor)
 
-        output = ssh.execute_command(interface_command)
-        ssh.disconnect()
+@app.route('/api/devices/<device_id>/history', methods=['GET'])
+def get_device_history(device_id):
+    """
+    查询设备指标历史（服务端按图表宽度降采样，长时间范围只返回与像素数相当的点）
+    查询参数：metric（cpu/memory/temperature）、range（如1h、24h、7d、30d）、width（图表像素宽度）、
+              method（minmax返回每个像素的最小/最大/平均值，lttb返回保留形状的代表点）
+    :param device_id: 设备ID
+    :return: JSON格式的降采样结果
+    """
+    if not device_manager.get_device(device_id):  # 设备不存在
+        return jsonify({'success': False, 'message': '设备不存在'}), 404
 
-        if not output:
-            return []
+    try:
+        result = history_store.query(
+            device_id,
+            metric=request.args.get('metric', 'cpu'),  # 指标
+            range_text=request.args.get('range', '24h'),  # 时间范围
+            width=request.args.get('width', 800, type=int),  # 图表宽度
+            method=request.args.get('method', 'minmax')  # 降采样方法
+        )
+    except ValueError as e:  # 参数无效
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, 'data': result})
 
-        # 解析接口信息（这里需要根据不同厂商的输出格式进行解析）
-        interfaces = parse_interface_output(output, vendor)
-        return interfaces
 
-    except Exception as e:
-        print(f"获取接口信息失败: {e}")
-        return []
-
-
-def get_interface_command(vendor):
-    """
-    获取接口信息命令
-    :param vendor: 设备厂商
-    :return: 命令字符串
-    """
-    commands = {
-        'Cisco(IOS)': 'show ip interface brief',
-        'Cisco(NX-OS)': 'show interface brief',
-        'Huawei': 'display interface brief',
-        'H3C': 'display interface brief',
-        'Juniper': 'show interfaces terse',
-        'Fortinet': 'get system interface',
-        'Arista': 'show interfaces status',
-        'Dell': 'show interfaces status',
-        'HP': 'display interface brief',
-        'Linux': 'ip -s link show',
-        'Windows': 'ipconfig /all',
-    }
-    return commands.get(vendor, 'display interface brief')
+# ==================== API：设备分组 ====================
+@app.route('/api/groups', methods=['GET'])
+def get_groups():
+    """
+    获取分组汇总（读取增量维护的汇总值，不扫描设备）
+    查询参数：dimension（site/role/vendor/tag）、parent（上级站点分组键，如 site:北京，返回其下级站点）
+    :return: JSON格式的分组汇总列表
+    """
+    dimension = request.args.get('dimension') or None  # 维度过滤
+    if dimension and dimension not in GROUP_DIMENSIONS:  # 维度不合法
+        return jsonify({'success': False, 'message': f"维度只能是{'/'.join(GROUP_DIMENSIONS)}"}), 400
+    groups = group_index.get_groups(dimension, parent=request.args.get('parent') or None)
+    return jsonify({'success': True, 'groups': groups})
 
 
-def parse_interface_output(output, vendor):
+@app.route('/api/groups/<path:group>', methods=['GET'])
+def get_group(group):
+    """
+    获取单个分组的汇总和成员设备
+    :param group: 分组键（如 site:北京/亦庄机房、role:core、vendor:huawei、tag:核心）
+    :return: JSON格式的分组汇总（devices_list为成员设备的基本信息）
+    """
+    summary = group_index.get_group(group)
+    if summary is None:
+        return jsonify({'success': False, 'message': '分组不存在'}), 404
+    members = set(summary.pop('device_ids'))
+    states = reachability.get_states(list(members))
+    summary['devices_list'] = [
+        {'id': device['id'], 'name': device.get('name', device['ip']), 'ip': device['ip'],
+         'vendor': device['vendor'], 'status': states[device['id']]['status']}
+        for device in device_manager.get_all_devices() if device['id'] in members
+    ]
+    return jsonify({'success': True, 'group': summary})
+
+
+# ==================== API：告警 ====================
+@app.route('/api/alerts', methods=['GET'])
+def get_alerts():
     """
-    解析接口信息输出
-    :param output: 命令输出
-    :param vendor: 设备厂商
-    :return: 接口列表
+    查询告警日志
+    查询参数：state（firing/resolved）、device_id、severity、since（开始时间戳）、limit（默认100）
+    :return: JSON格式的告警列表
     """
-    interfaces = []
+    alerts = alert_engine.query(
+        state=request.args.get('state') or None,  # 状态过滤
+        device_id=request.args.get('device_id') or None,  # 设备过滤
+        severity=request.args.get('severity') or None,  # 级别过滤
+        since=request.args.get('since', type=float),  # 时间过滤
+        limit=request.args.get('limit', 100, type=int)  # 返回条数
+    )
+    return jsonify({'success': True, 'alerts': alerts, 'summary': alert_engine.get_summary()})
 
-    try:
-        if vendor == 'Huawei' or vendor == 'H3C':
-            # 华为/H3C设备接口解析
-            interfaces = parse_huawei_interfaces(output)
-        elif vendor == 'Cisco(IOS)':
-            # Cisco IOS设备接口解析
-            interfaces = parse_cisco_ios_interfaces(output)
-        elif vendor == 'Cisco(NX-OS)':
-            # Cisco NX-OS设备接口解析
-            interfaces = parse_cisco_nxos_interfaces(output)
-        elif vendor == 'Linux':
-            # Linux服务器接口解析
-            interfaces = parse_linux_interfaces(output)
-        elif vendor == 'Windows':
-            # Windows服务器接口解析
-            interfaces = parse_windows_interfaces(output)
-        elif vendor == 'Juniper':
-            # Juniper设备接口解析
-            interfaces = parse_juniper_interfaces(output)
-        else:
-            # 通用解析（尽力而为）
-            interfaces = parse_generic_interfaces(output)
 
-    except Exception as e:
-        print(f"解析接口信息失败 ({vendor}): {e}")
+@app.route('/api/alerts/rules', methods=['GET'])
+def get_alert_rules():
+    """
+    获取告警规则
+    :return: JSON格式的规则列表
+    """
+    return jsonify({'success': True, 'rules': alert_engine.rules})
+
 
-    return interfaces
+@app.route('/api/alerts/rules', methods=['POST'])
+def save_alert_rules():
+    """
+    保存告警规则（整体替换）
+    :return: JSON格式的结果
+    """
+    data = request.json or {}  # 获取请求数据，如果为None则使用空字典
+    rules = data.get('rules')
+    if not isinstance(rules, list):  # 参数校验
+        return jsonify({'success': False, 'message': 'rules必须是规则列表'}), 400
+    if alert_engine.save_rules(rules):
+        group_index.set_alert_counts(alert_engine.get_firing_counts())  # 修改的规则其告警已批量解除
+        poll_scheduler.thresholds = alert_engine.get_thresholds()  # 轮询调度按新阈值判断是否接近阈值
+        coordinator.invalidate()  # 采集节点重新拉取阈值
+        return jsonify({'success': True, 'message': '告警规则保存成功'})
+    return jsonify({'success': False, 'message': '告警规则无效或保存失败'}), 400
+
+
+# ==================== API：凭据管理 ====================
+@app.route('/api/credentials', methods=['GET'])
+def get_credentials():
+    """
+    获取凭据列表（不含密码），附带引用每个凭据的设备数
+    :return: JSON格式的凭据列表
+    """
+    usage = {}
+    for device in device_manager.get_all_devices():
+        if device.get('credential_id'):
+            usage[device['credential_id']] = usage.get(device['credential_id'], 0) + 1
+    credentials = [dict(item, device_count=usage.get(item['id'], 0)) for item in credential_vault.list_credentials()]
+    return jsonify({'success': True, 'credentials': credentials})
 
 
-def parse_huawei_interfaces(output):
+@app.route('/api/credentials', methods=['POST'])
+def create_credential():
     """
-    解析华为/H3C设备接口信息
-    输出格式示例：
-    Interface                   PHY   Protocol  InUti OutUti   inErrors  outErrors
-    GigabitEthernet0/0/1        up    up        0.01%  0.01%          0          0
+    创建凭据
+    请求体：{"name": "核心交换机", "username": "admin", "password": "..."}
+    :return: JSON格式的凭据摘要
     """
-    interfaces = []
-    lines = output.strip().split('\n')
+    data = request.json or {}  # 获取请求数据，如果为None则使用空字典
+    if not data.get('username') or not data.get('password'):  # 参数校验
+        return jsonify({'success': False, 'message': '用户名和密码不能为空'}), 400
+    credential = credential_vault.create(data.get('name', ''), data['username'], data['password'])
+    return jsonify({'success': True, 'message': '凭据创建成功', 'credential': credential})
 
-    for line in lines:
-        line = line.strip()
-        # 跳过标题行和分隔符
-        if not line or 'Interface' in line or '---' in line or line.startswith('*'):
-            continue
 
-        parts = line.split()
-        if len(parts) >= 3:
-            interface_name = parts[0]
-            phy_status = parts[1] if len(parts) > 1 else 'unknown'
-            protocol_status = parts[2] if len(parts) > 2 else 'unknown'
-
-            # 判断接口状态
-            status = 'up' if phy_status.lower() == 'up' and protocol_status.lower() == 'up' else 'down'
-
-            interfaces.append({
-                'name': interface_name,
-                'status': status,
-                'speed': phy_status,
-                'rx_bytes': 0,
-                'tx_bytes': 0,
-                'errors': 0,
-                'description': f'PHY: {phy_status}, Protocol: {protocol_status}'
-            })
-
-    return interfaces
-
-
-def parse_cisco_ios_interfaces(output):
-    """
-    解析Cisco IOS设备接口信息
-    输出格式示例：
-    Interface              IP-Address      OK? Method Status                Protocol
-    GigabitEthernet0/0     192.168.1.1     YES NVRAM  up                    up
-    """
-    interfaces = []
-    lines = output.strip().split('\n')
-    
-    # 打印原始输出用于调试
-    print(f"[DEBUG] Cisco IOS原始接口输出:\n{output}")
-
-    for line in lines:
-        line = line.strip()
-        # 跳过标题行
-        if not line or 'Interface' in line or '---' in line:
-            continue
-            
-        # 保存原始行用于调试对比
-        original_line = line
-        
-        # 过滤控制字符和垃圾字符
-        # 移除常见的控制字符（ASCII < 32 和 ASCII = 127）
-        filtered_line = ''.join(char for char in line if ord(char) >= 32 and ord(char) != 127)
-        
-        # 特别处理\b (backspace)字符问题，这些字符在Cisco设备输出中很常见
-        # 先将字符串转换为字节，再移除backspace字符
-        filtered_line = filtered_line.replace('\b', '')  # 移除backspace字符
-        
-        # 移除多余的"unassigned"字符串
-        filtered_line = filtered_line.replace('unassigned', '').strip()
-        # 移除多余的"unset"字符串
-        filtered_line = filtered_line.replace('unset', '').strip()
-        # 移除多余的"DOWN"字符串（只保留状态信息）
-        filtered_line = filtered_line.replace('DOWN', '').strip()
-        # 移除多余的"UP"字符串（只保留状态信息）
-        filtered_line = filtered_line.replace('UP', '').strip()
-        
-        # 移除多余的空白字符
-        while '  ' in filtered_line:
-            filtered_line = filtered_line.replace('  ', ' ')
-        
-        # 打印过滤前后的对比用于调试
-        if original_line != filtered_line:
-            print(f"[DEBUG] 过滤前: {repr(original_line)}")
-            print(f"[DEBUG] 过滤后: {repr(filtered_line)}")
-        
-        # 分割处理后的行
-        parts = filtered_line.split()
-        # Cisco "show ip interface brief" 命令的标准输出格式：
-        # Interface  IP-Address  OK?  Method  Status  Protocol
-        # 至少需要6个部分才能正确解析
-        if len(parts) >= 6:
-            interface_name = parts[0]
-            # 清理接口名称中的垃圾字符，只保留合法字符
-            interface_name = ''.join(char for char in interface_name if char.isalnum() or char in ['/', '.', '-', '_'])
-            ip_address = parts[1] if len(parts) > 1 else '-'
-            ok_status = parts[2] if len(parts) > 2 else '-'
-            method = parts[3] if len(parts) > 3 else '-'
-            admin_status = parts[4] if len(parts) > 4 else 'unknown'
-            protocol_status = parts[5] if len(parts) > 5 else 'unknown'
-
-            status = 'up' if admin_status.lower() == 'up' and protocol_status.lower() == 'up' else 'down'
-
-            interfaces.append({
-                'name': interface_name,
-                'status': status,
-                'speed': '-',  # Cisco接口简要信息中不包含速度信息
-                'rx_bytes': 0,
-                'tx_bytes': 0,
-                'errors': 0,
-                'description': f'IP: {ip_address}, Status: {admin_status}/{protocol_status}'
-            })
-        # 处理特殊情况，如您提到的包含额外信息的行
-        elif len(parts) >= 4 and ('GigabitEthernet' in filtered_line or 'FastEthernet' in filtered_line):
-            # 尝试从行中提取接口名称
-            interface_name = ''
-            for part in parts:
-                if 'Ethernet' in part:
-                    interface_name = part
-                    break
-            
-            if interface_name:
-                # 清理接口名称中的垃圾字符
-                interface_name = ''.join(char for char in interface_name if char.isalnum() or char in ['/', '.', '-', '_'])
-                # 简化状态判断
-                status = 'down'  # 根据您的示例，这些接口都是down状态
-                interfaces.append({
-                    'name': interface_name,
-                    'status': status,
-                    'speed': '-',
-                    'rx_bytes': 0,
-                    'tx_bytes': 0,
-                    'errors': 0,
-                    'description': 'IP: unassigned, Status: down/down'
-                })
-
-    return interfaces
-
-
-def parse_cisco_nxos_interfaces(output):
-    """
-    解析Cisco NX-OS设备接口信息
-    输出格式示例：
-    Interface              Status          Description
-    Ethernet1/1            up              Server Port
-    7mmEth1/12             down            --
-    """
-    interfaces = []
-    lines = output.strip().split('\n')
-    
-    # 打印原始输出用于调试
-    print(f"[DEBUG] Cisco NX-OS原始接口输出:\n{output}")
-
-    for line in lines:
-        line = line.strip()
-        # 跳过标题行
-        if not line or 'Interface' in line or '---' in line:
-            continue
-            
-        # 保存原始行用于调试对比
-        original_line = line
-        
-        # 过滤控制字符和垃圾字符
-        # 移除常见的控制字符（ASCII < 32 和 ASCII = 127）
-        filtered_line = ''.join(char for char in line if ord(char) >= 32 and ord(char) != 127)
-        
-        # 特别处理\b (backspace)字符问题，这些字符在Cisco设备输出中很常见
-        filtered_line = filtered_line.replace('\b', '')  # 移除backspace字符
-        
-        # 移除多余的空白字符
-        while '  ' in filtered_line:
-            filtered_line = filtered_line.replace('  ', ' ')
-        
-        # 过滤掉接口名称前的"7mm"前缀
-        if filtered_line.startswith('7mm') and len(filtered_line) > 3:
-            filtered_line = filtered_line[3:]
-        
-        # 打印过滤前后的对比用于调试
-        if original_line != filtered_line:
-            print(f"[DEBUG] 过滤前: {repr(original_line)}")
-            print(f"[DEBUG] 过滤后: {repr(filtered_line)}")
-        
-        # 分割处理后的行
-        parts = filtered_line.split()
-        # Cisco NX-OS "show interface brief" 命令的标准输出格式：
-        # Interface  Status  Description
-        # 至少需要3个部分才能正确解析
-        if len(parts) >= 3:
-            interface_name = parts[0]
-            # 清理接口名称中的垃圾字符，只保留合法字符
-            interface_name = ''.join(char for char in interface_name if char.isalnum() or char in ['/', '.', '-', '_'])
-            status = parts[1] if len(parts) > 1 else 'unknown'
-            description = ' '.join(parts[2:]) if len(parts) > 2 else '-'
-
-            # 标准化状态值
-            status = 'up' if status.lower() == 'up' else 'down'
-
-            interfaces.append({
-                'name': interface_name,
-                'status': status,
-                'speed': '-',  # NX-OS接口简要信息中不包含速度信息
-                'rx_bytes': 0,
-                'tx_bytes': 0,
-                'errors': 0,
-                'description': description
-            })
-        # 处理只有接口名和状态的行
-        elif len(parts) >= 2:
-            interface_name = parts[0]
-            # 清理接口名称中的垃圾字符，只保留合法字符
-            interface_name = ''.join(char for char in interface_name if char.isalnum() or char in ['/', '.', '-', '_'])
-            status = parts[1] if len(parts) > 1 else 'unknown'
-
-            # 标准化状态值
-            status = 'up' if status.lower() == 'up' else 'down'
-
-            interfaces.append({
-                'name': interface_name,
-                'status': status,
-                'speed': '-',
-                'rx_bytes': 0,
-                'tx_bytes': 0,
-                'errors': 0,
-                'description': '-'
-            })
-
-    return interfaces
-
-
-def parse_linux_interfaces(output):
-    """
-    解析Linux服务器接口信息
-    输出格式示例：
-    2: eth0: <BROADCAST,MULTICAST,UP,LOWER_UP> mtu 1500 qdisc pfifo_fast state UP
-        RX: bytes  packets  errors  dropped overrun mcast
-        12345678   9876     0       0       0       0
-    """
-    interfaces = []
-    lines = output.strip().split('\n')
-
-    current_interface = None
-
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
+@app.route('/api/credentials/<credential_id>', methods=['PUT'])
+def update_credential(credential_id):
+    """
+    更新凭据（密码为空时保持不变，引用该凭据的设备下次连接即使用新密码）
+    :param credential_id: 凭据ID
+    :return: JSON格式的结果
+    """
+    data = request.json or {}  # 获取请求数据，如果为None则使用空字典
+    credential = credential_vault.update(credential_id, data.get('name'), data.get('username'), data.get('password'))
+    if not credential:
+        return jsonify({'success': False, 'message': '凭据不存在'}), 404
+    coordinator.invalidate()  # 采集节点重新拉取分配（含新密码）
+    return jsonify({'success': True, 'message': '凭据更新成功', 'credential': credential})
 
-        # 匹配接口行
-        if ':' in line and '<' in line:
-            parts = line.split(':')
-            if len(parts) >= 2:
-                interface_name = parts[1].strip().split()[0]
-                status = 'up' if 'UP' in line else 'down'
-
-                current_interface = {
-                    'name': interface_name,
-                    'status': status,
-                    'speed': '-',
-                    'rx_bytes': 0,
-                    'tx_bytes': 0,
-                    'errors': 0,
-                    'description': 'Linux Network Interface'
-                }
-                interfaces.append(current_interface)
-
-        # 匹配RX统计行
-        elif 'RX:' in line and current_interface:
-            try:
-                next_line_idx = lines.index(line) + 1
-                if next_line_idx < len(lines):
-                    stats = lines[next_line_idx].split()
-                    if len(stats) >= 3:
-                        current_interface['rx_bytes'] = int(stats[0])
-                        current_interface['errors'] = int(stats[2])
-            except:
-                pass
-
-        # 匹配TX统计行
-        elif 'TX:' in line and current_interface:
-            try:
-                next_line_idx = lines.index(line) + 1
-                if next_line_idx < len(lines):
-                    stats = lines[next_line_idx].split()
-                    if len(stats) >= 1:
-                        current_interface['tx_bytes'] = int(stats[0])
-            except:
-                pass
 
-    return interfaces
+@app.route('/api/credentials/<credential_id>', methods=['DELETE'])
+def delete_credential(credential_id):
+    """
+    删除凭据（仍被设备引用时拒绝删除）
+    :param credential_id: 凭据ID
+    :return: JSON格式的结果
+    """
+    in_use = sum(1 for device in device_manager.get_all_devices() if device.get('credential_id') == credential_id)
+    if in_use:
+        return jsonify({'success': False, 'message': f'凭据仍被{in_use}台设备引用，无法删除'}), 400
+    if not credential_vault.delete(credential_id):
+        return jsonify({'success': False, 'message': '凭据不存在'}), 404
+    return jsonify({'success': True, 'message': '凭据删除成功'})
 
 
-def parse_windows_interfaces(output):
+@app.route('/api/credentials/migrate', methods=['POST'])
+def migrate_credentials():
     """
-    解析Windows服务器接口信息
-    输出格式示例：
-    Ethernet adapter 以太网:
-       Connection-specific DNS Suffix  . :
-       IPv4 Address. . . . . . . . . . . : 192.168.1.100
+    将设备文件中的明文密码迁移到凭据保险库（相同用户名和密码的设备共用一个凭据）
+    :return: JSON格式的迁移结果
     """
-    interfaces = []
-    lines = output.strip().split('\n')
+    mapping = device_manager.migrate_credentials()
+    return jsonify({
+        'success': True,
+        'message': f"已迁移{len(mapping)}台设备，共{len(set(mapping.values()))}个凭据",
+        'migrated': len(mapping),  # 迁移的设备数
+        'credentials': len(set(mapping.values()))  # 使用的凭据数
+    })
 
-    current_interface = None
 
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
+# ==================== API：告警通知 ====================
+# 通知配置接口返回时隐藏的敏感字段
+NOTIFY_SECRET_FIELDS = ('password',)
+NOTIFY_SECRET_MASK = '******'
 
-        # 匹配接口名称行
-        if 'adapter' in line.lower() and ':' in line:
-            interface_name = line.split('adapter')[1].strip().rstrip(':')
-            current_interface = {
-                'name': interface_name,
-                'status': 'up',  # Windows默认显示的都是活动的
-                'speed': '-',
-                'rx_bytes': 0,
-                'tx_bytes': 0,
-                'errors': 0,
-                'description': 'Windows Network Adapter'
-            }
-            interfaces.append(current_interface)
-
-        # 匹配IP地址
-        elif 'IPv4 Address' in line and current_interface:
-            try:
-                ip = line.split(':')[1].strip()
-                current_interface['description'] = f'IP: {ip}'
-            except:
-                pass
 
-    return interfaces
+@app.route('/api/notify/config', methods=['GET'])
+def get_notify_config():
+    """
+    获取通知配置（隐藏密码）
+    :return: JSON格式的配置
+    """
+    config = notifier.config
+    channels = [
+        {key: (NOTIFY_SECRET_MASK if key in NOTIFY_SECRET_FIELDS and value else value) for key, value in channel.items()}
+        for channel in config.get('channels', [])
+    ]
+    return jsonify({'success': True, 'config': dict(config, channels=channels), 'stats': notifier.get_stats()})
 
 
-def parse_juniper_interfaces(output):
+@app.route('/api/notify/config', methods=['POST'])
+def save_notify_config():
     """
-    解析Juniper设备接口信息
-    输出格式示例：
-    ge-0/0/0.0              up    up
+    保存通知配置（密码为掩码时保留原值）
+    :return: JSON格式的结果
     """
-    interfaces = []
-    lines = output.strip().split('\n')
+    data = request.json or {}  # 获取请求数据，如果为None则使用空字典
+    if not isinstance(data.get('channels', []), list):  # 参数校验
+        return jsonify({'success': False, 'message': 'channels必须是渠道列表'}), 400
+    old_channels = {channel.get('id'): channel for channel in notifier.config.get('channels', [])}
+    for channel in data.get('channels', []):
+        for field in NOTIFY_SECRET_FIELDS:
+            if channel.get(field) == NOTIFY_SECRET_MASK:  # 未修改密码
+                channel[field] = old_channels.get(channel.get('id'), {}).get(field, '')
+    config = {'digest_window': data.get('digest_window', notifier.config.get('digest_window', 30)),
+              'channels': data.get('channels', [])}
+    if notifier.save_config(config):
+        return jsonify({'success': True, 'message': '通知配置保存成功'})
+    return jsonify({'success': False, 'message': '通知配置无效或保存失败'}), 400
+
+
+@app.route('/api/notify/test/<channel_id>', methods=['POST'])
+def test_notify_channel(channel_id):
+    """
+    向指定渠道发送测试通知
+    :param channel_id: 渠道ID
+    :return: JSON格式的结果
+    """
+    success, message = notifier.send_test(channel_id)
+    return jsonify({'success': success, 'message': message})
 
-    for line in lines:
-        line = line.strip()
-        if not line or 'Interface' in line:
-            continue
 
-        parts = line.split()
-        if len(parts) >= 3:
-            interface_name = parts[0]
-            admin_status = parts[1]
-            link_status = parts[2]
+# ==================== API：配置备份 ====================
+@app.route('/api/backup/config/<device_id>', methods=['POST'])
+def backup_device_config(device_id):
+    """
+    备份单台设备的运行配置（配置未变化时不生成新文件）
+    :param device_id: 设备ID
+    :return: JSON格式的结果（filename、size、unchanged）
+    """
+    device = device_manager.get_device(device_id)
+    if not device:
+        return jsonify({'success': False, 'message': '设备不存在'}), 404
+    try:
+        version = backup_manager.backup_device(device)  # 拉取并保存配置
+    except Exception as e:  # 备份失败
+        logger.warning("备份设备%s配置失败: %s", device['ip'], e, extra={'device': device['ip'], 'task': 'backup'})
+        return jsonify({'success': False, 'message': f'备份失败: {str(e)}'}), 500
+    return jsonify({
+        'success': True,
+        'message': '配置未变化，沿用上一版本' if version['unchanged'] else '配置备份成功',
+        'filename': version['filename'],  # 备份文件名
+        'size': version['size'],  # 文件大小
+        'unchanged': version['unchanged']  # 是否与上一版本相同
+    })
+
+
+@app.route('/api/backup/auto', methods=['POST'])
+def backup_all_configs():
+    """
+    并发备份所有设备的运行配置
+    :return: JSON格式的结果（success_count、total、results）
+    """
+    devices = device_manager.get_all_devices()  # 获取所有设备
+    results = backup_manager.backup_all(devices)  # 并发备份
+    success_count = sum(1 for result in results if result['success'])
+    return jsonify({
+        'success': True,
+        'success_count': success_count,  # 成功数
+        'unchanged_count': sum(1 for result in results if result.get('unchanged')),  # 配置未变化数
+        'total': len(devices),  # 设备总数
+        'results': results  # 每台设备的结果
+    })
+
+
+@app.route('/api/backup/files', methods=['GET'])
+def get_backup_files():
+    """
+    获取备份文件列表
+    :return: JSON格式的文件列表
+    """
+    return jsonify({'success': True, 'files': backup_manager.get_files()})
+
 
-            status = 'up' if admin_status.lower() == 'up' and link_status.lower() == 'up' else 'down'
+@app.route('/api/backup/versions/<device_id>', methods=['GET'])
+def get_backup_versions(device_id):
+    """
+    获取设备的配置版本列表
+    :param device_id: 设备ID
+    :return: JSON格式的版本列表
+    """
+    return jsonify({'success': True, 'versions': backup_manager.get_versions(device_id)})
 
-            interfaces.append({
-                'name': interface_name,
-                'status': status,
-                'speed': '-',
-                'rx_bytes': 0,
-                'tx_bytes': 0,
-                'errors': 0,
-                'description': f'Admin: {admin_status}, Link: {link_status}'
-            })
 
-    return interfaces
+@app.route('/api/backup/download/<filename>', methods=['GET'])
+def download_backup_file(filename):
+    """
+    下载备份文件
+    :param filename: 文件名
+    :return: 文件内容
+    """
+    filepath = backup_manager.get_file_path(filename)  # 校验文件名并获取路径
+    if not filepath:
+        return jsonify({'success': False, 'message': '文件不存在'}), 404
+    return send_file(os.path.abspath(filepath), as_attachment=True, download_name=filename)
 
 
-def parse_generic_interfaces(output):
+@app.route('/api/backup/delete/<filename>', methods=['DELETE'])
+def delete_backup_file(filename):
     """
-    通用接口解析（尽力而为）
+    删除备份文件
+    :param filename: 文件名
+    :return: JSON格式的结果
     """
-    interfaces = []
-    lines = output.strip().split('\n')
+    if backup_manager.delete_file(filename):
+        return jsonify({'success': True, 'message': '文件删除成功'})
+    return jsonify({'success': False, 'message': '文件不存在或删除失败'}), 404
 
-    for line in lines:
-        line = line.strip()
-        if not line or 'Interface' in line or '---' in line:
-            continue
 
-        parts = line.split()
-        if len(parts) >= 2:
-            interfaces.append({
-                'name': parts[0],
-                'status': 'up' if 'up' in line.lower() else 'down',
-                'speed': '-',
-                'rx_bytes': 0,
-                'tx_bytes': 0,
-                'errors': 0,
-                'description': ' '.join(parts[1:])[:50]  # 限制描述长度
-            })
+# ==================== API：配置漂移 ====================
+@app.route('/api/drift', methods=['GET'])
+def check_fleet_drift():
+    """
+    检查所有设备最新备份相对基线的配置漂移
+    查询参数：against（baseline黄金基线 / previous上一版本，默认baseline）
+    :return: JSON格式的检查结果和各状态数量
+    """
+    against = request.args.get('against', 'baseline')
+    if against not in ('baseline', 'previous'):  # 参数校验
+        return jsonify({'success': False, 'message': 'against只能是baseline或previous'}), 400
+    device_ids = [device['id'] for device in device_manager.get_all_devices()]
+    return jsonify({'success': True, **drift_engine.check_all(device_ids, against)})
+
 
-    return interfaces
+@app.route('/api/drift/<device_id>', methods=['GET'])
+def check_device_drift(device_id):
+    """
+    检查单台设备的配置漂移（含配置段差异）
+    :param device_id: 设备ID
+    :return: JSON格式的检查结果
+    """
+    against = request.args.get('against', 'baseline')
+    if against not in ('baseline', 'previous'):  # 参数校验
+        return jsonify({'success': False, 'message': 'against只能是baseline或previous'}), 400
+    return jsonify({'success': True, 'data': drift_engine.check_device(device_id, against)})
 
 
+@app.route('/api/drift/baseline/<device_id>', methods=['POST'])
+def set_drift_baseline(device_id):
+    """
+    设置设备的黄金基线（默认使用最新备份版本）
+    :param device_id: 设备ID
+    :return: JSON格式的结果
+    """
+    data = request.json or {}  # 获取请求数据，如果为None则使用空字典
+    filename = drift_engine.set_baseline(device_id, data.get('filename'))
+    if not filename:
+        return jsonify({'success': False, 'message': '该设备没有对应的备份版本'}), 404
+    return jsonify({'success': True, 'message': '基线设置成功', 'baseline': filename})
 
 
 # ==================== API：AI命令生成 ====================
@@ -880,6 +1163,79 @@ def generate_inspection_commands():
         return jsonify({'success': False, 'message': 'AI巡检命令生成失败'})  # 返回失败
 
 
+# ==================== API：批量命令下发 ====================
+@app.route('/api/bulk/push', methods=['POST'])
+def start_bulk_push():
+    """
+    批量下发配置命令（先金丝雀设备，再分批推进）
+    请求体：device_ids、commands（列表或多行文本）、canary（默认1）、wave_size（默认10）、
+           concurrency（默认5）、max_failures（默认0）、wait_time（默认2）
+    :return: JSON格式的结果（job_id）
+    """
+    data = request.json or {}  # 获取请求数据，如果为None则使用空字典
+    commands = data.get('commands') or []
+    if isinstance(commands, str):  # 多行文本按行拆分
+        commands = commands.splitlines()
+    commands = [command.strip() for command in commands if command and command.strip()]
+    if not commands:  # 参数校验
+        return jsonify({'success': False, 'message': '请提供要下发的命令'}), 400
+
+    device_ids = data.get('device_ids') or []
+    devices_by_id = {device['id']: device for device in device_manager.get_all_devices()}
+    missing = [device_id for device_id in device_ids if device_id not in devices_by_id]
+    if not device_ids or missing:  # 参数校验
+        return jsonify({'success': False, 'message': f'设备不存在: {", ".join(missing)}' if missing else '请选择设备'}), 400
+
+    try:
+        job_id = bulk_push_manager.start_job(
+            [devices_by_id[device_id] for device_id in device_ids],  # 按请求顺序下发
+            commands,
+            canary=int(data.get('canary', 1)),  # 金丝雀设备数
+            wave_size=int(data.get('wave_size', 10)),  # 每批设备数
+            concurrency=int(data.get('concurrency', 5)),  # 每批并发数
+            max_failures=int(data.get('max_failures', 0)),  # 失败阈值
+            wait_time=float(data.get('wait_time', 2))  # 命令等待时间
+        )
+    except (TypeError, ValueError):  # 数值参数非法
+        return jsonify({'success': False, 'message': '下发参数必须是数字'}), 400
+    return jsonify({'success': True, 'job_id': job_id, 'message': '批量下发任务已启动'})
+
+
+@app.route('/api/bulk/jobs', methods=['GET'])
+def get_bulk_jobs():
+    """
+    获取批量下发任务列表
+    :return: JSON格式的任务列表
+    """
+    return jsonify({'success': True, 'jobs': bulk_push_manager.list_jobs()})
+
+
+@app.route('/api/bulk/jobs/<job_id>', methods=['GET'])
+def get_bulk_job(job_id):
+    """
+    获取批量下发任务详情（含每台设备结果）
+    查询参数：output（0表示不返回命令回显）
+    :param job_id: 任务ID
+    :return: JSON格式的任务详情
+    """
+    job = bulk_push_manager.get_job(job_id, include_output=request.args.get('output') != '0')
+    if not job:
+        return jsonify({'success': False, 'message': '任务不存在'}), 404
+    return jsonify({'success': True, 'job': job})
+
+
+@app.route('/api/bulk/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_bulk_job(job_id):
+    """
+    取消批量下发任务（当前批次执行完后停止）
+    :param job_id: 任务ID
+    :return: JSON格式的结果
+    """
+    if bulk_push_manager.cancel_job(job_id):
+        return jsonify({'success': True, 'message': '已请求取消，当前批次完成后停止'})
+    return jsonify({'success': False, 'message': '任务不存在或已结束'}), 404
+
+
 # ==================== API：设备巡检 ====================
 @app.route('/api/inspection/start', methods=['POST'])
 def start_inspection():
@@ -954,21 +1310,21 @@ def get_inspection_progress(task_id):
 @app.route('/api/inspection/files', methods=['GET'])
 def get_inspection_files():
     """
-    获取巡检文件列表
+    获取巡检文件列表（支持ETag和 ?since=<版本> 增量获取）
     :return: JSON格式的文件列表
     """
-    files = inspection_manager.get_inspection_files()  # 获取文件列表
-    return jsonify({'success': True, 'files': files})  # 返回文件列表
+    return snapshot_response(inspection_files_snapshot,
+                             lambda: (inspection_manager.get_inspection_files(), {}), 'files')  # 返回文件列表
 
 
 @app.route('/api/analysis/files', methods=['GET'])
 def get_analysis_files():
     """
-    获取分析报告文件列表
+    获取分析报告文件列表（支持ETag和 ?since=<版本> 增量获取）
     :return: JSON格式的文件列表
     """
-    files = inspection_manager.get_analysis_files()  # 获取文件列表
-    return jsonify({'success': True, 'files': files})  # 返回文件列表
+    return snapshot_response(analysis_files_snapshot,
+                             lambda: (inspection_manager.get_analysis_files(), {}), 'files')  # 返回文件列表
 
 
 @app.route('/api/inspection/analyze', methods=['POST'])
@@ -1029,6 +1385,153 @@ def analyze_existing_file():
     return jsonify({'success': True, 'task_id': task_id, 'message': '分析任务已启动'})  # 返回成功
 
 
+# ==================== API：全文检索 ====================
+@app.route('/api/search', methods=['GET'])
+def search_reports():
+    """
+    全文检索巡检文件和分析报告
+    查询参数：q（关键字，多个以空格分隔）、type（inspection/analysis，可选）、limit（默认50）
+    :return: JSON格式的命中结果（设备、文件、章节、摘要）
+    """
+    query = request.args.get('q', '').strip()  # 检索关键字
+    file_type = request.args.get('type') or None  # 文件类型
+    limit = min(request.args.get('limit', 50, type=int), 500)  # 最大返回条数
+
+    if not query:  # 关键字为空
+        return jsonify({'success': False, 'message': '请输入检索关键字'}), 400
+    if file_type not in (None, 'inspection', 'analysis'):  # 文件类型不合法
+        return jsonify({'success': False, 'message': '文件类型只能是inspection或analysis'}), 400
+
+    start = time.perf_counter()  # 开始计时
+    results = search_index.search(query, file_type=file_type, limit=limit)  # 执行检索
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 2)  # 检索耗时（毫秒）
+
+    return jsonify({'success': True, 'results': results, 'count': len(results), 'elapsed_ms': elapsed_ms})
+
+
+@app.route('/api/search/reindex', methods=['POST'])
+def reindex_reports():
+    """
+    增量重建全文索引
+    :return: JSON格式的结果
+    """
+    count = inspection_manager.sync_search_index()  # 同步索引
+    return jsonify({'success': True, 'reindexed': count, 'stats': search_index.get_stats()})
+
+
+# ==================== API：采集节点 ====================
+def collector_required(view):
+    """
+    采集节点接口的令牌校验（未配置令牌时接口不开放）
+    :param view: 视图函数
+    :return: 包装后的视图函数
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not coordinator.check_token(request.headers.get(COLLECTOR_TOKEN_HEADER)):
+            return jsonify({'success': False, 'message': '采集节点令牌无效或未启用分布式采集'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@app.route('/api/collectors', methods=['GET'])
+def get_collectors():
+    """
+    获取采集节点列表（心跳时间、上报统计、分配的设备数）
+    :return: JSON格式的节点列表
+    """
+    devices = device_manager.get_all_devices()
+    workers = coordinator.get_workers(devices)
+    return jsonify({'success': True, 'enabled': coordinator.enabled, 'epoch': coordinator.epoch, 'workers': workers,
+                    'local': len(devices) - sum(worker['assigned'] for worker in workers)})
+
+
+@app.route('/api/collectors/<worker_id>/heartbeat', methods=['POST'])
+@collector_required
+def collector_heartbeat(worker_id):
+    """
+    采集节点心跳（新节点加入哈希环）
+    :param worker_id: 节点ID
+    :return: JSON格式的分配版本号和心跳间隔
+    """
+    data = request.get_json(silent=True) or {}
+    return jsonify(dict(coordinator.heartbeat(worker_id, data.get('stats')), success=True))
+
+
+@app.route('/api/collectors/<worker_id>/assignments', methods=['GET'])
+@collector_required
+def collector_assignments(worker_id):
+    """
+    获取分配给采集节点的设备（含解密后的登录信息）
+    :param worker_id: 节点ID
+    :return: JSON格式的分配版本号和设备列表
+    """
+    if not coordinator.is_registered(worker_id):  # 心跳超时后需重新发送心跳加入
+        return jsonify({'success': False, 'message': '采集节点未登记'}), 409
+    result = coordinator.assignments(worker_id, device_manager.get_all_devices(), credential_vault.resolve,
+                                     collect_facts=facts_collector.is_due)
+    return jsonify(dict(result, thresholds=alert_engine.get_thresholds(), success=True))
+
+
+@app.route('/api/collectors/<worker_id>/results', methods=['POST'])
+@collector_required
+def collector_results(worker_id):
+    """
+    接收采集节点批量上报的结果（请求体为gzip压缩的JSON：{"results": [{device_id, result, timestamp, duration}]}）
+    只接受节点当前负责的设备的结果：重新分配后旧节点迟到的结果不覆盖新节点的结果，也不重复触发告警
+    :param worker_id: 节点ID
+    :return: JSON格式的处理结果
+    """
+    if not coordinator.is_registered(worker_id):  # 心跳超时后需重新发送心跳加入
+        return jsonify({'success': False, 'message': '采集节点未登记'}), 409
+    try:
+        data = request.get_data()
+        batch = decode_batch(data) if request.headers.get('Content-Encoding') == 'gzip' else json.loads(data)
+        items = validate_batch(batch)
+    except ValueError as e:  # 请求体无效
+        return jsonify({'success': False, 'message': f'批量结果无效: {str(e)}'}), 400
+
+    devices = {device['id']: device for device in device_manager.get_all_devices()}
+    accepted = 0
+    for item in items:
+        device = devices.get(item['device_id'])
+        if device is None:  # 上报期间设备已删除
+            continue
+        if coordinator.owner(device['id']) != worker_id:  # 设备已重新分配给其他节点
+            continue
+        result = item.get('result')
+        try:
+            save_result(device, result, item.get('duration') or 0)
+        except Exception as e:  # 单条结果处理失败不影响其他结果
+            logger.exception("保存采集节点结果失败: %s", e, extra={'device': device['ip']})
+        poll_scheduler.record(device['id'], result, now=item.get('timestamp'))  # 仪表板读取最近一次结果
+        accepted += 1
+    coordinator.record_batch(worker_id, accepted)
+    return jsonify({'success': True, 'accepted': accepted})
+
+
+@app.route('/api/collectors/<worker_id>/leave', methods=['POST'])
+@collector_required
+def collector_leave(worker_id):
+    """
+    采集节点主动退出（立即重新分配其设备）
+    :param worker_id: 节点ID
+    :return: JSON格式的结果
+    """
+    coordinator.leave(worker_id)
+    return jsonify({'success': True})
+
+
+# ==================== API：运行指标 ====================
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    运行指标（Prometheus文本格式）：各阶段耗时直方图、失败次数、队列和任务仪表值
+    :return: 文本格式的指标
+    """
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
 def extract_vendor_from_inspection_file(filepath):
     """
     从巡检文件中提取厂商信息
@@ -1052,18 +1555,17 @@ def extract_vendor_from_inspection_file(filepath):
         # 这里简化处理，返回默认值
         return 'Huawei'
     except Exception as e:
-        print(f"提取厂商信息失败: {e}")
+        logger.warning("提取厂商信息失败: %s", e)
         return None
 
 # ==================== 主程序入口 ====================
 if __name__ == '__main__':
     # 启动Flask应用
-    print("="*60)  # 打印分隔线
-    print("AI网络监控分析智能体平台")  # 打印标题
-    print("="*60)  # 打印分隔线
-    print("欢迎使用网络AI监视器")
-    print("作者：DevNetOps")
-    print("访问地址: http://127.0.0.1:5001")  # 打印访问地址
+    debug = True  # 调试模式（代码修改后自动重载）
+    # 调试模式下重载器的监视进程只负责重启，后台任务只在实际服务请求的子进程（WERKZEUG_RUN_MAIN=true）中启动
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        logger.info("AI网络监控分析智能体平台启动（作者：DevNetOps），访问地址: http://127.0.0.1:5001")
+        start_background()
     app.run(host='0.0.0.0',  # 监听所有网络接口
             port=5001,  # 端口5001
-            debug=True)  # 启用调试模式
+            debug=debug)  # 启用调试模式
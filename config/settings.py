@@ -5,9 +5,13 @@
 """
 
 import json  # 用于JSON数据处理
+import logging  # 日志
 import os  # 用于文件和目录操作
 
 
+logger = logging.getLogger(__name__)  # 模块日志
+
+
 class SettingsManager:
     """配置管理类，负责AI配置的读取和保存"""
 
@@ -63,7 +67,7 @@ class SettingsManager:
             with open(self.config_file, 'r', encoding='utf-8') as f:  # 打开配置文件
                 return json.load(f)  # 返回JSON配置数据
         except Exception as e:  # 如果加载失败
-            print(f"加载配置失败: {e}")  # 打印错误信息
+            logger.error("加载配置失败: %s", e)  # 记录错误信息
             return {}  # 返回空字典
 
     def save_config(self, config):
@@ -79,7 +83,7 @@ class SettingsManager:
                 json.dump(config, f, ensure_ascii=False, indent=4)  # 保存JSON数据（格式化输出）
             return True  # 返回成功
         except Exception as e:  # 如果保存失败
-            print(f"保存配置失败: {e}")  # 打印错误信息
+            logger.error("保存配置失败: %s", e)  # 记录错误信息
             return False  # 返回失败
 
     def get_current_provider_config(self):
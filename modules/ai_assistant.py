@@ -4,8 +4,15 @@ AI助手模块
 负责调用AI API生成网络命令和分析巡检结果
 """
 
+import logging  # 日志
 import requests  # HTTP请求库
-import json  # JSON数据处理
+import time  # 计时
+
+from .metrics import AI_CALL_SECONDS  # AI接口调用耗时
+from .tracing import tracer  # 链路追踪
+
+
+logger = logging.getLogger(__name__)  # 模块日志
 
 
 class AIAssistant:
@@ -33,11 +40,11 @@ class AIAssistant:
         try:
             # 检查必要参数
             if not self.model or not self.model.strip():
-                print("错误：模型名称未配置，请在AI设置中配置model字段")
+                logger.error("模型名称未配置，请在AI设置中配置model字段")
                 return None
 
             if not self.api_key or not self.api_key.strip():
-                print("错误：API密钥未配置")
+                logger.error("API密钥未配置")
                 return None
 
             # 构建请求头
@@ -55,12 +62,24 @@ class AIAssistant:
             }
 
             # 发送POST请求
-            response = requests.post(
-                self.api_url,  # API地址
-                headers=headers,  # 请求头
-                json=payload,  # 请求体
-                timeout=60  # 超时时间60秒
-            )
+            start = time.perf_counter()  # 调用开始时间
+            prompt_chars = sum(len(message.get('content') or '') for message in messages)  # 提示词长度（跨度属性）
+            with tracer.span('ai.call', model=self.model, prompt_chars=prompt_chars) as span:
+                try:
+                    response = requests.post(
+                        self.api_url,  # API地址
+                        headers=headers,  # 请求头
+                        json=payload,  # 请求体
+                        timeout=60  # 超时时间60秒
+                    )
+                except Exception:  # 网络错误、超时
+                    AI_CALL_SECONDS.observe(time.perf_counter() - start, self.model, 'error')
+                    raise
+                span.set(status_code=response.status_code)
+                if response.status_code != 200:
+                    span.fail(f"HTTP {response.status_code}")
+            elapsed = time.perf_counter() - start  # 调用耗时
+            AI_CALL_SECONDS.observe(elapsed, self.model, 'ok' if response.status_code == 200 else 'http_error')
 
             # 检查响应状态
             if response.status_code == 200:  # 请求成功
@@ -68,12 +87,12 @@ class AIAssistant:
                 # 提取AI回复内容
                 return result.get('choices', [{}])[0].get('message', {}).get('content', '')  # 返回内容
             else:  # 请求失败
-                print(f"API调用失败，状态码: {response.status_code}")  # 打印状态码
-                print(f"响应内容: {response.text}")  # 打印响应内容
+                logger.warning("API调用失败，状态码: %s，响应内容: %.500s", response.status_code, response.text,
+                               extra={'duration': round(elapsed, 3)})  # 记录状态码和响应内容（截断）
                 return None  # 返回None
 
         except Exception as e:  # 异常处理
-            print(f"调用AI API失败: {e}")  # 打印错误信息
+            logger.warning("调用AI API失败: %s", e)  # 记录错误信息
             return None  # 返回None
 
     def generate_commands(self, user_request, vendor):
@@ -163,7 +182,7 @@ class AIAssistant:
 
         truncated_output = inspection_output
         if len(inspection_output) > max_chars:
-            print(f"[警告] 巡检内容过长（{len(inspection_output)}字符），进行智能截断到{max_chars}字符")
+            logger.info("巡检内容过长（%d字符），进行智能截断到%d字符", len(inspection_output), max_chars)
 
             # 智能截断策略：保留开头和关键部分
             # 1. 保留前40%的内容（通常包含设备基本信息）
@@ -182,7 +201,7 @@ class AIAssistant:
                 inspection_output[-tail_chars:]
             )
 
-            print(f"[信息] 截断后内容长度: {len(truncated_output)}字符")
+            logger.info("截断后内容长度: %d字符", len(truncated_output))
 
         # 构建提示词
         system_prompt = f"""你是一个专业的网络运维专家，擅长分析{vendor}设备的运行状态。
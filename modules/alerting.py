@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+"""
+告警引擎模块
+负责对每次采集的指标增量评估告警规则（静态阈值、变化率、EWMA异常检测），
+按保持时间去重，并将告警写入可查询的告警日志（SQLite）
+"""
+
+import json  # JSON数据处理
+import logging  # 日志
+import math  # 数学计算
+import os  # 文件操作
+import sqlite3  # SQLite数据库（Python内置）
+import threading  # 线程锁
+import time  # 时间处理
+
+
+logger = logging.getLogger(__name__)  # 模块日志
+
+
+# 支持的规则类型
+RULE_TYPES = ('threshold', 'rate', 'anomaly')
+# 支持的比较方式
+OPERATORS = {
+    '>': lambda value, limit: value > limit,
+    '>=': lambda value, limit: value >= limit,
+    '<': lambda value, limit: value < limit,
+    '<=': lambda value, limit: value <= limit,
+}
+
+# 必须设置阈值的规则类型（评估时缺少阈值按0比较，几乎每个样本都会触发）
+THRESHOLD_REQUIRED = ('threshold', 'rate')
+# 数值字段及其取值范围（下限, 上限），评估时直接参与计算
+NUMERIC_FIELDS = {
+    'threshold': (None, None),
+    'alpha': (0, 1),  # EWMA平滑系数
+    'hold_down': (0, None),  # 恢复保持时间（秒）
+    'min_samples': (0, None),  # 建立基线所需样本数
+}
+
+# 默认告警规则
+DEFAULT_RULES = [
+    {'id': 'cpu_high', 'name': 'CPU使用率过高', 'metric': 'cpu', 'type': 'threshold',
+     'operator': '>=', 'threshold': 85, 'severity': 'critical', 'hold_down': 60, 'enabled': True},
+    {'id': 'memory_high', 'name': '内存使用率过高', 'metric': 'memory', 'type': 'threshold',
+     'operator': '>=', 'threshold': 85, 'severity': 'critical', 'hold_down': 60, 'enabled': True},
+    {'id': 'temperature_high', 'name': '设备温度过高', 'metric': 'temperature', 'type': 'threshold',
+     'operator': '>=', 'threshold': 70, 'severity': 'critical', 'hold_down': 120, 'enabled': True},
+    {'id': 'cpu_spike', 'name': 'CPU使用率骤升', 'metric': 'cpu', 'type': 'rate',
+     'operator': '>=', 'threshold': 30, 'severity': 'warning', 'hold_down': 120, 'enabled': True},
+    {'id': 'memory_anomaly', 'name': '内存使用率异常', 'metric': 'memory', 'type': 'anomaly',
+     'threshold': 3, 'alpha': 0.1, 'min_samples': 10, 'severity': 'warning', 'hold_down': 300, 'enabled': True},
+]
+
+
+def validate_rule(rule):
+    """
+    校验告警规则
+    :param rule: 规则字典
+    :return: 错误信息，规则有效返回None
+    """
+    if not isinstance(rule, dict) or not rule.get('id') or not rule.get('metric'):
+        return f"告警规则缺少id或metric: {rule}"
+    if not isinstance(rule['id'], str):
+        return f"告警规则id必须是字符串: {rule['id']!r}"
+    if rule.get('type', 'threshold') not in RULE_TYPES:
+        return f"不支持的告警规则类型: {rule.get('type')}"
+    if rule.get('operator', '>=') not in OPERATORS:
+        return f"不支持的比较方式: {rule.get('operator')}"
+    if rule.get('type', 'threshold') in THRESHOLD_REQUIRED and 'threshold' not in rule:
+        return f"告警规则{rule['id']}缺少threshold"
+    for field, (low, high) in NUMERIC_FIELDS.items():
+        if field not in rule:
+            continue
+        value = rule[field]
+        # bool是int的子类，需单独排除；NaN和无穷大无法比较
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            return f"告警规则{rule['id']}的{field}必须是数值: {value!r}"
+        if (low is not None and value < low) or (high is not None and value > high):
+            return f"告警规则{rule['id']}的{field}超出范围: {value}"
+    return None
+
+
+class AlertEngine:
+    """告警引擎类：每条规则对每台设备只保存常数大小的状态，新样本到达时增量评估"""
+
+    def __init__(self, rules_file='config/alert_rules.json', db_file='outputs/alerts.db'):
+        """
+        初始化告警引擎
+        :param rules_file: 告警规则文件路径
+        :param db_file: 告警日志数据库路径
+        """
+        self.rules_file = rules_file  # 规则文件路径
+        self.db_file = db_file  # 告警日志路径
+        self._states = {}  # {(规则ID, 设备ID): 规则状态字典}
+        self._listeners = []  # 告警事件监听函数（如通知发送）
+        self._lock = threading.Lock()  # 锁
+        self._ensure_rules_file()  # 确保规则文件存在
+        self.rules = self.load_rules()  # 当前规则
+        self._ensure_database()  # 确保告警日志存在
+
+    def _ensure_rules_file(self):
+        """确保规则文件存在，如果不存在则写入默认规则"""
+        if not os.path.exists(self.rules_file):
+            self.save_rules(DEFAULT_RULES)
+
+    def _ensure_database(self):
+        """确保告警日志数据库和表存在"""
+        os.makedirs(os.path.dirname(self.db_file) or '.', exist_ok=True)  # 创建目录
+        self._conn = sqlite3.connect(self.db_file, check_same_thread=False)  # 允许跨线程使用（由锁保护）
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS alerts ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, rule_id TEXT, rule_name TEXT, '
+            'device_id TEXT, device_name TEXT, device_ip TEXT, metric TEXT, severity TEXT, '
+            'state TEXT, value REAL, message TEXT, started_at REAL, resolved_at REAL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_alerts_state ON alerts(state, started_at)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_alerts_device ON alerts(device_id, started_at)')
+        self._conn.commit()
+        # 进程重启后规则状态丢失，遗留的未恢复告警标记为已恢复，避免永久挂起
+        self._conn.execute("UPDATE alerts SET state = 'resolved', resolved_at = ? WHERE state = 'firing'",
+                           (time.time(),))
+        self._conn.commit()
+
+    def load_rules(self):
+        """
+        加载告警规则
+        :return: 规则列表
+        """
+        try:
+            with open(self.rules_file, 'r', encoding='utf-8') as f:
+                rules = json.load(f)
+        except Exception as e:  # 如果加载失败
+            logger.error("加载告警规则失败: %s", e)
+            return list(DEFAULT_RULES)
+        valid, seen = [], set()
+        for rule in rules:  # 手工修改的规则文件中无效的规则跳过，避免每次采集评估时出错
+            error = validate_rule(rule)
+            if not error and rule['id'] in seen:  # 重复ID的规则会共用规则状态
+                error = f"告警规则ID重复: {rule['id']}"
+            if error:
+                logger.error("忽略无效的告警规则: %s", error)
+            else:
+                seen.add(rule['id'])
+                valid.append(rule)
+        return valid
+
+    def save_rules(self, rules):
+        """
+        保存告警规则（已修改或已删除的规则会重置状态并解除其告警）
+        :param rules: 规则列表
+        :return: True表示成功，False表示失败
+        """
+        seen = set()
+        for rule in rules:  # 校验规则（规则ID不能重复，规则状态按规则ID和设备ID保存）
+            error = validate_rule(rule)
+            if not error and rule['id'] in seen:
+                error = f"告警规则ID重复: {rule['id']}"
+            if error:
+                logger.warning(error)
+                return False
+            seen.add(rule['id'])
+        try:
+            os.makedirs(os.path.dirname(self.rules_file) or '.', exist_ok=True)  # 创建目录
+            with open(self.rules_file, 'w', encoding='utf-8') as f:
+                json.dump(rules, f, ensure_ascii=False, indent=4)
+        except Exception as e:  # 如果保存失败
+            logger.error("保存告警规则失败: %s", e)
+            return False
+        with self._lock:
+            unchanged = {rule['id'] for rule in rules if rule in getattr(self, 'rules', [])}  # 未修改的规则
+            self.rules = rules
+            stale = {key[0] for key in self._states if key[0] not in unchanged}  # 已修改或已删除的规则
+            for key in [key for key in self._states if key[0] in stale]:  # 重新积累状态
+                self._states.pop(key)
+            if stale:  # 其未恢复告警不会再被评估，标记为已恢复
+                self._conn.execute(
+                    f"UPDATE alerts SET state = 'resolved', resolved_at = ? WHERE state = 'firing' "
+                    f"AND rule_id IN ({', '.join('?' * len(stale))})", (time.time(), *stale))
+                self._conn.commit()
+        return True
+
+    def get_thresholds(self):
+        """
+        获取各指标的上限告警阈值（轮询调度据此判断指标是否接近阈值）
+        :return: {指标: 启用的上限阈值规则中最低的阈值}
+        """
+        thresholds = {}
+        for rule in self.rules:
+            if (rule.get('enabled', True) and rule.get('type', 'threshold') == 'threshold'
+                    and rule.get('operator', '>=') in ('>', '>=') and 'threshold' in rule):
+                metric = rule['metric']
+                thresholds[metric] = min(thresholds.get(metric, rule['threshold']), rule['threshold'])
+        return thresholds
+
+    def add_listener(self, listener):
+        """
+        注册告警事件监听函数
+        :param listener: 函数 listener(event)，event为告警事件字典（state为firing或resolved）
+        """
+        self._listeners.append(listener)
+
+    def _check(self, rule, state, value, timestamp):
+        """
+        按规则类型判断本次样本是否越限（只读写该规则的常数大小状态）
+        :param rule: 规则字典
+        :param state: 规则状态字典
+        :param value: 指标值
+        :param timestamp: 采样时间（秒）
+        :return: (是否越限, 用于描述的数值)
+        """
+        rule_type = rule.get('type', 'threshold')
+        compare = OPERATORS[rule.get('operator', '>=')]
+        limit = rule.get('threshold', 0)
+
+        if rule_type == 'threshold':  # 静态阈值
+            return compare(value, limit), value
+
+        if rule_type == 'rate':  # 变化率（每分钟变化量）
+            previous, previous_time = state.get('previous'), state.get('previous_time')
+            state['previous'], state['previous_time'] = value, timestamp
+            if previous is None or timestamp <= previous_time:
+                return False, None
+            rate = (value - previous) * 60 / (timestamp - previous_time)
+            return compare(rate, limit), round(rate, 2)
+
+        # anomaly：EWMA均值和方差，z-score超过阈值视为异常
+        alpha = rule.get('alpha', 0.1)
+        count = state.get('count', 0)
+        mean, variance = state.get('mean', value), state.get('variance', 0.0)
+        z_score = (value - mean) / math.sqrt(variance) if variance > 0 else 0.0  # 与更新前的基线比较
+        deviation = value - mean
+        state['mean'] = mean + alpha * deviation  # 更新EWMA均值
+        state['variance'] = (1 - alpha) * (variance + alpha * deviation * deviation)  # 更新EWMA方差
+        state['count'] = count + 1
+        if count < rule.get('min_samples', 10):  # 基线尚未建立
+            return False, None
+        return abs(z_score) >= limit, round(z_score, 2)
+
+    def evaluate(self, device, sample, timestamp=None):
+        """
+        对一台设备的新样本评估全部启用的规则
+        :param device: 设备信息字典
+        :param sample: 指标样本 {指标名: 数值}（如监控结果字典）
+        :param timestamp: 采样时间（秒），默认当前时间
+        :return: 本次产生的告警事件列表
+        """
+        timestamp = timestamp or time.time()
+        events = []
+        with self._lock:
+            for rule in self.rules:
+                if not rule.get('enabled', True):
+                    continue
+                value = sample.get(rule['metric'])
+                if not isinstance(value, (int, float)):  # 本次未采集到该指标
+                    continue
+                state = self._states.setdefault((rule['id'], device['id']), {})
+                breached, observed = self._check(rule, state, value, timestamp)
+                event = self._transition(rule, device, state, breached, value, observed, timestamp)
+                if event:
+                    events.append(event)
+
+        for event in events:  # 锁外通知监听函数
+            for listener in self._listeners:
+                try:
+                    listener(event)
+                except Exception as e:  # 监听函数异常不影响采集
+                    logger.exception("告警事件处理失败: %s", e)
+        return events
+
+    def _transition(self, rule, device, state, breached, value, observed, timestamp):
+        """
+        按保持时间处理告警状态转换（越限即触发，持续恢复hold_down秒后才解除，期间不重复告警）
+        :param rule: 规则字典
+        :param device: 设备信息字典
+        :param state: 规则状态字典
+        :param breached: 本次是否越限
+        :param value: 指标值
+        :param observed: 用于描述的数值（阈值规则为指标值，变化率为每分钟变化量，异常为z-score）
+        :param timestamp: 采样时间（秒）
+        :return: 告警事件字典，无状态变化返回None
+        """
+        alert_id = state.get('alert_id')
+        if breached:
+            state['clear_since'] = None
+            if alert_id:  # 已在告警中，去重
+                return None
+            message = self._format_message(rule, device, value, observed)
+            cursor = self._conn.execute(
+                'INSERT INTO alerts (rule_id, rule_name, device_id, device_name, device_ip, metric, severity, '
+                "state, value, message, started_at) VALUES (?, ?, ?, ?, ?, ?, ?, 'firing', ?, ?, ?)",
+                (rule['id'], rule.get('name', rule['id']), device['id'], device.get('name', device['ip']),
+                 device['ip'], rule['metric'], rule.get('severity', 'warning'), value, message, timestamp)
+            )
+            self._conn.commit()
+            state['alert_id'] = cursor.lastrowid
+            return self._event(cursor.lastrowid, 'firing', rule, device, value, message, timestamp)
+
+        if not alert_id:  # 未在告警中
+            return None
+        if state.get('clear_since') is None:  # 开始恢复计时
+            state['clear_since'] = timestamp
+        if timestamp - state['clear_since'] < rule.get('hold_down', 60):  # 恢复时间不足，保持告警
+            return None
+        message = f"{device.get('name', device['ip'])} {rule.get('name', rule['id'])}已恢复（当前值 {value}）"
+        self._conn.execute("UPDATE alerts SET state = 'resolved', resolved_at = ? WHERE id = ?",
+                           (timestamp, alert_id))
+        self._conn.commit()
+        state['alert_id'] = None
+        state['clear_since'] = None
+        return self._event(alert_id, 'resolved', rule, device, value, message, timestamp)
+
+    def _format_message(self, rule, device, value, observed):
+        """
+        生成告警描述
+        :param rule: 规则字典
+        :param device: 设备信息字典
+        :param value: 指标值
+        :param observed: 用于描述的数值
+        :return: 告警描述
+        """
+        name = device.get('name', device['ip'])
+        rule_type = rule.get('type', 'threshold')
+        if rule_type == 'rate':
+            return f"{name} {rule.get('name', rule['id'])}：每分钟变化 {observed}（当前值 {value}）"
+        if rule_type == 'anomaly':
+            return f"{name} {rule.get('name', rule['id'])}：偏离基线 z={observed}（当前值 {value}）"
+        return f"{name} {rule.get('name', rule['id'])}：当前值 {value}，阈值 {rule.get('operator', '>=')} {rule.get('threshold')}"
+
+    def _event(self, alert_id, state, rule, device, value, message, timestamp):
+        """
+        构造告警事件
+        :return: 告警事件字典
+        """
+        return {
+            'id': alert_id,  # 告警ID
+            'state': state,  # firing / resolved
+            'rule_id': rule['id'],  # 规则ID
+            'rule_name': rule.get('name', rule['id']),  # 规则名称
+            'severity': rule.get('severity', 'warning'),  # 级别
+            'metric': rule['metric'],  # 指标
+            'device_id': device['id'],  # 设备ID
+            'device_name': device.get('name', device['ip']),  # 设备名称
+            'device_ip': device['ip'],  # 设备IP
+            'value': value,  # 指标值
+            'message': message,  # 描述
+            'timestamp': timestamp  # 时间
+        }
+
+    def query(self, state=None, device_id=None, severity=None, since=None, limit=100):
+        """
+        查询告警日志
+        :param state: 状态过滤（firing / resolved）
+        :param device_id: 设备ID过滤
+        :param severity: 级别过滤
+        :param since: 只返回该时间之后开始的告警（秒）
+        :param limit: 返回条数
+        :return: 告警字典列表（按开始时间倒序）
+        """
+        conditions, params = [], []
+        for column, value in (('state', state), ('device_id', device_id), ('severity', severity)):
+            if value:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        if since:
+            conditions.append('started_at >= ?')
+            params.append(since)
+        sql = 'SELECT * FROM alerts'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY started_at DESC LIMIT ?'
+        params.append(max(1, min(int(limit), 1000)))
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get_summary(self):
+        """
+        统计当前未恢复告警数量
+        :return: {'firing': 总数, 'critical': 数量, 'warning': 数量}
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT severity, COUNT(*) FROM alerts WHERE state = 'firing' GROUP BY severity"
+            ).fetchall()
+        summary = {'firing': sum(count for _, count in rows)}
+        summary.update({severity: count for severity, count in rows})
+        return summary
+
+    def get_firing_counts(self):
+        """
+        按设备统计当前未恢复告警数量
+        :return: {设备ID: 数量}
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT device_id, COUNT(*) FROM alerts WHERE state = 'firing' GROUP BY device_id"
+            ).fetchall()
+        return dict(rows)
+
+    def remove_device(self, device_id):
+        """
+        删除设备的规则状态，并将其未恢复告警标记为已恢复
+        :param device_id: 设备ID
+        """
+        with self._lock:
+            for key in [key for key in self._states if key[1] == device_id]:
+                self._states.pop(key)
+            self._conn.execute("UPDATE alerts SET state = 'resolved', resolved_at = ? "
+                               "WHERE device_id = ? AND state = 'firing'", (time.time(), device_id))
+            self._conn.commit()
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+配置备份模块
+负责通过SSH拉取设备运行配置，按内容哈希去重保存版本，并支持全网并发备份
+"""
+
+import hashlib  # 哈希计算
+import json  # JSON数据处理
+import logging  # 日志
+import os  # 文件操作
+import re  # 正则表达式
+import threading  # 线程锁
+from concurrent.futures import ThreadPoolExecutor  # 并发备份
+from datetime import datetime  # 时间处理
+
+from .ssh_connector import SSHConnector  # SSH连接器
+from .parsers import normalize_vendor, scrub_control_chars  # 厂商名称标准化、控制字符清理
+from .drift import normalize_config  # 配置规范化
+from .metrics import FILE_WRITE_SECONDS  # 文件写入耗时
+from .tracing import tracer  # 链路追踪
+
+
+logger = logging.getLogger(__name__)  # 模块日志
+
+
+# 各厂商的关闭分页命令和查看运行配置命令 {标准厂商键: (关闭分页命令, 配置命令)}
+BACKUP_COMMANDS = {
+    'huawei': ('screen-length 0 temporary', 'display current-configuration'),
+    'h3c': ('screen-length disable', 'display current-configuration'),
+    'cisco_ios': ('terminal length 0', 'show running-config'),
+    'cisco_nxos': ('terminal length 0', 'show running-config'),
+    'ruijie': ('terminal length 0', 'show running-config'),
+    'arista': ('terminal length 0', 'show running-config'),
+    'dell': ('terminal length 0', 'show running-config'),
+    'zte': ('terminal length 0', 'show running-config'),
+    'hp': ('no page', 'show running-config'),
+    'juniper': ('set cli screen-length 0', 'show configuration | display set'),
+    'fortinet': (None, 'show full-configuration'),
+}
+# 不支持配置备份的厂商（服务器操作系统没有统一的"运行配置"）
+UNSUPPORTED_VENDORS = ('linux', 'windows')
+# 默认命令（未单独登记的网络设备）
+DEFAULT_BACKUP_COMMANDS = ('terminal length 0', 'show running-config')
+
+# 输出末尾的设备提示符行（如：<HUAWEI>、Switch#、user@router>）
+PROMPT_LINE_PATTERN = re.compile(r'^\s*[<\[]?[\w\-.:/()@~]+[>\]#$]\s*$')
+# 文件名中不允许的字符
+UNSAFE_FILENAME_PATTERN = re.compile(r'[^\w\-.]+')
+
+
+def clean_config_output(output, command):
+    """
+    清理配置命令输出：去除控制字符、命令回显和末尾提示符
+    :param output: 原始输出
+    :param command: 配置命令
+    :return: 配置文本
+    """
+    lines = scrub_control_chars(output or '').replace('\r', '').split('\n')
+    for index, line in enumerate(lines[:5]):  # 命令回显位于开头几行
+        if command in line:
+            lines = lines[index + 1:]
+            break
+    while lines and (not lines[-1].strip() or PROMPT_LINE_PATTERN.match(lines[-1])):  # 去除末尾提示符和空行
+        lines.pop()
+    while lines and not lines[0].strip():  # 去除开头空行
+        lines.pop(0)
+    return '\n'.join(line.rstrip() for line in lines) + '\n'
+
+
+def config_hash(text):
+    """
+    计算配置内容哈希（基于规范化后的配置，时间戳、NTP时钟周期等变化不视为配置变化）
+    :param text: 配置文本
+    :return: SHA-256十六进制字符串
+    """
+    return hashlib.sha256(normalize_config(text).encode('utf-8')).hexdigest()
+
+
+class BackupManager:
+    """配置备份管理类：每台设备只在配置内容变化时写入新版本文件"""
+
+    def __init__(self, backup_dir='outputs/backup', max_workers=8):
+        """
+        初始化备份管理器
+        :param backup_dir: 备份文件目录
+        :param max_workers: 全网备份时的最大并发SSH会话数
+        """
+        self.backup_dir = backup_dir  # 备份目录
+        self.index_file = os.path.join(backup_dir, 'index.json')  # 版本索引文件
+        self.max_workers = max_workers  # 并发数
+        self._lock = threading.Lock()  # 索引读写锁
+        os.makedirs(self.backup_dir, exist_ok=True)  # 确保目录存在
+        self._index = self._load_index()  # {设备ID: {'hash': 最新哈希, 'versions': [版本字典, ...]}}
+        self._dirty = False  # 索引是否有未写入的检查时间
+
+    def _load_index(self):
+        """
+        加载版本索引
+        :return: 索引字典
+        """
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:  # 首次使用
+            return {}
+        except Exception as e:  # 索引损坏
+            logger.error("加载备份索引失败: %s", e)
+            return {}
+
+    def _save_index(self):
+        """保存版本索引（先写临时文件再替换，避免写入中断导致索引损坏）"""
+        temp_file = self.index_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, self.index_file)
+        self._dirty = False
+
+    def flush(self):
+        """将内存中更新的检查时间写入版本索引"""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def get_commands(self, vendor):
+        """
+        获取厂商的备份命令
+        :param vendor: 设备厂商
+        :return: (关闭分页命令, 配置命令)，不支持的厂商返回None
+        """
+        key = normalize_vendor(vendor)
+        if key in UNSUPPORTED_VENDORS:
+            return None
+        return BACKUP_COMMANDS.get(key, DEFAULT_BACKUP_COMMANDS)
+
+    def fetch_config(self, device):
+        """
+        登录设备拉取运行配置
+        :param device: 设备信息字典
+        :return: 配置文本
+        :raises RuntimeError: 厂商不支持、连接失败或输出为空
+        """
+        commands = self.get_commands(device.get('vendor'))
+        if not commands:
+            raise RuntimeError(f"厂商{device.get('vendor')}不支持配置备份")
+        pager_command, config_command = commands
+
+        ssh = SSHConnector.from_device(device)  # 登录信息由设备字段或凭据保险库提供
+        if not ssh.connect():  # 连接失败
+            raise RuntimeError('SSH连接失败')
+        try:
+            if pager_command:  # 关闭分页，避免配置中插入--More--
+                ssh.execute_command(pager_command, wait_time=1)
+            output = ssh.execute_command(config_command, wait_time=5)  # 拉取配置
+        finally:
+            ssh.disconnect()  # 断开SSH
+
+        config = clean_config_output(output, config_command)
+        if not config.strip():
+            raise RuntimeError('未获取到配置内容')
+        return config
+
+    def save_version(self, device, config, backup_time=None):
+        """
+        保存配置版本（内容未变化时只比较哈希，不写新文件）
+        :param device: 设备信息字典
+        :param config: 配置文本
+        :param backup_time: 备份时间，默认当前时间
+        :return: 版本字典（unchanged为True表示与上一版本相同）
+        """
+        backup_time = backup_time or datetime.now()
+        digest = config_hash(config)
+        with self._lock:
+            record = self._index.setdefault(device['id'], {'hash': None, 'versions': []})
+            if record['hash'] == digest and record['versions']:  # 配置未变化
+                latest = record['versions'][-1]
+                latest['last_checked'] = backup_time.isoformat(timespec='seconds')  # 记录检查时间
+                self._dirty = True  # 只更新内存，由flush统一写入
+                return dict(latest, unchanged=True)
+
+            name = UNSAFE_FILENAME_PATTERN.sub('_', device.get('name') or device['ip'])
+            filename = f"{name}_{device['ip']}_{backup_time.strftime('%Y%m%d_%H%M%S')}_{digest[:8]}.cfg"
+            filepath = os.path.join(self.backup_dir, filename)
+            with FILE_WRITE_SECONDS.timer('backup'), open(filepath, 'w', encoding='utf-8') as f:
+                f.write(config)
+            version = {
+                'filename': filename,  # 文件名
+                'hash': digest,  # 内容哈希
+                'size': os.path.getsize(filepath),  # 文件大小
+                'time': backup_time.isoformat(timespec='seconds'),  # 备份时间
+                'last_checked': backup_time.isoformat(timespec='seconds'),  # 最近检查时间
+                'device_name': device.get('name') or device['ip'],  # 设备名称
+                'device_ip': device['ip']  # 设备IP
+            }
+            record['hash'] = digest
+            record['versions'].append(version)
+            self._save_index()
+        return dict(version, unchanged=False)
+
+    def backup_device(self, device):
+        """
+        备份单台设备
+        :param device: 设备信息字典
+        :return: 版本字典
+        :raises RuntimeError: 备份失败
+        """
+        with tracer.span('backup.device', device=device['ip'], vendor=device.get('vendor')):
+            version = self.save_version(device, self.fetch_config(device))
+        self.flush()
+        return version
+
+    def backup_all(self, devices):
+        """
+        并发备份多台设备（同时进行的SSH会话不超过max_workers）
+        :param devices: 设备信息字典列表
+        :return: 每台设备的结果列表 [{'device', 'success', 'error', 'filename', 'size', 'unchanged'}]
+        """
+        def run(device):
+            result = {'device': device.get('name') or device['ip'], 'device_id': device['id'], 'success': False}
+            try:
+                with tracer.span('backup.device', device=device['ip'], vendor=device.get('vendor')):
+                    version = self.save_version(device, self.fetch_config(device))
+                result.update(success=True, filename=version['filename'], size=version['size'],
+                              unchanged=version['unchanged'])
+            except Exception as e:  # 单台失败不影响其他设备
+                result['error'] = str(e)
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(run, devices))
+        self.flush()  # 未变化的配置只在最后统一写一次索引
+        return results
+
+    def get_versions(self, device_id):
+        """
+        获取设备的配置版本列表
+        :param device_id: 设备ID
+        :return: 版本字典列表（按时间升序）
+        """
+        with self._lock:
+            return [dict(version) for version in self._index.get(device_id, {}).get('versions', [])]
+
+    def get_files(self):
+        """
+        获取所有备份文件列表
+        :return: 文件信息列表（按修改时间降序）
+        """
+        files = []
+        for filename in os.listdir(self.backup_dir):
+            if not filename.endswith('.cfg'):
+                continue
+            stat = os.stat(os.path.join(self.backup_dir, filename))
+            files.append({
+                'name': filename,  # 文件名
+                'size': stat.st_size,  # 文件大小（字节）
+                'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(timespec='seconds')  # 修改时间
+            })
+        files.sort(key=lambda x: x['modified'], reverse=True)
+        return files
+
+    def get_file_path(self, filename):
+        """
+        获取备份文件的完整路径（只允许备份目录下的.cfg文件）
+        :param filename: 文件名
+        :return: 完整路径，文件不存在或名称非法返回None
+        """
+        if os.path.basename(filename) != filename or not filename.endswith('.cfg'):  # 防止路径穿越
+            return None
+        filepath = os.path.join(self.backup_dir, filename)
+        return filepath if os.path.isfile(filepath) else None
+
+    def read_file(self, filename):
+        """
+        读取备份文件内容
+        :param filename: 文件名
+        :return: 配置文本，文件不存在返回None
+        """
+        filepath = self.get_file_path(filename)
+        if not filepath:
+            return None
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def delete_file(self, filename):
+        """
+        删除备份文件并从版本索引中移除
+        :param filename: 文件名
+        :return: True表示成功，False表示失败
+        """
+        filepath = self.get_file_path(filename)
+        if not filepath:
+            return False
+        try:
+            os.remove(filepath)
+        except Exception as e:  # 异常处理
+            logger.error("删除备份文件失败: %s", e)
+            return False
+        with self._lock:
+            for record in self._index.values():
+                versions = [version for version in record['versions'] if version['filename'] != filename]
+                if len(versions) != len(record['versions']):
+                    record['versions'] = versions
+                    record['hash'] = versions[-1]['hash'] if versions else None  # 最新版本被删除时回退
+            self._save_index()
+        return True
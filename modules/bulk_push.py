@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+批量命令下发模块
+负责将一组配置命令并行下发到多台设备：先金丝雀设备、再分批次推进，
+每批限制并发数，失败数超过阈值时停止后续批次，并记录每台设备的执行结果
+"""
+
+import re  # 正则表达式
+import threading  # 线程锁、后台线程
+import time  # 时间处理
+import uuid  # 任务ID
+from concurrent.futures import ThreadPoolExecutor  # 批内并发
+
+from .ssh_connector import SSHConnector  # SSH连接器
+from .parsers import scrub_control_chars  # 控制字符清理
+from .tracing import tracer  # 链路追踪
+
+
+# 设备回显中的命令错误提示（各厂商常见写法）
+COMMAND_ERROR_PATTERN = re.compile(
+    r'(% ?Invalid input|% ?Incomplete command|% ?Ambiguous command|% ?Unknown command|'
+    r'Unrecognized command|Error:|Wrong parameter|Too many parameters|Incomplete command found|'
+    r'syntax error|unknown command)',
+    re.IGNORECASE
+)
+# 已结束任务的保留数量（超出后删除最早的任务）
+MAX_FINISHED_JOBS = 50
+
+
+class BulkPushManager:
+    """批量下发管理类：每个任务在后台线程中按批次执行，任务状态可随时查询"""
+
+    def __init__(self):
+        """初始化批量下发管理器"""
+        self._jobs = {}  # {任务ID: 任务字典}
+        self._lock = threading.Lock()  # 锁
+
+    def plan_waves(self, device_ids, canary=1, wave_size=10):
+        """
+        划分下发批次：第一批为金丝雀设备，其余按批次大小划分
+        :param device_ids: 设备ID列表
+        :param canary: 金丝雀设备数（0表示不单独验证）
+        :param wave_size: 后续每批设备数
+        :return: 批次列表 [[设备ID, ...], ...]
+        """
+        waves = []
+        if canary > 0:
+            waves.append(device_ids[:canary])
+            device_ids = device_ids[canary:]
+        wave_size = max(1, wave_size)
+        waves += [device_ids[i:i + wave_size] for i in range(0, len(device_ids), wave_size)]
+        return [wave for wave in waves if wave]
+
+    def start_job(self, devices, commands, canary=1, wave_size=10, concurrency=5, max_failures=0,
+                  wait_time=2):
+        """
+        创建并启动批量下发任务
+        :param devices: 设备信息字典列表（按下发顺序）
+        :param commands: 命令列表
+        :param canary: 金丝雀设备数
+        :param wave_size: 后续每批设备数
+        :param concurrency: 每批内同时进行的SSH会话数
+        :param max_failures: 允许的累计失败设备数，超过后停止后续批次
+        :param wait_time: 每条命令的等待时间（秒）
+        :return: 任务ID
+        """
+        job_id = uuid.uuid4().hex[:12]
+        device_map = {device['id']: device for device in devices}
+        waves = self.plan_waves(list(device_map), canary, wave_size)
+        job = {
+            'id': job_id,  # 任务ID
+            'status': 'running',  # running / completed / aborted / cancelled
+            'commands': commands,  # 下发命令
+            'options': {'canary': canary, 'wave_size': wave_size, 'concurrency': concurrency,
+                        'max_failures': max_failures, 'wait_time': wait_time},  # 下发参数
+            'waves': waves,  # 批次划分
+            'current_wave': 0,  # 当前批次（从1开始，0表示未开始）
+            'total': len(device_map),  # 设备总数
+            'success_count': 0,  # 成功数
+            'failure_count': 0,  # 失败数
+            'message': '任务启动中...',  # 状态说明
+            'created': time.time(),  # 创建时间
+            'finished': None,  # 结束时间
+            'cancel': False,  # 是否请求取消
+            'results': {
+                device_id: {'device': device.get('name') or device['ip'], 'ip': device['ip'],
+                            'status': 'pending', 'output': '', 'error': None, 'started': None, 'finished': None}
+                for device_id, device in device_map.items()
+            }  # 每台设备的结果
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._prune()
+        threading.Thread(target=self._run, args=(job, device_map), daemon=True).start()
+        return job_id
+
+    def _push_device(self, job, device):
+        """
+        向单台设备下发命令并记录结果
+        :param job: 任务字典
+        :param device: 设备信息字典
+        """
+        result = job['results'][device['id']]
+        result['status'] = 'running'
+        result['started'] = time.time()
+        with tracer.span('bulk.device', device=device['ip'], vendor=device.get('vendor'), job=job['id']) as span:
+            try:
+                ssh = SSHConnector.from_device(device)  # 登录信息由设备字段或凭据保险库提供
+                if not ssh.connect():  # 连接失败
+                    raise RuntimeError('SSH连接失败')
+                try:
+                    output = ssh.execute_commands(job['commands'], job['options']['wait_time']) or ''
+                finally:
+                    ssh.disconnect()
+                output = scrub_control_chars(output)
+                result['output'] = output
+                error = COMMAND_ERROR_PATTERN.search(output)
+                if error:  # 设备拒绝了某条命令
+                    line_start = output.rfind('\n', 0, error.start()) + 1
+                    line_end = output.find('\n', error.end())
+                    raise RuntimeError(f"命令执行报错: {output[line_start:line_end if line_end >= 0 else None].strip()}")
+                result['status'] = 'success'
+            except Exception as e:  # 单台失败，记录原因
+                span.fail(e)
+                result['status'] = 'failed'
+                result['error'] = str(e)
+        result['finished'] = time.time()
+        with self._lock:
+            job['success_count' if result['status'] == 'success' else 'failure_count'] += 1
+
+    def _run(self, job, device_map):
+        """
+        按批次执行任务（后台线程）
+        :param job: 任务字典
+        :param device_map: {设备ID: 设备信息字典}
+        """
+        options = job['options']
+        for index, wave in enumerate(job['waves'], start=1):
+            if job['cancel']:
+                job['status'], job['message'] = 'cancelled', '任务已取消'
+                break
+            job['current_wave'] = index
+            job['message'] = f"正在执行第{index}/{len(job['waves'])}批（{len(wave)}台设备）"
+            with ThreadPoolExecutor(max_workers=max(1, options['concurrency'])) as executor:
+                list(executor.map(lambda device_id: self._push_device(job, device_map[device_id]), wave))
+
+            if index == 1 and options['canary'] > 0 and job['failure_count'] > 0:  # 金丝雀失败
+                job['status'], job['message'] = 'aborted', '金丝雀设备执行失败，已停止后续批次'
+                break
+            if job['failure_count'] > options['max_failures']:  # 超过失败阈值
+                job['status'] = 'aborted'
+                job['message'] = f"失败设备数{job['failure_count']}超过阈值{options['max_failures']}，已停止后续批次"
+                break
+        else:
+            job['status'] = 'completed'
+            job['message'] = f"执行完成，成功{job['success_count']}/{job['total']}"
+
+        for result in job['results'].values():  # 未执行的设备标记为跳过
+            if result['status'] == 'pending':
+                result['status'] = 'skipped'
+        job['finished'] = time.time()
+
+    def cancel_job(self, job_id):
+        """
+        取消任务（当前批次执行完后停止）
+        :param job_id: 任务ID
+        :return: True表示已请求取消，False表示任务不存在或已结束
+        """
+        job = self._jobs.get(job_id)
+        if not job or job['status'] != 'running':
+            return False
+        job['cancel'] = True
+        return True
+
+    def get_job(self, job_id, include_output=True):
+        """
+        获取任务详情
+        :param job_id: 任务ID
+        :param include_output: 是否包含每台设备的命令回显
+        :return: 任务字典副本，不存在返回None
+        """
+        job = self._jobs.get(job_id)
+        if not job:
+            return None
+        data = {key: value for key, value in job.items() if key not in ('results', 'cancel')}
+        data['results'] = [
+            dict(result, device_id=device_id, **({} if include_output else {'output': None}))
+            for device_id, result in list(job['results'].items())
+        ]
+        return data
+
+    def list_jobs(self):
+        """
+        获取任务列表（不含设备结果）
+        :return: 任务摘要列表（按创建时间倒序）
+        """
+        jobs = [{key: value for key, value in job.items() if key not in ('results', 'cancel', 'waves')}
+                for job in list(self._jobs.values())]
+        return sorted(jobs, key=lambda job: job['created'], reverse=True)
+
+    def _prune(self):
+        """删除过多的已结束任务"""
+        finished = sorted((job for job in self._jobs.values() if job['status'] != 'running'),
+                          key=lambda job: job['created'])
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            self._jobs.pop(job['id'], None)
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+会话录制回放模块
+负责将SSH Shell通道的原始收发内容（含分页提示、ANSI控制字符）录制为JSON录制文件，
+并在不连接网络的情况下按录制时的延迟或零延迟回放，供解析器基准、回归验证和性能分析使用
+"""
+
+import glob  # 查找录制文件
+import json  # 录制文件读写
+import logging  # 日志
+import os  # 文件操作
+import threading  # 线程锁
+import time  # 时间处理
+from datetime import datetime  # 录制时间
+
+from .parsers import normalize_vendor  # 厂商名称标准化
+from .ssh_connector import SSHConnector  # SSH连接器（生成解析语料时回放）
+
+
+logger = logging.getLogger(__name__)  # 模块日志
+
+
+# 录制文件格式版本
+CASSETTE_VERSION = 1
+# 录制目录环境变量（设置后主程序的所有SSH会话写入录制文件）
+RECORD_DIR_ENV = 'NETWORK_MONITOR_RECORD_DIR'
+# 回放目录环境变量（设置后主程序不连接网络，从录制文件回放设备输出）
+REPLAY_DIR_ENV = 'NETWORK_MONITOR_REPLAY_DIR'
+
+
+def _encode(data):
+    """
+    原始字节转为可写入JSON的文本（无法按UTF-8解码的字节保留为代理字符，可无损还原）
+    :param data: bytes
+    :return: str
+    """
+    return data.decode('utf-8', errors='surrogateescape')
+
+
+def _decode(text):
+    """
+    还原录制文件中的原始字节
+    :param text: str
+    :return: bytes
+    """
+    return text.encode('utf-8', errors='surrogateescape')
+
+
+class RecordingChannel:
+    """录制通道：代理paramiko Shell通道，记录每次发送的内容和每次接收的原始字节及其时间"""
+
+    def __init__(self, channel, on_close):
+        """
+        初始化录制通道
+        :param channel: paramiko Shell通道
+        :param on_close: 通道关闭时的回调（参数为事件列表）
+        """
+        self._channel = channel  # 实际通道
+        self._on_close = on_close  # 关闭回调
+        self._mark = time.monotonic()  # 上一次发送的时间（接收事件记录相对该时间的延迟）
+        self.events = []  # [{'send': 文本}, {'recv': 文本, 'at': 秒}]
+
+    def send(self, data):
+        raw = data.encode('utf-8') if isinstance(data, str) else bytes(data)
+        self.events.append({'send': _encode(raw)})
+        self._mark = time.monotonic()
+        return self._channel.send(data)
+
+    def recv(self, nbytes):
+        data = self._channel.recv(nbytes)
+        self.events.append({'recv': _encode(data), 'at': round(time.monotonic() - self._mark, 4)})
+        return data
+
+    def recv_ready(self):
+        return self._channel.recv_ready()
+
+    def close(self):
+        self._channel.close()
+        if self._on_close:
+            on_close, self._on_close = self._on_close, None  # 只保存一次
+            on_close(self.events)
+
+    def __getattr__(self, name):
+        return getattr(self._channel, name)  # 其他属性直接使用实际通道
+
+
+class CassetteRecorder:
+    """会话录制器：为每个SSH会话生成一个录制文件（设置为SSHConnector.recorder后生效）"""
+
+    def __init__(self, cassette_dir='outputs/cassettes'):
+        """
+        初始化会话录制器
+        :param cassette_dir: 录制文件目录
+        """
+        self.cassette_dir = cassette_dir  # 录制目录
+        os.makedirs(cassette_dir, exist_ok=True)  # 确保目录存在
+
+    def wrap(self, channel, connector):
+        """
+        包装Shell通道，会话关闭时写入录制文件
+        :param channel: paramiko Shell通道
+        :param connector: SSH连接器（提供地址、端口、厂商）
+        :return: RecordingChannel
+        """
+        started = datetime.now()
+        return RecordingChannel(channel, lambda events: self.save(connector, events, started))
+
+    def save(self, connector, events, started):
+        """
+        写入录制文件（文件名：地址_端口_开始时间.json）
+        :param connector: SSH连接器
+        :param events: 事件列表
+        :param started: 会话开始时间
+        :return: 录制文件路径，写入失败返回None
+        """
+        cassette = {
+            'version': CASSETTE_VERSION,  # 格式版本
+            'host': connector.host,  # 设备地址
+            'port': connector.port,  # SSH端口
+            'vendor': connector.vendor,  # 设备厂商
+            'recorded': started.strftime('%Y-%m-%d %H:%M:%S'),  # 录制时间
+            'events': events  # 收发事件
+        }
+        filename = f"{str(connector.host).replace(':', '-')}_{connector.port}_{started:%Y%m%d_%H%M%S_%f}.json"
+        filepath = os.path.join(self.cassette_dir, filename)
+        try:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(cassette, f, indent=1)  # 默认ASCII转义，控制字符和代理字符原样保留
+            return filepath
+        except Exception as e:  # 录制失败不影响采集
+            logger.error("保存录制文件失败 %s: %s", filepath, e)
+            return None
+
+
+class ReplayChannel:
+    """回放通道：按发送的内容找到录制中的同一次发送，依次返回其后接收到的原始字节"""
+
+    def __init__(self, events, realtime=False):
+        """
+        初始化回放通道
+        :param events: 录制文件中的事件列表
+        :param realtime: True按录制时的延迟返回数据，False零延迟
+        """
+        self.realtime = realtime  # 是否按录制延迟回放
+        # [('send', 字节), ('recv', 字节, 延迟)]
+        self._events = [('send', _decode(event['send'])) if 'send' in event
+                        else ('recv', _decode(event['recv']), event.get('at', 0))
+                        for event in events]
+        self._position = 0  # 下一个事件
+        self._mark = time.monotonic()  # 上一次发送的时间
+        self.closed = False
+
+    def _find(self, raw, start):
+        """从start开始查找内容相同的发送事件，返回下标，没有返回None"""
+        for index in range(start, len(self._events)):
+            if self._events[index][0] == 'send' and self._events[index][1] == raw:
+                return index
+        return None
+
+    def send(self, data):
+        raw = data.encode('utf-8') if isinstance(data, str) else bytes(data)
+        index = self._find(raw, self._position)  # 优先按录制顺序向后查找
+        if index is None:
+            index = self._find(raw, 0)  # 同一命令重复执行时从头查找
+        self._position = len(self._events) if index is None else index + 1  # 未录制的命令：设备无输出
+        self._mark = time.monotonic()
+        return len(raw)
+
+    def recv(self, nbytes):
+        if not self.recv_ready():  # 本次发送后的输出已全部返回
+            return b''
+        _, data, at = self._events[self._position]
+        if self.realtime:
+            delay = at - (time.monotonic() - self._mark)
+            if delay > 0:
+                time.sleep(delay)
+        if len(data) > nbytes:  # 调用方缓冲区较小，剩余部分留给下次接收
+            self._events[self._position] = ('recv', data[nbytes:], at)
+            return data[:nbytes]
+        self._position += 1
+        return data
+
+    def recv_ready(self):
+        """下一个事件是接收事件即有数据（不按时间判断，保证与录制时读到的数据一致）"""
+        return self._position < len(self._events) and self._events[self._position][0] == 'recv'
+
+    def close(self):
+        self.closed = True
+
+
+def load_cassettes(path):
+    """
+    加载录制文件
+    :param path: 录制文件路径或目录
+    :return: 录制内容字典列表（按文件名排序）
+    """
+    files = sorted(glob.glob(os.path.join(path, '*.json'))) if os.path.isdir(path) else [path]
+    cassettes = []
+    for filepath in files:
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                cassette = json.load(f)
+        except Exception as e:  # 跳过损坏的文件
+            logger.warning("加载录制文件失败 %s: %s", filepath, e)
+            continue
+        if cassette.get('version') == CASSETTE_VERSION:
+            cassette['file'] = filepath
+            cassettes.append(cassette)
+    return cassettes
+
+
+class CassettePlayer:
+    """会话回放器：按设备地址（其次按厂商）选择录制文件（设置为SSHConnector.player后生效）"""
+
+    def __init__(self, path, realtime=False):
+        """
+        初始化会话回放器
+        :param path: 录制文件路径或目录
+        :param realtime: True按录制时的延迟回放，False零延迟（SSHConnector同时跳过固定等待）
+        """
+        self.realtime = realtime  # 是否按录制延迟回放
+        self.cassettes = load_cassettes(path)  # 全部录制
+        self._by_host = {}  # {(地址, 端口): [录制]}
+        self._by_vendor = {}  # {标准厂商键: [录制]}
+        for cassette in self.cassettes:
+            self._by_host.setdefault((cassette['host'], cassette['port']), []).append(cassette)
+            self._by_vendor.setdefault(normalize_vendor(cassette.get('vendor')), []).append(cassette)
+        self._turns = {}  # 同一设备多个录制时轮流使用 {键: 次数}
+        self._lock = threading.Lock()
+
+    def open(self, connector):
+        """
+        为连接器打开回放通道（同一地址没有录制时使用同厂商的录制）
+        :param connector: SSH连接器
+        :return: ReplayChannel
+        :raises KeyError: 没有可用的录制
+        """
+        key = (connector.host, connector.port)
+        candidates = self._by_host.get(key)
+        if not candidates:
+            key = normalize_vendor(connector.vendor)
+            candidates = self._by_vendor.get(key)
+        if not candidates:
+            raise KeyError(f"没有 {connector.host} 的录制会话")
+        with self._lock:
+            turn = self._turns.get(key, 0)
+            self._turns[key] = turn + 1
+        return ReplayChannel(candidates[turn % len(candidates)]['events'], self.realtime)
+
+
+def exchanges(cassette):
+    """
+    提取录制中执行过的命令（分页时发送的空格归入同一条命令）
+    :param cassette: 录制内容字典
+    :return: 命令列表（按执行顺序去重）
+    """
+    commands = []
+    for event in cassette['events']:
+        command = event.get('send', '').strip()
+        if command and command not in commands:
+            commands.append(command)
+    return commands
+
+
+def load_corpus(path):
+    """
+    通过零延迟回放生成解析语料（经过SSHConnector的分页和控制字符处理，与线上解析器的输入一致）
+    :param path: 录制文件路径或目录
+    :return: {(标准厂商键, 命令): 命令输出}
+    """
+    corpus = {}
+    for cassette in load_cassettes(path):
+        vendor = normalize_vendor(cassette.get('vendor'))
+        ssh = SSHConnector(cassette['host'], cassette['port'], '', '', vendor=cassette.get('vendor') or '')
+        ssh.player = CassettePlayer(cassette['file'])  # 只回放这一个录制
+        if not ssh.connect():
+            continue
+        for command in exchanges(cassette):
+            if (vendor, command) not in corpus:
+                output = ssh.execute_command(command)
+                if output:
+                    corpus[(vendor, command)] = output
+        ssh.disconnect()
+    return corpus
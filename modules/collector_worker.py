@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+采集节点（独立进程）
+在单独的进程或主机上运行设备采集：向中心端（ai_monitor_app.py）发送心跳加入哈希环，
+拉取按一致性哈希分配给本节点的设备，用自适应轮询调度器采集，
+并把采集结果攒批gzip压缩后上报中心端（由中心端保存接口表、指标历史并评估告警）；
+节点加入或退出时中心端递增分配版本号，各节点在下次心跳时重新拉取分配
+
+用法：
+    中心端：NETWORK_MONITOR_COLLECTOR_TOKEN=<令牌> python ai_monitor_app.py
+    采集节点：python -m modules.collector_worker --server http://127.0.0.1:5001 --token <令牌> --name worker-1
+"""
+
+import argparse  # 命令行参数
+import logging  # 日志
+import os  # 环境变量
+import signal  # 退出信号
+import socket  # 主机名（默认节点ID）
+import threading  # 待上报结果锁
+import time  # 时间处理
+from collections import deque  # 待上报结果队列
+
+import requests  # HTTP请求
+
+from .log import setup_logging  # 结构化日志
+from .monitor import DeviceMonitor  # 设备监控器
+from .poll_scheduler import PollScheduler  # 自适应轮询调度
+from .sharding import TOKEN_ENV, TOKEN_HEADER, HEARTBEAT_INTERVAL, encode_batch  # 分布式采集协议
+
+
+logger = logging.getLogger(__name__)  # 模块日志
+
+
+# 批量上报间隔（秒）
+BATCH_INTERVAL = 2
+# 单批最多结果数
+BATCH_SIZE = 200
+# 中心端不可达时最多缓存的待上报结果数（超过后丢弃最早的结果）
+MAX_PENDING = 5000
+# 即使分配版本号未变也重新拉取分配的周期（秒）
+ASSIGNMENT_REFRESH = 300
+# 请求中心端的超时（秒）
+REQUEST_TIMEOUT = 10
+
+
+class CollectorWorker:
+    """采集节点类：心跳、拉取分配、本地调度采集、批量上报"""
+
+    def __init__(self, server, token, worker_id=None, max_workers=16, sessions_per_second=5,
+                 batch_interval=BATCH_INTERVAL, batch_size=BATCH_SIZE, max_pending=MAX_PENDING):
+        """
+        初始化采集节点
+        :param server: 中心端地址（如 http://127.0.0.1:5001）
+        :param token: 采集节点访问令牌（与中心端的NETWORK_MONITOR_COLLECTOR_TOKEN一致）
+        :param worker_id: 节点ID（重启后使用相同ID可保持原有分配），默认为 主机名-进程号
+        :param max_workers: 本节点并发采集线程数
+        :param sessions_per_second: 本节点每秒新建SSH会话上限
+        :param batch_interval: 批量上报间隔（秒）
+        :param batch_size: 单批最多结果数
+        :param max_pending: 最多缓存的待上报结果数
+        """
+        self.server = server.rstrip('/')  # 中心端地址
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"  # 节点ID
+        self.batch_interval = batch_interval  # 上报间隔
+        self.batch_size = batch_size  # 单批结果数
+        self.heartbeat_interval = HEARTBEAT_INTERVAL  # 心跳间隔（以中心端下发为准）
+        self.session = requests.Session()  # 复用HTTP连接
+        self.session.headers[TOKEN_HEADER] = token
+        self.monitor = DeviceMonitor()  # 监控器
+        self.scheduler = PollScheduler(collect=self._collect, get_devices=lambda: self._devices,
+                                       sessions_per_second=sessions_per_second, max_workers=max_workers)
+        self._devices = []  # 分配给本节点的设备
+        self._epoch = None  # 当前分配版本号
+        self._assigned_at = 0  # 上次拉取分配的时间
+        self._facts_done = set()  # 本次分配内已采集设备信息的设备ID
+        self._pending = deque(maxlen=max_pending)  # 待上报结果
+        self._pending_lock = threading.Lock()  # 待上报结果锁
+        self._stopping = threading.Event()  # 退出标志
+
+    def _url(self, action):
+        """
+        中心端采集节点接口地址
+        :param action: 接口动作（heartbeat、assignments、results、leave）
+        :return: URL
+        """
+        return f"{self.server}/api/collectors/{self.worker_id}/{action}"
+
+    def _collect(self, device):
+        """
+        采集一台设备并放入待上报队列（由调度器在线程池中调用）
+        :param device: 分配的设备字典（含登录信息）
+        :return: 监控结果字典
+        """
+        include_facts = device.get('collect_facts') and device['id'] not in self._facts_done
+        start = time.perf_counter()
+        result = self.monitor.monitor_device(device, include_facts=include_facts)
+        duration = round(time.perf_counter() - start, 3)
+        if result and 'facts' in result:  # 设备信息每次分配只采集一次
+            self._facts_done.add(device['id'])
+        with self._pending_lock:
+            self._pending.append({'device_id': device['id'], 'result': result, 'timestamp': time.time(),
+                                  'duration': duration})
+        return result
+
+    def heartbeat(self):
+        """
+        发送心跳，分配版本号变化（或到达刷新周期）时重新拉取分配
+        """
+        response = self.session.post(self._url('heartbeat'), json={'stats': dict(
+            self.scheduler.get_stats(), pending=len(self._pending), host=socket.gethostname(), pid=os.getpid()
+        )}, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+        self.heartbeat_interval = data.get('heartbeat_interval', HEARTBEAT_INTERVAL)
+        if data['epoch'] != self._epoch or time.time() - self._assigned_at >= ASSIGNMENT_REFRESH:
+            self.refresh_assignments()
+
+    def refresh_assignments(self):
+        """拉取分配给本节点的设备和告警阈值（调度器在下次检查时加入新设备、移除已迁出的设备）"""
+        response = self.session.get(self._url('assignments'), timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+        self._devices = data['devices']
+        self.scheduler.thresholds = data.get('thresholds') or {}  # 中心端告警规则的阈值
+        self._facts_done.clear()
+        self._assigned_at = time.time()
+        if data['epoch'] != self._epoch:
+            logger.info("分配版本 %s：本节点负责%d台设备", data['epoch'], len(self._devices))
+        self._epoch = data['epoch']
+
+    def flush(self):
+        """
+        上报一批待上报结果（gzip压缩），失败时放回队列等待下次重试
+        :return: 本次上报的结果数
+        """
+        with self._pending_lock:
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+        if not batch:
+            return 0
+        try:
+            response = self.session.post(self._url('results'), data=encode_batch({'results': batch}), headers={
+                'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException:
+            with self._pending_lock:  # 按原顺序放回（队列已满时丢弃最早的结果）
+                self._pending.extendleft(reversed(batch))
+            raise
+        return len(batch)
+
+    def run(self):
+        """运行节点主循环（直到stop被调用或收到退出信号）"""
+        logger.info("采集节点启动: %s -> %s", self.worker_id, self.server)
+        self.scheduler.start()
+        next_heartbeat = 0
+        while not self._stopping.is_set():
+            now = time.monotonic()
+            try:
+                if now >= next_heartbeat:
+                    next_heartbeat = now + self.heartbeat_interval
+                    self.heartbeat()
+                while self.flush() >= self.batch_size:  # 积压时连续上报
+                    pass
+            except (requests.RequestException, ValueError, KeyError) as e:  # 中心端暂时不可达，下次重试
+                logger.warning("与中心端通信失败: %s", e)
+            self._stopping.wait(self.batch_interval)
+        self._shutdown()
+
+    def stop(self):
+        """请求退出主循环"""
+        self._stopping.set()
+
+    def _shutdown(self):
+        """上报剩余结果并通知中心端立即重新分配本节点的设备"""
+        self._devices = []  # 调度器不再派发新的采集
+        try:
+            while self.flush():
+                pass
+            self.session.post(self._url('leave'), timeout=REQUEST_TIMEOUT)
+        except requests.RequestException as e:
+            logger.warning("退出时通知中心端失败: %s", e)
+        logger.info("采集节点已退出: %s", self.worker_id)
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description='运行采集节点（设备按一致性哈希分配，结果批量上报中心端）')
+    parser.add_argument('--server', default='http://127.0.0.1:5001', help='中心端地址')
+    parser.add_argument('--token', default=os.environ.get(TOKEN_ENV), help=f'访问令牌（默认读取环境变量{TOKEN_ENV}）')
+    parser.add_argument('--name', default=None, help='节点ID（默认 主机名-进程号，重启后使用相同ID可保持原有分配）')
+    parser.add_argument('--workers', type=int, default=16, help='并发采集线程数')
+    parser.add_argument('--rate', type=float, default=5, help='每秒新建SSH会话上限')
+    parser.add_argument('--batch-interval', type=float, default=BATCH_INTERVAL, help='批量上报间隔（秒）')
+    parser.add_argument('--log-file', default=None, help='日志文件（默认 outputs/logs/collector-<节点ID>.log）')
+    args = parser.parse_args()
+    if not args.token:
+        parser.error(f'缺少访问令牌（--token 或环境变量{TOKEN_ENV}）')
+
+    worker = CollectorWorker(args.server, args.token, worker_id=args.name, max_workers=args.workers,
+                             sessions_per_second=args.rate, batch_interval=args.batch_interval)
+    setup_logging(log_file=args.log_file if args.log_file is not None
+                  else os.path.join('outputs', 'logs', f'collector-{worker.worker_id}.log'))  # 每个节点单独的日志文件
+    for signum in (signal.SIGINT, signal.SIGTERM):  # 退出前上报剩余结果并通知中心端
+        signal.signal(signum, lambda signum, frame: worker.stop())
+    worker.run()
+
+
+if __name__ == '__main__':
+    main()
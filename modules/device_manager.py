@@ -4,20 +4,60 @@
 负责网络设备的增删改查操作
 """
 
+import csv  # 用于CSV导入导出
+import io  # 用于内存文本流
+import ipaddress  # 用于IP地址校验
 import json  # 用于JSON数据处理
+import logging  # 日志
 import os  # 用于文件操作
+import re  # 用于拆分标签
+import threading  # 用于批量写入加锁
 import uuid  # 用于生成唯一ID
 
 
+logger = logging.getLogger(__name__)  # 模块日志
+
+
+# 批量导入导出的字段（按CSV列顺序）
+DEVICE_FIELDS = ('name', 'ip', 'port', 'vendor', 'username', 'password', 'credential_id', 'model', 'serial_number',
+                 'version', 'site', 'role', 'tags')
+# 后台任务（设备发现、设备信息采集）写回设备存储的批量大小：攒够后调用update_devices一次写入
+WRITE_BATCH_SIZE = 50
+
+
+def parse_tags(value):
+    """
+    规范化设备标签
+    :param value: 标签列表，或以逗号/分号分隔的字符串（CSV导入、表单输入）
+    :return: 去重排序后的标签列表
+    """
+    if isinstance(value, str):
+        value = re.split(r'[,;，；]', value)
+    return sorted({str(tag).strip() for tag in value or [] if str(tag).strip()})
+
+
+def normalize_site(value):
+    """
+    规范化站点路径（层级之间用 / 分隔，如 北京/亦庄机房/A区）
+    :param value: 站点字符串
+    :return: 去除多余空格和空层级后的站点路径
+    """
+    return '/'.join(part.strip() for part in str(value or '').split('/') if part.strip())
+
+
 class DeviceManager:
     """设备管理类，负责设备信息的存储和管理"""
 
-    def __init__(self, devices_file='config/devices.json'):
+    def __init__(self, devices_file='config/devices.json', credential_store=None):
         """
         初始化设备管理器
         :param devices_file: 设备信息存储文件路径
+        :param credential_store: 凭据保险库（可选，设置后新增、导入和修改的明文密码存入保险库，设备文件只保存凭据ID）
         """
         self.devices_file = devices_file  # 设备信息文件路径
+        self.credential_store = credential_store  # 凭据保险库
+        self._lock = threading.RLock()  # 读-改-写锁（请求线程与后台发现、设备信息写回并发修改设备列表）
+        self._listeners = []  # 设备列表变更监听函数（如分组索引）
         self._ensure_devices_file()  # 确保设备文件存在
 
     def _ensure_devices_file(self):
@@ -37,7 +77,7 @@ class DeviceManager:
             with open(self.devices_file, 'r', encoding='utf-8') as f:  # 打开设备文件
                 return json.load(f)  # 返回设备列表
         except Exception as e:  # 如果加载失败
-            print(f"加载设备信息失败: {e}")  # 打印错误信息
+            logger.error("加载设备信息失败: %s", e)  # 记录错误信息
             return []  # 返回空列表
 
     def save_devices(self, devices):
@@ -47,14 +87,56 @@ class DeviceManager:
         :return: True表示成功，False表示失败
         """
         try:
-            with open(self.devices_file, 'w', encoding='utf-8') as f:  # 打开文件进行写入
+            temp_file = self.devices_file + '.tmp'  # 先写临时文件再替换，写入中断时不损坏原文件
+            with open(temp_file, 'w', encoding='utf-8') as f:  # 打开文件进行写入
                 json.dump(devices, f, ensure_ascii=False, indent=4)  # 保存JSON数据
-            return True  # 返回成功
+            os.replace(temp_file, self.devices_file)  # 原子替换
         except Exception as e:  # 如果保存失败
-            print(f"保存设备信息失败: {e}")  # 打印错误信息
+            logger.error("保存设备信息失败: %s", e)  # 记录错误信息
             return False  # 返回失败
+        for listener in self._listeners:  # 通知监听函数
+            try:
+                listener(devices)
+            except Exception as e:  # 监听函数异常不影响保存结果
+                logger.exception("设备变更处理失败: %s", e)
+        return True  # 返回成功
+
+    def _store_credentials(self, devices):
+        """
+        将设备中的明文密码存入凭据保险库（相同用户名和密码的设备共用一个凭据），设备只保留凭据ID
+        :param devices: 设备信息字典列表（原地修改）
+        :return: {设备ID: 凭据ID}
+        """
+        if self.credential_store is None:
+            return {}
+        mapping = self.credential_store.migrate(devices)
+        for device in devices:
+            if device['id'] in mapping:
+                device['credential_id'] = mapping[device['id']]
+                device['password'] = ''
+        return mapping
 
-    def add_device(self, ip, username, password, vendor, port=22, name=''):
+    def migrate_credentials(self):
+        """
+        迁移设备文件中遗留的明文密码（启动时执行一次，也可通过接口手动触发）
+        :return: {设备ID: 凭据ID}
+        """
+        with self._lock:
+            devices = self.load_devices()  # 加载设备列表
+            mapping = self._store_credentials(devices)
+            if mapping:
+                self.save_devices(devices)
+        return mapping
+
+    def add_listener(self, listener):
+        """
+        注册设备列表变更监听函数（每次保存设备列表后调用）
+        :param listener: 函数 listener(devices)，devices为保存后的完整设备列表
+        """
+        self._listeners.append(listener)
+
+    def add_device(self, ip, username, password, vendor, port=22, name='', credential_id=None,
+                   site='', role='', tags=None):
         """
         添加新设备
         :param ip: 设备IP地址
@@ -62,49 +144,46 @@ class DeviceManager:
         :param password: 登录密码
         :param vendor: 设备厂商（如：Huawei, Cisco, H3C等）
         :param port: SSH端口（默认22）
-        :param name: 设备名称（可选，如果不提供则自动获取）
+        :param name: 设备名称（可选，不提供时由后台发现任务获取主机名）
+        :param credential_id: 凭据ID（可选，引用凭据保险库时不保存明文密码）
+        :param site: 站点路径（可选，层级用 / 分隔）
+        :param role: 设备角色（可选，如 core、access）
+        :param tags: 标签列表或逗号分隔的字符串（可选）
         :return: 新添加的设备信息字典，失败返回None
         """
-        devices = self.load_devices()  # 加载现有设备
+        with self._lock:
+            devices = self.load_devices()  # 加载现有设备
 
-        # 检查设备是否已存在
-        for device in devices:  # 遍历所有设备
-            if device['ip'] == ip:  # 如果IP地址已存在
+            # 检查设备是否已存在
+            if any(device['ip'] == ip for device in devices):  # 如果IP地址已存在
                 return None  # 返回None表示设备已存在
 
-        # 如果没有提供设备名称，尝试自动获取hostname
-        if not name:
-            try:
-                from .ssh_connector import SSHConnector  # 导入SSH连接器
-                ssh = SSHConnector(
-                    host=ip,
-                    port=port,
-                    username=username,
-                    password=password,
-                    timeout=10
-                )
-                if ssh.connect():  # 如果连接成功
-                    hostname = ssh.get_hostname(vendor)  # 获取主机名
-                    ssh.disconnect()  # 断开连接
-                    if hostname and hostname != 'unknown':  # 如果获取成功
-                        name = hostname  # 使用获取的主机名
-                        print(f"自动获取设备名称成功: {name}")  # 打印日志
-                    else:
-                        name = f"{vendor}_{ip}"  # 使用默认名称
-                else:
-                    name = f"{vendor}_{ip}"  # 连接失败，使用默认名称
-            except Exception as e:
-                print(f"自动获取设备名称失败: {e}")  # 打印错误
-                name = f"{vendor}_{ip}"  # 使用默认名称
-
-        # 如果name仍然为空，使用默认格式
-        if not name:
-            name = f"{vendor}_{ip}"
-
-        # 创建新设备信息
-        new_device = {
+            new_device = self._new_device(ip, username, password, vendor, port, name,
+                                          credential_id=credential_id, site=site, role=role,
+                                          tags=tags)  # 创建新设备信息
+            self._store_credentials([new_device])  # 明文密码存入凭据保险库
+            devices.append(new_device)  # 添加新设备到列表
+            self.save_devices(devices)  # 保存设备列表
+        return new_device  # 返回新设备信息
+
+    def _new_device(self, ip, username, password, vendor, port=22, name='', **extra):
+        """
+        创建设备信息字典（未提供名称时使用"厂商_IP"占位，由后台发现任务获取主机名）
+        :param ip: 设备IP地址
+        :param username: 登录用户名
+        :param password: 登录密码
+        :param vendor: 设备厂商
+        :param port: SSH端口
+        :param name: 设备名称
+        :param extra: 其他字段（credential_id、model、serial_number、version、site、role、tags）
+        :return: 设备信息字典
+        """
+        extra['site'] = normalize_site(extra.get('site'))  # 分组字段规范化
+        extra['role'] = str(extra.get('role') or '').strip()
+        extra['tags'] = parse_tags(extra.get('tags'))
+        device = {
             'id': str(uuid.uuid4()),  # 生成唯一ID
-            'name': name,  # 设备名称
+            'name': name or f"{vendor}_{ip}",  # 设备名称
             'ip': ip,  # IP地址
             'port': port,  # SSH端口
             'username': username,  # 用户名
@@ -112,10 +191,134 @@ class DeviceManager:
             'vendor': vendor,  # 设备厂商
             'status': 'unknown'  # 设备状态（初始为未知）
         }
+        if not name:  # 等待后台发现主机名
+            device['name_pending'] = True
+        device.update({key: value for key, value in extra.items() if value})  # 凭据ID、已知的型号、序列号、版本、分组
+        if device.get('credential_id'):  # 登录信息由凭据保险库提供，不保存明文密码
+            device['password'] = ''
+        return device
 
-        devices.append(new_device)  # 添加新设备到列表
-        self.save_devices(devices)  # 保存设备列表
-        return new_device  # 返回新设备信息
+    def validate_record(self, record, known_credentials=None):
+        """
+        校验并规范化一条导入记录
+        :param record: 原始记录字典（CSV行或JSON对象）
+        :param known_credentials: 已存在的凭据ID集合（None表示不校验）
+        :return: (规范化后的记录, 错误信息)，校验通过时错误信息为None
+        """
+        tags = record.get('tags')  # 标签可以是列表（JSON）或分隔字符串（CSV）
+        record = {key: str(value).strip() for key, value in record.items()
+                  if key in DEVICE_FIELDS and value is not None and key != 'tags'}
+        if tags:
+            record['tags'] = parse_tags(tags)
+        try:
+            record['ip'] = str(ipaddress.ip_address(record.get('ip', '')))  # IP地址格式
+        except ValueError:
+            return None, f"IP地址无效: {record.get('ip', '')}"
+        for field in ('username', 'vendor'):  # 必填字段（引用凭据ID时用户名可省略）
+            if not record.get(field) and not (field == 'username' and record.get('credential_id')):
+                return None, f"缺少{field}"
+        try:
+            record['port'] = int(record.get('port') or 22)
+        except ValueError:
+            return None, f"端口无效: {record.get('port')}"
+        if not 0 < record['port'] < 65536:
+            return None, f"端口无效: {record['port']}"
+        if record.get('credential_id') and known_credentials is not None \
+                and record['credential_id'] not in known_credentials:
+            return None, f"凭据不存在: {record['credential_id']}"
+        record.setdefault('username', '')
+        record.setdefault('password', '')
+        return record, None
+
+    def import_devices(self, records, known_credentials=None):
+        """
+        批量导入设备（一次校验、一次写入；重复判断使用IP索引）
+        :param records: 记录字典列表
+        :param known_credentials: 已存在的凭据ID集合（None表示不校验）
+        :return: {'added': 新设备列表, 'skipped': 重复记录列表, 'errors': 无效记录列表}
+        """
+        added, skipped, errors = [], [], []
+        with self._lock:
+            devices = self.load_devices()  # 加载现有设备
+            ip_index = {device['ip'] for device in devices}  # IP索引（含本批已导入的地址）
+            for row, raw in enumerate(records, start=1):
+                if not isinstance(raw, dict):
+                    errors.append({'row': row, 'ip': None, 'error': '记录格式无效'})
+                    continue
+                record, error = self.validate_record(raw, known_credentials)
+                if error:
+                    errors.append({'row': row, 'ip': raw.get('ip'), 'error': error})
+                    continue
+                if record['ip'] in ip_index:
+                    skipped.append({'row': row, 'ip': record['ip'], 'error': '设备已存在'})
+                    continue
+                ip_index.add(record['ip'])
+                added.append(self._new_device(**record))
+            if added:
+                self._store_credentials(added)  # 整批明文密码存入凭据保险库（相同用户名和密码共用凭据）
+                devices.extend(added)
+                if not self.save_devices(devices):  # 整批写入失败则全部不生效
+                    return {'added': [], 'skipped': skipped,
+                            'errors': errors + [{'row': None, 'ip': None, 'error': '保存设备信息失败'}]}
+        return {'added': added, 'skipped': skipped, 'errors': errors}
+
+    def parse_import(self, content, fmt='csv'):
+        """
+        解析导入文件
+        :param content: 文件文本
+        :param fmt: 格式（csv / json）
+        :return: 记录字典列表
+        :raises ValueError: 格式无法解析
+        """
+        if fmt == 'json':
+            data = json.loads(content)
+            if isinstance(data, dict):  # 兼容 {"devices": [...]} 形式
+                data = data.get('devices', [])
+            if not isinstance(data, list):
+                raise ValueError('JSON内容必须是设备列表')
+            return data
+        reader = csv.DictReader(io.StringIO(content.lstrip('\ufeff')))  # 去除Excel导出的BOM
+        return [{(key or '').strip().lower(): value for key, value in row.items()} for row in reader]
+
+    def export_devices(self, fmt='csv', include_password=False):
+        """
+        导出设备
+        :param fmt: 格式（csv / json）
+        :param include_password: 是否包含密码
+        :return: 文件文本
+        """
+        fields = [field for field in DEVICE_FIELDS if include_password or field != 'password']
+        rows = [{field: device.get(field, [] if field == 'tags' else '') for field in fields}
+                for device in self.load_devices()]
+        if fmt == 'json':
+            return json.dumps(rows, ensure_ascii=False, indent=4)
+        for row in rows:  # CSV中标签用分号分隔
+            row['tags'] = ';'.join(row['tags'])
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+        return output.getvalue()
+
+    def update_devices(self, updates):
+        """
+        批量更新设备字段（一次读取、一次写入）
+        :param updates: {设备ID: {字段: 值}}
+        :return: 实际更新的设备数
+        """
+        if not updates:
+            return 0
+        with self._lock:
+            devices = self.load_devices()  # 加载设备列表
+            count = 0
+            for device in devices:
+                fields = updates.get(device['id'])
+                if fields:
+                    device.update(fields)
+                    count += 1
+            if count:
+                self.save_devices(devices)
+        return count
 
     def delete_device(self, device_id):
         """
@@ -123,14 +326,15 @@ class DeviceManager:
         :param device_id: 设备ID
         :return: True表示成功，False表示失败
         """
-        devices = self.load_devices()  # 加载设备列表
-        # 过滤掉要删除的设备
-        updated_devices = [d for d in devices if d['id'] != device_id]  # 保留ID不匹配的设备
+        with self._lock:
+            devices = self.load_devices()  # 加载设备列表
+            # 过滤掉要删除的设备
+            updated_devices = [d for d in devices if d['id'] != device_id]  # 保留ID不匹配的设备
 
-        if len(updated_devices) == len(devices):  # 如果列表长度没有变化
-            return False  # 表示设备不存在，删除失败
+            if len(updated_devices) == len(devices):  # 如果列表长度没有变化
+                return False  # 表示设备不存在，删除失败
 
-        return self.save_devices(updated_devices)  # 保存更新后的设备列表
+            return self.save_devices(updated_devices)  # 保存更新后的设备列表
 
     def get_device(self, device_id):
         """
@@ -151,13 +355,18 @@ class DeviceManager:
         :param kwargs: 要更新的字段
         :return: True表示成功，False表示失败
         """
-        devices = self.load_devices()  # 加载设备列表
-        for device in devices:  # 遍历所有设备
-            if device['id'] == device_id:  # 如果找到目标设备
-                # 更新设备信息
-                for key, value in kwargs.items():
-                    device[key] = value
-                return self.save_devices(devices)  # 保存并返回结果
+        with self._lock:
+            devices = self.load_devices()  # 加载设备列表
+            for device in devices:  # 遍历所有设备
+                if device['id'] == device_id:  # 如果找到目标设备
+                    # 更新设备信息
+                    for key, value in kwargs.items():
+                        device[key] = value
+                    if kwargs.get('password'):  # 新密码存入凭据保险库，不再沿用原来的凭据引用
+                        if self.credential_store is not None:
+                            device['credential_id'] = None
+                        self._store_credentials([device])
+                    return self.save_devices(devices)  # 保存并返回结果
         return False  # 设备不存在
 
     def update_device_status(self, device_id, status):
@@ -167,11 +376,12 @@ class DeviceManager:
         :param status: 新状态（如：online, offline, unknown）
         :return: True表示成功，False表示失败
         """
-        devices = self.load_devices()  # 加载设备列表
-        for device in devices:  # 遍历所有设备
-            if device['id'] == device_id:  # 如果找到目标设备
-                device['status'] = status  # 更新状态
-                return self.save_devices(devices)  # 保存并返回结果
+        with self._lock:
+            devices = self.load_devices()  # 加载设备列表
+            for device in devices:  # 遍历所有设备
+                if device['id'] == device_id:  # 如果找到目标设备
+                    device['status'] = status  # 更新状态
+                    return self.save_devices(devices)  # 保存并返回结果
         return False  # 设备不存在
 
     def get_all_devices(self):
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+设备发现模块
+负责在后台并行登录新导入的设备，获取主机名、型号、序列号、版本等信息并批量写回设备存储，
+避免添加设备的HTTP请求阻塞在SSH登录上
+"""
+
+import threading  # 线程锁、后台线程
+import time  # 时间处理
+import uuid  # 任务ID
+from concurrent.futures import ThreadPoolExecutor, as_completed  # 并行发现
+
+from .device_manager import WRITE_BATCH_SIZE  # 写回批量大小
+from .ssh_connector import SSHConnector  # SSH连接器
+from .facts import collect_facts, FACTS_FIELDS  # 设备信息采集
+from .tracing import tracer  # 链路追踪
+
+
+# 已结束任务的保留数量
+MAX_FINISHED_JOBS = 20
+
+
+class DiscoveryManager:
+    """设备发现管理类：后台线程池并行发现，结果分批写回设备存储"""
+
+    def __init__(self, device_manager, max_workers=16):
+        """
+        初始化设备发现管理器
+        :param device_manager: 设备管理器
+        :param max_workers: 同时进行的SSH会话数
+        """
+        self.device_manager = device_manager  # 设备管理器
+        self.max_workers = max_workers  # 并发数
+        self._jobs = {}  # {任务ID: 任务字典}
+        self._lock = threading.Lock()  # 锁
+
+    def discover(self, device):
+        """
+        登录单台设备发现信息
+        :param device: 设备信息字典
+        :return: 需要写回的字段字典
+        :raises RuntimeError: 连接失败
+        """
+        with tracer.span('discovery.device', device=device['ip'], vendor=device.get('vendor')):
+            ssh = SSHConnector.from_device(device, timeout=10)  # 登录信息由设备字段或凭据保险库提供
+            if not ssh.connect():  # 连接失败
+                raise RuntimeError('SSH连接失败')
+            try:
+                fields = {}
+                if device.get('name_pending'):  # 未手动指定名称
+                    hostname = ssh.get_hostname(device.get('vendor', ''))  # 获取主机名
+                    if hostname and hostname != 'unknown':
+                        fields['name'] = hostname
+                    fields['name_pending'] = False
+                facts = collect_facts(ssh, device.get('vendor', ''))  # 同一会话中采集设备信息
+                fields.update({key: facts[key] for key in FACTS_FIELDS if key in facts})
+                fields['facts_updated'] = int(time.time())  # 采集时间
+                return fields
+            finally:
+                ssh.disconnect()  # 断开连接
+
+    def submit(self, devices):
+        """
+        提交后台发现任务
+        :param devices: 设备信息字典列表
+        :return: 任务ID，无设备时返回None
+        """
+        if not devices:
+            return None
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            'id': job_id,  # 任务ID
+            'status': 'running',  # running / completed
+            'total': len(devices),  # 设备总数
+            'done': 0,  # 已完成数
+            'success_count': 0,  # 成功数
+            'errors': [],  # 失败列表 [{'device_id', 'ip', 'error'}]
+            'created': time.time(),  # 创建时间
+            'finished': None  # 结束时间
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            finished = sorted((item for item in self._jobs.values() if item['status'] != 'running'),
+                              key=lambda item: item['created'])
+            for item in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+                self._jobs.pop(item['id'], None)
+        threading.Thread(target=self._run, args=(job, devices), daemon=True).start()
+        return job_id
+
+    def _run(self, job, devices):
+        """
+        执行发现任务（后台线程）
+        :param job: 任务字典
+        :param devices: 设备信息字典列表
+        """
+        pending = {}  # 待写回的结果 {设备ID: 字段字典}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.discover, device): device for device in devices}
+            for future in as_completed(futures):
+                device = futures[future]
+                try:
+                    fields = future.result()
+                    if fields:
+                        pending[device['id']] = fields
+                    job['success_count'] += 1
+                except Exception as e:  # 单台失败不影响其他设备
+                    job['errors'].append({'device_id': device['id'], 'ip': device['ip'], 'error': str(e)})
+                job['done'] += 1
+                if len(pending) >= WRITE_BATCH_SIZE:  # 攒够一批写回
+                    self.device_manager.update_devices(pending)
+                    pending = {}
+        self.device_manager.update_devices(pending)  # 写回剩余结果
+        job['status'] = 'completed'
+        job['finished'] = time.time()
+
+    def get_stats(self):
+        """
+        获取任务统计
+        :return: {任务状态: 任务数}
+        """
+        counts = {}
+        for job in list(self._jobs.values()):
+            counts[job['status']] = counts.get(job['status'], 0) + 1
+        return counts
+
+    def get_job(self, job_id):
+        """
+        获取发现任务进度
+        :param job_id: 任务ID
+        :return: 任务字典副本，不存在返回None
+        """
+        job = self._jobs.get(job_id)
+        return dict(job, errors=list(job['errors'])) if job else None
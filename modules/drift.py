@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+配置漂移检测模块
+负责规范化设备配置（去除时间戳、NTP时钟周期、分页残留等易变内容），按配置段计算哈希，
+并与黄金基线或上一版本比较，输出配置段级别的差异
+"""
+
+import difflib  # 文本差异
+import hashlib  # 哈希计算
+import json  # JSON数据处理
+import logging  # 日志
+import os  # 文件操作
+import re  # 正则表达式
+import threading  # 线程锁
+import time  # 时间处理
+
+
+logger = logging.getLogger(__name__)  # 模块日志
+
+
+# 缓存条目上限（超出后整体清空，重新按需计算）
+CACHE_LIMIT = 20000
+
+# 规范化时整行删除的易变内容
+VOLATILE_LINE_PATTERN = re.compile(
+    r'^\s*(?:'
+    r'!\s*Last configuration change at.*'  # Cisco 最近修改时间
+    r'|!\s*NVRAM config last updated at.*'  # Cisco 最近保存时间
+    r'|!\s*No configuration change since last restart.*'
+    r'|!\s*Time:.*'  # NX-OS 生成时间
+    r'|!\s*Command:.*'  # NX-OS 命令回显
+    r'|ntp clock-period\s+\d+'  # Cisco NTP时钟周期（自动调整）
+    r'|Building configuration\.\.\.'
+    r'|Current configuration\s*:\s*\d+\s*bytes'  # 配置长度
+    r'|!\s*Software Version.*'  # 华为 版本注释
+    r'|!\s*Last configuration was (?:updated|saved) at.*'  # 华为 修改/保存时间
+    r'|##\s*Last (?:commit|changed):.*'  # Juniper 提交时间
+    r'|#conf_file_ver=.*'  # Fortinet 配置版本号
+    r'|[-\s]*-{2,}\s*More\s*-{2,}[-\s]*'  # 分页提示残留
+    r')\s*$',
+    re.IGNORECASE
+)
+# 终端转义序列（分页后光标回退等）
+ANSI_ESCAPE_PATTERN = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+# 行内分页提示残留
+INLINE_MORE_PATTERN = re.compile(r'\s*-{2,}\s*More\s*-{2,}\s*', re.IGNORECASE)
+# 配置段分隔行（华为/H3C的#、Cisco的!）
+SEPARATOR_LINE_PATTERN = re.compile(r'^\s*[#!]\s*$')
+
+
+def normalize_config(text):
+    """
+    规范化配置文本：去除易变行、分页残留、终端转义序列、行尾空白和分隔行
+    :param text: 配置文本
+    :return: 规范化后的配置文本
+    """
+    lines = []
+    for line in ANSI_ESCAPE_PATTERN.sub('', text or '').replace('\r', '').split('\n'):
+        line = INLINE_MORE_PATTERN.sub('', line).rstrip()
+        if not line.strip() or VOLATILE_LINE_PATTERN.match(line) or SEPARATOR_LINE_PATTERN.match(line):
+            continue
+        lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+def split_sections(normalized):
+    """
+    按顶层命令划分配置段（不缩进的行开始新段，缩进行归属上一段）
+    :param normalized: 规范化后的配置文本
+    :return: {段标题: 段内行列表}（保持原顺序，重复标题追加序号）
+    """
+    sections = {}
+    current = None
+    for line in normalized.split('\n'):
+        if not line:
+            continue
+        if not line[0].isspace() or current is None:  # 顶层命令
+            header = line.strip()
+            key, number = header, 2
+            while key in sections:  # 重复的顶层命令（如多条静态路由相同前缀）
+                key = f"{header} #{number}"
+                number += 1
+            current = sections[key] = [line]
+        else:
+            current.append(line)
+    return sections
+
+
+def hash_text(text):
+    """
+    计算文本哈希
+    :param text: 文本
+    :return: SHA-1十六进制字符串（仅用于比较是否变化）
+    """
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class DriftEngine:
+    """配置漂移检测类：按配置版本哈希缓存段哈希，只有新版本需要读取和规范化"""
+
+    def __init__(self, backup_manager, baseline_file='config/drift_baselines.json'):
+        """
+        初始化漂移检测引擎
+        :param backup_manager: 配置备份管理器（提供版本列表和文件读取）
+        :param baseline_file: 黄金基线配置文件路径 {设备ID: 备份文件名}
+        """
+        self.backup_manager = backup_manager  # 备份管理器
+        self.baseline_file = baseline_file  # 基线文件路径
+        self._section_cache = {}  # {版本哈希: {段标题: 段哈希}}
+        self._result_cache = {}  # {(基线版本哈希, 当前版本哈希): 变化段列表}
+        self._lock = threading.Lock()  # 锁
+        self.baselines = self._load_baselines()  # 黄金基线
+
+    def _load_baselines(self):
+        """
+        加载黄金基线配置
+        :return: {设备ID: 备份文件名}
+        """
+        try:
+            with open(self.baseline_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:  # 尚未设置基线
+            return {}
+        except Exception as e:  # 文件损坏
+            logger.error("加载配置基线失败: %s", e)
+            return {}
+
+    def set_baseline(self, device_id, filename=None):
+        """
+        设置设备的黄金基线
+        :param device_id: 设备ID
+        :param filename: 备份文件名，None表示使用最新版本
+        :return: 基线文件名，设备无该版本返回None
+        """
+        versions = self.backup_manager.get_versions(device_id)
+        if filename is None and versions:
+            filename = versions[-1]['filename']
+        if not any(version['filename'] == filename for version in versions):
+            return None
+        with self._lock:
+            self.baselines[device_id] = filename
+            os.makedirs(os.path.dirname(self.baseline_file) or '.', exist_ok=True)  # 创建目录
+            with open(self.baseline_file, 'w', encoding='utf-8') as f:
+                json.dump(self.baselines, f, ensure_ascii=False, indent=4)
+        return filename
+
+    def _read_sections(self, version):
+        """
+        读取并规范化一个版本，返回完整段内容（只在生成差异时使用）
+        :param version: 版本字典
+        :return: {段标题: 段内行列表}
+        """
+        return split_sections(normalize_config(self.backup_manager.read_file(version['filename']) or ''))
+
+    def _section_hashes(self, version):
+        """
+        获取版本的段哈希（按版本哈希缓存，相同内容只处理一次）
+        :param version: 版本字典
+        :return: {段标题: 段哈希}
+        """
+        hashes = self._section_cache.get(version['hash'])
+        if hashes is None:
+            hashes = {header: hash_text('\n'.join(lines))
+                      for header, lines in self._read_sections(version).items()}
+            if len(self._section_cache) >= CACHE_LIMIT:
+                self._section_cache.clear()
+            self._section_cache[version['hash']] = hashes
+        return hashes
+
+    def _diff(self, base, current):
+        """
+        比较两个版本，输出变化的配置段（结果按版本哈希对缓存）
+        :param base: 基线版本字典
+        :param current: 当前版本字典
+        :return: 变化段列表 [{'section', 'change', 'diff'}]
+        """
+        key = (base['hash'], current['hash'])
+        cached = self._result_cache.get(key)
+        if cached is not None:
+            return cached
+
+        base_hashes, current_hashes = self._section_hashes(base), self._section_hashes(current)
+        changed = [header for header in base_hashes if base_hashes[header] != current_hashes.get(header)]
+        changed += [header for header in current_hashes if header not in base_hashes]
+        changes = []
+        if changed:  # 只有存在变化段时才读取完整内容生成差异
+            base_sections, current_sections = self._read_sections(base), self._read_sections(current)
+            for header in changed:
+                old_lines = base_sections.get(header, [])
+                new_lines = current_sections.get(header, [])
+                changes.append({
+                    'section': header,  # 段标题
+                    'change': 'added' if not old_lines else 'removed' if not new_lines else 'modified',  # 变化类型
+                    'diff': list(difflib.unified_diff(old_lines, new_lines, base['filename'], current['filename'],
+                                                      lineterm='', n=1))  # 段内差异
+                })
+        if len(self._result_cache) >= CACHE_LIMIT:
+            self._result_cache.clear()
+        self._result_cache[key] = changes
+        return changes
+
+    def check_device(self, device_id, against='baseline'):
+        """
+        检查单台设备的配置漂移
+        :param device_id: 设备ID
+        :param against: 比较对象（baseline：黄金基线，previous：上一版本）
+        :return: 检查结果字典
+        """
+        versions = self.backup_manager.get_versions(device_id)
+        result = {'device_id': device_id, 'against': against, 'status': 'no_backup', 'baseline': None,
+                  'current': None, 'changes': []}
+        if not versions:
+            return result
+        current = versions[-1]
+        result['current'] = current['filename']
+        result['device_name'] = current.get('device_name')
+
+        if against == 'previous':
+            base = versions[-2] if len(versions) > 1 else None
+        else:
+            filename = self.baselines.get(device_id)
+            base = next((version for version in versions if version['filename'] == filename), None)
+        if base is None:
+            result['status'] = 'no_baseline'
+            return result
+        result['baseline'] = base['filename']
+
+        if base['hash'] == current['hash']:  # 内容哈希相同，无需比较
+            result['status'] = 'in_sync'
+            return result
+        with self._lock:
+            changes = self._diff(base, current)
+        result['status'] = 'drifted' if changes else 'in_sync'
+        result['changes'] = changes
+        return result
+
+    def check_all(self, device_ids, against='baseline'):
+        """
+        检查多台设备的配置漂移（只有哈希变化的版本需要读取文件）
+        :param device_ids: 设备ID列表
+        :param against: 比较对象（baseline / previous）
+        :return: {'results': 结果列表, 'summary': 各状态数量, 'elapsed': 耗时秒}
+        """
+        start = time.monotonic()
+        results = [self.check_device(device_id, against) for device_id in device_ids]
+        summary = {}
+        for result in results:
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+        return {'results': results, 'summary': summary, 'elapsed': round(time.monotonic() - start, 3)}
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+设备信息采集模块
+负责在已建立的SSH会话上低频采集设备型号、序列号、软件版本和启动时间，
+结果缓存在设备存储中，详情页直接读取，无需每次查看都登录设备
+"""
+
+import logging  # 日志
+import threading  # 线程锁、后台线程
+import time  # 时间处理
+
+from .device_manager import WRITE_BATCH_SIZE  # 待写回结果攒够该数量后立即写入设备存储
+from .parsers import registry  # 厂商命令解析器注册表
+
+
+logger = logging.getLogger(__name__)  # 模块日志
+
+
+# 写回设备存储的设备信息字段
+FACTS_FIELDS = ('model', 'serial_number', 'version', 'boot_time')
+
+
+def collect_facts(ssh, vendor):
+    """
+    在已建立的SSH会话上采集设备信息（版本命令 + 硬件清单命令）
+    :param ssh: SSH连接对象
+    :param vendor: 设备厂商
+    :return: 设备信息字典（只包含成功解析的字段）
+    """
+    facts = {}
+    for metric in ('version', 'inventory'):  # 版本信息优先，硬件清单补充缺失字段
+        try:
+            parsed = registry.collect(ssh, vendor, metric) or {}
+        except Exception as e:  # 单条命令失败不影响其他命令
+            logger.warning("采集%s失败 (%s): %s", metric, vendor, e,
+                           extra={'device': ssh.host, 'vendor': vendor, 'stage': metric})
+            continue
+        for key, value in parsed.items():
+            if value is not None and facts.get(key) is None:
+                facts[key] = value
+    uptime = facts.pop('uptime_seconds', None)
+    if uptime is not None:  # 保存启动时间而不是运行时长，缓存的值不会过时
+        facts['boot_time'] = int(time.time() - uptime)
+    return facts
+
+
+def format_uptime(boot_time, now=None):
+    """
+    根据启动时间计算运行时长文本
+    :param boot_time: 启动时间戳（秒）
+    :param now: 当前时间戳，默认当前时间
+    :return: 运行时长文本（如：10天 2小时 3分钟），无启动时间返回None
+    """
+    if not boot_time:
+        return None
+    seconds = max(0, int((now or time.time()) - boot_time))
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes = seconds // 60
+    return f"{days}天 {hours}小时 {minutes}分钟" if days else f"{hours}小时 {minutes}分钟"
+
+
+class FactsCollector:
+    """设备信息缓存类：判断设备信息是否需要刷新，采集结果分批写回设备存储"""
+
+    def __init__(self, device_manager, refresh_interval=86400, flush_interval=30):
+        """
+        初始化设备信息缓存
+        :param device_manager: 设备管理器
+        :param refresh_interval: 设备信息刷新周期（秒），默认每天一次
+        :param flush_interval: 后台写回设备存储的周期（秒）
+        """
+        self.device_manager = device_manager  # 设备管理器
+        self.refresh_interval = refresh_interval  # 刷新周期
+        self.flush_interval = flush_interval  # 写回周期
+        self._pending = {}  # 待写回的结果 {设备ID: 字段字典}
+        self._lock = threading.Lock()  # 锁
+
+    def is_due(self, device):
+        """
+        判断设备信息是否需要刷新（由采集方在本次SSH会话中顺带采集）
+        :param device: 设备信息字典
+        :return: True表示需要采集
+        """
+        if device['id'] in self._pending:  # 已采集，尚未写回
+            return False
+        return time.time() - device.get('facts_updated', 0) >= self.refresh_interval
+
+    def record(self, device_id, facts):
+        """
+        记录采集结果（无论是否解析到字段都更新采集时间，避免不支持的设备每轮重复采集）
+        :param device_id: 设备ID
+        :param facts: collect_facts返回的设备信息字典
+        :return: 写回设备存储的字段字典
+        """
+        fields = {key: facts[key] for key in FACTS_FIELDS if facts.get(key) is not None}
+        fields['facts_updated'] = int(time.time())  # 采集时间
+        with self._lock:
+            self._pending[device_id] = fields
+            full = len(self._pending) >= WRITE_BATCH_SIZE
+        if full:  # 攒够一批立即写回
+            self.flush()
+        return fields
+
+    def get_pending(self, device_id):
+        """
+        获取尚未写回的采集结果
+        :param device_id: 设备ID
+        :return: 字段字典，没有返回None
+        """
+        return self._pending.get(device_id)
+
+    def remove(self, device_id):
+        """
+        丢弃已删除设备尚未写回的结果
+        :param device_id: 设备ID
+        """
+        with self._lock:
+            self._pending.pop(device_id, None)
+
+    def get_stats(self):
+        """
+        获取缓存统计
+        :return: {'pending': 待写回的设备数}
+        """
+        return {'pending': len(self._pending)}
+
+    def flush(self):
+        """将待写回的结果一次写入设备存储"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if pending:
+            self.device_manager.update_devices(pending)
+
+    def start(self):
+        """启动后台写回线程"""
+        def loop():
+            while True:
+                time.sleep(self.flush_interval)
+                try:
+                    self.flush()
+                except Exception as e:  # 写回失败，下个周期重试
+                    logger.error("写回设备信息失败: %s", e)
+
+        threading.Thread(target=loop, daemon=True).start()
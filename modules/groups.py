@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+设备分组模块
+负责按站点（层级）、角色、厂商、标签维护设备分组索引，
+并在可达性变化、采集样本到达、告警触发/恢复时增量更新每个分组的汇总值，
+站点级视图只需读取分组汇总（与分组数成正比），不再扫描全部设备
+"""
+
+import threading  # 线程锁
+
+from .parsers import normalize_vendor  # 厂商名称标准化
+
+
+# 分组维度（分组键格式为 维度:值，站点按层级展开为 site:北京、site:北京/亦庄机房 等）
+DIMENSIONS = ('site', 'role', 'vendor', 'tag')
+# 累加的指标
+METRICS = ('cpu', 'memory')
+
+
+def group_keys(device):
+    """
+    计算设备所属的全部分组
+    :param device: 设备信息字典
+    :return: 分组键元组
+    """
+    keys = []
+    parts = [part for part in (device.get('site') or '').split('/') if part]
+    for depth in range(1, len(parts) + 1):  # 站点的每一级都是一个分组
+        keys.append('site:' + '/'.join(parts[:depth]))
+    if device.get('role'):
+        keys.append('role:' + device['role'])
+    keys.append('vendor:' + (normalize_vendor(device.get('vendor')) or 'unknown'))
+    keys.extend('tag:' + tag for tag in device.get('tags') or [])
+    return tuple(keys)
+
+
+def _new_contribution():
+    """
+    创建单台设备对分组汇总的贡献
+    :return: 贡献字典
+    """
+    return {'online': 0, 'cpu': None, 'memory': None, 'alerts': 0}
+
+
+def _new_aggregate():
+    """
+    创建分组汇总
+    :return: 汇总字典
+    """
+    aggregate = {'devices': 0, 'online': 0, 'alerts': 0, 'members': set()}
+    for metric in METRICS:
+        aggregate.update({f'{metric}_sum': 0.0, f'{metric}_count': 0, f'{metric}_max': None})
+    return aggregate
+
+
+class GroupIndex:
+    """分组索引类：保存分组成员索引和每个分组的增量汇总（在线数、CPU/内存平均值和最大值、告警数）"""
+
+    def __init__(self):
+        """初始化分组索引"""
+        self._device_groups = {}  # {设备ID: 分组键元组}
+        self._contributions = {}  # {设备ID: 贡献字典}
+        self._groups = {}  # {分组键: 汇总字典}
+        self._lock = threading.Lock()  # 锁（采集线程、探测线程和请求线程并发更新）
+
+    def sync(self, devices):
+        """
+        同步设备列表（设备增删或分组字段变化时调整成员索引，设备管理器保存后调用）
+        :param devices: 完整设备列表
+        """
+        with self._lock:
+            current = {}
+            for device in devices:
+                current[device['id']] = keys = group_keys(device)
+                old_keys = self._device_groups.get(device['id'])
+                if old_keys == keys:
+                    continue
+                contribution = self._contributions.setdefault(device['id'], _new_contribution())
+                if old_keys is not None:
+                    self._leave(device['id'], old_keys, contribution)
+                self._join(device['id'], keys, contribution)
+                self._device_groups[device['id']] = keys
+            for device_id in [device_id for device_id in self._device_groups if device_id not in current]:
+                self._leave(device_id, self._device_groups.pop(device_id), self._contributions.pop(device_id))
+
+    def _join(self, device_id, keys, contribution):
+        """
+        设备加入分组并累加其贡献（调用方持有锁）
+        :param device_id: 设备ID
+        :param keys: 分组键元组
+        :param contribution: 贡献字典
+        """
+        for key in keys:
+            aggregate = self._groups.setdefault(key, _new_aggregate())
+            aggregate['members'].add(device_id)
+            aggregate['devices'] += 1
+            self._apply(aggregate, _new_contribution(), contribution)
+
+    def _leave(self, device_id, keys, contribution):
+        """
+        设备离开分组并扣除其贡献，空分组删除（调用方持有锁）
+        :param device_id: 设备ID
+        :param keys: 分组键元组
+        :param contribution: 贡献字典
+        """
+        for key in keys:
+            aggregate = self._groups[key]
+            aggregate['members'].discard(device_id)
+            aggregate['devices'] -= 1
+            if not aggregate['members']:
+                del self._groups[key]
+                continue
+            self._apply(aggregate, contribution, _new_contribution())
+
+    def _apply(self, aggregate, old, new):
+        """
+        将一台设备的贡献从旧值改为新值（调用方持有锁）
+        最大值只在原最大值所属设备下降或离开时才重新扫描该分组成员
+        :param aggregate: 汇总字典
+        :param old: 旧贡献
+        :param new: 新贡献
+        """
+        aggregate['online'] += new['online'] - old['online']
+        aggregate['alerts'] += new['alerts'] - old['alerts']
+        for metric in METRICS:
+            before, after = old[metric], new[metric]
+            if before == after:
+                continue
+            if before is not None:
+                aggregate[f'{metric}_sum'] -= before
+                aggregate[f'{metric}_count'] -= 1
+            if after is not None:
+                aggregate[f'{metric}_sum'] += after
+                aggregate[f'{metric}_count'] += 1
+            current_max = aggregate[f'{metric}_max']
+            if after is not None and (current_max is None or after >= current_max):
+                aggregate[f'{metric}_max'] = after
+            elif before is not None and before == current_max:  # 最大值所属设备下降或离开，重新计算
+                values = [self._contributions[member][metric] for member in aggregate['members']
+                          if member in self._contributions and self._contributions[member] is not old]
+                if after is not None:
+                    values.append(after)
+                aggregate[f'{metric}_max'] = max((value for value in values if value is not None), default=None)
+
+    def _update(self, device_id, **fields):
+        """
+        修改设备贡献的部分字段并增量更新其所属分组（调用方持有锁）
+        :param device_id: 设备ID
+        :param fields: 新字段值
+        """
+        old = self._contributions.get(device_id)
+        if old is None:  # 设备尚未同步（或已删除）
+            return
+        new = dict(old, **fields)
+        if new == old:
+            return
+        for key in self._device_groups.get(device_id, ()):
+            self._apply(self._groups[key], old, new)
+        self._contributions[device_id] = new
+
+    def update_status(self, device_id, status):
+        """
+        更新设备在线状态（离线时清除其CPU/内存，不计入平均值）
+        :param device_id: 设备ID
+        :param status: 对外状态（online / offline / unknown）
+        """
+        with self._lock:
+            if status == 'online':
+                self._update(device_id, online=1)
+            else:
+                self._update(device_id, online=0, cpu=None, memory=None)
+
+    def update_sample(self, device_id, result):
+        """
+        写入一次采集结果的CPU/内存
+        :param device_id: 设备ID
+        :param result: 监控结果字典
+        """
+        values = {metric: float(result[metric]) if isinstance(result.get(metric), (int, float)) else None
+                  for metric in METRICS}
+        with self._lock:
+            self._update(device_id, **values)
+
+    def update_alert(self, event):
+        """
+        告警事件监听函数：触发时告警数加一，恢复时减一
+        :param event: 告警事件字典
+        """
+        with self._lock:
+            old = self._contributions.get(event['device_id'])
+            if old is not None:
+                delta = 1 if event['state'] == 'firing' else -1
+                self._update(event['device_id'], alerts=max(0, old['alerts'] + delta))
+
+    def set_alert_counts(self, counts):
+        """
+        按告警日志重置各设备的未恢复告警数（规则修改后未恢复告警被批量解除时调用）
+        :param counts: {设备ID: 未恢复告警数}
+        """
+        with self._lock:
+            for device_id in self._contributions:
+                self._update(device_id, alerts=counts.get(device_id, 0))
+
+    def _summary(self, key, aggregate):
+        """
+        生成分组汇总的对外字典（调用方持有锁）
+        :param key: 分组键
+        :param aggregate: 汇总字典
+        :return: 汇总字典副本
+        """
+        dimension, _, name = key.partition(':')
+        summary = {'group': key, 'dimension': dimension, 'name': name, 'devices': aggregate['devices'],
+                   'online': aggregate['online'], 'offline': aggregate['devices'] - aggregate['online'],
+                   'alerts': aggregate['alerts']}
+        for metric in METRICS:
+            count = aggregate[f'{metric}_count']
+            summary[f'{metric}_avg'] = round(aggregate[f'{metric}_sum'] / count, 1) if count else None
+            summary[f'{metric}_max'] = aggregate[f'{metric}_max']
+        return summary
+
+    def get_groups(self, dimension=None, parent=None):
+        """
+        获取分组汇总列表
+        :param dimension: 维度过滤（site、role、vendor、tag）
+        :param parent: 上级站点分组键（如 site:北京），只返回其直接下级；维度为site且未指定时只返回顶级站点
+        :return: 汇总字典列表（按分组键排序）
+        """
+        with self._lock:
+            summaries = []
+            for key in sorted(self._groups):
+                if dimension and not key.startswith(dimension + ':'):
+                    continue
+                if parent is not None:
+                    if not key.startswith(parent + '/') or '/' in key[len(parent) + 1:]:
+                        continue
+                elif dimension == 'site' and '/' in key:
+                    continue
+                summaries.append(self._summary(key, self._groups[key]))
+            return summaries
+
+    def get_group(self, key):
+        """
+        获取单个分组的汇总和成员
+        :param key: 分组键
+        :return: 汇总字典（含device_ids），分组不存在返回None
+        """
+        with self._lock:
+            aggregate = self._groups.get(key)
+            if aggregate is None:
+                return None
+            summary = self._summary(key, aggregate)
+            summary['device_ids'] = sorted(aggregate['members'])
+            return summary
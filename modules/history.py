@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+指标历史模块
+负责保存每次采集的CPU、内存、温度样本（SQLite），并按图表像素宽度在服务端降采样：
+min/max包络在SQLite中按时间桶聚合，LTTB在按列存放的数组上计算，
+查询窗口对齐到桶边界，结果按（设备、指标、时间范围、宽度、方法）缓存
+"""
+
+import logging  # 日志
+import os  # 文件操作
+import re  # 正则表达式
+import sqlite3  # SQLite数据库（Python内置）
+import threading  # 线程锁
+import time  # 时间处理
+from array import array  # 紧凑的数值数组
+from collections import OrderedDict  # LRU缓存
+
+
+logger = logging.getLogger(__name__)  # 模块日志
+
+
+# 保存历史的指标（列名白名单）
+METRICS = ('cpu', 'memory', 'temperature')
+# 降采样方法：minmax为每个像素桶的最小/最大/平均值，lttb为保留形状的代表点
+METHODS = ('minmax', 'lttb')
+# 历史保留天数
+RETENTION_DAYS = 30
+# 样本批量写入间隔（秒）
+FLUSH_INTERVAL = 5
+# 过期样本清理间隔（秒）
+PURGE_INTERVAL = 3600
+# 降采样结果缓存条数
+CACHE_SIZE = 256
+# 图表宽度范围（像素）
+MIN_WIDTH = 10
+MAX_WIDTH = 4000
+# 时间范围写法：数字 + 单位（m分钟、h小时、d天）
+RANGE_PATTERN = re.compile(r'^(\d+)([mhd])$')
+RANGE_UNITS = {'m': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_range(text):
+    """
+    解析时间范围（如 1h、24h、7d、30d）
+    :param text: 时间范围字符串
+    :return: 秒数（不超过保留天数）
+    """
+    match = RANGE_PATTERN.match((text or '').strip().lower())
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f"无效的时间范围: {text}（示例：1h、24h、7d）")
+    return min(int(match.group(1)) * RANGE_UNITS[match.group(2)], RETENTION_DAYS * 86400)
+
+
+def lttb(timestamps, values, threshold):
+    """
+    LTTB降采样（Largest-Triangle-Three-Buckets）：每个桶保留与前一个选中点、下一个桶均值构成三角形面积最大的点
+    :param timestamps: 时间数组（升序）
+    :param values: 数值数组
+    :param threshold: 输出点数
+    :return: (时间列表, 数值列表)
+    """
+    n = len(timestamps)
+    if threshold >= n or threshold < 3:  # 点数不超过宽度，无需降采样
+        return list(timestamps), list(values)
+    every = (n - 2) / (threshold - 2)  # 每个桶的点数（首尾两点单独保留）
+    out_t, out_v = [timestamps[0]], [values[0]]
+    selected = 0  # 上一个选中点的下标
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1  # 当前桶
+        next_end = min(int((i + 2) * every) + 1, n)  # 下一个桶（最后一个桶为末点）
+        next_t, next_v = timestamps[end:next_end], values[end:next_end]
+        avg_t, avg_v = sum(next_t) / len(next_t), sum(next_v) / len(next_v)  # 下一个桶的均值点
+        at, av = timestamps[selected], values[selected]
+        dx, dy = at - avg_t, avg_v - av
+        # 三角形面积的两倍（常数因子不影响比较），按切片整体计算
+        areas = map(lambda t, v: abs(dx * (v - av) - (at - t) * dy), timestamps[start:end], values[start:end])
+        selected = start + max(zip(areas, range(end - start)))[1]
+        out_t.append(timestamps[selected])
+        out_v.append(values[selected])
+    out_t.append(timestamps[n - 1])
+    out_v.append(values[n - 1])
+    return out_t, out_v
+
+
+class MetricHistory:
+    """指标历史类：样本批量写入SQLite，查询时降采样到图表宽度并缓存结果"""
+
+    def __init__(self, db_file='outputs/history.db', retention_days=RETENTION_DAYS, cache_size=CACHE_SIZE):
+        """
+        初始化指标历史
+        :param db_file: 历史数据库路径
+        :param retention_days: 历史保留天数
+        :param cache_size: 降采样结果缓存条数
+        """
+        self.db_file = db_file  # 数据库路径
+        self.retention = retention_days * 86400  # 保留时长（秒）
+        self.cache_size = cache_size  # 缓存条数
+        self._pending = []  # 待写入的样本
+        self._flushed = time.monotonic()  # 上次写入时间
+        self._purged = 0  # 上次清理时间
+        self._cache = OrderedDict()  # {(设备ID, 指标, 范围, 宽度, 方法, 窗口结束): 结果}
+        self._lock = threading.Lock()  # 数据库访问锁（采集线程写入、请求线程读取）
+        self._ensure_database()  # 确保数据库存在
+
+    def _ensure_database(self):
+        """确保历史数据库和表存在"""
+        os.makedirs(os.path.dirname(self.db_file) or '.', exist_ok=True)  # 创建目录
+        self._conn = sqlite3.connect(self.db_file, check_same_thread=False)  # 允许跨线程使用（由锁保护）
+        self._conn.execute('PRAGMA journal_mode=WAL')  # 写入不阻塞读取
+        self._conn.execute('PRAGMA synchronous=NORMAL')  # 批量写入时减少fsync
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS samples ('
+            'device_id TEXT, ts REAL, cpu REAL, memory REAL, temperature REAL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_samples_device ON samples(device_id, ts)')
+        self._conn.commit()
+
+    def record(self, device_id, result, timestamp=None):
+        """
+        记录一次采集结果（攒批写入，间隔FLUSH_INTERVAL秒提交一次）
+        :param device_id: 设备ID
+        :param result: 监控结果字典（cpu、memory、temperature）
+        :param timestamp: 采集时间（秒），默认当前时间
+        """
+        sample = [device_id, timestamp or time.time()]
+        for metric in METRICS:
+            value = result.get(metric)
+            sample.append(float(value) if isinstance(value, (int, float)) else None)  # 非数值（如解析失败）记为空
+        with self._lock:
+            self._pending.append(tuple(sample))
+            if time.monotonic() - self._flushed >= FLUSH_INTERVAL:
+                self._flush_locked()
+
+    def flush(self):
+        """立即写入待写入的样本"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        """写入待写入的样本，并定期清理过期样本（调用方持有锁）"""
+        self._flushed = time.monotonic()
+        try:
+            if self._pending:
+                self._conn.executemany('INSERT INTO samples VALUES (?, ?, ?, ?, ?)', self._pending)
+                self._pending = []
+            if self._flushed - self._purged >= PURGE_INTERVAL:
+                self._purged = self._flushed
+                self._conn.execute('DELETE FROM samples WHERE ts < ?', (time.time() - self.retention,))
+            self._conn.commit()
+        except sqlite3.Error as e:  # 写入失败时丢弃本批，避免无限堆积
+            logger.error("写入指标历史失败: %s", e)
+            self._pending = []
+
+    def remove(self, device_id):
+        """
+        删除设备的全部历史
+        :param device_id: 设备ID
+        """
+        with self._lock:
+            self._pending = [sample for sample in self._pending if sample[0] != device_id]
+            self._conn.execute('DELETE FROM samples WHERE device_id = ?', (device_id,))
+            self._conn.commit()
+            for key in [key for key in self._cache if key[0] == device_id]:
+                del self._cache[key]
+
+    def recent(self, device_id, limit=20):
+        """
+        获取设备最近的原始样本（设备详情页的实时图表）
+        :param device_id: 设备ID
+        :param limit: 样本数
+        :return: {'timestamps': [...], 'cpu': [...], 'memory': [...], 'temperature': [...]}（时间升序）
+        """
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(
+                'SELECT ts, cpu, memory, temperature FROM samples WHERE device_id = ? ORDER BY ts DESC LIMIT ?',
+                (device_id, limit)).fetchall()
+        rows.reverse()
+        return {
+            'timestamps': [row[0] for row in rows],
+            **{metric: [row[index] for row in rows] for index, metric in enumerate(METRICS, 1)}
+        }
+
+    def query(self, device_id, metric='cpu', range_text='24h', width=800, method='minmax'):
+        """
+        查询降采样后的指标历史
+        :param device_id: 设备ID
+        :param metric: 指标名称（cpu、memory、temperature）
+        :param range_text: 时间范围（如 1h、24h、7d、30d）
+        :param width: 图表像素宽度（输出点数上限）
+        :param method: 降采样方法（minmax或lttb）
+        :return: 结果字典，minmax方法额外包含每个桶的min、max
+        """
+        if metric not in METRICS:
+            raise ValueError(f"不支持的指标: {metric}")
+        if method not in METHODS:
+            raise ValueError(f"不支持的降采样方法: {method}")
+        seconds = parse_range(range_text)
+        width = max(MIN_WIDTH, min(int(width), MAX_WIDTH))
+        step = max(seconds / width, 1.0)  # 每个像素对应的秒数
+        # 窗口结束对齐到桶边界（不含正在积累的桶），同一桶内的重复请求命中缓存，且缓存结果不会过期
+        end = (time.time() // step) * step
+        start = end - step * width
+        key = (device_id, metric, range_text, width, method, end)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            self._flush_locked()
+            if method == 'minmax':
+                result = self._query_minmax(device_id, metric, start, end, step)
+            else:
+                result = self._query_lttb(device_id, metric, start, end, width)
+            result.update({'metric': metric, 'range': range_text, 'width': width, 'method': method,
+                           'start': start, 'end': end, 'step': step})
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return result
+
+    def _query_minmax(self, device_id, metric, start, end, step):
+        """
+        min/max包络：在SQLite中按时间桶分组聚合，只有每个桶一行结果离开数据库（调用方持有锁）
+        :return: {'raw_points', 'timestamps', 'values'（桶平均值）, 'min', 'max'}
+        """
+        rows = self._conn.execute(
+            f'SELECT CAST((ts - ?) / ? AS INTEGER) AS bucket, MIN({metric}), MAX({metric}), AVG({metric}), COUNT(*) '
+            f'FROM samples WHERE device_id = ? AND ts >= ? AND ts < ? AND {metric} IS NOT NULL '
+            f'GROUP BY bucket ORDER BY bucket',
+            (start, step, device_id, start, end)).fetchall()
+        return {
+            'raw_points': sum(row[4] for row in rows),
+            'timestamps': [start + row[0] * step for row in rows],  # 桶开始时间
+            'values': [round(row[3], 2) for row in rows],
+            'min': [row[1] for row in rows],
+            'max': [row[2] for row in rows],
+        }
+
+    def _query_lttb(self, device_id, metric, start, end, width):
+        """
+        LTTB：原始样本读入按列存放的double数组后降采样（调用方持有锁）
+        :return: {'raw_points', 'timestamps', 'values'}
+        """
+        timestamps, values = array('d'), array('d')
+        for ts, value in self._conn.execute(
+                f'SELECT ts, {metric} FROM samples WHERE device_id = ? AND ts >= ? AND ts < ? '
+                f'AND {metric} IS NOT NULL ORDER BY ts', (device_id, start, end)):
+            timestamps.append(ts)
+            values.append(value)
+        out_t, out_v = lttb(timestamps, values, width)
+        return {'raw_points': len(timestamps), 'timestamps': out_t, 'values': out_v}
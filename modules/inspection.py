@@ -4,23 +4,31 @@
 负责设备巡检和报告生成
 """
 
+import logging  # 日志
 import os  # 文件操作
 from datetime import datetime  # 日期时间处理
 from .ssh_connector import SSHConnector  # SSH连接器
 from .ai_assistant import AIAssistant  # AI助手
+from .metrics import FILE_WRITE_SECONDS  # 文件写入耗时
+from .tracing import tracer  # 链路追踪
+
+
+logger = logging.getLogger(__name__)  # 模块日志
 
 
 class InspectionManager:
     """巡检管理类，负责设备巡检流程"""
 
-    def __init__(self, output_dir='outputs'):
+    def __init__(self, output_dir='outputs', search_index=None):
         """
         初始化巡检管理器
         :param output_dir: 输出目录
+        :param search_index: 全文检索索引（可选，提供后巡检文件和分析报告写入时自动建立索引）
         """
         self.output_dir = output_dir  # 输出根目录
         self.inspection_dir = os.path.join(output_dir, 'inspection')  # 巡检文件目录
         self.analysis_dir = os.path.join(output_dir, 'analysis')  # 分析报告目录
+        self.search_index = search_index  # 全文检索索引
         self._ensure_directories()  # 确保目录存在
 
     def _ensure_directories(self):
@@ -36,76 +44,78 @@ class InspectionManager:
         :param progress_callback: 进度回调函数（可选）
         :return: 巡检结果文件路径，失败返回None
         """
-        try:
-            # 更新进度：连接设备
-            if progress_callback:  # 如果有回调函数
-                progress_callback('connecting', 10, f"正在连接设备 {device_info['ip']}...")  # 调用回调
-
-            # 创建SSH连接
-            ssh = SSHConnector(
-                host=device_info['ip'],  # IP地址
-                port=device_info.get('port', 22),  # 端口
-                username=device_info['username'],  # 用户名
-                password=device_info['password']  # 密码
-            )
-
-            # 连接设备
-            if not ssh.connect():  # 如果连接失败
-                if progress_callback:  # 通知失败
-                    progress_callback('error', 0, f"连接设备失败: {device_info['ip']}")  # 调用回调
+        with tracer.span('inspection.run', device=device_info['ip'], vendor=device_info.get('vendor'),
+                         commands=len(commands)) as span:
+            try:
+                # 更新进度：连接设备
+                if progress_callback:  # 如果有回调函数
+                    progress_callback('connecting', 10, f"正在连接设备 {device_info['ip']}...")  # 调用回调
+
+                # 创建SSH连接
+                ssh = SSHConnector.from_device(device_info)  # 登录信息由设备字段或凭据保险库提供
+
+                # 连接设备
+                if not ssh.connect():  # 如果连接失败
+                    if progress_callback:  # 通知失败
+                        progress_callback('error', 0, f"连接设备失败: {device_info['ip']}")  # 调用回调
+                    return None  # 返回None
+
+                # 更新进度：获取主机名
+                if progress_callback:  # 如果有回调
+                    progress_callback('getting_hostname', 20, "正在获取设备主机名...")  # 调用回调
+
+                # 获取设备主机名
+                hostname = ssh.get_hostname(device_info.get('vendor', 'huawei'))  # 获取主机名
+
+                # 更新进度：执行命令
+                if progress_callback:  # 如果有回调
+                    progress_callback('executing', 30, f"正在执行巡检命令（共{len(commands)}条）...")  # 调用回调
+
+                # 执行巡检命令
+                output = ssh.execute_commands(commands, wait_time=3)  # 执行命令（等待3秒）
+
+                # 断开连接
+                ssh.disconnect()  # 断开SSH
+
+                # 更新进度：保存结果
+                if progress_callback:  # 如果有回调
+                    progress_callback('saving', 70, "正在保存巡检结果...")  # 调用回调
+
+                # 生成文件名：hostname_ip_巡检时间.txt
+                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')  # 生成时间戳
+                filename = f"{hostname}_{device_info['ip']}_{timestamp}.txt"  # 生成文件名
+                filepath = os.path.join(self.inspection_dir, filename)  # 完整路径
+
+                # 保存巡检结果
+                with FILE_WRITE_SECONDS.timer('inspection'), open(filepath, 'w', encoding='utf-8') as f:  # 打开文件写入
+                    # 写入文件头信息
+                    f.write(f"{'='*60}\n")  # 分隔线
+                    f.write(f"设备巡检报告\n")  # 标题
+                    f.write(f"{'='*60}\n")  # 分隔线
+                    f.write(f"设备IP: {device_info['ip']}\n")  # IP地址
+                    f.write(f"主机名: {hostname}\n")  # 主机名
+                    f.write(f"厂商: {device_info.get('vendor', 'Unknown')}\n")  # 厂商
+                    f.write(f"巡检时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")  # 巡检时间
+                    f.write(f"{'='*60}\n\n")  # 分隔线
+                    f.write(output)  # 写入命令输出
+
+                # 建立全文索引
+                if self.search_index:  # 如果启用了全文检索
+                    self.search_index.index_file(filepath, 'inspection')  # 索引巡检文件
+
+                # 更新进度：完成
+                if progress_callback:  # 如果有回调
+                    progress_callback('completed', 100, f"巡检完成，结果已保存: {filename}")  # 调用回调
+
+                return filepath  # 返回文件路径
+
+            except Exception as e:  # 异常处理
+                span.fail(e)
+                if progress_callback:  # 通知错误
+                    progress_callback('error', 0, f"巡检失败: {str(e)}")  # 调用回调
+                logger.warning("巡检失败: %s", e, extra={'device': device_info.get('ip'), 'task': 'inspection'})  # 记录错误
                 return None  # 返回None
 
-            # 更新进度：获取主机名
-            if progress_callback:  # 如果有回调
-                progress_callback('getting_hostname', 20, "正在获取设备主机名...")  # 调用回调
-
-            # 获取设备主机名
-            hostname = ssh.get_hostname(device_info.get('vendor', 'huawei'))  # 获取主机名
-
-            # 更新进度：执行命令
-            if progress_callback:  # 如果有回调
-                progress_callback('executing', 30, f"正在执行巡检命令（共{len(commands)}条）...")  # 调用回调
-
-            # 执行巡检命令
-            output = ssh.execute_commands(commands, wait_time=3)  # 执行命令（等待3秒）
-
-            # 断开连接
-            ssh.disconnect()  # 断开SSH
-
-            # 更新进度：保存结果
-            if progress_callback:  # 如果有回调
-                progress_callback('saving', 70, "正在保存巡检结果...")  # 调用回调
-
-            # 生成文件名：hostname_ip_巡检时间.txt
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')  # 生成时间戳
-            filename = f"{hostname}_{device_info['ip']}_{timestamp}.txt"  # 生成文件名
-            filepath = os.path.join(self.inspection_dir, filename)  # 完整路径
-
-            # 保存巡检结果
-            with open(filepath, 'w', encoding='utf-8') as f:  # 打开文件写入
-                # 写入文件头信息
-                f.write(f"{'='*60}\n")  # 分隔线
-                f.write(f"设备巡检报告\n")  # 标题
-                f.write(f"{'='*60}\n")  # 分隔线
-                f.write(f"设备IP: {device_info['ip']}\n")  # IP地址
-                f.write(f"主机名: {hostname}\n")  # 主机名
-                f.write(f"厂商: {device_info.get('vendor', 'Unknown')}\n")  # 厂商
-                f.write(f"巡检时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")  # 巡检时间
-                f.write(f"{'='*60}\n\n")  # 分隔线
-                f.write(output)  # 写入命令输出
-
-            # 更新进度：完成
-            if progress_callback:  # 如果有回调
-                progress_callback('completed', 100, f"巡检完成，结果已保存: {filename}")  # 调用回调
-
-            return filepath  # 返回文件路径
-
-        except Exception as e:  # 异常处理
-            if progress_callback:  # 通知错误
-                progress_callback('error', 0, f"巡检失败: {str(e)}")  # 调用回调
-            print(f"巡检失败: {e}")  # 打印错误
-            return None  # 返回None
-
     def analyze_inspection(self, inspection_file, ai_config, vendor, progress_callback=None):
         """
         分析巡检结果
@@ -115,62 +125,68 @@ class InspectionManager:
         :param progress_callback: 进度回调函数
         :return: 分析报告文件路径，失败返回None
         """
-        try:
-            # 更新进度：读取文件
-            if progress_callback:  # 如果有回调
-                progress_callback('reading', 10, "正在读取巡检文件...")  # 调用回调
-
-            # 读取巡检文件
-            with open(inspection_file, 'r', encoding='utf-8') as f:  # 打开文件
-                inspection_content = f.read()  # 读取内容
-
-            # 更新进度：调用AI分析
-            if progress_callback:  # 如果有回调
-                progress_callback('analyzing', 30, "正在调用AI进行分析，请稍候...")  # 调用回调
-
-            # 创建AI助手
-            ai = AIAssistant(
-                api_url=ai_config.get('api_url'),  # API地址
-                api_key=ai_config.get('api_key'),  # API密钥
-                model=ai_config.get('model')  # 模型
-            )
-
-            # 调用AI分析
-            analysis_result = ai.analyze_inspection_result(inspection_content, vendor)  # AI分析
-
-            # 更新进度：保存报告
-            if progress_callback:  # 如果有回调
-                progress_callback('saving', 80, "正在保存分析报告...")  # 调用回调
-
-            # 生成分析报告文件名
-            inspection_filename = os.path.basename(inspection_file)  # 获取原文件名
-            analysis_filename = f"AI_Analytics_{inspection_filename}"  # 添加前缀
-            analysis_filepath = os.path.join(self.analysis_dir, analysis_filename)  # 完整路径
-
-            # 保存分析报告
-            with open(analysis_filepath, 'w', encoding='utf-8') as f:  # 打开文件写入
-                f.write(f"{'='*60}\n")  # 分隔线
-                f.write(f"AI 巡检分析报告\n")  # 标题
-                f.write(f"{'='*60}\n")  # 分隔线
-                f.write(f"原始巡检文件: {inspection_filename}\n")  # 原文件名
-                f.write(f"分析时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")  # 分析时间
-                f.write(f"{'='*60}\n\n")  # 分隔线
-                f.write(analysis_result)  # 写入分析结果
-                f.write(f"\n\n{'='*60}\n")  # 结束分隔线
-                f.write(f"报告生成完成\n")  # 结束标记
-                f.write(f"{'='*60}\n")  # 分隔线
-
-            # 更新进度：完成
-            if progress_callback:  # 如果有回调
-                progress_callback('completed', 100, f"分析完成，报告已保存: {analysis_filename}")  # 调用回调
-
-            return analysis_filepath  # 返回分析报告路径
-
-        except Exception as e:  # 异常处理
-            if progress_callback:  # 通知错误
-                progress_callback('error', 0, f"分析失败: {str(e)}")  # 调用回调
-            print(f"分析巡检结果失败: {e}")  # 打印错误
-            return None  # 返回None
+        with tracer.span('inspection.analyze', file=os.path.basename(inspection_file), vendor=vendor) as span:
+            try:
+                # 更新进度：读取文件
+                if progress_callback:  # 如果有回调
+                    progress_callback('reading', 10, "正在读取巡检文件...")  # 调用回调
+
+                # 读取巡检文件
+                with open(inspection_file, 'r', encoding='utf-8') as f:  # 打开文件
+                    inspection_content = f.read()  # 读取内容
+
+                # 更新进度：调用AI分析
+                if progress_callback:  # 如果有回调
+                    progress_callback('analyzing', 30, "正在调用AI进行分析，请稍候...")  # 调用回调
+
+                # 创建AI助手
+                ai = AIAssistant(
+                    api_url=ai_config.get('api_url'),  # API地址
+                    api_key=ai_config.get('api_key'),  # API密钥
+                    model=ai_config.get('model')  # 模型
+                )
+
+                # 调用AI分析
+                analysis_result = ai.analyze_inspection_result(inspection_content, vendor)  # AI分析
+
+                # 更新进度：保存报告
+                if progress_callback:  # 如果有回调
+                    progress_callback('saving', 80, "正在保存分析报告...")  # 调用回调
+
+                # 生成分析报告文件名
+                inspection_filename = os.path.basename(inspection_file)  # 获取原文件名
+                analysis_filename = f"AI_Analytics_{inspection_filename}"  # 添加前缀
+                analysis_filepath = os.path.join(self.analysis_dir, analysis_filename)  # 完整路径
+
+                # 保存分析报告
+                with FILE_WRITE_SECONDS.timer('analysis'), open(analysis_filepath, 'w', encoding='utf-8') as f:  # 打开文件写入
+                    f.write(f"{'='*60}\n")  # 分隔线
+                    f.write(f"AI 巡检分析报告\n")  # 标题
+                    f.write(f"{'='*60}\n")  # 分隔线
+                    f.write(f"原始巡检文件: {inspection_filename}\n")  # 原文件名
+                    f.write(f"分析时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")  # 分析时间
+                    f.write(f"{'='*60}\n\n")  # 分隔线
+                    f.write(analysis_result)  # 写入分析结果
+                    f.write(f"\n\n{'='*60}\n")  # 结束分隔线
+                    f.write(f"报告生成完成\n")  # 结束标记
+                    f.write(f"{'='*60}\n")  # 分隔线
+
+                # 建立全文索引
+                if self.search_index:  # 如果启用了全文检索
+                    self.search_index.index_file(analysis_filepath, 'analysis')  # 索引分析报告
+
+                # 更新进度：完成
+                if progress_callback:  # 如果有回调
+                    progress_callback('completed', 100, f"分析完成，报告已保存: {analysis_filename}")  # 调用回调
+
+                return analysis_filepath  # 返回分析报告路径
+
+            except Exception as e:  # 异常处理
+                span.fail(e)
+                if progress_callback:  # 通知错误
+                    progress_callback('error', 0, f"分析失败: {str(e)}")  # 调用回调
+                logger.warning("分析巡检结果失败: %s", e, extra={'task': 'analysis'})  # 记录错误
+                return None  # 返回None
 
     def get_inspection_files(self):
         """
@@ -214,6 +230,17 @@ class InspectionManager:
         files.sort(key=lambda x: x['modified'], reverse=True)  # 排序
         return files  # 返回文件列表
 
+    def sync_search_index(self):
+        """
+        增量同步全文索引（索引启用前已存在或被外部修改的文件）
+        :return: 本次重新索引的文件数
+        """
+        if not self.search_index:  # 未启用全文检索
+            return 0
+        count = self.search_index.sync_directory(self.inspection_dir, 'inspection')  # 同步巡检文件
+        count += self.search_index.sync_directory(self.analysis_dir, 'analysis')  # 同步分析报告
+        return count  # 返回重新索引数
+
     def delete_file(self, filepath):
         """
         删除文件
@@ -223,8 +250,10 @@ class InspectionManager:
         try:
             if os.path.exists(filepath):  # 如果文件存在
                 os.remove(filepath)  # 删除文件
+                if self.search_index:  # 同步删除全文索引
+                    self.search_index.remove_file(filepath)
                 return True  # 返回成功
             return False  # 文件不存在
         except Exception as e:  # 异常处理
-            print(f"删除文件失败: {e}")  # 打印错误
+            logger.error("删除文件失败: %s", e)  # 记录错误
             return False  # 返回失败
\ No newline at end of file
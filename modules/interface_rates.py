@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+接口速率计算模块
+负责根据相邻两次采集的接口计数器计算bps/pps/错误速率，并维护全网热点接口排行
+"""
+
+import heapq  # 堆（Top-N）
+import operator  # 整列运算
+import threading  # 线程锁
+import time  # 时间处理
+from array import array  # 紧凑数值数组（Python内置）
+from itertools import repeat  # 整列取整
+
+
+# 计数器列（与解析器输出的接口记录字段一致）
+COUNTER_FIELDS = ('rx_bytes', 'tx_bytes', 'rx_packets', 'tx_packets', 'errors')
+# 32位计数器回绕上限
+COUNTER32_MAX = 2 ** 32
+
+
+def counter_delta(current, previous):
+    """
+    计算计数器增量（处理32位计数器回绕和设备重启清零）
+    :param current: 本次计数
+    :param previous: 上次计数
+    :return: 增量，无法判断（计数器被清零）时返回0
+    """
+    if current >= previous:  # 正常递增
+        return current - previous
+    if previous < COUNTER32_MAX:  # 32位计数器回绕
+        wrapped = current + COUNTER32_MAX - previous
+        if wrapped < COUNTER32_MAX // 2:  # 回绕后的增量在合理范围内
+            return wrapped
+    return 0  # 64位计数器不会在一个采集周期内回绕，视为清零
+
+
+def column_deltas(current, previous):
+    """
+    按列计算计数器增量：整列逐元素相减，只有出现负值（回绕或清零）的位置才逐个修正
+    :param current: 本次计数数组
+    :param previous: 上次计数数组（与本次按位置对齐）
+    :return: 增量列表
+    """
+    deltas = list(map(operator.sub, current, previous))
+    if deltas and min(deltas) < 0:  # 少见情况：存在回绕或清零的计数器
+        for index in [index for index, delta in enumerate(deltas) if delta < 0]:
+            deltas[index] = counter_delta(current[index], previous[index])
+    return deltas
+
+
+def column_rates(deltas, scale, digits):
+    """
+    整列把增量换算为速率
+    :param deltas: 增量列表
+    :param scale: 换算系数（如 8/采样间隔）
+    :param digits: 保留小数位数
+    :return: 速率迭代器
+    """
+    return map(round, map(float(scale).__mul__, deltas), repeat(digits))
+
+
+class InterfaceRateCalculator:
+    """接口速率计算类：按设备保存上一次计数器数组，增量计算速率并维护热点排行"""
+
+    # 排行维度：traffic（收发bps之和）、errors（错误数/秒）
+    RANKINGS = ('traffic', 'errors')
+
+    def __init__(self, top_n=20):
+        """
+        初始化速率计算器
+        :param top_n: 每台设备保留的候选数，也是全网排行的最大长度
+        """
+        self.top_n = top_n  # 排行长度
+        self._samples = {}  # {设备ID: (采集时间, 接口名元组, {计数器列: array('Q')})}
+        self._rates = {}  # {设备ID: {接口名: 速率字典}}
+        self._device_top = {ranking: {} for ranking in self.RANKINGS}  # {排行维度: {设备ID: 该设备Top-N候选}}
+        self._fleet_top = {}  # 全网排行缓存 {排行维度: 列表}
+        self._lock = threading.Lock()  # 锁
+
+    def update(self, device_id, device_name, interfaces, timestamp=None):
+        """
+        写入一次接口计数器采样并计算速率
+        :param device_id: 设备ID
+        :param device_name: 设备名称
+        :param interfaces: 接口记录列表（含rx_bytes、tx_bytes等计数器）
+        :param timestamp: 采集时间（秒），默认当前时间
+        :return: {接口名: 速率字典}，首次采样返回空字典
+        """
+        timestamp = timestamp or time.time()
+        names = tuple(record.get('name', '') for record in interfaces or [])  # 接口名
+        columns = {
+            field: array('Q', (max(0, int(record.get(field) or 0)) for record in interfaces or []))
+            for field in COUNTER_FIELDS
+        }  # 按列保存计数器
+
+        with self._lock:
+            previous = self._samples.get(device_id)
+            self._samples[device_id] = (timestamp, names, columns)  # 保存本次采样
+        if not previous or timestamp <= previous[0]:  # 首次采样或时间未前进
+            return {}
+
+        prev_time, prev_names, prev_columns = previous
+        elapsed = timestamp - prev_time  # 采样间隔（秒）
+        if prev_names == names:  # 接口顺序未变化（常见情况），整列按位置计算
+            current_columns, aligned_columns = columns, prev_columns
+            aligned_names = names
+        else:  # 接口增减时按名称对齐后再整列计算
+            prev_index = {name: index for index, name in enumerate(prev_names)}
+            positions = [index for index, name in enumerate(names) if name in prev_index]
+            prev_positions = [prev_index[names[index]] for index in positions]
+            current_columns = {field: array('Q', map(columns[field].__getitem__, positions))
+                               for field in COUNTER_FIELDS}
+            aligned_columns = {field: array('Q', map(prev_columns[field].__getitem__, prev_positions))
+                               for field in COUNTER_FIELDS}
+            aligned_names = [names[index] for index in positions]
+
+        deltas = {field: column_deltas(current_columns[field], aligned_columns[field])
+                  for field in COUNTER_FIELDS}  # 按列计算增量
+
+        rates = {
+            name: {
+                'rx_bps': rx_bps,  # 入方向比特/秒
+                'tx_bps': tx_bps,  # 出方向比特/秒
+                'rx_pps': rx_pps,  # 入方向包/秒
+                'tx_pps': tx_pps,  # 出方向包/秒
+                'error_rate': error_rate,  # 错误数/秒
+            }
+            for name, rx_bps, tx_bps, rx_pps, tx_pps, error_rate in zip(
+                aligned_names,
+                column_rates(deltas['rx_bytes'], 8 / elapsed, 2),
+                column_rates(deltas['tx_bytes'], 8 / elapsed, 2),
+                column_rates(deltas['rx_packets'], 1 / elapsed, 2),
+                column_rates(deltas['tx_packets'], 1 / elapsed, 2),
+                column_rates(deltas['errors'], 1 / elapsed, 4),
+            )
+        }
+
+        # 计算该设备的Top-N候选（全网排行只需合并各设备候选，无需扫描所有接口）
+        candidates = {
+            'traffic': heapq.nlargest(self.top_n, (
+                (rate['rx_bps'] + rate['tx_bps'], name) for name, rate in rates.items()
+                if rate['rx_bps'] + rate['tx_bps'] > 0)),
+            'errors': heapq.nlargest(self.top_n, (
+                (rate['error_rate'], name) for name, rate in rates.items() if rate['error_rate'] > 0)),
+        }
+        with self._lock:
+            self._rates[device_id] = rates
+            for ranking, items in candidates.items():
+                self._device_top[ranking][device_id] = [
+                    (value, device_id, device_name, name) for value, name in items
+                ]
+                self._fleet_top.pop(ranking, None)  # 全网排行缓存失效
+        return rates
+
+    def remove(self, device_id):
+        """
+        删除设备的采样和排行数据
+        :param device_id: 设备ID
+        """
+        with self._lock:
+            self._samples.pop(device_id, None)
+            self._rates.pop(device_id, None)
+            for ranking in self.RANKINGS:
+                self._device_top[ranking].pop(device_id, None)
+            self._fleet_top.clear()
+
+    def get_device_rates(self, device_id):
+        """
+        获取设备各接口的最新速率
+        :param device_id: 设备ID
+        :return: {接口名: 速率字典}
+        """
+        return self._rates.get(device_id, {})
+
+    def get_top(self, ranking='traffic', limit=10):
+        """
+        获取全网热点接口排行
+        :param ranking: 排行维度（traffic / errors）
+        :param limit: 返回条数（不超过top_n）
+        :return: 排行列表
+        """
+        with self._lock:
+            top = self._fleet_top.get(ranking)
+            if top is None:  # 缓存失效时合并各设备候选
+                merged = (item for items in self._device_top.get(ranking, {}).values() for item in items)
+                top = heapq.nlargest(self.top_n, merged)
+                self._fleet_top[ranking] = top
+
+        results = []
+        for value, device_id, device_name, name in top[:limit]:
+            rate = self._rates.get(device_id, {}).get(name, {})
+            results.append({
+                'device_id': device_id,  # 设备ID
+                'device_name': device_name,  # 设备名称
+                'interface': name,  # 接口名
+                'value': value,  # 排行值（bps或错误数/秒）
+                **rate  # 完整速率
+            })
+        return results
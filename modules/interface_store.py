@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+接口信息存储模块
+负责保存每台设备最近一次采集的完整接口表，并提供分页、过滤查询
+"""
+
+import threading  # 线程锁
+import time  # 时间处理
+
+
+class InterfaceStore:
+    """接口表存储类，按设备保存紧凑的行元组，查询时再展开为字典"""
+
+    # 行元组的列顺序（与解析器输出的接口记录字段一致）
+    FIELDS = (
+        'name', 'status', 'admin_status', 'oper_status', 'speed', 'description',
+        'rx_bytes', 'tx_bytes', 'rx_packets', 'tx_packets', 'in_errors', 'out_errors', 'errors',
+        'rx_bps', 'tx_bps', 'rx_pps', 'tx_pps', 'error_rate'
+    )
+    # 各列缺省值
+    DEFAULTS = ('', 'unknown', 'unknown', 'unknown', '-', '-', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
+    # 允许排序的列
+    SORTABLE = ('name', 'status', 'rx_bytes', 'tx_bytes', 'rx_packets', 'tx_packets', 'errors',
+                'rx_bps', 'tx_bps', 'error_rate')
+
+    def __init__(self):
+        """初始化接口表存储"""
+        self._tables = {}  # {设备ID: {'timestamp': 采集时间, 'rows': [行元组, ...]}}
+        self._lock = threading.Lock()  # 读写锁（采集线程写入、请求线程读取）
+
+    def update(self, device_id, interfaces, timestamp=None, rates=None):
+        """
+        保存设备的完整接口表（整表替换）
+        :param device_id: 设备ID
+        :param interfaces: 接口记录列表（解析器输出）
+        :param timestamp: 采集时间（秒），默认当前时间
+        :param rates: 接口速率 {接口名: 速率字典}（可选，由InterfaceRateCalculator计算）
+        """
+        rates = rates or {}
+        rows = [
+            tuple(rates.get(record.get('name'), {}).get(field, record.get(field, default))
+                  for field, default in zip(self.FIELDS, self.DEFAULTS))
+            for record in interfaces or []
+        ]  # 转换为紧凑的行元组（合并速率列）
+        with self._lock:
+            self._tables[device_id] = {'timestamp': timestamp or time.time(), 'rows': rows}
+
+    def remove(self, device_id):
+        """
+        删除设备的接口表
+        :param device_id: 设备ID
+        """
+        with self._lock:
+            self._tables.pop(device_id, None)
+
+    def get_timestamp(self, device_id):
+        """
+        获取设备接口表的采集时间
+        :param device_id: 设备ID
+        :return: 采集时间（秒），无数据返回None
+        """
+        table = self._tables.get(device_id)
+        return table['timestamp'] if table else None
+
+    def query(self, device_id, page=1, page_size=50, status=None, keyword=None, sort=None, descending=False):
+        """
+        分页查询设备接口表
+        :param device_id: 设备ID
+        :param page: 页码（从1开始）
+        :param page_size: 每页条数
+        :param status: 状态过滤（up / down），None表示全部
+        :param keyword: 关键字过滤（匹配接口名称或描述，不区分大小写）
+        :param sort: 排序列（见SORTABLE），None表示保持设备输出顺序
+        :param descending: 是否降序
+        :return: 分页结果字典
+        """
+        with self._lock:
+            table = self._tables.get(device_id)
+        rows = table['rows'] if table else []  # 行列表整体替换写入，读取无需复制
+
+        name_index = self.FIELDS.index('name')
+        status_index = self.FIELDS.index('status')
+        description_index = self.FIELDS.index('description')
+        if status:  # 状态过滤
+            rows = [row for row in rows if row[status_index] == status]
+        if keyword:  # 关键字过滤
+            keyword = keyword.lower()
+            rows = [row for row in rows
+                    if keyword in row[name_index].lower() or keyword in str(row[description_index]).lower()]
+        if sort in self.SORTABLE:  # 排序
+            sort_index = self.FIELDS.index(sort)
+            rows = sorted(rows, key=lambda row: row[sort_index], reverse=descending)
+
+        page_size = max(1, min(int(page_size), 500))  # 每页条数限制在1-500
+        total = len(rows)  # 过滤后总数
+        pages = max(1, (total + page_size - 1) // page_size)  # 总页数
+        page = max(1, min(int(page), pages))  # 页码限制在有效范围
+        start = (page - 1) * page_size
+
+        return {
+            'total': total,  # 过滤后的接口总数
+            'page': page,  # 当前页码
+            'page_size': page_size,  # 每页条数
+            'pages': pages,  # 总页数
+            'timestamp': table['timestamp'] if table else None,  # 采集时间
+            'interfaces': [dict(zip(self.FIELDS, row)) for row in rows[start:start + page_size]]  # 当前页
+        }
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+日志模块
+负责配置结构化日志：各模块通过 logging.getLogger(__name__) 记录日志，
+调用线程只把日志记录放入有界队列（队列满时丢弃并计数，不阻塞采集线程），
+由后台线程写入按大小轮转的JSON日志文件和控制台；高频的调试日志按调用位置抽样输出
+"""
+
+import atexit  # 退出时写完队列中的日志
+import copy  # 复制日志记录
+import json  # JSON格式日志
+import logging  # 标准日志库
+import logging.handlers  # 队列和轮转处理器
+import os  # 文件操作
+import queue  # 日志队列
+import threading  # 线程锁
+from datetime import datetime  # 日志时间
+
+from .metrics import metrics  # 运行指标
+from .tracing import tracer  # 链路追踪（日志附带当前链路ID）
+
+
+# 日志级别环境变量，如 INFO 或 INFO,modules.parsers=DEBUG（逗号后为单个模块的级别）
+LEVEL_ENV = 'NETWORK_MONITOR_LOG_LEVEL'
+# 日志文件环境变量（为空字符串时不写文件）
+FILE_ENV = 'NETWORK_MONITOR_LOG_FILE'
+# 调试日志抽样环境变量：同一调用位置每N条输出1条（1为全部输出）
+SAMPLE_ENV = 'NETWORK_MONITOR_LOG_SAMPLE'
+
+# 默认日志文件
+DEFAULT_LOG_FILE = 'outputs/logs/monitor.log'
+# 单个日志文件最大字节数
+MAX_BYTES = 10 * 1024 * 1024
+# 保留的轮转文件数
+BACKUP_COUNT = 5
+# 日志队列容量（超出后丢弃新日志）
+QUEUE_SIZE = 10000
+# 默认调试日志抽样间隔
+DEFAULT_SAMPLE = 100
+
+# 结构化字段（通过 extra={...} 传入，输出到JSON的同名字段）
+STRUCTURED_FIELDS = ('device', 'vendor', 'stage', 'command', 'duration', 'task', 'trace_id')
+
+# 队列满时丢弃的日志数
+DROPPED_TOTAL = metrics.counter('network_monitor_log_dropped_total', '日志队列已满时丢弃的日志数')
+
+_listener = None  # 后台写日志的监听器
+
+
+class JsonFormatter(logging.Formatter):
+    """JSON格式化器：每条日志一行JSON，包含时间、级别、模块、消息和结构化字段"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],  # 毫秒精度
+            'level': record.levelname,  # 级别
+            'logger': record.name,  # 模块
+            'thread': record.threadName,  # 线程
+            'message': record.getMessage()  # 消息
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:  # 异常堆栈
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:  # 入队前已格式化的异常堆栈
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """控制台格式化器：可读文本，结构化字段以 key=value 附在消息后"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s: %(message)s', '%H:%M:%S')
+
+    def format(self, record):
+        text = super().format(record)
+        fields = ' '.join(f"{field}={getattr(record, field)}" for field in STRUCTURED_FIELDS
+                          if getattr(record, field, None) is not None)
+        if not fields:
+            return text
+        head, sep, tail = text.partition('\n')  # 字段放在第一行末尾（异常堆栈在后）
+        return f"{head} [{fields}]{sep}{tail}"
+
+
+class SamplingFilter(logging.Filter):
+    """抽样过滤器：指定级别及以下的日志，同一调用位置每N条只保留1条（轮询中的调试日志）"""
+
+    def __init__(self, every=DEFAULT_SAMPLE, level=logging.DEBUG):
+        """
+        :param every: 抽样间隔（1为全部保留）
+        :param level: 参与抽样的最高级别
+        """
+        super().__init__()
+        self.every = max(1, int(every))  # 抽样间隔
+        self.level = level  # 参与抽样的最高级别
+        self._counts = {}  # {(文件, 行号): 次数}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > self.level or self.every == 1:
+            return True
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.every == 0  # 每个位置的第1条必定输出
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """非阻塞队列处理器：队列满时丢弃日志并计数，调用线程从不等待磁盘或控制台"""
+
+    def prepare(self, record):
+        """入队前合并消息参数、格式化异常堆栈（异常对象不跨线程传递），保留结构化字段并附带当前链路ID"""
+        record = copy.copy(record)
+        if getattr(record, 'trace_id', None) is None:
+            record.trace_id = tracer.current_trace_id()  # 当前跨度在调用线程的上下文中，必须在入队前读取
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED_TOTAL.inc()
+
+
+def parse_levels(spec):
+    """
+    解析日志级别配置
+    :param spec: 如 'INFO' 或 'INFO,modules.parsers=DEBUG'
+    :return: (根级别, {模块名: 级别})
+    """
+    root_level = logging.INFO
+    levels = {}
+    for part in (spec or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, level = part.rpartition('=')
+        value = logging.getLevelName(level.strip().upper())
+        if not isinstance(value, int):  # 未知级别忽略
+            continue
+        if sep:
+            levels[name.strip()] = value
+        else:
+            root_level = value
+    return root_level, levels
+
+
+def setup_logging(level=None, log_file=None, sample=None, console=True):
+    """
+    配置日志（重复调用时替换之前的配置）
+    :param level: 日志级别配置，默认读取环境变量，未设置为INFO
+    :param log_file: 日志文件路径，默认读取环境变量，未设置为outputs/logs/monitor.log，空字符串不写文件
+    :param sample: 调试日志抽样间隔，默认读取环境变量，未设置为100
+    :param console: 是否输出到控制台
+    :return: 根日志记录器
+    """
+    global _listener
+    level = os.environ.get(LEVEL_ENV, 'INFO') if level is None else level
+    log_file = os.environ.get(FILE_ENV, DEFAULT_LOG_FILE) if log_file is None else log_file
+    sample = os.environ.get(SAMPLE_ENV, DEFAULT_SAMPLE) if sample is None else sample
+
+    handlers = []
+    if log_file:  # JSON日志文件（按大小轮转）
+        os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding='utf-8')
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+    if console:  # 控制台
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(ConsoleFormatter())
+        handlers.append(console_handler)
+
+    stop_logging()  # 停止之前的后台线程
+    _listener = logging.handlers.QueueListener(queue.Queue(QUEUE_SIZE), *handlers, respect_handler_level=True)
+    queue_handler = NonBlockingQueueHandler(_listener.queue)
+    queue_handler.addFilter(SamplingFilter(sample))  # 抽样在入队前完成，丢弃的调试日志不占用队列
+
+    root_level, levels = parse_levels(level)
+    root = logging.getLogger()
+    for handler in list(root.handlers):  # 替换已有的处理器
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(root_level)
+    logging.getLogger('paramiko').setLevel(max(root_level, logging.WARNING))  # 每次连接的握手细节默认不输出
+    for name, value in levels.items():
+        logging.getLogger(name).setLevel(value)
+
+    _listener.start()
+    return root
+
+
+def stop_logging():
+    """停止后台写日志线程（写完队列中剩余的日志）"""
+    global _listener
+    if _listener:
+        listener, _listener = _listener, None
+        listener.stop()
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+运行指标模块
+负责记录采集热点路径各阶段的耗时直方图、错误计数和队列/任务仪表值，
+并按Prometheus文本格式输出（GET /metrics），记录一次耗时只是一次二分查找和几次加法
+"""
+
+import bisect  # 直方图分桶
+import logging  # 日志
+import threading  # 线程锁
+import time  # 计时
+from contextlib import contextmanager  # 计时上下文
+
+
+logger = logging.getLogger(__name__)  # 模块日志
+
+
+# 默认直方图分桶（秒）：覆盖毫秒级解析到分钟级巡检
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# 每个指标最多保留的标签组合数（命令等标签取值不受控，超出后归入other，避免内存和输出无限增长）
+MAX_SERIES = 2000
+# 超出标签组合上限时使用的标签值
+OVERFLOW_LABEL = 'other'
+
+
+def _escape(value):
+    """转义标签值中的反斜杠、双引号和换行"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    """
+    生成标签文本
+    :param names: 标签名元组
+    :param values: 标签值元组
+    :param extra: 附加标签 (名称, 值)，如直方图的le
+    :return: {a="1",b="2"}，没有标签返回空字符串
+    """
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    """数值文本（整数不带小数点）"""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    """指标基类：按标签值元组保存序列"""
+
+    kind = ''
+
+    def __init__(self, name, help_text, labels=()):
+        """
+        :param name: 指标名称
+        :param help_text: 说明
+        :param labels: 标签名元组
+        """
+        self.name = name  # 指标名称
+        self.help_text = help_text  # 说明
+        self.labels = tuple(labels)  # 标签名
+        self._series = {}  # {标签值元组: 序列数据}
+        self._lock = threading.Lock()  # 锁
+
+    def _key(self, values):
+        """返回可写入的标签值元组（调用方持有锁；超出组合上限时归入other）"""
+        if values in self._series or len(self._series) < MAX_SERIES:
+            return values
+        return (OVERFLOW_LABEL,) * len(self.labels)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """计数器：只增不减"""
+
+    kind = 'counter'
+
+    def inc(self, *values, amount=1):
+        """
+        计数加一
+        :param values: 标签值（按标签名顺序）
+        :param amount: 增加量
+        """
+        with self._lock:
+            key = self._key(values)
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            series = list(self._series.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labels, values)} {_format_value(count)}"
+                                for values, count in series]
+
+
+class Histogram(_Metric):
+    """直方图：按分桶统计耗时分布，同时记录总和与次数"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        """
+        :param buckets: 分桶上限（升序，秒）
+        """
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)  # 分桶上限
+
+    def observe(self, value, *values):
+        """
+        记录一次观测值
+        :param value: 观测值（秒）
+        :param values: 标签值（按标签名顺序）
+        """
+        index = bisect.bisect_left(self.buckets, value)  # 第一个上限不小于观测值的分桶
+        with self._lock:
+            key = self._key(values)
+            series = self._series.get(key)
+            if series is None:  # [各分桶计数..., +Inf计数, 总和, 次数]
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def timer(self, *values):
+        """
+        计时上下文（代码块正常结束时记录耗时，抛出异常时不记录）
+        :param values: 标签值（按标签名顺序）
+        """
+        start = time.perf_counter()
+        yield
+        self.observe(time.perf_counter() - start, *values)
+
+    def render(self):
+        with self._lock:
+            series = [(values, list(data)) for values, data in self._series.items()]
+        lines = self.header()
+        for values, data in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), data):  # 输出累计计数
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, ('le', bound))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {_format_value(data[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {data[-1]}")
+        return lines
+
+
+class Gauge(_Metric):
+    """仪表值：输出时调用回调读取当前值（队列长度、运行中的任务数等），平时没有任何开销"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, callback, labels=()):
+        """
+        :param callback: 返回数值（无标签），或返回 {标签值元组: 数值}（有标签）
+        """
+        super().__init__(name, help_text, labels)
+        self.callback = callback  # 取值回调
+
+    def render(self):
+        try:
+            value = self.callback()
+        except Exception as e:  # 单个仪表值失败不影响其他指标
+            logger.warning("读取指标%s失败: %s", self.name, e)
+            return []
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        return self.header() + [f"{self.name}{_format_labels(self.labels, values)} {_format_value(number)}"
+                                for values, number in items if number is not None]
+
+
+class MetricsRegistry:
+    """指标注册表：同名指标只创建一次"""
+
+    def __init__(self):
+        self._metrics = {}  # {指标名称: 指标}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text, labels=()):
+        """获取或创建计数器"""
+        return self._register(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        """获取或创建直方图"""
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def gauge(self, name, help_text, callback, labels=()):
+        """注册仪表值（同名时替换回调）"""
+        with self._lock:
+            self._metrics[name] = Gauge(name, help_text, callback, labels)
+            return self._metrics[name]
+
+    def render(self):
+        """
+        输出全部指标（Prometheus文本格式）
+        :return: 文本
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# 全局指标注册表
+metrics = MetricsRegistry()
+
+# 采集各阶段耗时：connect（TCP连接）、auth（SSH握手和认证）、invoke_shell（打开Shell并等待初始化）、
+# execute（单条命令，含等待和分页）、page（单次翻页）、parse（解析命令输出）
+STAGE_SECONDS = metrics.histogram('network_monitor_stage_seconds', '采集各阶段耗时（秒）',
+                                  ('stage', 'vendor', 'command'))
+# 采集各阶段失败次数
+STAGE_ERRORS = metrics.counter('network_monitor_stage_errors_total', '采集各阶段失败次数', ('stage', 'vendor'))
+# 结果文件写入耗时（巡检文件、分析报告、配置备份）
+FILE_WRITE_SECONDS = metrics.histogram('network_monitor_file_write_seconds', '结果文件写入耗时（秒）', ('kind',))
+# AI接口调用耗时（outcome：ok / http_error / error）
+AI_CALL_SECONDS = metrics.histogram('network_monitor_ai_call_seconds', 'AI接口调用耗时（秒）', ('model', 'outcome'),
+                                    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120))
@@ -0,0 +1,491 @@
+# -*- coding: utf-8 -*-
+"""
+告警通知模块
+负责将告警事件异步投递到Webhook、SMTP邮件、Syslog等通知渠道，
+按时间窗口合并为摘要，并按渠道限流，告警风暴时不阻塞采集、不刷屏
+"""
+
+import json  # JSON数据处理
+import logging  # 日志
+import os  # 文件操作
+import queue  # 线程安全队列
+import smtplib  # SMTP邮件发送
+import socket  # Syslog（UDP）发送
+import threading  # 线程锁、后台线程
+import time  # 时间处理
+from email.message import EmailMessage  # 邮件构造
+
+import requests  # HTTP请求库
+
+from .poll_scheduler import TokenBucket  # 令牌桶限流
+
+
+logger = logging.getLogger(__name__)  # 模块日志
+
+
+# 告警级别顺序（用于渠道的最低级别过滤）
+SEVERITY_ORDER = {'info': 0, 'warning': 1, 'critical': 2}
+# Syslog级别映射（RFC 5424）
+SYSLOG_SEVERITY = {'critical': 2, 'warning': 4, 'info': 6}
+# 摘要中同一规则逐条列出的设备数上限，超出部分只计数
+DIGEST_DEVICE_LIMIT = 10
+# 发送失败后的重试间隔（秒）：首次失败后RETRY_BASE秒重试，之后按2倍递增，最长RETRY_MAX秒
+RETRY_BASE = 5
+RETRY_MAX = 300
+
+# 默认通知配置
+DEFAULT_NOTIFY_CONFIG = {
+    'digest_window': 30,  # 摘要合并时间窗口（秒）
+    'channels': [
+        # 示例：
+        # {'id': 'ops-webhook', 'type': 'webhook', 'enabled': True, 'url': 'http://127.0.0.1:9000/alert',
+        #  'min_severity': 'warning', 'max_per_minute': 6},
+        # {'id': 'ops-mail', 'type': 'smtp', 'enabled': True, 'host': '127.0.0.1', 'port': 25, 'use_tls': False,
+        #  'username': '', 'password': '', 'sender': 'monitor@example.com', 'recipients': ['ops@example.com']},
+        # {'id': 'syslog', 'type': 'syslog', 'enabled': True, 'host': '127.0.0.1', 'port': 514, 'facility': 1},
+        # {'id': 'local-file', 'type': 'file', 'enabled': True, 'path': 'outputs/notifications.jsonl'}
+    ]
+}
+
+
+def build_digest(events):
+    """
+    将一批告警事件合并为摘要（同一规则同一状态的事件合并为一条）
+    :param events: 告警事件列表
+    :return: (标题, 正文, 分组列表)
+    """
+    groups = {}
+    for event in events:
+        key = (event['state'], event['rule_id'])
+        groups.setdefault(key, []).append(event)
+
+    firing = sum(1 for event in events if event['state'] == 'firing')
+    resolved = len(events) - firing
+    title = f"[网络监控告警] {firing}条告警触发，{resolved}条恢复"
+
+    lines, summary = [], []
+    for (state, rule_id), items in sorted(groups.items(), key=lambda item: item[0][0] != 'firing'):
+        first = items[0]
+        label = '触发' if state == 'firing' else '恢复'
+        devices = [f"{item['device_name']}({item['device_ip']})" for item in items]
+        shown = '、'.join(devices[:DIGEST_DEVICE_LIMIT])
+        if len(devices) > DIGEST_DEVICE_LIMIT:
+            shown += f" 等{len(devices)}台设备"
+        lines.append(f"[{first['severity'].upper()}] {label} {first['rule_name']}：{shown}")
+        if len(items) == 1:  # 单条事件附带详细描述
+            lines.append(f"    {first['message']}")
+        summary.append({
+            'state': state,  # firing / resolved
+            'rule_id': rule_id,  # 规则ID
+            'rule_name': first['rule_name'],  # 规则名称
+            'severity': first['severity'],  # 级别
+            'count': len(items),  # 设备数
+            'devices': devices  # 设备列表
+        })
+    return title, '\n'.join(lines), summary
+
+
+class WebhookSink:
+    """Webhook通知渠道：POST JSON摘要"""
+
+    def __init__(self, url, timeout=10, headers=None, **_):
+        """
+        初始化Webhook渠道
+        :param url: 接收地址
+        :param timeout: 请求超时（秒）
+        :param headers: 额外请求头
+        """
+        self.url = url  # 接收地址
+        self.timeout = timeout  # 超时
+        self.headers = headers or {}  # 请求头
+
+    def send(self, title, body, events, summary):
+        """
+        发送摘要
+        :param title: 标题
+        :param body: 正文
+        :param events: 告警事件列表
+        :param summary: 分组列表
+        """
+        response = requests.post(self.url, json={
+            'title': title, 'text': body, 'count': len(events), 'groups': summary, 'alerts': events
+        }, headers=self.headers, timeout=self.timeout)
+        response.raise_for_status()  # 非2xx视为失败
+
+
+class SmtpSink:
+    """SMTP邮件通知渠道"""
+
+    def __init__(self, host, sender, recipients, port=25, username='', password='', use_tls=False,
+                 use_ssl=False, timeout=10, **_):
+        """
+        初始化邮件渠道
+        :param host: SMTP服务器
+        :param sender: 发件人
+        :param recipients: 收件人列表
+        :param port: 端口
+        :param username: 用户名（为空则不登录）
+        :param password: 密码
+        :param use_tls: 是否使用STARTTLS
+        :param use_ssl: 是否使用SSL直连（通常为465端口）
+        :param timeout: 超时（秒）
+        """
+        self.host = host  # 服务器
+        self.port = port  # 端口
+        self.sender = sender  # 发件人
+        self.recipients = recipients if isinstance(recipients, list) else [recipients]  # 收件人
+        self.username = username  # 用户名
+        self.password = password  # 密码
+        self.use_tls = use_tls  # STARTTLS
+        self.use_ssl = use_ssl  # SSL直连
+        self.timeout = timeout  # 超时
+
+    def send(self, title, body, events, summary):
+        """
+        发送摘要邮件
+        :param title: 标题
+        :param body: 正文
+        :param events: 告警事件列表
+        :param summary: 分组列表
+        """
+        message = EmailMessage()
+        message['Subject'] = title
+        message['From'] = self.sender
+        message['To'] = ', '.join(self.recipients)
+        message.set_content(body)
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        with smtp_class(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+
+
+class SyslogSink:
+    """Syslog通知渠道：每条告警一条UDP报文（RFC 5424格式）"""
+
+    def __init__(self, host, port=514, facility=1, app_name='network_ai_monitor', **_):
+        """
+        初始化Syslog渠道
+        :param host: Syslog服务器
+        :param port: 端口
+        :param facility: 设施编号（1为user-level）
+        :param app_name: 应用名称
+        """
+        self.address = (host, int(port))  # 服务器地址
+        self.facility = facility  # 设施编号
+        self.app_name = app_name  # 应用名称
+        self.hostname = socket.gethostname()  # 本机名称
+
+    def send(self, title, body, events, summary):
+        """
+        发送告警（Syslog按条发送，便于日志平台检索）
+        :param title: 标题
+        :param body: 正文
+        :param events: 告警事件列表
+        :param summary: 分组列表
+        """
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            for event in events:
+                priority = self.facility * 8 + SYSLOG_SEVERITY.get(event['severity'], 5)
+                timestamp = time.strftime('%Y-%m-%dT%H:%M:%S%z', time.localtime(event['timestamp']))
+                packet = (f"<{priority}>1 {timestamp} {self.hostname} {self.app_name} - {event['state']} - "
+                          f"{event['message']}")
+                sock.sendto(packet.encode('utf-8'), self.address)
+
+
+class FileSink:
+    """本地文件通知渠道：每份摘要追加一行JSON（无外部服务时用于验证通知链路，也可供日志采集器读取）"""
+
+    base_dir = 'outputs'  # 允许写入的目录（路径来自通知配置接口，不能写到该目录以外）
+
+    def __init__(self, path='outputs/notifications.jsonl', **_):
+        """
+        初始化文件渠道
+        :param path: 文件路径（必须位于base_dir目录内）
+        :raises ValueError: 路径在base_dir目录以外
+        """
+        self.path = self.check_path(path)  # 文件路径（解析符号链接后的绝对路径）
+
+    @classmethod
+    def check_path(cls, path):
+        """
+        校验文件路径（解析 .. 和符号链接后必须位于base_dir目录内）
+        :param path: 文件路径
+        :return: 解析后的绝对路径
+        :raises ValueError: 路径无效或在base_dir目录以外
+        """
+        if not isinstance(path, str) or not path:
+            raise ValueError(f"文件渠道路径无效: {path!r}")
+        base = os.path.realpath(cls.base_dir)
+        resolved = os.path.realpath(path)
+        if resolved == base or os.path.commonpath([base, resolved]) != base:
+            raise ValueError(f"文件渠道路径必须位于{cls.base_dir}目录内: {path}")
+        return resolved
+
+    def send(self, title, body, events, summary):
+        """
+        追加一份摘要
+        :param title: 标题
+        :param body: 正文
+        :param events: 告警事件列表
+        :param summary: 分组列表
+        """
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)  # 创建目录
+        line = json.dumps({'time': time.time(), 'title': title, 'text': body, 'count': len(events),
+                           'groups': summary, 'alerts': events}, ensure_ascii=False, default=str)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+# 渠道类型注册表
+SINK_TYPES = {
+    'webhook': WebhookSink,
+    'smtp': SmtpSink,
+    'syslog': SyslogSink,
+    'file': FileSink,
+}
+
+
+class NotificationDispatcher:
+    """通知分发类：告警事件入队即返回，后台线程按时间窗口合并摘要，每个渠道由独立线程限流发送并在失败后重试"""
+
+    def __init__(self, config_file='config/notify_config.json', max_queue=10000):
+        """
+        初始化通知分发器
+        :param config_file: 通知配置文件路径
+        :param max_queue: 队列长度上限（超出时丢弃并计数，保护内存）
+        """
+        self.config_file = config_file  # 配置文件路径
+        self._queue = queue.Queue(maxsize=max_queue)  # 告警事件队列
+        self._pending = {}  # {渠道ID: 待发送的事件列表（新事件、限流或发送失败暂存的事件并入同一份摘要）}
+        self._wakeups = {}  # {渠道ID: 唤醒渠道发送线程的事件}
+        self._buckets = {}  # {渠道ID: 令牌桶}
+        self._stats = {'queued': 0, 'dropped': 0, 'sent': 0, 'failed': 0, 'rate_limited': 0}  # 统计
+        self._lock = threading.Lock()  # 锁
+        self._thread = None  # 发送线程
+        self._ensure_config_file()  # 确保配置文件存在
+        self.config = self.load_config()  # 当前配置
+
+    def _ensure_config_file(self):
+        """确保配置文件存在，如果不存在则写入默认配置"""
+        if not os.path.exists(self.config_file):
+            self.save_config(DEFAULT_NOTIFY_CONFIG)
+
+    def load_config(self):
+        """
+        加载通知配置
+        :return: 配置字典
+        """
+        try:
+            with open(self.config_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:  # 如果加载失败
+            logger.error("加载通知配置失败: %s", e)
+            return dict(DEFAULT_NOTIFY_CONFIG)
+
+    def save_config(self, config):
+        """
+        保存通知配置
+        :param config: 配置字典
+        :return: True表示成功，False表示失败
+        """
+        for channel in config.get('channels', []):  # 校验渠道
+            if not isinstance(channel, dict) or not channel.get('id') or channel.get('type') not in SINK_TYPES:
+                logger.warning("通知渠道缺少id或类型不支持: %s", channel)
+                return False
+            if channel['type'] == 'file':
+                try:
+                    FileSink.check_path(channel.get('path', 'outputs/notifications.jsonl'))
+                except ValueError as e:
+                    logger.warning("%s", e)
+                    return False
+        try:
+            os.makedirs(os.path.dirname(self.config_file) or '.', exist_ok=True)  # 创建目录
+            with open(self.config_file, 'w', encoding='utf-8') as f:
+                json.dump(config, f, ensure_ascii=False, indent=4)
+        except Exception as e:  # 如果保存失败
+            logger.error("保存通知配置失败: %s", e)
+            return False
+        with self._lock:
+            self.config = config
+            self._buckets.clear()  # 限流参数可能变化
+            for wakeup in self._wakeups.values():  # 已删除或停用的渠道其发送线程退出
+                wakeup.set()
+        return True
+
+    def enqueue(self, event):
+        """
+        告警事件入队（可直接注册为AlertEngine的监听函数，不阻塞调用方）
+        :param event: 告警事件字典
+        """
+        try:
+            self._queue.put_nowait(event)
+            counter = 'queued'
+        except queue.Full:  # 队列已满，丢弃
+            counter = 'dropped'
+        with self._lock:
+            self._stats[counter] += 1
+
+    def _make_sink(self, channel):
+        """
+        根据渠道配置创建发送器
+        :param channel: 渠道配置字典
+        :return: 发送器对象
+        """
+        options = {key: value for key, value in channel.items()
+                   if key not in ('id', 'type', 'enabled', 'min_severity', 'max_per_minute')}
+        return SINK_TYPES[channel['type']](**options)
+
+    def _bucket(self, channel):
+        """
+        获取渠道令牌桶（每分钟最多发送max_per_minute份摘要，调用方持有锁）
+        :param channel: 渠道配置字典
+        :return: 令牌桶
+        """
+        bucket = self._buckets.get(channel['id'])
+        if bucket is None:
+            per_minute = channel.get('max_per_minute', 6)
+            bucket = TokenBucket(per_minute / 60, burst=max(1, per_minute))
+            self._buckets[channel['id']] = bucket
+        return bucket
+
+    def _dispatch(self, events):
+        """
+        将一批事件按渠道最低级别过滤后并入各渠道的待发送列表，并唤醒渠道发送线程
+        :param events: 告警事件列表
+        """
+        with self._lock:
+            for channel in self.config.get('channels', []):
+                if not channel.get('enabled', True):
+                    continue
+                min_level = SEVERITY_ORDER.get(channel.get('min_severity', 'info'), 0)
+                selected = [event for event in events if SEVERITY_ORDER.get(event['severity'], 0) >= min_level]
+                if not selected:
+                    continue
+                self._keep_locked(channel['id'], selected)
+                wakeup = self._wakeups.get(channel['id'])
+                if wakeup is None:  # 渠道首次有事件，启动其发送线程
+                    wakeup = self._wakeups[channel['id']] = threading.Event()
+                    threading.Thread(target=self._channel_loop, args=(channel['id'], wakeup), daemon=True,
+                                     name=f"notify-{channel['id']}").start()
+                wakeup.set()
+
+    def _keep_locked(self, channel_id, events, front=False):
+        """
+        暂存渠道的待发送事件（超过队列上限时丢弃最早的事件，调用方持有锁）
+        :param channel_id: 渠道ID
+        :param events: 事件列表
+        :param front: True表示放在已有事件之前（发送失败或限流退回的事件）
+        """
+        pending = self._pending.get(channel_id, [])
+        pending = events + pending if front else pending + events
+        overflow = len(pending) - self._queue.maxsize
+        if overflow > 0:
+            self._stats['dropped'] += overflow
+            pending = pending[overflow:]
+        self._pending[channel_id] = pending
+
+    def _channel_loop(self, channel_id, wakeup):
+        """
+        渠道发送线程：取出待发送事件合并为一份摘要发送，限流时等到有令牌，失败时退回事件并指数退避重试；
+        每个渠道一个线程，某个渠道超时或故障只延迟该渠道
+        :param channel_id: 渠道ID
+        :param wakeup: 唤醒事件（有新事件或配置变化时设置）
+        """
+        retry_at = None  # 限流或失败后的下次发送时间（单调时钟）
+        failures = 0  # 连续失败次数
+        while True:
+            wakeup.wait(None if retry_at is None else max(0.0, retry_at - time.monotonic()))
+            wakeup.clear()
+            with self._lock:
+                channel = next((item for item in self.config.get('channels', [])
+                                if item.get('id') == channel_id and item.get('enabled', True)), None)
+                if channel is None:  # 渠道已删除或停用，丢弃其待发送事件并退出
+                    self._pending.pop(channel_id, None)
+                    self._wakeups.pop(channel_id, None)
+                    return
+                if retry_at is not None and time.monotonic() < retry_at:  # 退避期间到达的新事件等待下次合并发送
+                    continue
+                events = self._pending.pop(channel_id, [])
+                if not events:
+                    retry_at = None
+                    continue
+                bucket = self._bucket(channel)
+                if not bucket.take():  # 超出渠道频率，等到下一个令牌再合并发送
+                    self._keep_locked(channel_id, events, front=True)
+                    self._stats['rate_limited'] += 1
+                    retry_at = time.monotonic() + 1 / bucket.rate
+                    continue
+            title, body, summary = build_digest(events)
+            try:
+                self._make_sink(channel).send(title, body, events, summary)
+            except Exception as e:  # 发送失败，事件退回待发送列表稍后重试
+                failures += 1
+                retry_at = time.monotonic() + min(RETRY_MAX, RETRY_BASE * 2 ** (failures - 1))
+                with self._lock:
+                    self._keep_locked(channel_id, events, front=True)
+                    self._stats['failed'] += 1
+                logger.warning("通知渠道%s发送失败（第%d次，%.0f秒后重试）: %s", channel_id, failures,
+                               retry_at - time.monotonic(), e)
+                continue
+            failures = 0
+            retry_at = None
+            with self._lock:
+                self._stats['sent'] += 1
+
+    def _run(self):
+        """后台合并循环：取到第一条事件后等待合并窗口，再整体分发给各渠道"""
+        while True:
+            events = [self._queue.get()]
+            deadline = time.monotonic() + self.config.get('digest_window', 30)
+            while True:  # 合并窗口内的后续事件
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    events.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._dispatch(events)
+            except Exception as e:  # 异常处理，保证线程不退出
+                logger.exception("告警通知分发失败: %s", e)
+
+    def start(self):
+        """启动后台发送线程"""
+        if self._thread and self._thread.is_alive():  # 已启动
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def send_test(self, channel_id):
+        """
+        向指定渠道同步发送一条测试通知（不限流、不合并）
+        :param channel_id: 渠道ID
+        :return: (是否成功, 说明)
+        """
+        channel = next((item for item in self.config.get('channels', []) if item.get('id') == channel_id), None)
+        if not channel:
+            return False, '通知渠道不存在'
+        event = {
+            'id': 0, 'state': 'firing', 'rule_id': 'test', 'rule_name': '测试通知', 'severity': 'info',
+            'metric': '-', 'device_id': '-', 'device_name': 'network_ai_monitor', 'device_ip': '127.0.0.1',
+            'value': 0, 'message': '这是一条测试通知', 'timestamp': time.time()
+        }
+        title, body, summary = build_digest([event])
+        try:
+            self._make_sink(channel).send(title, body, [event], summary)
+            return True, '测试通知发送成功'
+        except Exception as e:  # 发送失败
+            return False, f'测试通知发送失败: {e}'
+
+    def get_stats(self):
+        """
+        获取发送统计
+        :return: 统计字典（含当前队列长度和暂存事件数）
+        """
+        with self._lock:
+            return dict(self._stats, queue_size=self._queue.qsize(),
+                        pending=sum(len(events) for events in self._pending.values()))
@@ -0,0 +1,959 @@
+# -*- coding: utf-8 -*-
+"""
+厂商命令解析模块
+负责按（厂商, 指标）统一注册采集命令和输出解析器（CPU、内存、温度、接口、设备信息）
+"""
+
+import logging  # 日志
+import re  # 正则表达式
+from collections import namedtuple  # 命名元组
+
+from .metrics import STAGE_SECONDS  # 各阶段耗时
+from .tracing import tracer  # 链路追踪
+
+
+logger = logging.getLogger(__name__)  # 模块日志（接口原始输出仅在DEBUG级别输出）
+
+
+# 解析器描述：采集命令、解析函数、命令等待时间（秒）
+ParserSpec = namedtuple('ParserSpec', ['command', 'parser', 'wait_time'])
+
+# 厂商名称别名表（页面、设备文件、历史代码中的各种写法 -> 标准厂商键）
+VENDOR_ALIASES = {
+    'huawei': 'huawei',
+    'h3c': 'h3c',
+    'cisco(ios)': 'cisco_ios',
+    'cisco ios': 'cisco_ios',
+    'cisco_ios': 'cisco_ios',
+    'cisco': 'cisco_ios',
+    'cisco(nx-os)': 'cisco_nxos',
+    'cisco nx-os': 'cisco_nxos',
+    'cisco_nxos': 'cisco_nxos',
+    'nx-os': 'cisco_nxos',
+    'juniper': 'juniper',
+    'fortinet': 'fortinet',
+    'arista': 'arista',
+    'dell': 'dell',
+    'hp': 'hp',
+    'ruijie': 'ruijie',
+    'zte': 'zte',
+    'linux': 'linux',
+    'windows': 'windows',
+}
+
+
+def normalize_vendor(vendor):
+    """
+    标准化厂商名称
+    :param vendor: 厂商名称（如：Huawei、huawei、Cisco(IOS)）
+    :return: 标准厂商键（如：huawei、cisco_ios），未知厂商返回小写原值
+    """
+    key = (vendor or '').strip().lower()  # 去除空格并转为小写
+    return VENDOR_ALIASES.get(key, key)  # 查表返回
+
+
+class ParserRegistry:
+    """解析器注册表，按（标准厂商键, 指标）O(1)查找采集命令和解析函数"""
+
+    # 通配厂商键：未单独注册的厂商使用该键下的解析器
+    DEFAULT_VENDOR = '*'
+
+    def __init__(self):
+        """初始化注册表"""
+        self._table = {}  # {(厂商键, 指标): ParserSpec}
+        self._commands = set()  # 已注册的采集命令（指标标签只使用这些固定命令，避免任意命令占满时间序列）
+
+    def register(self, vendors, metric, command, wait_time=2):
+        """
+        注册解析器（装饰器）
+        :param vendors: 标准厂商键列表
+        :param metric: 指标名称（cpu、memory、temperature、interfaces）
+        :param command: 采集命令
+        :param wait_time: 命令等待时间（秒）
+        :return: 装饰器
+        """
+        def decorator(func):
+            for vendor in vendors:  # 每个厂商共用同一个解析函数
+                self._table[(vendor, metric)] = ParserSpec(command, func, wait_time)
+            if command:
+                self._commands.add(command)
+            return func
+        return decorator
+
+    def lookup(self, vendor, metric):
+        """
+        查找解析器
+        :param vendor: 厂商名称（任意写法）
+        :param metric: 指标名称
+        :return: ParserSpec，未注册返回None
+        """
+        spec = self._table.get((normalize_vendor(vendor), metric))  # 精确匹配
+        if spec is None:  # 回退到通配解析器
+            spec = self._table.get((self.DEFAULT_VENDOR, metric))
+        return spec
+
+    def parse(self, vendor, metric, output):
+        """
+        解析命令输出
+        :param vendor: 厂商名称
+        :param metric: 指标名称
+        :param output: 命令输出
+        :return: 解析结果，无解析器或无输出返回None
+        """
+        spec = self.lookup(vendor, metric)
+        if spec is None or not output:
+            return None
+        return spec.parser(output)
+
+    def collect(self, ssh, vendor, metric):
+        """
+        在已建立的SSH会话上执行采集命令并解析
+        :param ssh: SSH连接对象
+        :param vendor: 厂商名称
+        :param metric: 指标名称
+        :return: 解析结果，不支持或失败返回None
+        """
+        spec = self.lookup(vendor, metric)
+        if spec is None or spec.command is None:  # 该厂商不支持此指标
+            return None
+        output = ssh.execute_command(spec.command, wait_time=spec.wait_time)  # 执行命令
+        if not output:  # 无输出
+            return None
+        with tracer.span('parse', metric=metric, command=spec.command), \
+                STAGE_SECONDS.timer('parse', normalize_vendor(vendor), spec.command):  # 记录解析耗时
+            return spec.parser(output)  # 解析输出
+
+    def is_known_command(self, command):
+        """
+        判断是否为已注册的采集命令
+        :param command: 命令
+        :return: True表示是轮询采集使用的固定命令
+        """
+        return command in self._commands
+
+    def vendors(self):
+        """
+        获取已注册的厂商键列表
+        :return: 厂商键列表
+        """
+        return sorted({vendor for vendor, _ in self._table if vendor != self.DEFAULT_VENDOR})
+
+
+# 全局注册表
+registry = ParserRegistry()
+
+
+# ==================== 工具函数 ====================
+def _first_int(output, patterns, group=1):
+    """
+    按顺序尝试多个预编译正则，返回第一个匹配的整数
+    :param output: 命令输出
+    :param patterns: 预编译正则列表
+    :param group: 取值分组
+    :return: 整数，全部未匹配返回None
+    """
+    for pattern in patterns:
+        match = pattern.search(output)
+        if match:  # 匹配成功
+            return int(match.group(group))
+    return None
+
+
+def _percent(used, total):
+    """计算使用率百分比（避免除零）"""
+    return int((used / total) * 100) if total > 0 else None
+
+
+def _interface_record(name, status, admin_status, oper_status, description, speed='-'):
+    """
+    构造统一格式的接口记录
+    :return: 接口信息字典
+    """
+    return {
+        'name': name,  # 接口名
+        'status': status,  # 综合状态（up/down）
+        'admin_status': admin_status,  # 管理状态
+        'oper_status': oper_status,  # 操作状态
+        'speed': speed,  # 速率
+        'rx_bytes': 0,  # 接收字节数
+        'tx_bytes': 0,  # 发送字节数
+        'rx_packets': 0,  # 接收包数
+        'tx_packets': 0,  # 发送包数
+        'in_errors': 0,  # 入方向错误数
+        'out_errors': 0,  # 出方向错误数
+        'errors': 0,  # 错误数（入+出）
+        'description': description  # 描述
+    }
+
+
+# 控制字符删除表：ASCII < 32（保留换行符）和 ASCII = 127，供str.translate一次性处理整个缓冲区
+CONTROL_CHAR_TABLE = dict.fromkeys([code for code in range(32) if code != ord('\n')] + [127])
+# Cisco IOS输出中的垃圾字符串（未分配IP、未设置方式、终端残留的DOWN/UP）
+CISCO_IOS_NOISE_PATTERN = re.compile(r'unassigned|unset|DOWN|UP')
+# NX-OS终端残留的"7mm"接口名前缀（行首，允许前导空白）
+NXOS_PREFIX_PATTERN = re.compile(r'^([ \t]*)7mm(?=\S)', re.MULTILINE)
+# 接口名称中的非法字符（只保留字母、数字和 / . - _）
+INTERFACE_NAME_JUNK_PATTERN = re.compile(r'[^\w/.\-]')
+
+
+def scrub_control_chars(text):
+    """
+    删除文本中的控制字符（保留换行符）
+    :param text: 原始文本
+    :return: 清理后的文本
+    """
+    return text.translate(CONTROL_CHAR_TABLE)  # 查表删除，线性时间
+
+
+def clean_interface_name(name):
+    """
+    清理接口名称中的垃圾字符
+    :param name: 原始接口名称
+    :return: 清理后的接口名称
+    """
+    return INTERFACE_NAME_JUNK_PATTERN.sub('', name)
+
+
+class TableParser:
+    """模板化表格解析器：逐行拆分列，跳过表头/分隔线，由行构造函数生成记录（单次遍历）"""
+
+    def __init__(self, min_columns, build_row, skip_tokens=('Interface', '---'), skip_prefixes=()):
+        """
+        初始化表格解析器
+        :param min_columns: 数据行最少列数
+        :param build_row: 行构造函数 build_row(parts, line) -> 记录字典或None
+        :param skip_tokens: 包含这些字符串的行视为表头或分隔线
+        :param skip_prefixes: 以这些前缀开头的行跳过
+        """
+        self.min_columns = min_columns  # 最少列数
+        self.build_row = build_row  # 行构造函数
+        self.skip_tokens = skip_tokens  # 跳过标记
+        self.skip_prefixes = tuple(skip_prefixes)  # 跳过前缀
+
+    def __call__(self, output):
+        """
+        解析表格输出
+        :param output: 命令输出
+        :return: 记录列表
+        """
+        records = []
+        for line in output.strip().split('\n'):
+            line = line.strip()
+            if not line or (self.skip_prefixes and line.startswith(self.skip_prefixes)):
+                continue
+            if any(token in line for token in self.skip_tokens):  # 表头或分隔线
+                continue
+            parts = line.split()
+            if len(parts) >= self.min_columns:
+                record = self.build_row(parts, line)
+                if record:
+                    records.append(record)
+        return records
+
+
+# ==================== CPU使用率 ====================
+HUAWEI_CPU_PATTERN = re.compile(r'CPU\s+[Uu]sage.*?(\d+)%')  # CPU Usage: 10%
+CISCO_CPU_PATTERN = re.compile(r'five seconds:\s*(\d+)%')  # CPU utilization for five seconds: 5%
+LINUX_CPU_PATTERN = re.compile(r'Cpu\(s\):\s+(\d+(?:\.\d+)?)%?\s*us')  # %Cpu(s):  3.1 us
+
+
+@registry.register(['huawei', 'h3c'], 'cpu', 'display cpu-usage')
+def parse_huawei_cpu(output):
+    """解析华为/H3C CPU使用率"""
+    return _first_int(output, [HUAWEI_CPU_PATTERN])
+
+
+@registry.register(['cisco_ios', 'cisco_nxos'], 'cpu', 'show processes cpu')
+def parse_cisco_cpu(output):
+    """解析Cisco IOS/NX-OS CPU使用率"""
+    return _first_int(output, [CISCO_CPU_PATTERN])
+
+
+@registry.register(['linux'], 'cpu', 'top -bn1 | grep "Cpu(s)"')
+def parse_linux_cpu(output):
+    """解析Linux CPU使用率（用户态）"""
+    match = LINUX_CPU_PATTERN.search(output)
+    return int(float(match.group(1))) if match else None
+
+
+@registry.register(['windows'], 'cpu', 'wmic cpu get loadpercentage')
+def parse_windows_cpu(output):
+    """解析Windows CPU使用率（输出中的第一个纯数字行）"""
+    for line in output.strip().split('\n'):
+        line = line.strip()
+        if line and line.isdigit():
+            return int(line)
+    return None
+
+
+# ==================== 内存使用率 ====================
+HUAWEI_MEMORY_PATTERN = re.compile(r'Memory\s+[Uu]tilization.*?(\d+)%')  # Memory Utilization: 50%
+CISCO_TOTAL_PATTERN = re.compile(r'Total[:\s]+(\d+)', re.IGNORECASE)  # 总内存
+CISCO_USED_PATTERN = re.compile(r'Used[:\s]+(\d+)', re.IGNORECASE)  # 已用内存
+CISCO_FREE_PATTERN = re.compile(r'Free[:\s]+(\d+)', re.IGNORECASE)  # 空闲内存
+PERCENT_PATTERN = re.compile(r'(\d+)%')  # 任意百分比
+NXOS_TOTALS_PATTERN = re.compile(
+    r'Shared memory totals.*?Size[:\s]+(\d+)\s*MB.*?Used[:\s]+(\d+)\s*MB', re.IGNORECASE | re.DOTALL
+)  # Shared memory totals - Size: 1411 MB, Used: 101 MB
+NXOS_SIZE_PATTERN = re.compile(r'Size[:\s]+(\d+)\s*MB', re.IGNORECASE)  # 共享内存大小
+NXOS_USED_PATTERN = re.compile(r'Used[:\s]+(\d+)\s*MB', re.IGNORECASE)  # 已用共享内存
+WINDOWS_TOTAL_PATTERN = re.compile(r'TotalVisibleMemorySize=(\d+)')  # 总内存（KB）
+WINDOWS_FREE_PATTERN = re.compile(r'FreePhysicalMemory=(\d+)')  # 空闲内存（KB）
+
+
+@registry.register(['huawei', 'h3c'], 'memory', 'display memory-usage')
+def parse_huawei_memory(output):
+    """解析华为/H3C内存使用率"""
+    return _first_int(output, [HUAWEI_MEMORY_PATTERN])
+
+
+@registry.register(['cisco_ios'], 'memory', 'show processes memory')
+def parse_cisco_ios_memory(output):
+    """
+    解析Cisco IOS内存使用率
+    输出格式示例：
+    Processor Pool Total: 3710293952 Used: 1234567890 Free: 2475726062
+    """
+    match_total = CISCO_TOTAL_PATTERN.search(output)  # 匹配总内存
+    if match_total:  # 如果找到总内存
+        total = int(match_total.group(1))
+        match_used = CISCO_USED_PATTERN.search(output)
+        if match_used:  # 有已用内存
+            used = int(match_used.group(1))
+        else:  # 只有空闲内存，计算已用
+            match_free = CISCO_FREE_PATTERN.search(output)
+            used = total - int(match_free.group(1)) if match_free else 0
+        usage = _percent(used, total)
+        if usage is not None:
+            return usage
+    return _first_int(output, [PERCENT_PATTERN])  # 回退：直接匹配百分比
+
+
+@registry.register(['cisco_nxos'], 'memory', 'show processes memory shared')
+def parse_cisco_nxos_memory(output):
+    """
+    解析Cisco NX-OS内存使用率
+    输出格式示例：
+    Shared memory totals - Size: 1411 MB, Used: 101 MB, Available: 1318 MB
+    """
+    match = NXOS_TOTALS_PATTERN.search(output)
+    if match:
+        usage = _percent(int(match.group(2)), int(match.group(1)))
+        if usage is not None:
+            return usage
+    match_size = NXOS_SIZE_PATTERN.search(output)  # 回退：分别匹配大小和已用
+    match_used = NXOS_USED_PATTERN.search(output)
+    if match_size and match_used:
+        return _percent(int(match_used.group(1)), int(match_size.group(1)))
+    return None
+
+
+@registry.register(['linux'], 'memory', 'free | grep Mem')
+def parse_linux_memory(output):
+    """
+    解析Linux内存使用率
+    输出格式示例：Mem:        8192000     4096000     4096000      123456      512000     3584000
+    """
+    line = next((line for line in output.split('\n') if line.strip().startswith('Mem:')), '')  # 跳过命令回显
+    parts = line.split()
+    if len(parts) >= 7 and parts[1].isdigit() and parts[2].isdigit():
+        return _percent(int(parts[2]), int(parts[1]))
+    return None
+
+
+@registry.register(['windows'], 'memory', 'wmic OS get TotalVisibleMemorySize,FreePhysicalMemory /value')
+def parse_windows_memory(output):
+    """解析Windows内存使用率"""
+    match_total = WINDOWS_TOTAL_PATTERN.search(output)
+    match_free = WINDOWS_FREE_PATTERN.search(output)
+    if match_total and match_free:
+        total = int(match_total.group(1))
+        return _percent(total - int(match_free.group(1)), total)
+    return None
+
+
+# ==================== 设备温度 ====================
+HUAWEI_TEMPERATURE_PATTERNS = [re.compile(r'[Tt]emperature.*?(\d+)[°]?C')]  # Temperature: 45C
+CISCO_IOS_TEMPERATURE_PATTERNS = [
+    re.compile(r'Temperature\s+Value[:\s]+(\d+)', re.IGNORECASE),  # Temperature Value: 45 Degree Celsius
+    re.compile(r'(\d+)\s*(?:Degree[s]?)?\s*Celsius', re.IGNORECASE),  # 45 Celsius
+    re.compile(r'(?:Inlet|Outlet|Sensor)\s+(\d+)', re.IGNORECASE),  # 表格形式：Inlet  45  55  OK
+    re.compile(r'(\d+)\s*[°]?C'),  # 45°C / 45C
+]
+NXOS_TEMPERATURE_PATTERNS = [
+    re.compile(r'MajorThresh.*?(\d+)', re.MULTILINE),  # MajorThresh列的第一个数值
+    re.compile(r'\d+\s+\w+\s+(\d+)', re.MULTILINE),  # Module Sensor MajorThresh
+    re.compile(r'^\s*\d+\s+\w+\s+(\d+)', re.MULTILINE),  # 从行首开始匹配
+]
+NXOS_TEMPERATURE_FALLBACK = re.compile(r'\d+\s+[CF]\s+(\d+)')  # 任意温度值
+
+
+@registry.register(['huawei', 'h3c'], 'temperature', 'display environment')
+def parse_huawei_temperature(output):
+    """解析华为/H3C设备温度"""
+    return _first_int(output, HUAWEI_TEMPERATURE_PATTERNS)
+
+
+@registry.register(['cisco_ios'], 'temperature', 'show env temperature status')
+def parse_cisco_ios_temperature(output):
+    """
+    解析Cisco IOS设备温度（按格式优先级依次尝试）
+    输出格式示例：
+    Temperature Value: 45 Degree Celsius
+    或者表格形式：
+    Sensor        Current(C)  Threshold(C)  Status
+    Inlet         45          55            OK
+    """
+    return _first_int(output, CISCO_IOS_TEMPERATURE_PATTERNS)
+
+
+@registry.register(['cisco_nxos'], 'temperature', 'show env temperature')
+def parse_cisco_nxos_temperature(output):
+    """
+    解析Cisco NX-OS设备温度（返回MajorThresh阈值）
+    输出格式示例：
+    Module   Sensor        MajorThresh   MinorThres   CurTemp     Status
+    27       Sensor0         75              55          0          Ok
+    """
+    value = _first_int(output, NXOS_TEMPERATURE_PATTERNS)
+    if value is not None:
+        return value
+    temps = [int(t) for t in NXOS_TEMPERATURE_FALLBACK.findall(output)]  # 回退：取最大温度值
+    return max(temps) if temps else None
+
+
+@registry.register(['linux', 'windows'], 'temperature', None)
+def parse_no_temperature(output):
+    """Linux/Windows服务器通常不通过SSH提供温度信息（不执行采集命令）"""
+    return None
+
+
+# ==================== 接口信息 ====================
+def _huawei_row(parts, line):
+    """华为/H3C接口行：Interface PHY Protocol InUti OutUti inErrors outErrors"""
+    phy_status, protocol_status = parts[1], parts[2]
+    status = 'up' if phy_status.lower() == 'up' and protocol_status.lower() == 'up' else 'down'
+    record = _interface_record(parts[0], status, phy_status, protocol_status,
+                               f'PHY: {phy_status}, Protocol: {protocol_status}', speed=phy_status)
+    return record
+
+
+def _juniper_row(parts, line):
+    """Juniper接口行：Interface Admin Link Proto Local Remote"""
+    admin_status, link_status = parts[1], parts[2]
+    status = 'up' if admin_status.lower() == 'up' and link_status.lower() == 'up' else 'down'
+    return _interface_record(parts[0], status, admin_status, link_status,
+                             f'Admin: {admin_status}, Link: {link_status}')
+
+
+def _generic_row(parts, line):
+    """通用接口行：第一列为接口名，包含up即视为up"""
+    status = 'up' if 'up' in line.lower() else 'down'
+    return _interface_record(parts[0], status, status, status, ' '.join(parts[1:])[:50])  # 限制描述长度
+
+
+_HUAWEI_TABLE = TableParser(3, _huawei_row, skip_prefixes=('*',))  # 华为/H3C表格模板
+_JUNIPER_TABLE = TableParser(3, _juniper_row, skip_tokens=('Interface',))  # Juniper表格模板
+_GENERIC_TABLE = TableParser(2, _generic_row)  # 通用表格模板
+
+
+@registry.register(['huawei', 'h3c'], 'interfaces', 'display interface brief', wait_time=3)
+def parse_huawei_interfaces(output):
+    """
+    解析华为/H3C设备接口信息
+    输出格式示例：
+    Interface                   PHY   Protocol  InUti OutUti   inErrors  outErrors
+    GigabitEthernet0/0/1        up    up        0.01%  0.01%          0          0
+    """
+    return _HUAWEI_TABLE(output)
+
+
+@registry.register(['cisco_ios'], 'interfaces', 'show ip interface brief', wait_time=3)
+def parse_cisco_ios_interfaces(output):
+    """
+    解析Cisco IOS设备接口信息
+    输出格式示例：
+    Interface              IP-Address      OK? Method Status                Protocol
+    GigabitEthernet0/0     192.168.1.1     YES NVRAM  up                    up
+    """
+    interfaces = []
+
+    # 调试级别下输出原始内容（默认不输出，避免每次轮询写入整段CLI输出）
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Cisco IOS原始接口输出:\n%s", output)
+
+    # 整个缓冲区一次性清理：控制字符查表删除，垃圾字符串单个正则替换
+    cleaned = CISCO_IOS_NOISE_PATTERN.sub('', scrub_control_chars(output))
+
+    for line in cleaned.split('\n'):
+        # 跳过标题行和分隔线
+        if 'Interface' in line or '---' in line:
+            continue
+
+        # 分割处理后的行（split()同时完成多余空白的合并）
+        parts = line.split()
+        # Cisco "show ip interface brief" 命令的标准输出格式：
+        # Interface  IP-Address  OK?  Method  Status  Protocol
+        # 至少需要6个部分才能正确解析
+        if len(parts) >= 6:
+            interface_name = clean_interface_name(parts[0])  # 清理接口名称中的垃圾字符
+            ip_address = parts[1]
+            admin_status = parts[4]
+            protocol_status = parts[5]
+
+            status = 'up' if admin_status.lower() == 'up' and protocol_status.lower() == 'up' else 'down'
+
+            interfaces.append(_interface_record(
+                interface_name, status, admin_status, protocol_status,
+                f'IP: {ip_address}, Status: {admin_status}/{protocol_status}'
+            ))  # Cisco接口简要信息中不包含速度信息
+        # 处理特殊情况：包含额外信息的行
+        elif len(parts) >= 4 and ('GigabitEthernet' in line or 'FastEthernet' in line):
+            # 尝试从行中提取接口名称
+            interface_name = next((part for part in parts if 'Ethernet' in part), '')
+            if interface_name:
+                # 这类行的接口均为down状态
+                interfaces.append(_interface_record(
+                    clean_interface_name(interface_name), 'down', 'down', 'down',
+                    'IP: unassigned, Status: down/down'
+                ))
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Cisco IOS清理后接口输出:\n%s", cleaned)
+    return interfaces
+
+
+@registry.register(['cisco_nxos'], 'interfaces', 'show interface brief', wait_time=3)
+def parse_cisco_nxos_interfaces(output):
+    """
+    解析Cisco NX-OS设备接口信息
+    输出格式示例：
+    Interface              Status          Description
+    Ethernet1/1            up              Server Port
+    7mmEth1/12             down            --
+    """
+    interfaces = []
+
+    # 调试级别下输出原始内容
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Cisco NX-OS原始接口输出:\n%s", output)
+
+    # 整个缓冲区一次性清理控制字符，并去除接口名称前的"7mm"终端残留前缀
+    cleaned = NXOS_PREFIX_PATTERN.sub('', scrub_control_chars(output))
+
+    for line in cleaned.split('\n'):
+        # 跳过标题行和分隔线
+        if 'Interface' in line or '---' in line:
+            continue
+
+        # 分割处理后的行
+        parts = line.split()
+        # Cisco NX-OS "show interface brief" 命令的标准输出格式：
+        # Interface  Status  Description
+        if len(parts) >= 2:
+            interface_name = clean_interface_name(parts[0])  # 清理接口名称中的垃圾字符
+            raw_status = parts[1]
+            description = ' '.join(parts[2:]) if len(parts) > 2 else '-'
+
+            # 标准化状态值（NX-OS简要信息中状态列只有一个）
+            status = 'up' if raw_status.lower() == 'up' else 'down'
+
+            interfaces.append(_interface_record(interface_name, status, raw_status, raw_status, description))
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Cisco NX-OS清理后接口输出:\n%s", cleaned)
+    return interfaces
+
+
+@registry.register(['linux'], 'interfaces', 'ip -s link show', wait_time=3)
+@registry.register(['linux'], 'interface_details', 'ip -s link show', wait_time=3)
+def parse_linux_interfaces(output):
+    """
+    解析Linux服务器接口信息
+    输出格式示例：
+    2: eth0: <BROADCAST,MULTICAST,UP,LOWER_UP> mtu 1500 qdisc pfifo_fast state UP
+        RX: bytes  packets  errors  dropped overrun mcast
+        12345678   9876     0       0       0       0
+    """
+    interfaces = []
+    lines = [line.strip() for line in output.strip().split('\n')]  # 预先去除空白
+    current_interface = None
+
+    for index, line in enumerate(lines):
+        if not line:
+            continue
+
+        # 匹配接口行
+        if ':' in line and '<' in line:
+            parts = line.split(':')
+            if len(parts) >= 2 and parts[1].strip():
+                interface_name = parts[1].strip().split()[0]
+                status = 'up' if 'UP' in line else 'down'
+                current_interface = _interface_record(
+                    interface_name, status, status, status, 'Linux Network Interface'
+                )
+                interfaces.append(current_interface)
+
+        # 匹配RX/TX统计行（统计值在下一行：bytes packets errors ...）
+        elif current_interface and (line.startswith('RX:') or line.startswith('TX:')) \
+                and index + 1 < len(lines):
+            stats = lines[index + 1].split()
+            if len(stats) < 3 or not all(value.isdigit() for value in stats[:3]):
+                continue
+            direction = 'rx' if line.startswith('RX:') else 'tx'
+            current_interface[f'{direction}_bytes'] = int(stats[0])
+            current_interface[f'{direction}_packets'] = int(stats[1])
+            current_interface['in_errors' if direction == 'rx' else 'out_errors'] = int(stats[2])
+            current_interface['errors'] = current_interface['in_errors'] + current_interface['out_errors']
+
+    return interfaces
+
+
+@registry.register(['windows'], 'interfaces', 'ipconfig /all', wait_time=3)
+def parse_windows_interfaces(output):
+    """
+    解析Windows服务器接口信息
+    输出格式示例：
+    Ethernet adapter 以太网:
+       Connection-specific DNS Suffix  . :
+       IPv4 Address. . . . . . . . . . . : 192.168.1.100
+    """
+    interfaces = []
+    current_interface = None
+
+    for line in output.strip().split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+
+        # 匹配接口名称行
+        if 'adapter' in line.lower() and ':' in line:
+            interface_name = line.split('adapter', 1)[-1].strip().rstrip(':')
+            # Windows默认显示的都是活动的
+            current_interface = _interface_record(interface_name, 'up', 'up', 'up', 'Windows Network Adapter')
+            interfaces.append(current_interface)
+
+        # 匹配IP地址
+        elif 'IPv4 Address' in line and current_interface and ':' in line:
+            ip = line.split(':', 1)[1].strip()
+            current_interface['description'] = f'IP: {ip}'
+
+    return interfaces
+
+
+@registry.register(['juniper'], 'interfaces', 'show interfaces terse', wait_time=3)
+def parse_juniper_interfaces(output):
+    """
+    解析Juniper设备接口信息
+    输出格式示例：
+    ge-0/0/0.0              up    up
+    """
+    return _JUNIPER_TABLE(output)
+
+
+@registry.register([ParserRegistry.DEFAULT_VENDOR, 'hp'], 'interfaces', 'display interface brief', wait_time=3)
+def parse_generic_interfaces(output):
+    """
+    通用接口解析（尽力而为）
+    """
+    return _GENERIC_TABLE(output)
+
+
+# 其他厂商仅注册采集命令，输出使用通用解析
+registry.register(['fortinet'], 'interfaces', 'get system interface', wait_time=3)(parse_generic_interfaces)
+registry.register(['arista', 'dell'], 'interfaces', 'show interfaces status', wait_time=3)(parse_generic_interfaces)
+
+
+# ==================== 接口详细信息（含计数器） ====================
+class BlockParser:
+    """模板化分块解析器：按接口标题行切分输出块，块内用预编译正则提取命名分组字段"""
+
+    # 整数字段（命名分组的值转换为int）
+    INT_FIELDS = ('rx_bytes', 'tx_bytes', 'rx_packets', 'tx_packets', 'in_errors', 'out_errors')
+
+    def __init__(self, header_pattern, field_patterns, build_status):
+        """
+        初始化分块解析器
+        :param header_pattern: 接口标题行正则（需包含name分组，其余分组传给build_status）
+        :param field_patterns: 块内字段正则列表（命名分组即字段名）
+        :param build_status: 状态构造函数 build_status(header_groups) -> (status, admin_status, oper_status)
+        """
+        self.header_pattern = header_pattern  # 标题行正则
+        self.field_patterns = field_patterns  # 字段正则
+        self.build_status = build_status  # 状态构造函数
+
+    def __call__(self, output):
+        """
+        解析接口详细信息输出
+        :param output: 命令输出
+        :return: 接口记录列表
+        """
+        text = scrub_control_chars(output)  # 一次性清理控制字符
+        headers = list(self.header_pattern.finditer(text))  # 所有接口标题行
+        interfaces = []
+        for index, header in enumerate(headers):
+            end = headers[index + 1].start() if index + 1 < len(headers) else len(text)
+            block = text[header.end():end]  # 当前接口的输出块
+            status, admin_status, oper_status = self.build_status(header.groupdict())
+            record = _interface_record(clean_interface_name(header.group('name')),
+                                       status, admin_status, oper_status, '-')
+            for pattern in self.field_patterns:  # 块内提取字段
+                match = pattern.search(block)
+                if not match:
+                    continue
+                for field, value in match.groupdict().items():
+                    if value is None:
+                        continue
+                    record[field] = int(value) if field in self.INT_FIELDS else value.strip()
+            record['errors'] = record['in_errors'] + record['out_errors']
+            interfaces.append(record)
+        return interfaces
+
+
+def _updown_status(admin, oper):
+    """根据管理状态和协议状态生成综合状态"""
+    admin = (admin or '').lower()
+    oper = (oper or admin).lower()
+    return ('up' if admin == 'up' and oper == 'up' else 'down'), admin or 'unknown', oper or 'unknown'
+
+
+_CISCO_IOS_DETAIL = BlockParser(
+    re.compile(r'^(?P<name>\S+) is (?P<admin>administratively down|up|down)[^,\n]*'
+               r'(?:, line protocol is (?P<oper>\w+))?', re.MULTILINE),
+    [
+        re.compile(r'Description:[ \t]*(?P<description>[^\n]*)'),
+        re.compile(r'(?P<speed>\d+\s*[MG]b/s)'),
+        re.compile(r'(?P<rx_packets>\d+) packets input, (?P<rx_bytes>\d+) bytes'),
+        re.compile(r'(?P<tx_packets>\d+) packets output, (?P<tx_bytes>\d+) bytes'),
+        re.compile(r'(?P<in_errors>\d+) input errors'),
+        re.compile(r'(?P<out_errors>\d+) output errors'),
+    ],
+    lambda groups: _updown_status('down' if groups['admin'] == 'administratively down' else groups['admin'],
+                                  groups.get('oper'))
+)
+
+_CISCO_NXOS_DETAIL = BlockParser(
+    re.compile(r'^(?P<name>\S+) is (?P<oper>up|down)[^\n]*(?:\n\s*admin state is (?P<admin>\w+))?',
+               re.MULTILINE),
+    [
+        re.compile(r'Description:[ \t]*(?P<description>[^\n]*)'),
+        re.compile(r'(?P<speed>\d+\s*[MG]b/s)'),
+        re.compile(r'(?P<rx_packets>\d+) input packets\s+(?P<rx_bytes>\d+) bytes'),
+        re.compile(r'(?P<tx_packets>\d+) output packets\s+(?P<tx_bytes>\d+) bytes'),
+        re.compile(r'(?P<in_errors>\d+) input error'),
+        re.compile(r'(?P<out_errors>\d+) output error'),
+    ],
+    lambda groups: _updown_status(groups.get('admin') or groups['oper'], groups['oper'])
+)
+
+_HUAWEI_DETAIL = BlockParser(
+    re.compile(r'^(?P<name>\S+) current state\s*:\s*(?P<admin>[\w ]+?)\s*(?:\(.*\))?\s*$'
+               r'(?:\n\s*Line protocol current state\s*:\s*(?P<oper>\w+))?', re.MULTILINE),
+    [
+        re.compile(r'Description:[ \t]*(?P<description>[^\n]*)'),
+        re.compile(r'Speed\s*:\s*(?P<speed>[^,\n]+)'),
+        re.compile(r'Input(?: \(total\))?:\s*(?P<rx_packets>\d+) packets,\s*(?P<rx_bytes>\d+) bytes'),
+        re.compile(r'Output(?: \(total\))?:\s*(?P<tx_packets>\d+) packets,\s*(?P<tx_bytes>\d+) bytes'),
+        re.compile(r'Input(?: \(total\))?:\s*(?P<rx_bytes>\d+) bytes,\s*(?P<rx_packets>\d+) packets'),
+        re.compile(r'Output(?: \(total\))?:\s*(?P<tx_bytes>\d+) bytes,\s*(?P<tx_packets>\d+) packets'),
+        re.compile(r'Input errors?\s*:\s*(?P<in_errors>\d+)'),  # 华为：Input errors: 0
+        re.compile(r'(?P<in_errors>\d+) input errors'),  # H3C：Input: 0 input errors, 0 runts
+        re.compile(r'Output errors?\s*:\s*(?P<out_errors>\d+)'),  # 华为：Output errors: 0
+        re.compile(r'(?P<out_errors>\d+) output errors'),  # H3C：Output: 0 output errors
+    ],
+    lambda groups: _updown_status('down' if 'administratively' in groups['admin'].lower() else groups['admin'],
+                                  groups.get('oper'))
+)
+
+
+@registry.register(['cisco_ios'], 'interface_details', 'show interfaces', wait_time=3)
+def parse_cisco_ios_interface_details(output):
+    """
+    解析Cisco IOS接口详细信息（show interfaces，含收发字节/包数和错误计数）
+    输出格式示例：
+    GigabitEthernet0/1 is up, line protocol is up (connected)
+         123456 packets input, 7890123 bytes, 0 no buffer
+         0 input errors, 0 CRC, 0 frame, 0 overrun, 0 ignored
+         654321 packets output, 98765432 bytes, 0 underruns
+         0 output errors, 0 collisions, 1 interface resets
+    """
+    return _CISCO_IOS_DETAIL(output)
+
+
+@registry.register(['cisco_nxos'], 'interface_details', 'show interface', wait_time=3)
+def parse_cisco_nxos_interface_details(output):
+    """
+    解析Cisco NX-OS接口详细信息（show interface）
+    输出格式示例：
+    Ethernet1/1 is up
+    admin state is up, Dedicated Interface
+      RX
+        123456 input packets  7890123 bytes
+        0 input error  0 short frame  0 overrun   0 underrun  0 ignored
+      TX
+        654321 output packets  98765432 bytes
+        0 output error  0 collision  0 deferred  0 late collision
+    """
+    return _CISCO_NXOS_DETAIL(output)
+
+
+@registry.register(['huawei', 'h3c'], 'interface_details', 'display interface', wait_time=3)
+def parse_huawei_interface_details(output):
+    """
+    解析华为/H3C接口详细信息（display interface）
+    输出格式示例：
+    GigabitEthernet0/0/1 current state : UP
+    Line protocol current state : UP
+    Speed : 1000,  Loopback: NONE
+    Input:  123 packets, 4567 bytes
+    Output:  890 packets, 1234 bytes
+    Input errors:  0
+    Output errors: 0
+    """
+    return _HUAWEI_DETAIL(output)
+
+
+# ==================== 设备信息（型号、序列号、版本、运行时长） ====================
+FACTS_VERSION_PATTERNS = [
+    re.compile(r'VRP \(R\) software,\s*Version\s+[\d.]+\s*\(\S+\s+([^)\s]+)\)'),  # 华为：Version 5.170 (S5700 V200R011C10SPC500)
+    re.compile(r'Comware Software,\s*Version\s+([^,\s]+(?:,\s*Release\s+\S+)?)'),  # H3C：Version 7.1.045, Release 3108P03
+    re.compile(r'(?:NXOS|system):\s+version\s+(\S+)', re.IGNORECASE),  # NX-OS：NXOS: version 9.3(8)
+    re.compile(r'Software image version:\s*(\S+)'),  # Arista
+    re.compile(r'Junos:\s*(\S+)'),  # Juniper
+    re.compile(r'JUNOS [^\[\n]*\[([^\]]+)\]'),  # Juniper旧版本：JUNOS Software Release [12.3R12.4]
+    re.compile(r'^Version:\s*\S+\s+(v[\d.]+,build\d+)', re.MULTILINE),  # Fortinet：Version: FortiGate-60E v6.2.3,build1066
+    re.compile(r'Version\s+([^,\s]+)'),  # Cisco IOS及其他：Version 15.0(2)SE4,
+]
+FACTS_MODEL_PATTERNS = [
+    re.compile(r'^Model(?: number)?\s*:\s*(\S+)', re.MULTILINE | re.IGNORECASE),  # Juniper / Cisco交换机
+    re.compile(r'^(?:HUAWEI|H3C|Quidway)\s+(\S+).*uptime is', re.MULTILINE),  # 华为/H3C：HUAWEI S5700-28C-HI Routing Switch uptime is
+    re.compile(r'^\s*cisco\s+(Nexus\S*\s+\S+)\s+[Cc]hassis', re.MULTILINE | re.IGNORECASE),  # NX-OS：cisco Nexus9000 C93180YC-EX chassis
+    re.compile(r'^[Cc]isco\s+(\S+)\s+\(.*\)\s+(?:processor|with)', re.MULTILINE),  # Cisco IOS：cisco WS-C2960-24TT-L (PowerPC405) processor
+    re.compile(r'^Arista\s+(\S+)', re.MULTILINE),  # Arista DCS-7050TX-64-R
+    re.compile(r'^Version:\s*(\S+)\s+v[\d.]', re.MULTILINE),  # Fortinet
+    re.compile(r'\bPID:\s*([^\s,]+)'),  # show inventory：PID: WS-C2960-24TT-L , VID: V02 , SN: FOC1234X5YZ
+    re.compile(r'^Name=(.+?)\s*$', re.MULTILINE),  # Windows：wmic csproduct
+]
+FACTS_SERIAL_PATTERNS = [
+    re.compile(r'System [Ss]erial [Nn]umber\s*:\s*(\S+)'),  # Cisco交换机
+    re.compile(r'Processor [Bb]oard ID\s+(\S+)'),  # Cisco IOS / NX-OS
+    re.compile(r'Serial[- ][Nn]umber\s*:\s*(\S+)'),  # Arista / Fortinet
+    re.compile(r'\bSN:\s*(\S+)'),  # show inventory
+    re.compile(r'ESN of [^:]+:\s*(\S+)'),  # 华为：ESN of slot 0: 2102351931P0C3000154
+    re.compile(r'DEVICE_SERIAL_NUMBER\s*:\s*(\S+)'),  # H3C：display device manuinfo
+    re.compile(r'^Chassis\s+(\S+)\s+\S+', re.MULTILINE),  # Juniper：show chassis hardware
+    re.compile(r'^IdentifyingNumber=(\S+)', re.MULTILINE),  # Windows：wmic csproduct
+]
+# 运行时长文本：uptime is 1 year, 2 weeks, 3 days, 4 hours, 5 minutes / Uptime: 10 days, 3 hours and 5 minutes
+UPTIME_TEXT_PATTERN = re.compile(r'uptime(?: is|:)\s*(.+)', re.IGNORECASE)
+UPTIME_UNIT_PATTERN = re.compile(r'(\d+)\s*(year|week|day|hour|minute|second)', re.IGNORECASE)
+UPTIME_UNIT_SECONDS = {'year': 31536000, 'week': 604800, 'day': 86400, 'hour': 3600, 'minute': 60, 'second': 1}
+# Linux：uname -sr 与 /proc/uptime 的输出
+LINUX_KERNEL_PATTERN = re.compile(r'^(Linux\s+\S+)', re.MULTILINE)  # Linux 5.15.0-91-generic
+LINUX_UPTIME_PATTERN = re.compile(r'^(\d+(?:\.\d+)?)\s+\d+(?:\.\d+)?\s*$', re.MULTILINE)  # 123456.78 234567.89
+WINDOWS_CAPTION_PATTERN = re.compile(r'^Caption=(.+?)\s*$', re.MULTILINE)  # Caption=Microsoft Windows Server 2019 Standard
+WINDOWS_VERSION_PATTERN = re.compile(r'^Version=(\S+)', re.MULTILINE)  # Version=10.0.17763
+
+
+def _first_text(output, patterns):
+    """
+    按顺序尝试多个预编译正则，返回第一个匹配的文本
+    :param output: 命令输出
+    :param patterns: 预编译正则列表
+    :return: 去除首尾空白的文本，全部未匹配返回None
+    """
+    for pattern in patterns:
+        match = pattern.search(output)
+        if match and match.group(1).strip():  # 匹配成功
+            return match.group(1).strip()
+    return None
+
+
+def parse_uptime_seconds(text):
+    """
+    将运行时长文本换算为秒数
+    :param text: 运行时长文本（如：1 year, 2 weeks, 3 days, 4 hours, 5 minutes）
+    :return: 秒数，无法识别返回None
+    """
+    units = UPTIME_UNIT_PATTERN.findall(text or '')
+    if not units:
+        return None
+    return sum(int(value) * UPTIME_UNIT_SECONDS[unit.lower()] for value, unit in units)
+
+
+@registry.register(['huawei', 'h3c'], 'version', 'display version')
+@registry.register(['fortinet'], 'version', 'get system status')
+@registry.register([ParserRegistry.DEFAULT_VENDOR], 'version', 'show version')
+def parse_version(output):
+    """
+    解析版本信息（display version / show version / get system status）
+    输出格式示例：
+    VRP (R) software, Version 5.170 (S5700 V200R011C10SPC500)
+    HUAWEI S5700-28C-HI Routing Switch uptime is 10 days, 2 hours, 3 minutes
+    或者：
+    Cisco IOS Software, C2960 Software (C2960-LANBASEK9-M), Version 15.0(2)SE4, RELEASE SOFTWARE (fc1)
+    Switch uptime is 1 year, 2 weeks, 3 days, 4 hours, 5 minutes
+    System serial number            : FOC1234X5YZ
+    :return: {'model', 'serial_number', 'version', 'uptime_seconds'}
+    """
+    uptime = UPTIME_TEXT_PATTERN.search(output)
+    return {
+        'model': _first_text(output, FACTS_MODEL_PATTERNS),  # 型号
+        'serial_number': _first_text(output, FACTS_SERIAL_PATTERNS),  # 序列号
+        'version': _first_text(output, FACTS_VERSION_PATTERNS),  # 软件版本
+        'uptime_seconds': parse_uptime_seconds(uptime.group(1)) if uptime else None  # 运行时长（秒）
+    }
+
+
+@registry.register(['linux'], 'version', 'uname -sr; cat /proc/uptime')
+def parse_linux_version(output):
+    """
+    解析Linux内核版本和运行时长
+    输出格式示例：
+    Linux 5.15.0-91-generic
+    123456.78 234567.89
+    """
+    uptime = LINUX_UPTIME_PATTERN.search(output)
+    return {
+        'model': None,
+        'serial_number': None,
+        'version': _first_text(output, [LINUX_KERNEL_PATTERN]),
+        'uptime_seconds': int(float(uptime.group(1))) if uptime else None
+    }
+
+
+@registry.register(['windows'], 'version', 'wmic os get Caption,Version /value')
+def parse_windows_version(output):
+    """
+    解析Windows系统版本
+    输出格式示例：
+    Caption=Microsoft Windows Server 2019 Standard
+    Version=10.0.17763
+    """
+    caption = _first_text(output, [WINDOWS_CAPTION_PATTERN])
+    version = _first_text(output, [WINDOWS_VERSION_PATTERN])
+    return {
+        'model': None,
+        'serial_number': None,
+        'version': ' '.join(part for part in (caption, version) if part) or None,
+        'uptime_seconds': None
+    }
+
+
+@registry.register(['huawei'], 'inventory', 'display esn')
+@registry.register(['h3c'], 'inventory', 'display device manuinfo')
+@registry.register(['cisco_ios', 'cisco_nxos'], 'inventory', 'show inventory')
+@registry.register(['juniper'], 'inventory', 'show chassis hardware')
+@registry.register(['windows'], 'inventory', 'wmic csproduct get Name,IdentifyingNumber /value')
+def parse_inventory(output):
+    """
+    解析硬件清单（第一条记录为机框/整机）
+    输出格式示例：
+    NAME: "1", DESCR: "WS-C2960-24TT-L"
+    PID: WS-C2960-24TT-L   , VID: V02  , SN: FOC1234X5YZ
+    :return: {'model', 'serial_number'}
+    """
+    return {
+        'model': _first_text(output, FACTS_MODEL_PATTERNS),  # 型号
+        'serial_number': _first_text(output, FACTS_SERIAL_PATTERNS)  # 序列号
+    }
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+自适应轮询调度模块
+负责按设备"活跃程度"安排指标采集：指标变化快或接近阈值时加密轮询，
+不可达设备指数退避，并按全局SSH会话速率预算限流
+"""
+
+import heapq  # 堆（按到期时间排序）
+import logging  # 日志
+import threading  # 线程锁、后台线程
+import time  # 时间处理
+from concurrent.futures import ThreadPoolExecutor  # 采集线程池
+
+
+logger = logging.getLogger(__name__)  # 模块日志
+
+
+class TokenBucket:
+    """令牌桶：限制每秒新建的SSH会话数"""
+
+    def __init__(self, rate, burst=None):
+        """
+        初始化令牌桶
+        :param rate: 每秒补充的令牌数
+        :param burst: 桶容量（允许的突发数），默认等于rate
+        """
+        self.rate = rate  # 补充速率
+        self.capacity = burst or max(1, rate)  # 桶容量
+        self._tokens = self.capacity  # 当前令牌数
+        self._updated = time.monotonic()  # 上次补充时间
+
+    def take(self):
+        """
+        尝试取一个令牌
+        :return: True表示取到，False表示预算已用完
+        """
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)  # 按时间补充
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+
+class PollScheduler:
+    """自适应轮询调度类：为每台设备维护下次采集时间，后台线程按预算派发采集任务"""
+
+    # 参与变化判断的指标
+    METRICS = ('cpu', 'memory', 'temperature')
+
+    def __init__(self, collect, get_devices, is_reachable=None, base_interval=60, min_interval=15,
+                 max_interval=900, change_threshold=10, thresholds=None, sessions_per_second=5, max_workers=16,
+                 owns=None):
+        """
+        初始化调度器
+        :param collect: 采集函数 collect(device) -> 监控结果字典（status为online表示成功）
+        :param get_devices: 返回设备列表的函数
+        :param is_reachable: 可达性判断函数 is_reachable(device_id) -> bool，None表示总是尝试采集
+        :param base_interval: 指标平稳时的采集间隔（秒）
+        :param min_interval: 指标变化或接近阈值时的采集间隔（秒）
+        :param max_interval: 不可达设备退避的最大间隔（秒）
+        :param change_threshold: 两次采集间指标变化超过该值（百分点/摄氏度）视为活跃
+        :param thresholds: 各指标告警阈值 {指标: 阈值}（取自告警规则），达到阈值的90%视为接近阈值；
+                           None表示只按指标变化判断
+        :param sessions_per_second: 全局每秒新建SSH会话上限
+        :param max_workers: 并发采集线程数
+        :param owns: 归属判断函数 owns(device_id) -> bool，返回False的设备由其他采集节点采集并通过record写入结果，
+                     None表示全部由本调度器采集
+        """
+        self.collect = collect  # 采集函数
+        self.get_devices = get_devices  # 设备列表函数
+        self.is_reachable = is_reachable  # 可达性判断函数
+        self.owns = owns  # 归属判断函数
+        self.base_interval = base_interval  # 平稳间隔
+        self.min_interval = min_interval  # 活跃间隔
+        self.max_interval = max_interval  # 退避上限
+        self.change_threshold = change_threshold  # 变化阈值
+        self.thresholds = thresholds or {}  # 告警阈值（告警规则修改后由调用方更新）
+        self.budget = TokenBucket(sessions_per_second)  # SSH会话预算
+        self.max_workers = max_workers  # 并发采集线程数
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)  # 采集线程池
+        self._schedule = {}  # {设备ID: 调度信息字典}
+        self._queue = []  # 到期堆 [(到期时间, 设备ID)]
+        self._results = {}  # {设备ID: 最近一次采集结果}
+        self._running = set()  # 正在采集的设备ID
+        self._lock = threading.Lock()  # 锁
+        self._thread = None  # 调度线程
+
+    def _entry(self, device_id):
+        """
+        获取（或创建）设备调度信息
+        :param device_id: 设备ID
+        :return: 调度信息字典
+        """
+        entry = self._schedule.get(device_id)
+        if entry is None:
+            entry = {
+                'interval': self.min_interval,  # 当前采集间隔
+                'next_due': 0,  # 下次采集时间（0表示立即）
+                'failures': 0,  # 连续不可达/失败次数
+                'reason': 'new',  # 当前间隔的原因
+                'last_poll': None  # 最近采集时间
+            }
+            self._schedule[device_id] = entry
+            heapq.heappush(self._queue, (0, device_id))
+        return entry
+
+    def _reschedule(self, device_id, interval, reason, now):
+        """
+        设置设备下次采集时间
+        :param device_id: 设备ID
+        :param interval: 采集间隔（秒）
+        :param reason: 间隔原因（active / stable / backoff / remote）
+        :param now: 当前时间（秒）
+        """
+        entry = self._entry(device_id)
+        entry['interval'] = interval
+        entry['reason'] = reason
+        entry['next_due'] = now + interval
+        heapq.heappush(self._queue, (entry['next_due'], device_id))  # 旧条目出堆时按next_due识别并丢弃
+
+    def _backoff_interval(self, failures):
+        """
+        计算不可达设备的退避间隔
+        :param failures: 连续失败次数
+        :return: 间隔（秒）
+        """
+        return min(self.max_interval, self.base_interval * 2 ** max(0, failures - 1))
+
+    def _is_active(self, previous, current):
+        """
+        判断设备指标是否活跃（变化明显或接近阈值）
+        :param previous: 上次采集结果
+        :param current: 本次采集结果
+        :return: True表示需要加密轮询
+        """
+        for metric in self.METRICS:
+            value = current.get(metric)
+            if not isinstance(value, (int, float)):
+                continue
+            threshold = self.thresholds.get(metric)
+            if threshold is not None and value >= threshold * 0.9:  # 接近或超过阈值
+                return True
+            last = (previous or {}).get(metric)
+            if isinstance(last, (int, float)) and abs(value - last) >= self.change_threshold:  # 变化明显
+                return True
+        return False
+
+    def record(self, device_id, result, now=None):
+        """
+        写入一次采集结果并按结果调整下次采集时间（调度线程和手动采集共用）
+        :param device_id: 设备ID
+        :param result: 监控结果字典
+        :param now: 采集时间（秒），默认当前时间
+        """
+        now = now or time.time()
+        with self._lock:
+            entry = self._entry(device_id)
+            entry['last_poll'] = now
+            if result and result.get('status') == 'online':  # 采集成功
+                entry['failures'] = 0
+                active = self._is_active(self._results.get(device_id), result)
+                self._results[device_id] = {key: value for key, value in result.items()
+                                            if key != 'interfaces'}  # 接口表由InterfaceStore保存
+                self._results[device_id]['timestamp'] = now
+                if active:
+                    self._reschedule(device_id, self.min_interval, 'active', now)
+                else:
+                    self._reschedule(device_id, self.base_interval, 'stable', now)
+            else:  # 采集失败，指数退避
+                entry['failures'] += 1
+                self._reschedule(device_id, self._backoff_interval(entry['failures']), 'backoff', now)
+
+    def _run_collect(self, device):
+        """
+        执行一次采集（在线程池中运行）
+        :param device: 设备信息字典
+        """
+        try:
+            result = self.collect(device)
+        except Exception as e:  # 异常处理
+            logger.exception("采集设备%s失败: %s", device['ip'], e, extra={'device': device['ip']})
+            result = None
+        self.record(device['id'], result)
+        with self._lock:
+            self._running.discard(device['id'])
+
+    def tick(self, now=None):
+        """
+        派发所有到期设备的采集任务（受SSH会话预算限制，未派发的留到下次）
+        :param now: 当前时间（秒），默认当前时间
+        :return: 本次派发的设备数
+        """
+        now = now or time.time()
+        devices = {device['id']: device for device in self.get_devices()}
+        dispatched = 0
+        with self._lock:
+            for device_id in devices:  # 新设备立即进入调度
+                self._entry(device_id)
+            for device_id in list(self._schedule):  # 已删除的设备移出调度
+                if device_id not in devices:
+                    self._schedule.pop(device_id)
+                    self._results.pop(device_id, None)
+
+            deferred = []
+            while self._queue and self._queue[0][0] <= now:
+                due, device_id = heapq.heappop(self._queue)
+                entry = self._schedule.get(device_id)
+                if entry is None or entry['next_due'] != due or device_id in self._running:
+                    continue  # 过期堆条目或正在采集
+                if self.owns and not self.owns(device_id):  # 由其他采集节点负责，节点退出后再接管
+                    self._reschedule(device_id, self.min_interval, 'remote', now)
+                    continue
+                if self.is_reachable and not self.is_reachable(device_id):  # 不可达，不占用SSH会话
+                    entry['failures'] += 1
+                    self._reschedule(device_id, self._backoff_interval(entry['failures']), 'backoff', now)
+                    continue
+                if not self.budget.take():  # 本秒预算已用完
+                    deferred.append((due, device_id))
+                    break
+                self._running.add(device_id)
+                self._executor.submit(self._run_collect, devices[device_id])
+                dispatched += 1
+            for item in deferred:
+                heapq.heappush(self._queue, item)
+        return dispatched
+
+    def request(self, device_id):
+        """
+        请求尽快采集某台设备（例如用户打开了页面）
+        :param device_id: 设备ID
+        """
+        with self._lock:
+            entry = self._entry(device_id)
+            if entry['next_due'] > time.time():
+                entry['next_due'] = 0
+                heapq.heappush(self._queue, (0, device_id))
+
+    def get_result(self, device_id):
+        """
+        获取设备最近一次采集结果
+        :param device_id: 设备ID
+        :return: 监控结果字典，未采集返回None
+        """
+        return self._results.get(device_id)
+
+    def get_schedule(self):
+        """
+        获取全部设备的调度信息
+        :return: {设备ID: 调度信息字典}
+        """
+        with self._lock:
+            return {device_id: dict(entry, running=device_id in self._running)
+                    for device_id, entry in self._schedule.items()}
+
+    def get_stats(self):
+        """
+        获取调度统计
+        :return: {'devices': 调度中的设备数, 'due': 已到期未派发数, 'running': 正在采集数, 'workers': 采集线程数}
+        """
+        now = time.time()
+        with self._lock:
+            return {
+                'devices': len(self._schedule),
+                'due': sum(1 for device_id, entry in self._schedule.items()
+                           if entry['next_due'] <= now and device_id not in self._running),
+                'running': len(self._running),
+                'workers': self.max_workers
+            }
+
+    def remove(self, device_id):
+        """
+        删除设备的调度信息和采集结果
+        :param device_id: 设备ID
+        """
+        with self._lock:
+            self._schedule.pop(device_id, None)
+            self._results.pop(device_id, None)
+
+    def start(self, tick_interval=1):
+        """
+        启动后台调度线程
+        :param tick_interval: 调度检查间隔（秒）
+        """
+        if self._thread and self._thread.is_alive():  # 已启动
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.tick()
+                except Exception as e:  # 异常处理，保证线程不退出
+                    logger.exception("轮询调度失败: %s", e)
+                time.sleep(tick_interval)
+
+        self._thread = threading.Thread(target=loop, daemon=True)
+        self._thread.start()
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+设备可达性检测模块
+负责并发探测设备SSH端口（非阻塞TCP连接），维护带抖动抑制的在线/离线状态
+"""
+
+import asyncio  # 异步IO（并发探测）
+import logging  # 日志
+import math  # 数学计算（惩罚值衰减）
+import socket  # 同步探测
+import threading  # 线程锁、后台线程
+import time  # 时间处理
+
+try:
+    import resource  # 文件描述符上限（仅Unix）
+except ImportError:  # Windows
+    resource = None
+
+from .tracing import tracer  # 链路追踪
+
+
+logger = logging.getLogger(__name__)  # 模块日志
+
+
+# 为SSH会话、数据库、日志和HTTP连接保留的文件描述符数
+RESERVED_FDS = 256
+# 并发探测数上下限
+MIN_CONCURRENCY = 64
+MAX_CONCURRENCY = 4096
+# 无法读取文件描述符上限时（Windows）的并发探测数
+DEFAULT_CONCURRENCY = 256
+
+
+def default_concurrency():
+    """
+    按进程文件描述符上限计算并发探测数（软上限低于硬上限时先尝试提高软上限）
+    :return: 并发探测数
+    """
+    if resource is None:
+        return DEFAULT_CONCURRENCY
+    try:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        wanted = MAX_CONCURRENCY + RESERVED_FDS
+        if soft != resource.RLIM_INFINITY and soft < wanted and (hard == resource.RLIM_INFINITY or hard > soft):
+            soft = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    except (ValueError, OSError) as e:  # 无权限提高上限时沿用当前软上限
+        logger.debug("提高文件描述符上限失败: %s", e)
+        soft = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+    if soft == resource.RLIM_INFINITY:
+        return MAX_CONCURRENCY
+    return max(MIN_CONCURRENCY, min(soft - RESERVED_FDS, MAX_CONCURRENCY))
+
+
+def check_port(host, port=22, timeout=2):
+    """
+    同步探测TCP端口是否可连接
+    :param host: 主机地址
+    :param port: 端口
+    :param timeout: 超时时间（秒）
+    :return: (是否可达, 连接耗时毫秒)
+    """
+    start = time.monotonic()
+    try:
+        with socket.create_connection((host, int(port)), timeout=timeout):
+            return True, round((time.monotonic() - start) * 1000, 2)
+    except (OSError, ValueError):  # 拒绝连接、超时、地址无效
+        return False, None
+
+
+async def _probe(host, port, timeout, semaphore):
+    """
+    异步探测TCP端口（只建立连接，不做SSH握手）
+    :param host: 主机地址
+    :param port: 端口
+    :param timeout: 超时时间（秒）
+    :param semaphore: 并发上限信号量
+    :return: (是否可达, 连接耗时毫秒)
+    """
+    async with semaphore:
+        start = time.monotonic()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, int(port)), timeout)
+        except (OSError, ValueError, asyncio.TimeoutError):  # 拒绝连接、超时、地址无效
+            return False, None
+        rtt = round((time.monotonic() - start) * 1000, 2)
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:  # 对端已重置连接
+            pass
+        return True, rtt
+
+
+class ReachabilityMonitor:
+    """可达性监控类：并发扫描设备端口，按连续探测结果和抖动惩罚值决定对外状态"""
+
+    def __init__(self, timeout=2, concurrency=None, down_threshold=2, up_threshold=1,
+                 flap_penalty=1000, suppress_limit=2500, reuse_limit=750, half_life=300):
+        """
+        初始化可达性监控器
+        :param timeout: 单次探测超时（秒）
+        :param concurrency: 同时进行的探测数上限，默认按进程文件描述符上限计算
+        :param down_threshold: 连续失败多少次判定为离线
+        :param up_threshold: 连续成功多少次判定为在线
+        :param flap_penalty: 每次状态翻转累加的惩罚值
+        :param suppress_limit: 惩罚值超过该值时抑制状态变化（判定为抖动）
+        :param reuse_limit: 惩罚值衰减到该值以下时解除抑制
+        :param half_life: 惩罚值半衰期（秒）
+        """
+        self.timeout = timeout  # 探测超时
+        self.concurrency = concurrency or default_concurrency()  # 并发上限
+        self.down_threshold = down_threshold  # 离线判定阈值
+        self.up_threshold = up_threshold  # 在线判定阈值
+        self.flap_penalty = flap_penalty  # 翻转惩罚值
+        self.suppress_limit = suppress_limit  # 抑制阈值
+        self.reuse_limit = reuse_limit  # 解除抑制阈值
+        self.half_life = half_life  # 半衰期
+        self._states = {}  # {设备ID: 状态字典}
+        self._listeners = []  # 对外状态变化监听函数（如分组汇总）
+        self._lock = threading.Lock()  # 锁
+        self._thread = None  # 后台扫描线程
+
+    def _new_state(self):
+        """
+        创建初始状态
+        :return: 状态字典
+        """
+        return {
+            'status': 'unknown',  # 对外状态（online / offline / unknown）
+            'raw_status': 'unknown',  # 未经抖动抑制的状态
+            'last_change': None,  # 对外状态最近变化时间
+            'last_check': None,  # 最近探测时间
+            'rtt_ms': None,  # 最近一次连接耗时（毫秒）
+            'successes': 0,  # 连续成功次数
+            'failures': 0,  # 连续失败次数
+            'penalty': 0.0,  # 抖动惩罚值
+            'penalty_time': None,  # 惩罚值更新时间
+            'flapping': False  # 是否处于抖动抑制
+        }
+
+    def _apply(self, device_id, reachable, rtt, now):
+        """
+        写入一次探测结果并更新对外状态
+        :param device_id: 设备ID
+        :param reachable: 本次是否可达
+        :param rtt: 连接耗时（毫秒）
+        :param now: 探测时间（秒）
+        :return: 对外状态是否变化
+        """
+        state = self._states.setdefault(device_id, self._new_state())
+        state['last_check'] = now
+        state['rtt_ms'] = rtt
+        if reachable:
+            state['successes'] += 1
+            state['failures'] = 0
+        else:
+            state['failures'] += 1
+            state['successes'] = 0
+
+        if state['raw_status'] == 'unknown':  # 首次探测直接采用结果
+            target = 'online' if reachable else 'offline'
+        elif state['successes'] >= self.up_threshold:
+            target = 'online'
+        elif state['failures'] >= self.down_threshold:
+            target = 'offline'
+        else:  # 未达到连续次数，保持原状态
+            target = state['raw_status']
+
+        if state['penalty_time'] is not None:  # 惩罚值按半衰期指数衰减
+            elapsed = now - state['penalty_time']
+            state['penalty'] *= math.exp(-math.log(2) * elapsed / self.half_life)
+        state['penalty_time'] = now
+        if target != state['raw_status']:  # 未抑制状态发生翻转
+            if state['raw_status'] != 'unknown':  # 真实翻转才计入惩罚
+                state['penalty'] += self.flap_penalty
+            state['raw_status'] = target
+        if state['penalty'] > self.suppress_limit:  # 翻转过于频繁，开始抑制
+            state['flapping'] = True
+        elif state['penalty'] < self.reuse_limit:  # 衰减到位，解除抑制
+            state['flapping'] = False
+
+        if not state['flapping'] and state['status'] != target:  # 抖动期间保持上一个稳定状态
+            state['status'] = target
+            state['last_change'] = now
+            return True
+        return False
+
+    def add_listener(self, listener):
+        """
+        注册对外状态变化监听函数
+        :param listener: 函数 listener(device_id, status)
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, changes):
+        """
+        在锁外通知状态变化
+        :param changes: [(设备ID, 新状态), ...]
+        """
+        for device_id, status in changes:
+            for listener in self._listeners:
+                try:
+                    listener(device_id, status)
+                except Exception as e:  # 监听函数异常不影响探测
+                    logger.exception("可达性状态变化处理失败: %s", e)
+
+    def sweep(self, devices):
+        """
+        并发探测一组设备
+        最坏情况（全部不可达）耗时约为 ⌈设备数/并发上限⌉ × 超时时间，而非设备数×超时时间；
+        并发上限按文件描述符上限计算（通常为4096），因此数千台设备的扫描也只需一两个超时时间
+        :param devices: 设备信息字典列表
+        :return: {设备ID: 状态字典}
+        """
+        if not devices:
+            return {}
+
+        async def run():
+            semaphore = asyncio.Semaphore(self.concurrency)
+            return await asyncio.gather(*(
+                _probe(device['ip'], device.get('port', 22), self.timeout, semaphore) for device in devices
+            ))
+
+        results = asyncio.run(run())  # 在当前线程中运行独立事件循环
+        now = time.time()
+        with self._lock:
+            changes = [(device['id'], self._states[device['id']]['status']) for device, (reachable, rtt)
+                       in zip(devices, results) if self._apply(device['id'], reachable, rtt, now)]
+        self._notify(changes)
+        return self.get_states([device['id'] for device in devices])
+
+    def check(self, device):
+        """
+        同步探测单台设备并更新状态
+        :param device: 设备信息字典
+        :return: 状态字典
+        """
+        with tracer.span('reachability.check', device=device['ip']) as span:
+            reachable, rtt = check_port(device['ip'], device.get('port', 22), self.timeout)
+            span.set(reachable=reachable)
+        with self._lock:
+            changes = [(device['id'], self._states[device['id']]['status'])] \
+                if self._apply(device['id'], reachable, rtt, time.time()) else []
+        self._notify(changes)
+        return self.get_state(device['id'])
+
+    def refresh(self, devices, max_age=30):
+        """
+        只探测状态过期（或从未探测）的设备
+        :param devices: 设备信息字典列表
+        :param max_age: 状态有效期（秒）
+        :return: {设备ID: 状态字典}（包含全部传入设备）
+        """
+        now = time.time()
+        with self._lock:
+            stale = [device for device in devices
+                     if (self._states.get(device['id']) or {}).get('last_check') is None
+                     or now - self._states[device['id']]['last_check'] > max_age]
+        if stale:
+            self.sweep(stale)
+        return self.get_states([device['id'] for device in devices])
+
+    def get_state(self, device_id):
+        """
+        获取设备可达性状态
+        :param device_id: 设备ID
+        :return: 状态字典副本
+        """
+        with self._lock:
+            state = self._states.get(device_id)
+            return dict(state) if state else self._new_state()
+
+    def get_states(self, device_ids=None):
+        """
+        批量获取设备可达性状态
+        :param device_ids: 设备ID列表，None表示全部
+        :return: {设备ID: 状态字典}
+        """
+        with self._lock:
+            ids = list(self._states) if device_ids is None else device_ids
+            return {device_id: dict(self._states[device_id]) if device_id in self._states else self._new_state()
+                    for device_id in ids}
+
+    def remove(self, device_id):
+        """
+        删除设备状态
+        :param device_id: 设备ID
+        """
+        with self._lock:
+            self._states.pop(device_id, None)
+
+    def start(self, get_devices, interval=30):
+        """
+        启动后台周期扫描线程
+        :param get_devices: 返回设备列表的函数
+        :param interval: 扫描间隔（秒）
+        """
+        if self._thread and self._thread.is_alive():  # 已启动
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.sweep(get_devices())
+                except Exception as e:  # 异常处理，保证线程不退出
+                    logger.exception("可达性扫描失败: %s", e)
+                time.sleep(interval)
+
+        self._thread = threading.Thread(target=loop, daemon=True)
+        self._thread.start()
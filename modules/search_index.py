@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+全文检索模块
+负责为巡检文件和AI分析报告建立全文索引（SQLite FTS5），支持全网设备关键字检索
+"""
+
+import logging  # 日志
+import os  # 文件操作
+import re  # 正则表达式
+import sqlite3  # SQLite数据库（Python内置）
+import threading  # 线程锁
+
+
+logger = logging.getLogger(__name__)  # 模块日志
+
+
+# 巡检文件中命令回显行的匹配模式（如：<HUAWEI>display version、Switch#show version）
+COMMAND_ECHO_PATTERN = re.compile(r'^\s*[<\[]?[\w\-.:/()@~]+[>\]#$]\s*(\S.*)$')
+# 分析报告中Markdown标题行的匹配模式（如：## 1. 性能分析）
+HEADING_PATTERN = re.compile(r'^\s*#{1,6}\s+(.+?)\s*$')
+# 文件头中的设备信息匹配模式
+DEVICE_IP_PATTERN = re.compile(r'^设备IP:\s*(\S+)', re.MULTILINE)  # 设备IP
+HOSTNAME_PATTERN = re.compile(r'^主机名:\s*(\S+)', re.MULTILINE)  # 主机名
+SOURCE_FILE_PATTERN = re.compile(r'^原始巡检文件:\s*(\S+)', re.MULTILINE)  # 分析报告对应的巡检文件
+
+
+class SearchIndex:
+    """全文检索索引类，按"文件-章节"粒度索引巡检文件和分析报告"""
+
+    def __init__(self, db_file='outputs/search_index.db'):
+        """
+        初始化全文检索索引
+        :param db_file: 索引数据库文件路径
+        """
+        self.db_file = db_file  # 索引数据库路径
+        self._lock = threading.Lock()  # 数据库访问锁（多线程写入巡检结果时使用）
+        self.tokenizer = None  # 实际使用的分词器（trigram / unicode61 / None表示不支持FTS5）
+        self._conn = None  # 数据库连接
+        self._ensure_database()  # 确保数据库和表存在
+
+    def _ensure_database(self):
+        """确保索引数据库存在，并优先使用支持中文子串检索的trigram分词器"""
+        os.makedirs(os.path.dirname(self.db_file) or '.', exist_ok=True)  # 创建目录
+        self._conn = sqlite3.connect(self.db_file, check_same_thread=False)  # 允许跨线程使用（由锁保护）
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS documents ('
+            'path TEXT PRIMARY KEY, file_type TEXT, filename TEXT, '
+            'device_name TEXT, device_ip TEXT, mtime REAL, size INTEGER)'
+        )  # 文件元数据表（用于增量同步）
+
+        # 已存在的索引表沿用建表时的分词器
+        row = self._conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'sections'"
+        ).fetchone()
+        if row:  # 索引表已存在
+            sql = row[0] or ''
+            if 'fts5' not in sql.lower():
+                self.tokenizer = None  # 普通表（当前SQLite不支持FTS5）
+            elif 'trigram' in sql:
+                self.tokenizer = 'trigram'
+            else:
+                self.tokenizer = 'unicode61'
+            return
+
+        # 依次尝试trigram分词器（SQLite 3.34+）、unicode61分词器，最后退化为普通表
+        for tokenizer in ('trigram', 'unicode61'):
+            try:
+                self._conn.execute(
+                    'CREATE VIRTUAL TABLE sections USING fts5('
+                    'path UNINDEXED, file_type UNINDEXED, filename UNINDEXED, '
+                    'device_name, device_ip, section, content, '
+                    f"tokenize = '{tokenizer}')"
+                )
+                self.tokenizer = tokenizer  # 记录分词器
+                break
+            except sqlite3.OperationalError:  # 当前SQLite不支持该分词器
+                continue
+        else:
+            self._conn.execute(
+                'CREATE TABLE sections (path TEXT, file_type TEXT, filename TEXT, '
+                'device_name TEXT, device_ip TEXT, section TEXT, content TEXT)'
+            )  # 普通表，使用子串匹配检索
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_sections_path ON sections(path)')
+            logger.warning("当前SQLite不支持FTS5，全文检索将退化为逐行匹配")
+        self._conn.commit()  # 提交建表
+
+    def index_file(self, filepath, file_type):
+        """
+        索引单个文件（已存在的旧索引会被替换）
+        :param filepath: 文件路径
+        :param file_type: 文件类型（inspection / analysis）
+        :return: True表示成功，False表示失败
+        """
+        try:
+            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:  # 读取文件
+                content = f.read()
+            stat = os.stat(filepath)  # 文件信息
+            filename = os.path.basename(filepath)  # 文件名
+            device_name, device_ip = self._extract_device(content, filename, file_type)  # 设备信息
+            if file_type == 'analysis':  # 分析报告按Markdown标题分节
+                sections = self._split_analysis_sections(content)
+            else:  # 巡检文件按命令回显分节
+                sections = self._split_inspection_sections(content)
+
+            with self._lock:  # 加锁写入
+                self._delete_locked(filepath)  # 删除旧索引
+                self._conn.executemany(
+                    'INSERT INTO sections (path, file_type, filename, device_name, device_ip, section, content) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    [(filepath, file_type, filename, device_name, device_ip, title, body)
+                     for title, body in sections]
+                )  # 批量插入章节
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (filepath, file_type, filename, device_name, device_ip, stat.st_mtime, stat.st_size)
+                )  # 记录文件元数据
+                self._conn.commit()  # 提交事务
+            return True  # 返回成功
+        except Exception as e:  # 异常处理
+            logger.error("索引文件失败 %s: %s", filepath, e)  # 记录错误
+            return False  # 返回失败
+
+    def remove_file(self, filepath):
+        """
+        从索引中删除文件
+        :param filepath: 文件路径
+        """
+        try:
+            with self._lock:  # 加锁删除
+                self._delete_locked(filepath)
+                self._conn.commit()
+        except Exception as e:  # 异常处理
+            logger.error("删除索引失败 %s: %s", filepath, e)  # 记录错误
+
+    def _delete_locked(self, filepath):
+        """删除文件的全部索引记录（调用方需持有锁）"""
+        self._conn.execute('DELETE FROM sections WHERE path = ?', (filepath,))  # 删除章节
+        self._conn.execute('DELETE FROM documents WHERE path = ?', (filepath,))  # 删除元数据
+
+    def sync_directory(self, directory, file_type):
+        """
+        增量同步目录：只索引新增或修改过的文件，并清理已删除文件的索引
+        :param directory: 目录路径
+        :param file_type: 文件类型（inspection / analysis）
+        :return: 本次重新索引的文件数
+        """
+        if not os.path.exists(directory):  # 目录不存在
+            return 0
+
+        with self._lock:  # 读取已索引文件的修改时间
+            indexed = dict(self._conn.execute(
+                'SELECT path, mtime FROM documents WHERE file_type = ?', (file_type,)
+            ).fetchall())
+
+        count = 0  # 重新索引计数
+        seen = set()  # 目录中现存的文件
+        for filename in os.listdir(directory):  # 遍历目录
+            if not filename.endswith('.txt'):  # 只索引txt文件
+                continue
+            filepath = os.path.join(directory, filename)  # 完整路径
+            seen.add(filepath)
+            if indexed.get(filepath) == os.stat(filepath).st_mtime:  # 未修改，跳过
+                continue
+            if self.index_file(filepath, file_type):  # 重新索引
+                count += 1
+
+        for filepath in set(indexed) - seen:  # 清理已删除文件的索引
+            self.remove_file(filepath)
+        return count  # 返回重新索引数
+
+    def search(self, query, file_type=None, limit=50):
+        """
+        全文检索
+        :param query: 检索关键字（多个关键字以空格分隔，需同时命中）
+        :param file_type: 限定文件类型（inspection / analysis），None表示全部
+        :param limit: 最大返回条数
+        :return: 命中结果列表（设备、文件、章节、摘要）
+        """
+        terms = [t for t in (query or '').split() if t]  # 拆分关键字
+        if not terms:  # 空查询
+            return []
+
+        conditions = []  # WHERE条件
+        params = []  # SQL参数
+        if self.tokenizer and all(self._term_matchable(t) for t in terms):
+            # FTS5全文匹配：只匹配正文列，每个关键字作为短语（双引号转义），空格表示AND
+            conditions.append('sections MATCH ?')
+            params.append('content : (' + ' '.join('"' + t.replace('"', '""') + '"' for t in terms) + ')')
+            snippet = "snippet(sections, 6, '[', ']', '...', 48)"  # FTS5摘要（高亮命中）
+            order = 'ORDER BY rank'  # 按相关度排序
+        else:
+            # 关键字过短（trigram至少3个字符）或不支持FTS5时退化为子串匹配
+            for term in terms:
+                conditions.append('instr(lower(content), lower(?)) > 0')
+                params.append(term)
+            snippet = 'content'  # 摘要由Python截取
+            order = ''
+
+        if file_type:  # 限定文件类型
+            conditions.append('file_type = ?')
+            params.append(file_type)
+        params.append(int(limit))  # 返回条数
+
+        sql = (f'SELECT device_name, device_ip, filename, file_type, section, {snippet} '
+               f'FROM sections WHERE {" AND ".join(conditions)} {order} LIMIT ?')
+        with self._lock:  # 加锁查询
+            rows = self._conn.execute(sql, params).fetchall()
+
+        results = []  # 结果列表
+        for device_name, device_ip, filename, ftype, section, text in rows:
+            if snippet == 'content':  # 手动截取摘要
+                text = self._make_snippet(text, terms[0])
+            results.append({
+                'device_name': device_name,  # 设备名称
+                'device_ip': device_ip,  # 设备IP
+                'file': filename,  # 文件名
+                'file_type': ftype,  # 文件类型
+                'section': section,  # 章节
+                'snippet': text  # 命中摘要
+            })
+        return results  # 返回结果
+
+    def get_stats(self):
+        """
+        获取索引统计信息
+        :return: 统计字典
+        """
+        with self._lock:
+            documents = self._conn.execute('SELECT COUNT(*) FROM documents').fetchone()[0]  # 文件数
+            sections = self._conn.execute('SELECT COUNT(*) FROM sections').fetchone()[0]  # 章节数
+        return {'documents': documents, 'sections': sections, 'tokenizer': self.tokenizer}
+
+    def _term_matchable(self, term):
+        """判断关键字能否使用FTS5匹配（trigram分词器要求至少3个字符）"""
+        return self.tokenizer != 'trigram' or len(term) >= 3
+
+    @staticmethod
+    def _make_snippet(text, term, width=60):
+        """
+        截取关键字附近的文本作为摘要
+        :param text: 章节内容
+        :param term: 关键字
+        :param width: 关键字两侧保留的字符数
+        :return: 摘要字符串
+        """
+        pos = text.lower().find(term.lower())  # 关键字位置
+        if pos < 0:
+            return text[:width * 2]
+        start = max(0, pos - width)
+        end = min(len(text), pos + len(term) + width)
+        return ('...' if start > 0 else '') + text[start:pos] + '[' + text[pos:pos + len(term)] + ']' + \
+            text[pos + len(term):end] + ('...' if end < len(text) else '')
+
+    @staticmethod
+    def _extract_device(content, filename, file_type):
+        """
+        从文件头或文件名中提取设备名称和IP
+        :return: (设备名称, 设备IP)
+        """
+        head = content[:2000]  # 只在文件头中查找
+        if file_type == 'analysis':  # 分析报告：从原始巡检文件名中解析
+            match = SOURCE_FILE_PATTERN.search(head)
+            source = match.group(1) if match else filename.replace('AI_Analytics_', '', 1)
+            parts = source[:-4].rsplit('_', 3) if source.endswith('.txt') else []  # hostname_ip_日期_时间
+            if len(parts) == 4:
+                return parts[0], parts[1]
+            return '', ''
+
+        ip_match = DEVICE_IP_PATTERN.search(head)  # 巡检文件：读取文件头
+        name_match = HOSTNAME_PATTERN.search(head)
+        return (name_match.group(1) if name_match else '', ip_match.group(1) if ip_match else '')
+
+    @staticmethod
+    def _split_inspection_sections(content):
+        """
+        按命令回显行拆分巡检文件（每条命令的输出作为一个章节）
+        :return: [(章节名, 内容), ...]
+        """
+        sections = []  # 章节列表
+        title = '文件头'  # 第一个章节为文件头
+        lines = []  # 当前章节内容
+        for line in content.split('\n'):
+            match = COMMAND_ECHO_PATTERN.match(line)
+            if match:  # 遇到新的命令回显
+                if any(l.strip() for l in lines):
+                    sections.append((title, '\n'.join(lines)))
+                title = match.group(1).strip()  # 命令作为章节名
+                lines = []
+            else:
+                lines.append(line)
+        if any(l.strip() for l in lines):  # 最后一个章节
+            sections.append((title, '\n'.join(lines)))
+        return sections or [('全文', content)]
+
+    @staticmethod
+    def _split_analysis_sections(content):
+        """
+        按Markdown标题拆分分析报告
+        :return: [(章节名, 内容), ...]
+        """
+        sections = []  # 章节列表
+        title = '概述'  # 第一个标题前的内容
+        lines = []  # 当前章节内容
+        for line in content.split('\n'):
+            match = HEADING_PATTERN.match(line)
+            if match:  # 遇到新的标题
+                if any(l.strip() for l in lines):
+                    sections.append((title, '\n'.join(lines)))
+                title = match.group(1)  # 标题作为章节名
+                lines = []
+            else:
+                lines.append(line)
+        if any(l.strip() for l in lines):  # 最后一个章节
+            sections.append((title, '\n'.join(lines)))
+        return sections or [('全文', content)]
+
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+分布式采集模块（中心端）
+负责登记独立进程/主机上运行的采集节点（modules/collector_worker.py），按一致性哈希把设备分配给存活的节点，
+节点加入、退出或心跳超时时重新分配（只有受影响的设备会迁移），并解码节点批量上报的压缩结果；
+没有存活节点时全部设备仍由中心进程自己采集
+"""
+
+import bisect  # 哈希环查找
+import gzip  # 批量结果压缩
+import hashlib  # 一致性哈希
+import hmac  # 令牌比较
+import json  # 批量结果序列化
+import logging  # 日志
+import math  # 数值校验
+import threading  # 线程锁
+import time  # 时间处理
+import zlib  # 限长解压
+
+from .metrics import metrics  # 运行指标
+
+
+logger = logging.getLogger(__name__)  # 模块日志
+
+
+# 采集节点访问令牌的环境变量（未设置时不开放采集节点接口）
+TOKEN_ENV = 'NETWORK_MONITOR_COLLECTOR_TOKEN'
+# 采集节点请求头中的令牌字段
+TOKEN_HEADER = 'X-Collector-Token'
+# 每个节点在哈希环上的虚拟节点数（越多分配越均匀）
+VIRTUAL_NODES = 160
+# 心跳间隔（秒，由中心端下发给节点）
+HEARTBEAT_INTERVAL = 5
+# 心跳超时（秒），超过后节点移出哈希环，其设备重新分配
+WORKER_TIMEOUT = 15
+# 解压后的批量结果大小上限（字节）
+MAX_BATCH_BYTES = 64 * 1024 * 1024
+# 分配给节点的设备字段（登录信息在下发前解析为明文用户名和密码）
+ASSIGN_FIELDS = ('id', 'name', 'ip', 'port', 'vendor')
+
+# 采集节点上报的结果数
+RESULTS_RECEIVED = metrics.counter('network_monitor_collector_results_total', '采集节点上报的结果数', ('worker',))
+
+
+def encode_batch(payload):
+    """
+    压缩批量结果
+    :param payload: 可JSON序列化的对象
+    :return: gzip压缩后的字节串
+    """
+    return gzip.compress(json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8'), compresslevel=6)
+
+
+def decode_batch(data, limit=MAX_BATCH_BYTES):
+    """
+    解压批量结果（限制解压后大小，防止压缩炸弹）
+    :param data: gzip压缩的字节串
+    :param limit: 解压后大小上限（字节）
+    :return: 解码后的对象
+    :raises ValueError: 数据无效或超过大小上限
+    """
+    try:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)  # gzip格式
+        raw = decompressor.decompress(data, limit)
+        if decompressor.unconsumed_tail:
+            raise ValueError(f"批量结果解压后超过{limit}字节")
+        return json.loads(raw.decode('utf-8'))
+    except (zlib.error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"批量结果无效: {e}")
+
+
+def validate_batch(batch):
+    """
+    校验批量结果的结构（上报请求来自网络，字段类型不可信）
+    :param batch: 解码后的请求体
+    :return: 结果条目列表
+    :raises ValueError: 结构或字段类型无效
+    """
+    items = batch.get('results') if isinstance(batch, dict) else None
+    if not isinstance(items, list):
+        raise ValueError("results必须是列表")
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('device_id'), str):
+            raise ValueError(f"第{index + 1}条结果格式无效")
+        if item.get('result') is not None and not isinstance(item['result'], dict):
+            raise ValueError(f"第{index + 1}条结果的result必须是对象")
+        for field in ('timestamp', 'duration'):
+            value = item.get(field)
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))
+                                      or not math.isfinite(value)):
+                raise ValueError(f"第{index + 1}条结果的{field}必须是数字")
+    return items
+
+
+def _hash(key):
+    """
+    计算哈希环位置
+    :param key: 字符串
+    :return: 64位整数
+    """
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """一致性哈希环：每个节点对应多个虚拟节点，节点增减时只有相邻区间的键改变归属"""
+
+    def __init__(self, virtual_nodes=VIRTUAL_NODES):
+        """
+        初始化哈希环
+        :param virtual_nodes: 每个节点的虚拟节点数
+        """
+        self.virtual_nodes = virtual_nodes  # 虚拟节点数
+        self.nodes = set()  # 节点集合
+        self._points = []  # 虚拟节点位置（升序）
+        self._owners = []  # 与位置对应的节点
+
+    def _rebuild(self):
+        """重建虚拟节点列表"""
+        ring = sorted((_hash(f"{node}#{index}"), node) for node in self.nodes for index in range(self.virtual_nodes))
+        self._points = [point for point, _ in ring]
+        self._owners = [node for _, node in ring]
+
+    def add(self, node):
+        """
+        加入节点
+        :param node: 节点名称
+        """
+        self.nodes.add(node)
+        self._rebuild()
+
+    def remove(self, node):
+        """
+        移除节点
+        :param node: 节点名称
+        """
+        self.nodes.discard(node)
+        self._rebuild()
+
+    def get(self, key):
+        """
+        查找键所属的节点（顺时针方向的第一个虚拟节点）
+        :param key: 键（设备ID）
+        :return: 节点名称，环为空返回None
+        """
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+
+class CollectorCoordinator:
+    """采集节点协调类：登记节点心跳、维护哈希环和分配版本号，节点按版本号变化重新拉取分配"""
+
+    def __init__(self, token=None, timeout=WORKER_TIMEOUT, virtual_nodes=VIRTUAL_NODES):
+        """
+        初始化协调器
+        :param token: 采集节点访问令牌（为空时不开放采集节点接口，全部设备由中心进程采集）
+        :param timeout: 心跳超时（秒）
+        :param virtual_nodes: 每个节点的虚拟节点数
+        """
+        self.token = token or ''  # 访问令牌
+        self.timeout = timeout  # 心跳超时
+        self.epoch = 0  # 分配版本号（节点或设备变化时加一）
+        self._ring = HashRing(virtual_nodes)  # 哈希环
+        self._workers = {}  # {节点ID: 节点信息字典}
+        self._fingerprint = None  # 影响分配的设备字段指纹
+        self._expired = 0  # 上次检查超时的时间
+        self._lock = threading.Lock()  # 锁
+
+    @property
+    def enabled(self):
+        """是否开放采集节点接口"""
+        return bool(self.token)
+
+    def check_token(self, token):
+        """
+        校验采集节点令牌
+        :param token: 请求头中的令牌
+        :return: True表示有效
+        """
+        return self.enabled and hmac.compare_digest((token or '').encode('utf-8'), self.token.encode('utf-8'))
+
+    def _expire_locked(self, now):
+        """移除心跳超时的节点（调用方持有锁，每秒最多检查一次）"""
+        if now - self._expired < 1:
+            return
+        self._expired = now
+        for worker_id in [worker_id for worker_id, worker in self._workers.items()
+                          if now - worker['last_seen'] > self.timeout]:
+            logger.warning("采集节点心跳超时，重新分配设备: %s", worker_id)
+            self._leave_locked(worker_id)
+
+    def _leave_locked(self, worker_id):
+        """节点移出哈希环（调用方持有锁）"""
+        if self._workers.pop(worker_id, None) is not None:
+            self._ring.remove(worker_id)
+            self.epoch += 1
+
+    def heartbeat(self, worker_id, stats=None):
+        """
+        记录节点心跳（新节点加入哈希环）
+        :param worker_id: 节点ID
+        :param stats: 节点上报的运行统计（调度设备数、正在采集数、待上报结果数等）
+        :return: {'epoch': 分配版本号, 'heartbeat_interval': 心跳间隔}
+        """
+        now = time.time()
+        with self._lock:
+            self._expire_locked(now)
+            worker = self._workers.get(worker_id)
+            if worker is None:  # 新节点（或超时后恢复的节点）
+                worker = self._workers[worker_id] = {'joined': now, 'batches': 0, 'results': 0, 'last_batch': None}
+                self._ring.add(worker_id)
+                self.epoch += 1
+                logger.info("采集节点加入: %s", worker_id)
+            worker['last_seen'] = now
+            worker['stats'] = stats or {}
+            return {'epoch': self.epoch, 'heartbeat_interval': HEARTBEAT_INTERVAL}
+
+    def leave(self, worker_id):
+        """
+        节点主动退出（立即重新分配其设备）
+        :param worker_id: 节点ID
+        """
+        with self._lock:
+            self._leave_locked(worker_id)
+        logger.info("采集节点退出: %s", worker_id)
+
+    def is_registered(self, worker_id):
+        """
+        判断节点是否在哈希环上
+        :param worker_id: 节点ID
+        :return: True表示已登记且未超时
+        """
+        with self._lock:
+            self._expire_locked(time.time())
+            return worker_id in self._workers
+
+    def owner(self, device_id):
+        """
+        查找设备所属的采集节点
+        :param device_id: 设备ID
+        :return: 节点ID，没有存活节点返回None（由中心进程采集）
+        """
+        with self._lock:
+            self._expire_locked(time.time())
+            return self._ring.get(device_id)
+
+    def assignments(self, worker_id, devices, resolve, collect_facts=None):
+        """
+        计算分配给节点的设备
+        :param worker_id: 节点ID
+        :param devices: 完整设备列表
+        :param resolve: 登录信息解析函数 resolve(device) -> (用户名, 密码)
+        :param collect_facts: 设备信息是否到期的判断函数 collect_facts(device) -> bool
+        :return: {'epoch': 分配版本号, 'devices': 设备字典列表}
+        """
+        with self._lock:
+            epoch = self.epoch
+            owned = [device for device in devices if self._ring.get(device['id']) == worker_id]
+        assigned = []
+        for device in owned:
+            item = {field: device[field] for field in ASSIGN_FIELDS if field in device}
+            item['username'], item['password'] = resolve(device)
+            item['collect_facts'] = bool(collect_facts and collect_facts(device))
+            assigned.append(item)
+        return {'epoch': epoch, 'devices': assigned}
+
+    def devices_changed(self, devices):
+        """
+        设备列表保存后调用：影响采集的字段（增删设备、地址、厂商、登录信息）变化时递增分配版本号
+        :param devices: 完整设备列表
+        """
+        fingerprint = hashlib.md5(json.dumps(
+            [[device.get(field) for field in ASSIGN_FIELDS + ('username', 'password', 'credential_id')]
+             for device in devices], default=str).encode('utf-8')).hexdigest()
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                self._fingerprint = fingerprint
+                self.epoch += 1
+
+    def invalidate(self):
+        """分配内容变化但设备列表未变时（如凭据密码修改）通知节点重新拉取"""
+        with self._lock:
+            self.epoch += 1
+
+    def record_batch(self, worker_id, count):
+        """
+        记录一次批量上报
+        :param worker_id: 节点ID
+        :param count: 本批结果数
+        """
+        RESULTS_RECEIVED.inc(worker_id, amount=count)
+        with self._lock:
+            worker = self._workers.get(worker_id)
+            if worker is not None:
+                worker['batches'] += 1
+                worker['results'] += count
+                worker['last_batch'] = time.time()
+
+    def get_workers(self, devices=None):
+        """
+        获取节点列表
+        :param devices: 完整设备列表（提供时统计每个节点分配的设备数）
+        :return: 节点信息字典列表
+        """
+        with self._lock:
+            self._expire_locked(time.time())
+            counts = {}
+            for device in devices or []:
+                owner = self._ring.get(device['id'])
+                counts[owner] = counts.get(owner, 0) + 1
+            return [dict(worker, id=worker_id, assigned=counts.get(worker_id, 0))
+                    for worker_id, worker in sorted(self._workers.items())]
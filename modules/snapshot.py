@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+版本快照模块
+负责为列表类接口（仪表板、设备列表、巡检/分析文件列表）维护带版本号的快照：
+每个条目按内容哈希判断是否变化，变化时记录所在版本，删除的条目保留删除版本，
+使前端可以用ETag做条件请求（未变化返回304），或用 ?since=<版本> 只获取变化的条目
+"""
+
+import hashlib  # 内容哈希
+import json  # 条目序列化
+import threading  # 线程锁
+import time  # 时间处理
+import uuid  # 进程标识
+
+
+# 保留的删除记录数（更早的删除无法增量获取，客户端需要重新拉取全量）
+MAX_TOMBSTONES = 10000
+
+
+def _digest(item):
+    """条目内容哈希（键排序，保证相同内容的哈希一致）"""
+    return hashlib.blake2b(json.dumps(item, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'),
+                           digest_size=8).digest()
+
+
+class VersionedSnapshot:
+    """带版本号的列表快照：内容变化时版本号加一，可按版本号取出变化的条目"""
+
+    def __init__(self, key='id', max_age=0, max_tombstones=MAX_TOMBSTONES):
+        """
+        初始化快照
+        :param key: 条目主键字段
+        :param max_age: 快照复用时间（秒），期间的请求直接使用上次构建的结果（多个页面同时刷新时只构建一次）
+        :param max_tombstones: 保留的删除记录数
+        """
+        self.key = key  # 主键字段
+        self.max_age = max_age  # 快照复用时间
+        self.max_tombstones = max_tombstones  # 删除记录上限
+        self.epoch = uuid.uuid4().hex[:8]  # 进程标识（重启后旧版本号失效）
+        self.version = 0  # 当前版本号
+        self.items = []  # 当前条目（构建顺序）
+        self.meta = {}  # 随快照返回的汇总字段
+        self._entries = {}  # {主键: (内容哈希, 变化版本)}
+        self._tombstones = {}  # {主键: 删除版本}（按删除顺序）
+        self._floor = 0  # 可增量获取的最小版本（更早的删除记录已丢弃）
+        self._built = None  # 上次构建时间
+        self._lock = threading.Lock()  # 保护快照状态
+        self._build_lock = threading.Lock()  # 同一时间只有一个请求构建快照
+
+    @property
+    def tag(self):
+        """当前版本标识（ETag和since参数使用）"""
+        return f"{self.epoch}-{self.version}"
+
+    def refresh(self, build):
+        """
+        构建快照（复用时间内直接使用上次结果）
+        :param build: 构建函数，返回 (条目列表, 汇总字段字典)
+        """
+        with self._build_lock:
+            if self._built is not None and time.monotonic() - self._built < self.max_age:
+                return
+            items, meta = build()
+            self.update(items, meta)
+            self._built = time.monotonic()
+
+    def update(self, items, meta=None):
+        """
+        用最新条目更新快照（内容或汇总字段有变化时版本号加一）
+        :param items: 条目字典列表
+        :param meta: 汇总字段字典
+        :return: 版本标识
+        """
+        meta = meta or {}
+        digests = {item[self.key]: _digest(item) for item in items}
+        with self._lock:
+            changed = [key for key, digest in digests.items()
+                       if key not in self._entries or self._entries[key][0] != digest]
+            removed = [key for key in self._entries if key not in digests]
+            if changed or removed or meta != self.meta:
+                self.version += 1
+                for key in changed:
+                    self._entries[key] = (digests[key], self.version)
+                    self._tombstones.pop(key, None)  # 删除后又重新出现
+                for key in removed:
+                    del self._entries[key]
+                    self._tombstones[key] = self.version
+                while len(self._tombstones) > self.max_tombstones:  # 丢弃最早的删除记录
+                    oldest = next(iter(self._tombstones))
+                    self._floor = max(self._floor, self._tombstones.pop(oldest))
+            self.items = items
+            self.meta = meta
+            return self.tag
+
+    def view(self, since=None):
+        """
+        读取快照（全量，或指定版本之后的变化）
+        :param since: 客户端持有的版本标识，None表示全量
+        :return: {'version': 版本标识, 'full': 是否全量, 'items': 条目列表, 'removed': 删除的主键列表, 'meta': 汇总字段}
+                 版本标识无效（服务重启）或太旧（删除记录已丢弃）时返回全量
+        """
+        epoch, _, number = (since or '').partition('-')
+        with self._lock:
+            view = {'version': self.tag, 'full': True, 'items': self.items, 'removed': [], 'meta': self.meta}
+            if epoch == self.epoch and number.isdigit() and self._floor <= int(number) <= self.version:
+                number = int(number)
+                view['full'] = False
+                view['items'] = [item for item in self.items if self._entries[item[self.key]][1] > number]
+                view['removed'] = [key for key, version in self._tombstones.items() if version > number]
+            return view
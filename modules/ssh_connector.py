@@ -4,15 +4,38 @@ SSH连接模块
 负责通过SSH连接网络设备并执行命令
 """
 
+import logging  # 日志
 import paramiko  # SSH连接库
+import socket  # TCP连接（与SSH握手分开计时）
 import time  # 时间处理
 import re  # 正则表达式
+from contextlib import contextmanager  # 阶段计时上下文
+
+from .metrics import STAGE_SECONDS, STAGE_ERRORS  # 各阶段耗时和失败次数
+from .parsers import normalize_vendor, registry  # 厂商名称标准化、已注册的采集命令（指标标签）
+from .tracing import tracer  # 链路追踪
+
+
+logger = logging.getLogger(__name__)  # 模块日志
+
+
+# 输出末尾的分页提示符（--More--、-- More --、---- More ----、<--- More --->、---(more 25%)---等）
+MORE_PROMPT_PATTERN = re.compile(r'[ \t]*(?:<?-+ ?More ?-+>?|-+\(more[^)]*\)-+)[ \t]*$', re.IGNORECASE)
+# 继续翻页后设备擦除分页提示的光标回退序列（ANSI回退或退格 + 空格覆盖 + 再次回退），位于下一页开头
+PAGER_ERASE_PATTERN = re.compile(r'^(?:\x1b\[\d*D|[\x08\r])+ *(?:\x1b\[\d*D|[\x08\r])*')
 
 
 class SSHConnector:
     """SSH连接器类，用于连接网络设备并执行命令"""
 
-    def __init__(self, host, port, username, password, timeout=10):
+    # 凭据提供者（设备引用凭据ID时由其解密用户名和密码，需提供resolve(device)方法）
+    credential_provider = None
+    # 会话录制器（Shell通道的收发内容写入录制文件，需提供wrap(channel, connector)方法）
+    recorder = None
+    # 会话回放器（不连接网络，从录制文件回放设备输出，需提供open(connector)方法和realtime属性）
+    player = None
+
+    def __init__(self, host, port, username, password, timeout=10, vendor=''):
         """
         初始化SSH连接器
         :param host: 设备IP地址
@@ -20,44 +43,103 @@ class SSHConnector:
         :param username: 登录用户名
         :param password: 登录密码
         :param timeout: 连接超时时间（秒）
+        :param vendor: 设备厂商（写入录制文件，回放时按厂商匹配录制）
         """
         self.host = host  # 设备IP
         self.port = port  # SSH端口
         self.username = username  # 用户名
         self.password = password  # 密码
         self.timeout = timeout  # 超时时间
+        self.vendor = vendor  # 设备厂商
+        self._vendor_label = normalize_vendor(vendor) or 'unknown'  # 指标标签
         self.client = None  # SSH客户端对象
         self.shell = None  # Shell通道对象
 
+    @classmethod
+    def from_device(cls, device, timeout=10):
+        """
+        根据设备信息创建SSH连接器（引用凭据ID的设备由凭据提供者解密登录信息）
+        :param device: 设备信息字典
+        :param timeout: 连接超时时间（秒）
+        :return: SSH连接器
+        """
+        if cls.credential_provider is not None:
+            username, password = cls.credential_provider.resolve(device)
+        else:
+            username, password = device.get('username', ''), device.get('password', '')
+        return cls(host=device['ip'], port=device.get('port', 22), username=username, password=password,
+                   timeout=timeout, vendor=device.get('vendor', ''))
+
+    def _wait(self, seconds):
+        """
+        等待设备输出（零延迟回放时不等待）
+        :param seconds: 等待时间（秒）
+        """
+        if self.player is None or self.player.realtime:
+            time.sleep(seconds)
+
+    @contextmanager
+    def _stage(self, stage):
+        """
+        登录阶段计时（耗时直方图 + 链路跨度，阶段失败时直方图不记录）
+        :param stage: 阶段名称（connect、auth、invoke_shell）
+        """
+        with tracer.span(f'ssh.{stage}'), STAGE_SECONDS.timer(stage, self._vendor_label, ''):
+            yield
+
     def connect(self):
         """
         建立SSH连接
         :return: True表示成功，False表示失败
         """
-        try:
-            self.client = paramiko.SSHClient()  # 创建SSH客户端
-            self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())  # 自动添加主机密钥
-
-            # 连接设备
-            self.client.connect(
-                hostname=self.host,  # 主机地址
-                port=self.port,  # 端口
-                username=self.username,  # 用户名
-                password=self.password,  # 密码
-                timeout=self.timeout,  # 超时时间
-                look_for_keys=False,  # 不使用密钥认证
-                allow_agent=False  # 不使用SSH代理
-            )
-
-            # 打开Shell通道（用于交互式命令执行）
-            self.shell = self.client.invoke_shell()  # 创建Shell通道
-            time.sleep(1)  # 等待Shell初始化
-            self.shell.recv(65535)  # 清空初始输出缓冲区
-
-            return True  # 连接成功
-        except Exception as e:  # 连接失败
-            print(f"SSH连接失败 {self.host}: {e}")  # 打印错误信息
-            return False  # 返回失败
+        with tracer.span('ssh.login', device=self.host, vendor=self._vendor_label) as span:  # SSH登录跨度
+            stage = 'connect'  # 当前阶段（失败时计入该阶段）
+            try:
+                if self.player is not None:  # 回放录制的会话，不连接网络
+                    span.set(replay=True)
+                    self.shell = self.player.open(self)
+                    self._wait(1)  # 等待Shell初始化
+                    self.shell.recv(65535)  # 清空初始输出缓冲区
+                    return True
+
+                with self._stage('connect'):
+                    sock = socket.create_connection((self.host, self.port), timeout=self.timeout)  # TCP连接
+
+                stage = 'auth'
+                with self._stage('auth'):
+                    self.client = paramiko.SSHClient()  # 创建SSH客户端
+                    self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())  # 自动添加主机密钥
+
+                    # SSH握手和认证（使用已建立的TCP连接）
+                    self.client.connect(
+                        hostname=self.host,  # 主机地址
+                        port=self.port,  # 端口
+                        username=self.username,  # 用户名
+                        password=self.password,  # 密码
+                        timeout=self.timeout,  # 超时时间
+                        sock=sock,  # 已建立的TCP连接
+                        look_for_keys=False,  # 不使用密钥认证
+                        allow_agent=False  # 不使用SSH代理
+                    )
+
+                stage = 'invoke_shell'
+                with self._stage('invoke_shell'):
+                    # 打开Shell通道（用于交互式命令执行）
+                    self.shell = self.client.invoke_shell()  # 创建Shell通道
+                    if self.recorder is not None:  # 录制模式：记录通道的原始收发内容
+                        self.shell = self.recorder.wrap(self.shell, self)
+                    self._wait(1)  # 等待Shell初始化
+                    self.shell.recv(65535)  # 清空初始输出缓冲区
+
+                return True  # 连接成功
+            except Exception as e:  # 连接失败
+                STAGE_ERRORS.inc(stage, self._vendor_label)  # 记录失败阶段
+                span.fail(e)
+                if self.client:  # 关闭握手或认证失败后残留的连接
+                    self.client.close()
+                logger.warning("SSH连接失败 %s: %s", self.host, e,
+                               extra={'device': self.host, 'vendor': self._vendor_label, 'stage': stage})  # 记录错误信息
+                return False  # 返回失败
 
     def execute_command(self, command, wait_time=2, max_pages=100):
         """
@@ -70,52 +152,60 @@ class SSHConnector:
         if not self.shell:  # 如果Shell未连接
             return None  # 返回None
 
-        try:
-            self.shell.send(command + '\n')  # 发送命令（添加换行符）
-            time.sleep(wait_time)  # 等待命令执行
-
-            output = ""  # 初始化输出
-            page_count = 0  # 分页计数器
-
-            while page_count < max_pages:  # 循环读取，最多读取max_pages次
-                # 接收输出
-                chunk = self.shell.recv(65535).decode('utf-8', errors='ignore')
-                output += chunk  # 追加输出
-
-                # 检查是否有分页提示符（--More--, -- More --等）
-                # 常见的分页提示符：--More--、-- More --、<--- More --->、---- More ----等
-                more_patterns = [
-                    '--More--', '-- More --',
-                    '<--- More --->', '---- More ----',
-                    '-- More--', '--More --',
-                    'More', 'more'
-                ]
-
-                has_more = False
-                for pattern in more_patterns:
-                    if pattern in output[-100:]:  # 只检查最后100个字符
-                        has_more = True
-                        break
-
-                if has_more:  # 如果有分页提示
-                    page_count += 1  # 增加分页计数
-                    self.shell.send(b' ')  # 发送空格继续显示
-                    time.sleep(0.3)  # 短暂等待
-                    # 清除分页提示符（避免在最终输出中出现）
-                    for pattern in more_patterns:
-                        output = output.replace(pattern, '')
-                else:
-                    # 没有分页提示，检查是否还有数据
-                    if self.shell.recv_ready():  # 如果还有数据
-                        time.sleep(0.2)  # 短暂等待
-                        continue  # 继续读取
+        with tracer.span('ssh.execute', device=self.host, vendor=self._vendor_label, command=command) as span:
+            # 只有已注册的采集命令作为指标标签；批量下发、AI助手等任意命令归入空标签，避免占满时间序列上限
+            command_label = command if registry.is_known_command(command) else ''
+            try:
+                start = time.perf_counter()  # 命令开始时间
+                page_start = start  # 翻页开始时间
+                self.shell.send(command + '\n')  # 发送命令（添加换行符）
+                self._wait(wait_time)  # 等待命令执行
+
+                output = ""  # 初始化输出
+                page_count = 0  # 分页计数器
+                after_more = False  # 上一次读取以分页提示结束
+
+                while page_count < max_pages:  # 循环读取，最多读取max_pages次
+                    # 接收输出
+                    chunk = self.shell.recv(65535).decode('utf-8', errors='ignore')
+                    if after_more:  # 去除设备擦除分页提示的回退序列，避免残留拼接到下一页第一行
+                        STAGE_SECONDS.observe(time.perf_counter() - page_start, 'page', self._vendor_label, command_label)
+                        chunk = PAGER_ERASE_PATTERN.sub('', chunk, count=1)
+                        after_more = False
+                    output += chunk  # 追加输出
+
+                    # 只在输出末尾匹配分页提示符（正文中出现的More不会误触发翻页）
+                    match = MORE_PROMPT_PATTERN.search(output, max(0, len(output) - 100))
+
+                    if match:  # 如果有分页提示
+                        page_count += 1  # 增加分页计数
+                        output = output[:match.start()]  # 清除分页提示符（避免在最终输出中出现）
+                        page_start = time.perf_counter()  # 翻页开始时间
+                        self.shell.send(b' ')  # 发送空格继续显示
+                        self._wait(0.3)  # 短暂等待
+                        after_more = True
                     else:
-                        break  # 没有数据了，退出循环
+                        # 没有分页提示，检查是否还有数据
+                        if self.shell.recv_ready():  # 如果还有数据
+                            self._wait(0.2)  # 短暂等待
+                            continue  # 继续读取
+                        else:
+                            break  # 没有数据了，退出循环
 
-            return output  # 返回完整命令输出
-        except Exception as e:  # 执行失败
-            print(f"执行命令失败 {command}: {e}")  # 打印错误信息
-            return None  # 返回None
+                duration = time.perf_counter() - start  # 命令耗时
+                STAGE_SECONDS.observe(duration, 'execute', self._vendor_label, command_label)
+                span.set(pages=page_count + 1, chars=len(output))
+                logger.debug("命令执行完成 %s（%d页，%d字符）", command, page_count + 1, len(output),
+                             extra={'device': self.host, 'vendor': self._vendor_label, 'stage': 'execute',
+                                    'command': command, 'duration': round(duration, 4)})  # 轮询热点路径，按位置抽样输出
+                return output  # 返回完整命令输出
+            except Exception as e:  # 执行失败
+                STAGE_ERRORS.inc('execute', self._vendor_label)  # 记录失败
+                span.fail(e)
+                logger.warning("执行命令失败 %s: %s", command, e,
+                               extra={'device': self.host, 'vendor': self._vendor_label, 'stage': 'execute',
+                                      'command': command})  # 记录错误信息
+                return None  # 返回None
 
     def execute_commands(self, commands, wait_time=2):
         """
@@ -149,26 +239,26 @@ class SSHConnector:
             if vendor.lower() in ['huawei', 'h3c']:  # 华为、H3C设备
                 output = self.execute_command('display current-configuration | include sysname', wait_time=1)  # 查询sysname
                 if output:  # 确保output不为None
-                    match = re.search(r'sysname\s+(\S+)', output)  # 正则匹配主机名
+                    match = re.search(r'^\s*sysname[ \t]+(\S+)', output, re.MULTILINE)  # 匹配配置行（跳过命令回显）
                     if match:  # 如果匹配成功
                         return match.group(1)  # 返回主机名
             elif vendor.lower() in ['cisco(ios)', 'cisco(nx-os)']:  # Cisco设备
                 output = self.execute_command('show running-config | include hostname', wait_time=1)  # 查询hostname
                 if output:  # 确保output不为None
-                    match = re.search(r'hostname\s+(\S+)', output)  # 正则匹配主机名
+                    match = re.search(r'^\s*hostname[ \t]+(\S+)', output, re.MULTILINE)  # 匹配配置行（跳过命令回显）
                     if match:  # 如果匹配成功
                         return match.group(1)  # 返回主机名
 
             # 如果上述方法失败，尝试从提示符获取
             self.shell.send(b'\n')  # 发送换行
-            time.sleep(0.5)  # 等待
+            self._wait(0.5)  # 等待
             output = self.shell.recv(1024).decode('utf-8', errors='ignore')  # 接收输出
             # 匹配提示符中的主机名（如：<hostname>或hostname#）
             match = re.search(r'[<\[]?(\S+?)[>\]#]', output)  # 正则匹配
             if match:  # 如果匹配成功
                 return match.group(1)  # 返回主机名
         except Exception as e:  # 获取失败
-            print(f"获取主机名失败: {e}")  # 打印错误
+            logger.warning("获取主机名失败: %s", e, extra={'device': self.host})  # 记录错误
 
         return "unknown"  # 返回未知
 
@@ -180,7 +270,7 @@ class SSHConnector:
             if self.client:  # 如果客户端存在
                 self.client.close()  # 关闭客户端
         except Exception as e:  # 断开失败
-            print(f"断开连接失败: {e}")  # 打印错误
+            logger.warning("断开连接失败: %s", e, extra={'device': self.host})  # 记录错误
 
     def test_connection(self):
         """
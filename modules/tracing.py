@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+"""
+链路追踪模块
+负责记录一次HTTP请求或后台任务内各步骤（可达性探测、SSH登录、命令执行、解析、AI调用）的耗时跨度，
+当前跨度通过contextvars在同一线程的调用链中传递；根跨度结束时由慢请求采样器决定是否导出整条链路，
+导出在后台线程中进行（本地JSON文件或OTLP/HTTP JSON接收端）
+"""
+
+import contextvars  # 当前跨度
+import json  # 导出文件
+import logging  # 日志
+import os  # 文件操作
+import queue  # 导出队列
+import random  # 跨度ID、随机采样
+import threading  # 线程锁、后台线程
+import time  # 时间处理
+from contextlib import contextmanager  # 跨度上下文
+
+import requests  # OTLP导出
+
+from .metrics import metrics  # 运行指标
+
+
+logger = logging.getLogger(__name__)  # 模块日志
+
+# 追踪导出目标环境变量：off关闭；http(s)://开头为OTLP/HTTP接收端（如 http://127.0.0.1:4318/v1/traces）；其他为文件路径
+TRACE_ENV = 'NETWORK_MONITOR_TRACE'
+# 慢请求阈值环境变量（秒），根跨度耗时达到阈值时导出整条链路
+TRACE_SLOW_ENV = 'NETWORK_MONITOR_TRACE_SLOW'
+# 随机采样比例环境变量（0~1），未达到阈值的链路按比例导出
+TRACE_SAMPLE_ENV = 'NETWORK_MONITOR_TRACE_SAMPLE'
+
+# 默认导出文件（每行一条链路）
+DEFAULT_TRACE_FILE = 'outputs/traces/traces.jsonl'
+# 默认慢请求阈值（秒）
+DEFAULT_SLOW_THRESHOLD = 5.0
+# 单条链路最多记录的跨度数（超出的跨度只计数，避免长任务占用内存）
+MAX_SPANS_PER_TRACE = 500
+# 导出队列容量（超出后丢弃链路）
+EXPORT_QUEUE_SIZE = 1000
+# 导出文件超过该大小后轮转为 .1
+MAX_TRACE_FILE_BYTES = 50 * 1024 * 1024
+
+# 已导出和丢弃的链路数
+TRACES_EXPORTED = metrics.counter('network_monitor_traces_exported_total', '已导出的链路数')
+TRACES_DROPPED = metrics.counter('network_monitor_traces_dropped_total', '导出队列已满或导出失败时丢弃的链路数')
+
+
+def _new_id(bits):
+    """生成十六进制ID（链路ID 128位，跨度ID 64位）"""
+    return format(random.getrandbits(bits), f'0{bits // 4}x')
+
+
+class Span:
+    """跨度：一个步骤的名称、耗时、属性和错误信息"""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'attributes', 'start_time', 'duration',
+                 'error', 'is_root', 'slow_threshold', '_start', '_token')
+
+    def __init__(self, name, trace_id, parent_id, attributes, is_root, slow_threshold):
+        self.name = name  # 跨度名称
+        self.trace_id = trace_id  # 链路ID
+        self.span_id = _new_id(64)  # 跨度ID
+        self.parent_id = parent_id  # 父跨度ID（根跨度可以有上游传入的父跨度）
+        self.attributes = attributes  # 属性
+        self.start_time = time.time()  # 开始时间（导出用）
+        self.duration = None  # 耗时（秒）
+        self.error = None  # 错误信息
+        self.is_root = is_root  # 是否为本进程内链路的根跨度
+        self.slow_threshold = slow_threshold  # 根跨度的慢请求阈值（None使用默认值）
+        self._start = time.perf_counter()  # 计时起点
+        self._token = None  # 当前跨度的上下文令牌
+
+    def set(self, **attributes):
+        """设置属性（值为None的属性忽略）"""
+        self.attributes.update((key, value) for key, value in attributes.items() if value is not None)
+
+    def fail(self, error):
+        """标记失败"""
+        self.error = str(error) or type(error).__name__
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': round(self.start_time, 6),
+            'duration': round(self.duration, 6) if self.duration is not None else None,
+            'attributes': self.attributes,
+            'error': self.error
+        }
+
+
+class _NoopSpan:
+    """未启用追踪时返回的空跨度（调用方无需判断）"""
+
+    trace_id = None
+    span_id = None
+
+    def set(self, **attributes):
+        pass
+
+    def fail(self, error):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class FileExporter:
+    """文件导出器：每条链路一行JSON，超过大小上限后轮转"""
+
+    def __init__(self, path=DEFAULT_TRACE_FILE, max_bytes=MAX_TRACE_FILE_BYTES):
+        """
+        :param path: 导出文件路径
+        :param max_bytes: 文件大小上限（字节）
+        """
+        self.path = path  # 导出文件
+        self.max_bytes = max_bytes  # 大小上限
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def export(self, traces):
+        """
+        写入链路
+        :param traces: 链路字典列表
+        """
+        if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+            os.replace(self.path, self.path + '.1')  # 只保留一个历史文件
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for trace in traces:
+                f.write(json.dumps(trace, ensure_ascii=False, default=str) + '\n')
+
+
+def _otlp_value(value):
+    """属性值转为OTLP AnyValue"""
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class OtlpExporter:
+    """OTLP导出器：按OTLP/HTTP JSON格式发送到接收端（OpenTelemetry Collector、Jaeger、Tempo等）"""
+
+    def __init__(self, endpoint, service_name='network_ai_monitor', timeout=5):
+        """
+        :param endpoint: 接收端地址，如 http://127.0.0.1:4318/v1/traces
+        :param service_name: 服务名称
+        :param timeout: 发送超时（秒）
+        """
+        self.endpoint = endpoint  # 接收端地址
+        self.service_name = service_name  # 服务名称
+        self.timeout = timeout  # 超时时间
+
+    def _span(self, trace_id, span):
+        otlp = {
+            'traceId': trace_id,
+            'spanId': span['span_id'],
+            'name': span['name'],
+            'kind': 2 if span['parent_id'] is None else 1,  # 根跨度为SERVER，其余为INTERNAL
+            'startTimeUnixNano': str(int(span['start'] * 1e9)),
+            'endTimeUnixNano': str(int((span['start'] + (span['duration'] or 0)) * 1e9)),
+            'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in span['attributes'].items()],
+            'status': {'code': 2, 'message': span['error']} if span['error'] else {'code': 1}
+        }
+        if span['parent_id']:
+            otlp['parentSpanId'] = span['parent_id']
+        return otlp
+
+    def export(self, traces):
+        """
+        发送链路
+        :param traces: 链路字典列表
+        """
+        payload = {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service_name}}]},
+            'scopeSpans': [{
+                'scope': {'name': 'network_monitor'},
+                'spans': [self._span(trace['trace_id'], span) for trace in traces for span in trace['spans']]
+            }]
+        }]}
+        response = requests.post(self.endpoint, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class Tracer:
+    """追踪器：创建跨度，按链路收集已结束的跨度，根跨度结束时采样并异步导出"""
+
+    def __init__(self):
+        self.exporter = None  # 导出器（None表示未启用）
+        self.slow_threshold = DEFAULT_SLOW_THRESHOLD  # 默认慢请求阈值（秒）
+        self.sample_rate = 0.0  # 随机采样比例
+        self._current = contextvars.ContextVar('network_monitor_span', default=None)  # 当前跨度
+        self._traces = {}  # 未结束的链路 {链路ID: [已结束的跨度]}
+        self._lock = threading.Lock()  # 锁
+        self._queue = queue.Queue(EXPORT_QUEUE_SIZE)  # 待导出的链路
+        self._thread = None  # 导出线程
+
+    @property
+    def enabled(self):
+        return self.exporter is not None
+
+    def configure(self, exporter, slow_threshold=DEFAULT_SLOW_THRESHOLD, sample_rate=0.0):
+        """
+        启用追踪
+        :param exporter: 导出器（提供export(traces)方法），None关闭追踪
+        :param slow_threshold: 默认慢请求阈值（秒）
+        :param sample_rate: 未达到阈值的链路的随机采样比例
+        """
+        self.exporter = exporter
+        self.slow_threshold = slow_threshold
+        self.sample_rate = sample_rate
+        if exporter is not None and self._thread is None:
+            self._thread = threading.Thread(target=self._export_loop, name='trace-exporter', daemon=True)
+            self._thread.start()
+
+    def current(self):
+        """当前跨度，没有返回None"""
+        return self._current.get()
+
+    def current_trace_id(self):
+        """当前链路ID，没有返回None"""
+        span = self._current.get()
+        return span.trace_id if span is not None else None
+
+    def start(self, name, parent=None, slow_threshold=None, **attributes):
+        """
+        开始跨度并设为当前跨度（必须调用finish结束）
+        :param name: 跨度名称
+        :param parent: 上游传入的父跨度 (链路ID, 跨度ID)，仅在没有当前跨度时使用
+        :param slow_threshold: 作为根跨度时的慢请求阈值（秒），None使用默认值
+        :param attributes: 属性（值为None的忽略）
+        :return: Span，未启用时返回空跨度
+        """
+        if self.exporter is None:
+            return NOOP_SPAN
+        attributes = {key: value for key, value in attributes.items() if value is not None}
+        current = self._current.get()
+        if current is not None:  # 子跨度
+            span = Span(name, current.trace_id, current.span_id, attributes, False, None)
+        else:  # 根跨度（开始新链路，或延续上游链路）
+            trace_id, parent_id = parent or (_new_id(128), None)
+            span = Span(name, trace_id, parent_id, attributes, True, slow_threshold)
+            with self._lock:
+                self._traces[trace_id] = []
+        span._token = self._current.set(span)
+        return span
+
+    def finish(self, span, error=None):
+        """
+        结束跨度（根跨度结束时决定是否导出整条链路）
+        :param span: start返回的跨度
+        :param error: 异常（可选）
+        """
+        if span is NOOP_SPAN or span.duration is not None:
+            return
+        span.duration = time.perf_counter() - span._start
+        if error is not None:
+            span.fail(error)
+        try:
+            self._current.reset(span._token)  # 恢复父跨度
+        except ValueError:  # 在其他上下文中结束（跨线程），不影响该上下文的当前跨度
+            pass
+        with self._lock:
+            spans = self._traces.pop(span.trace_id, None) if span.is_root else self._traces.get(span.trace_id)
+        if spans is None:  # 根跨度已结束后才结束的子跨度
+            return
+        if span.is_root:
+            spans.append(span.to_dict())
+            if self._sampled(span):
+                self._enqueue(span, spans)
+        elif len(spans) < MAX_SPANS_PER_TRACE:
+            spans.append(span.to_dict())
+
+    def _sampled(self, root):
+        """慢请求采样：失败、耗时达到阈值或命中随机采样的链路导出"""
+        threshold = self.slow_threshold if root.slow_threshold is None else root.slow_threshold
+        return root.error is not None or root.duration >= threshold or random.random() < self.sample_rate
+
+    def _enqueue(self, root, spans):
+        trace = {
+            'trace_id': root.trace_id,
+            'name': root.name,
+            'start': round(root.start_time, 6),
+            'duration': round(root.duration, 6),
+            'error': root.error,
+            'spans': spans
+        }
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            TRACES_DROPPED.inc()
+
+    def _export_loop(self):
+        """后台导出线程：批量取出链路交给导出器"""
+        while True:
+            traces = [self._queue.get()]
+            while len(traces) < 100:
+                try:
+                    traces.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.exporter.export(traces)
+                TRACES_EXPORTED.inc(amount=len(traces))
+            except Exception as e:  # 导出失败，丢弃本批链路
+                TRACES_DROPPED.inc(amount=len(traces))
+                logger.warning("导出链路失败: %s", e)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        跨度上下文（代码块抛出异常时标记失败并继续抛出）
+        :param name: 跨度名称
+        :param attributes: 属性，可包含parent、slow_threshold（见start）
+        """
+        span = self.start(name, **attributes)
+        try:
+            yield span
+        except Exception as e:
+            span.fail(e)
+            raise
+        finally:
+            self.finish(span)
+
+
+def parse_traceparent(header):
+    """
+    解析W3C traceparent请求头
+    :param header: 如 00-<32位链路ID>-<16位跨度ID>-01
+    :return: (链路ID, 跨度ID)，格式不正确返回None
+    """
+    parts = (header or '').strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2]
+
+
+def setup_tracing(target=None, slow_threshold=None, sample_rate=None):
+    """
+    按配置启用追踪
+    :param target: 导出目标，默认读取环境变量，未设置时写入outputs/traces/traces.jsonl，off关闭
+    :param slow_threshold: 慢请求阈值（秒），默认读取环境变量，未设置为5
+    :param sample_rate: 随机采样比例，默认读取环境变量，未设置为0
+    :return: 追踪器
+    """
+    target = os.environ.get(TRACE_ENV, DEFAULT_TRACE_FILE) if target is None else target
+    slow_threshold = float(os.environ.get(TRACE_SLOW_ENV, DEFAULT_SLOW_THRESHOLD) if slow_threshold is None
+                           else slow_threshold)
+    sample_rate = float(os.environ.get(TRACE_SAMPLE_ENV, 0) if sample_rate is None else sample_rate)
+    if not target or target.lower() == 'off':
+        exporter = None
+    elif target.startswith(('http://', 'https://')):
+        exporter = OtlpExporter(target)
+    else:
+        exporter = FileExporter(target)
+    tracer.configure(exporter, slow_threshold, sample_rate)
+    return tracer
+
+
+# 全局追踪器（setup_tracing之前不记录任何跨度）
+tracer = Tracer()
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+凭据保险库模块
+负责将设备登录凭据与设备清单分开存储：密码使用主密钥以AES-256-GCM加密保存，
+设备通过凭据ID引用（多台设备可共用一个凭据），解密结果在内存中按有效期缓存，过期或删除时清零
+"""
+
+import base64  # 密钥与密文编码
+import json  # JSON数据处理
+import logging  # 日志
+import os  # 文件操作、随机数
+import threading  # 线程锁
+import time  # 时间处理
+import uuid  # 凭据ID
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM  # 认证加密（paramiko的依赖库）
+
+
+logger = logging.getLogger(__name__)  # 模块日志
+
+
+# 主密钥环境变量（URL安全Base64编码的32字节密钥），未设置时使用密钥文件
+MASTER_KEY_ENV = 'NETWORK_MONITOR_VAULT_KEY'
+# AES-GCM随机数长度（字节）
+NONCE_SIZE = 12
+
+
+def _zeroize(buffer):
+    """
+    清零字节缓冲区（Python无法可靠清除不可变的str/bytes，缓存中只保存bytearray）
+    :param buffer: bytearray
+    """
+    for index in range(len(buffer)):
+        buffer[index] = 0
+
+
+class CredentialVault:
+    """凭据保险库类：加密存储凭据，按凭据ID解密并缓存"""
+
+    def __init__(self, vault_file='config/credentials.json', key_file='config/vault.key', cache_ttl=300):
+        """
+        初始化凭据保险库
+        :param vault_file: 凭据存储文件路径
+        :param key_file: 主密钥文件路径（未设置环境变量时使用，首次启动自动生成，权限0600）
+        :param cache_ttl: 解密结果缓存有效期（秒）
+        """
+        self.vault_file = vault_file  # 凭据文件路径
+        self.key_file = key_file  # 密钥文件路径
+        self.cache_ttl = cache_ttl  # 缓存有效期
+        self._lock = threading.Lock()  # 锁
+        self._cache = {}  # {凭据ID: (过期时间, 用户名, 密码bytearray)}
+        self._aead = AESGCM(self._load_master_key())  # 加密器
+        self._credentials = self._load_credentials()  # {凭据ID: 凭据记录}
+
+    def _load_master_key(self):
+        """
+        加载主密钥（优先环境变量，其次密钥文件，都不存在时生成密钥文件）
+        :return: 32字节密钥
+        """
+        encoded = os.environ.get(MASTER_KEY_ENV)
+        if not encoded and os.path.exists(self.key_file):
+            with open(self.key_file, 'r', encoding='utf-8') as f:
+                encoded = f.read().strip()
+        if encoded:
+            key = base64.urlsafe_b64decode(encoded)
+            if len(key) != 32:
+                raise ValueError('凭据主密钥长度必须为32字节')
+            return key
+
+        key = AESGCM.generate_key(bit_length=256)  # 首次启动生成密钥
+        os.makedirs(os.path.dirname(self.key_file) or '.', exist_ok=True)  # 创建目录
+        fd = os.open(self.key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)  # 仅所有者可读写
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(base64.urlsafe_b64encode(key).decode('ascii'))
+        return key
+
+    def _load_credentials(self):
+        """
+        加载凭据文件
+        :return: {凭据ID: 凭据记录}
+        """
+        try:
+            with open(self.vault_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:  # 尚未创建凭据
+            return {}
+        except Exception as e:  # 文件损坏
+            logger.error("加载凭据文件失败: %s", e)
+            return {}
+
+    def _save_credentials(self):
+        """保存凭据文件（先写临时文件再替换）"""
+        os.makedirs(os.path.dirname(self.vault_file) or '.', exist_ok=True)  # 创建目录
+        temp_file = self.vault_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self._credentials, f, ensure_ascii=False, indent=4)
+        os.replace(temp_file, self.vault_file)
+
+    def _encrypt(self, credential_id, password):
+        """
+        加密密码（凭据ID作为附加认证数据，密文不能挪用到其他凭据）
+        :return: (随机数Base64, 密文Base64)
+        """
+        nonce = os.urandom(NONCE_SIZE)
+        secret = self._aead.encrypt(nonce, password.encode('utf-8'), credential_id.encode('utf-8'))
+        return base64.b64encode(nonce).decode('ascii'), base64.b64encode(secret).decode('ascii')
+
+    def _evict(self, credential_id):
+        """移除缓存条目并清零密码缓冲区"""
+        entry = self._cache.pop(credential_id, None)
+        if entry:
+            _zeroize(entry[2])
+
+    def _purge(self, now):
+        """移除所有过期的缓存条目"""
+        for credential_id in [key for key, entry in self._cache.items() if entry[0] <= now]:
+            self._evict(credential_id)
+
+    def create(self, name, username, password):
+        """
+        创建凭据
+        :param name: 凭据名称（如：核心交换机管理员）
+        :param username: 登录用户名
+        :param password: 登录密码
+        :return: 凭据摘要（不含密码）
+        """
+        credential_id = uuid.uuid4().hex[:12]
+        nonce, secret = self._encrypt(credential_id, password)
+        now = int(time.time())
+        with self._lock:
+            self._credentials[credential_id] = {
+                'name': name or username,  # 凭据名称
+                'username': username,  # 用户名
+                'nonce': nonce,  # 随机数
+                'secret': secret,  # 加密后的密码
+                'created': now,  # 创建时间
+                'updated': now  # 更新时间
+            }
+            self._save_credentials()
+        return self.get_summary(credential_id)
+
+    def update(self, credential_id, name=None, username=None, password=None):
+        """
+        更新凭据（密码为空时保持不变）
+        :param credential_id: 凭据ID
+        :return: 凭据摘要，凭据不存在返回None
+        """
+        with self._lock:
+            record = self._credentials.get(credential_id)
+            if record is None:
+                return None
+            if name:
+                record['name'] = name
+            if username:
+                record['username'] = username
+            if password:
+                record['nonce'], record['secret'] = self._encrypt(credential_id, password)
+            record['updated'] = int(time.time())
+            self._evict(credential_id)  # 缓存中的旧凭据立即失效
+            self._save_credentials()
+        return self.get_summary(credential_id)
+
+    def delete(self, credential_id):
+        """
+        删除凭据
+        :param credential_id: 凭据ID
+        :return: True表示成功，False表示凭据不存在
+        """
+        with self._lock:
+            if self._credentials.pop(credential_id, None) is None:
+                return False
+            self._evict(credential_id)
+            self._save_credentials()
+        return True
+
+    def get_summary(self, credential_id):
+        """
+        获取凭据摘要（不含密码）
+        :param credential_id: 凭据ID
+        :return: {'id', 'name', 'username', 'created', 'updated'}，不存在返回None
+        """
+        record = self._credentials.get(credential_id)
+        if record is None:
+            return None
+        return {'id': credential_id, 'name': record['name'], 'username': record['username'],
+                'created': record['created'], 'updated': record['updated']}
+
+    def list_credentials(self):
+        """
+        获取全部凭据摘要
+        :return: 凭据摘要列表（按名称排序）
+        """
+        return sorted((self.get_summary(credential_id) for credential_id in list(self._credentials)),
+                      key=lambda item: item['name'])
+
+    def get_secret(self, credential_id):
+        """
+        获取解密后的用户名和密码（缓存命中时只是一次字典查找）
+        :param credential_id: 凭据ID
+        :return: (用户名, 密码)
+        :raises KeyError: 凭据不存在
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(credential_id)
+            if entry is None or entry[0] <= now:
+                self._purge(now)  # 顺带清理其他过期条目
+                record = self._credentials.get(credential_id)
+                if record is None:
+                    raise KeyError(f"凭据不存在: {credential_id}")
+                plain = bytearray(self._aead.decrypt(
+                    base64.b64decode(record['nonce']), base64.b64decode(record['secret']),
+                    credential_id.encode('utf-8')
+                ))
+                entry = self._cache[credential_id] = (now + self.cache_ttl, record['username'], plain)
+            return entry[1], entry[2].decode('utf-8')
+
+    def resolve(self, device):
+        """
+        获取设备的登录用户名和密码（引用凭据ID时从保险库解密，否则使用设备中的明文字段）
+        :param device: 设备信息字典
+        :return: (用户名, 密码)
+        """
+        credential_id = device.get('credential_id')
+        if credential_id:
+            return self.get_secret(credential_id)
+        return device.get('username', ''), device.get('password', '')
+
+    def clear_cache(self):
+        """清空并清零全部缓存"""
+        with self._lock:
+            for credential_id in list(self._cache):
+                self._evict(credential_id)
+
+    def migrate(self, devices):
+        """
+        将设备中的明文密码迁移到保险库（相同用户名和密码的设备共用一个凭据）
+        :param devices: 设备信息字典列表
+        :return: {设备ID: 凭据ID}
+        """
+        profiles = {}  # {(用户名, 密码): 凭据ID}
+        for record_id, record in list(self._credentials.items()):  # 复用已有的相同凭据
+            username, password = self.get_secret(record_id)
+            profiles.setdefault((username, password), record_id)
+
+        mapping = {}
+        for device in devices:
+            if device.get('credential_id') or not device.get('password'):
+                continue
+            key = (device.get('username', ''), device['password'])
+            if key not in profiles:
+                profiles[key] = self.create(f"{key[0]} #{len(profiles) + 1}", *key)['id']
+            mapping[device['id']] = profiles[key]
+        return mapping
@@ -22,6 +22,10 @@ const MAX_DATA_POINTS = 20;
 // 缓存的设备数据
 let cachedDevicesData = null;
 
+// 增量刷新状态：服务端快照版本和按ID索引的设备列表
+let dashboardVersion = null;
+let dashboardDevices = new Map();
+
 // 页面加载完成后初始化
 document.addEventListener('DOMContentLoaded', function() {
     // 初始化Dashboard
@@ -99,12 +103,35 @@ function restartDashboardRefresh() {
     initDashboard();
 }
 
+// 获取仪表板数据（带上次的版本号，只接收变化的设备并合并到本地缓存）
+async function fetchDashboardData() {
+    const url = dashboardVersion
+        ? `/api/dashboard/data?since=${encodeURIComponent(dashboardVersion)}`
+        : '/api/dashboard/data';
+    const response = await fetch(url);
+    const result = await response.json();
+    if (!result.success || !result.data) {
+        return result;
+    }
+
+    const data = result.data;
+    if (data.full) {
+        dashboardDevices = new Map();
+    }
+    (data.removed || []).forEach(id => dashboardDevices.delete(id));
+    data.devices.forEach(device => dashboardDevices.set(device.id, device));
+    dashboardVersion = data.version;
+
+    // 返回与全量响应相同结构的数据
+    data.devices = Array.from(dashboardDevices.values());
+    return result;
+}
+
 // 加载设备状态和完整数据（包括设备列表、统计数字、图表）
 async function loadDeviceStatusAndData() {
     try {
         console.log('[Dashboard] 刷新设备状态和完整数据...');
-        const response = await fetch('/api/dashboard/data');
-        const result = await response.json();
+        const result = await fetchDashboardData();
 
         if (result.success && result.data) {
             const data = result.data;
@@ -121,6 +148,9 @@ async function loadDeviceStatusAndData() {
             // 更新图表数据
             updateCharts(data.devices);
 
+            // 更新热点接口排行
+            updateTopInterfaces(data.top_interfaces);
+
             console.log(`[Dashboard] 完整数据更新成功 - 总数:${data.total} 在线:${data.online} 离线:${data.offline}`);
         }
     } catch (error) {
@@ -131,14 +161,14 @@ async function loadDeviceStatusAndData() {
 // 只加载CPU/内存数据并更新图表（不更新设备列表）
 async function loadCpuMemoryData() {
     try {
-        const response = await fetch('/api/dashboard/data');
-        const result = await response.json();
+        const result = await fetchDashboardData();
 
         if (result.success && result.data) {
             const data = result.data;
 
-            // 只更新图表数据，不更新设备列表和统计数字
+            // 只更新图表数据和热点接口排行，不更新设备列表和统计数字
             updateCharts(data.devices);
+            updateTopInterfaces(data.top_interfaces);
 
             console.log(`[Dashboard] CPU/内存图表数据更新成功`);
         }
@@ -168,6 +198,47 @@ function updateStatistics(data) {
     }
 }
 
+// 更新热点接口排行（服务端预计算的Top-N索引）
+function updateTopInterfaces(topInterfaces) {
+    if (!topInterfaces) return;
+
+    renderTopInterfaceTable('topTrafficInterfaces', topInterfaces.traffic, iface =>
+        `${formatBitRate(iface.rx_bps)} / ${formatBitRate(iface.tx_bps)}`, '入 / 出');
+    renderTopInterfaceTable('topErrorInterfaces', topInterfaces.errors, iface =>
+        `${iface.error_rate} /s`, '错误速率');
+}
+
+// 渲染单个排行表格
+function renderTopInterfaceTable(elementId, items, formatValue, valueTitle) {
+    const container = document.getElementById(elementId);
+    if (!container) return;
+
+    if (!items || items.length === 0) {
+        container.innerHTML = '<p class="text-center text-muted">暂无数据</p>';
+        return;
+    }
+
+    let html = '<div class="table-responsive"><table class="table table-sm table-hover mb-0">';
+    html += `<thead><tr><th>设备</th><th>接口</th><th>${valueTitle}</th></tr></thead><tbody>`;
+    items.forEach(iface => {
+        html += '<tr>';
+        html += `<td><a href="#" onclick="viewDeviceDetails('${iface.device_id}'); return false;">${iface.device_name}</a></td>`;
+        html += `<td>${iface.interface}</td>`;
+        html += `<td>${formatValue(iface)}</td>`;
+        html += '</tr>';
+    });
+    html += '</tbody></table></div>';
+    container.innerHTML = html;
+}
+
+// 格式化比特速率
+function formatBitRate(bps) {
+    if (!bps) return '0 bps';
+    const units = ['bps', 'Kbps', 'Mbps', 'Gbps', 'Tbps'];
+    const i = Math.min(units.length - 1, Math.floor(Math.log(bps) / Math.log(1000)));
+    return parseFloat((bps / Math.pow(1000, i)).toFixed(2)) + ' ' + units[i];
+}
+
 // 数字动画效果
 function animateNumber(element, targetValue) {
     const currentValue = parseInt(element.textContent) || 0;
@@ -498,6 +569,9 @@ function openAddDeviceModal() {
     document.getElementById('modalDevicePort').value = '22';
     document.getElementById('modalDeviceUsername').value = '';
     document.getElementById('modalDevicePassword').value = '';
+    document.getElementById('modalDeviceSite').value = '';
+    document.getElementById('modalDeviceRole').value = '';
+    document.getElementById('modalDeviceTags').value = '';
 
     // 显示模态框
     const modal = new bootstrap.Modal(document.getElementById('addDeviceModal'));
@@ -513,6 +587,9 @@ function addDeviceFromModal() {
     const port = document.getElementById('modalDevicePort').value || '22';
     const username = document.getElementById('modalDeviceUsername').value.trim();
     const password = document.getElementById('modalDevicePassword').value;
+    const site = document.getElementById('modalDeviceSite').value.trim();
+    const role = document.getElementById('modalDeviceRole').value.trim();
+    const tags = document.getElementById('modalDeviceTags').value.trim();
 
     // 验证必填字段
     if (!vendor || !ip || !username || !password) {
@@ -535,7 +612,10 @@ function addDeviceFromModal() {
             ip: ip,
             port: parseInt(port),
             username: username,
-            password: password
+            password: password,
+            site: site,
+            role: role,
+            tags: tags
         })
     })
     .then(response => response.json())
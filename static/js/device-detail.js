@@ -172,154 +172,273 @@ function updateDeviceBasicInfo(device) {
     container.innerHTML = html;
 }
 
+// 历史图表时间范围（空表示实时：详情接口返回的最近原始样本）
+let historyRange = '';
+
+// 格式化历史时间戳（秒），长时间范围带日期
+function formatHistoryTime(timestamp, withDate) {
+    const date = new Date(timestamp * 1000);
+    const pad = (value) => String(value).padStart(2, '0');
+    const time = `${pad(date.getHours())}:${pad(date.getMinutes())}`;
+    if (withDate) {
+        return `${pad(date.getMonth() + 1)}-${pad(date.getDate())} ${time}`;
+    }
+    return `${time}:${pad(date.getSeconds())}`;
+}
+
+// 创建历史图表（数值折线 + 降采样后的最大/最小值包络）
+function createHistoryChart(canvas, label, color) {
+    return new Chart(canvas.getContext('2d'), {
+        type: 'line',
+        data: {
+            labels: [],
+            datasets: [{
+                label: label,
+                data: [],
+                borderColor: `rgb(${color})`,
+                backgroundColor: `rgba(${color}, 0.1)`,
+                tension: 0.4,
+                fill: true,
+                pointRadius: 4,
+                pointHoverRadius: 6
+            }, {
+                label: '最大值',
+                data: [],
+                borderColor: `rgba(${color}, 0.3)`,
+                borderWidth: 1,
+                pointRadius: 0,
+                fill: false
+            }, {
+                label: '最小值',
+                data: [],
+                borderColor: `rgba(${color}, 0.3)`,
+                backgroundColor: `rgba(${color}, 0.15)`,
+                borderWidth: 1,
+                pointRadius: 0,
+                fill: '-1'
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    display: true,
+                    position: 'top',
+                    labels: {
+                        // 没有包络数据时（实时、LTTB）不显示最大/最小值图例
+                        filter: (item, data) => data.datasets[item.datasetIndex].data.length > 0
+                    }
+                },
+                tooltip: {
+                    mode: 'index',
+                    intersect: false
+                }
+            },
+            scales: {
+                y: {
+                    beginAtZero: true,
+                    max: 100,
+                    ticks: {
+                        callback: function(value) {
+                            return value + '%';
+                        }
+                    }
+                },
+                x: {
+                    ticks: {
+                        maxRotation: 45,
+                        minRotation: 45
+                    }
+                }
+            }
+        }
+    });
+}
+
+// 更新历史图表数据（长时间范围的点数与图表宽度相当，不绘制数据点）
+function setHistoryChartData(chart, labels, values, minValues, maxValues) {
+    chart.data.labels = labels;
+    chart.data.datasets[0].data = values;
+    chart.data.datasets[0].pointRadius = historyRange ? 0 : 4;
+    chart.data.datasets[1].data = maxValues || [];
+    chart.data.datasets[2].data = minValues || [];
+    chart.update('none');
+}
+
 // 更新设备历史图表
 function updateDeviceCharts(device) {
+    // 选择了时间范围时从历史接口获取降采样数据
+    if (historyRange) {
+        loadDeviceHistory();
+        return;
+    }
+
     if (!device.history) {
         console.log('[DeviceDetail] 无历史数据');
         return;
     }
 
     const history = device.history;
-    const labels = history.timestamps || [];
-    const cpuData = history.cpu || [];
-    const memoryData = history.memory || [];
+    const labels = (history.timestamps || []).map((timestamp) => formatHistoryTime(timestamp, false));
 
     // 更新CPU图表
     const cpuCanvas = document.getElementById('deviceCpuChart');
     if (cpuCanvas) {
-        if (deviceCpuChart) {
-            deviceCpuChart.data.labels = labels;
-            deviceCpuChart.data.datasets[0].data = cpuData;
-            deviceCpuChart.update('none');
-        } else {
-            deviceCpuChart = new Chart(cpuCanvas.getContext('2d'), {
-                type: 'line',
-                data: {
-                    labels: labels,
-                    datasets: [{
-                        label: 'CPU使用率 (%)',
-                        data: cpuData,
-                        borderColor: 'rgb(75, 192, 192)',
-                        backgroundColor: 'rgba(75, 192, 192, 0.1)',
-                        tension: 0.4,
-                        fill: true,
-                        pointRadius: 4,
-                        pointHoverRadius: 6
-                    }]
-                },
-                options: {
-                    responsive: true,
-                    maintainAspectRatio: false,
-                    plugins: {
-                        legend: {
-                            display: true,
-                            position: 'top'
-                        },
-                        tooltip: {
-                            mode: 'index',
-                            intersect: false
-                        }
-                    },
-                    scales: {
-                        y: {
-                            beginAtZero: true,
-                            max: 100,
-                            ticks: {
-                                callback: function(value) {
-                                    return value + '%';
-                                }
-                            }
-                        },
-                        x: {
-                            ticks: {
-                                maxRotation: 45,
-                                minRotation: 45
-                            }
-                        }
-                    }
-                }
-            });
+        if (!deviceCpuChart) {
+            deviceCpuChart = createHistoryChart(cpuCanvas, 'CPU使用率 (%)', '75, 192, 192');
         }
+        setHistoryChartData(deviceCpuChart, labels, history.cpu || []);
     }
 
     // 更新内存图表
     const memoryCanvas = document.getElementById('deviceMemoryChart');
     if (memoryCanvas) {
-        if (deviceMemoryChart) {
-            deviceMemoryChart.data.labels = labels;
-            deviceMemoryChart.data.datasets[0].data = memoryData;
-            deviceMemoryChart.update('none');
-        } else {
-            deviceMemoryChart = new Chart(memoryCanvas.getContext('2d'), {
-                type: 'line',
-                data: {
-                    labels: labels,
-                    datasets: [{
-                        label: '内存使用率 (%)',
-                        data: memoryData,
-                        borderColor: 'rgb(255, 99, 132)',
-                        backgroundColor: 'rgba(255, 99, 132, 0.1)',
-                        tension: 0.4,
-                        fill: true,
-                        pointRadius: 4,
-                        pointHoverRadius: 6
-                    }]
-                },
-                options: {
-                    responsive: true,
-                    maintainAspectRatio: false,
-                    plugins: {
-                        legend: {
-                            display: true,
-                            position: 'top'
-                        },
-                        tooltip: {
-                            mode: 'index',
-                            intersect: false
-                        }
-                    },
-                    scales: {
-                        y: {
-                            beginAtZero: true,
-                            max: 100,
-                            ticks: {
-                                callback: function(value) {
-                                    return value + '%';
-                                }
-                            }
-                        },
-                        x: {
-                            ticks: {
-                                maxRotation: 45,
-                                minRotation: 45
-                            }
-                        }
-                    }
-                }
-            });
+        if (!deviceMemoryChart) {
+            deviceMemoryChart = createHistoryChart(memoryCanvas, '内存使用率 (%)', '255, 99, 132');
         }
+        setHistoryChartData(deviceMemoryChart, labels, history.memory || []);
     }
 }
 
-// 更新接口信息
+// 加载指定时间范围的历史数据（服务端按图表宽度降采样）
+async function loadDeviceHistory() {
+    if (!currentDeviceId || !historyRange) return;
+
+    const charts = [
+        {metric: 'cpu', canvasId: 'deviceCpuChart', label: 'CPU使用率 (%)', color: '75, 192, 192'},
+        {metric: 'memory', canvasId: 'deviceMemoryChart', label: '内存使用率 (%)', color: '255, 99, 132'}
+    ];
+    try {
+        await Promise.all(charts.map(async (item) => {
+            const canvas = document.getElementById(item.canvasId);
+            if (!canvas) return;
+
+            const params = new URLSearchParams({
+                metric: item.metric,
+                range: historyRange,
+                width: Math.max(canvas.clientWidth || 0, 100),
+                method: 'minmax'
+            });
+            const response = await fetch(`/api/devices/${currentDeviceId}/history?${params.toString()}`);
+            const result = await response.json();
+            if (!result.success) {
+                throw new Error(result.message || '未知错误');
+            }
+
+            const data = result.data;
+            const withDate = data.end - data.start > 86400;
+            const labels = data.timestamps.map((timestamp) => formatHistoryTime(timestamp, withDate));
+            let chart = item.metric === 'cpu' ? deviceCpuChart : deviceMemoryChart;
+            if (!chart) {
+                chart = createHistoryChart(canvas, item.label, item.color);
+                if (item.metric === 'cpu') {
+                    deviceCpuChart = chart;
+                } else {
+                    deviceMemoryChart = chart;
+                }
+            }
+            setHistoryChartData(chart, labels, data.values, data.min, data.max);
+        }));
+    } catch (error) {
+        console.error('[DeviceDetail] 加载历史数据失败:', error);
+        showToast('加载历史数据失败: ' + error.message, 'danger');
+    }
+}
+
+// 切换历史图表时间范围
+function changeHistoryRange(range) {
+    historyRange = range;
+    if (range) {
+        loadDeviceHistory();
+    } else if (currentDeviceId) {
+        loadDeviceDetail(currentDeviceId);
+    }
+}
+
+// 接口表分页状态
+let interfacePage = 1;
+let interfaceStatusFilter = '';
+let interfaceKeyword = '';
+
+// 更新接口信息（详情接口只返回第一页）
 function updateDeviceInterfaces(device) {
+    interfacePage = 1;
+    renderInterfaceTable(device.interfaces || [], {
+        total: device.interface_total || 0,
+        page: 1,
+        pages: device.interface_pages || 1
+    });
+
+    // 有过滤条件时按过滤条件重新加载
+    if (interfaceStatusFilter || interfaceKeyword) {
+        loadInterfacePage(1);
+    }
+}
+
+// 分页加载接口表（读取服务端最近一次采集结果）
+async function loadInterfacePage(page) {
+    if (!currentDeviceId) return;
+
+    const params = new URLSearchParams({page: page, page_size: 50});
+    if (interfaceStatusFilter) params.set('status', interfaceStatusFilter);
+    if (interfaceKeyword) params.set('q', interfaceKeyword);
+
+    try {
+        const response = await fetch(`/api/devices/${currentDeviceId}/interfaces?${params.toString()}`);
+        const result = await response.json();
+
+        if (result.success && result.data) {
+            interfacePage = result.data.page;
+            renderInterfaceTable(result.data.interfaces, result.data);
+        } else {
+            showToast('加载接口信息失败: ' + (result.message || '未知错误'), 'danger');
+        }
+    } catch (error) {
+        console.error('[DeviceDetail] 加载接口信息失败:', error);
+        showToast('加载接口信息失败', 'danger');
+    }
+}
+
+// 设置接口过滤条件
+function filterInterfaces() {
+    const statusSelect = document.getElementById('interfaceStatusFilter');
+    const keywordInput = document.getElementById('interfaceKeyword');
+    interfaceStatusFilter = statusSelect ? statusSelect.value : '';
+    interfaceKeyword = keywordInput ? keywordInput.value.trim() : '';
+    loadInterfacePage(1);
+}
+
+// 渲染接口表和分页控件
+function renderInterfaceTable(interfaces, pageInfo) {
     const container = document.getElementById('deviceInterfacesList');
     if (!container) return;
 
-    const interfaces = device.interfaces || [];
+    // 过滤控件
+    let html = '<div class="row g-2 mb-2">';
+    html += '<div class="col-md-3"><select class="form-select form-select-sm" id="interfaceStatusFilter" onchange="filterInterfaces()">';
+    html += `<option value="" ${interfaceStatusFilter === '' ? 'selected' : ''}>全部状态</option>`;
+    html += `<option value="up" ${interfaceStatusFilter === 'up' ? 'selected' : ''}>UP</option>`;
+    html += `<option value="down" ${interfaceStatusFilter === 'down' ? 'selected' : ''}>DOWN</option>`;
+    html += '</select></div>';
+    html += '<div class="col-md-5"><input type="text" class="form-control form-control-sm" id="interfaceKeyword" ';
+    html += `placeholder="按接口名称或描述过滤" value="${interfaceKeyword}" onkeydown="if(event.key==='Enter'){filterInterfaces();}"></div>`;
+    html += `<div class="col-md-4 text-end text-muted small align-self-center">共 ${pageInfo.total || 0} 个接口</div>`;
+    html += '</div>';
 
-    if (interfaces.length === 0) {
-        container.innerHTML = '<p class="text-center text-muted">暂无接口信息</p>';
+    if (!interfaces || interfaces.length === 0) {
+        container.innerHTML = html + '<p class="text-center text-muted">暂无接口信息</p>';
         return;
     }
 
-    let html = '<div class="table-responsive"><table class="table table-hover">';
+    html += '<div class="table-responsive"><table class="table table-hover">';
     html += '<thead><tr>';
     html += '<th><i class="bi bi-ethernet"></i> 接口名称</th>';
     html += '<th><i class="bi bi-activity"></i> 状态</th>';
     html += '<th><i class="bi bi-speedometer"></i> 速率</th>';
     html += '<th><i class="bi bi-arrow-down"></i> 入流量</th>';
     html += '<th><i class="bi bi-arrow-up"></i> 出流量</th>';
+    html += '<th><i class="bi bi-graph-up"></i> 入/出速率</th>';
     html += '<th><i class="bi bi-exclamation-triangle"></i> 错误</th>';
     html += '<th><i class="bi bi-info-circle"></i> 描述</th>';
     html += '</tr></thead><tbody>';
@@ -335,12 +454,25 @@ function updateDeviceInterfaces(device) {
         html += `<td>${iface.speed || '-'}</td>`;
         html += `<td>${formatBytes(iface.rx_bytes)}</td>`;
         html += `<td>${formatBytes(iface.tx_bytes)}</td>`;
+        html += `<td>${formatBitRate(iface.rx_bps)} / ${formatBitRate(iface.tx_bps)}</td>`;
         html += `<td>${iface.errors || 0}</td>`;
         html += `<td>${iface.description || '-'}</td>`;
         html += '</tr>';
     });
 
     html += '</tbody></table></div>';
+
+    // 分页控件
+    const pages = pageInfo.pages || 1;
+    if (pages > 1) {
+        const page = pageInfo.page || 1;
+        html += '<nav><ul class="pagination pagination-sm justify-content-center">';
+        html += `<li class="page-item ${page <= 1 ? 'disabled' : ''}"><a class="page-link" href="#" onclick="loadInterfacePage(${page - 1}); return false;">上一页</a></li>`;
+        html += `<li class="page-item disabled"><span class="page-link">${page} / ${pages}</span></li>`;
+        html += `<li class="page-item ${page >= pages ? 'disabled' : ''}"><a class="page-link" href="#" onclick="loadInterfacePage(${page + 1}); return false;">下一页</a></li>`;
+        html += '</ul></nav>';
+    }
+
     container.innerHTML = html;
 }
 
@@ -300,6 +300,9 @@ function openEditDeviceModal(deviceId) {
     document.getElementById('editDeviceModel').value = device.model || device.device_model || '';
     document.getElementById('editDeviceSerial').value = device.serial_number || device.serial || '';
     document.getElementById('editDeviceVersion').value = device.version || device.software_version || '';
+    document.getElementById('editDeviceSite').value = device.site || '';
+    document.getElementById('editDeviceRole').value = device.role || '';
+    document.getElementById('editDeviceTags').value = (device.tags || []).join(', ');
 
     // 清空密码字段
     document.getElementById('editDevicePassword').value = '';
@@ -323,7 +326,10 @@ function saveDeviceChanges() {
         username: document.getElementById('editDeviceUsername').value,
         model: document.getElementById('editDeviceModel').value,
         serial_number: document.getElementById('editDeviceSerial').value,
-        version: document.getElementById('editDeviceVersion').value
+        version: document.getElementById('editDeviceVersion').value,
+        site: document.getElementById('editDeviceSite').value,
+        role: document.getElementById('editDeviceRole').value,
+        tags: document.getElementById('editDeviceTags').value
     };
 
     // 如果密码字段不为空，则更新密码
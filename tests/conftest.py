@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""
+测试公共配置：把项目根目录加入模块搜索路径（测试以 modules.xxx 方式导入）
+"""
+
+import os  # 路径处理
+import sys  # 模块搜索路径
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+告警规则测试：保存时拒绝缺少阈值、数值字段无效和ID重复的规则
+"""
+
+import pytest
+
+from modules.alerting import DEFAULT_RULES, AlertEngine, validate_rule
+
+
+@pytest.mark.parametrize('rule', [
+    {'id': 'r1', 'metric': 'cpu', 'type': 'threshold', 'operator': '>='},
+    {'id': 'r1', 'metric': 'cpu', 'type': 'rate'},
+    {'id': 'r1', 'metric': 'cpu', 'threshold': '80'},
+    {'id': 'r1', 'metric': 'cpu', 'threshold': True},
+    {'id': 'r1', 'metric': 'cpu', 'threshold': float('inf')},
+    {'id': 'r1', 'metric': 'memory', 'type': 'anomaly', 'threshold': 3, 'alpha': 1.5},
+    {'id': ['r1'], 'metric': 'cpu', 'threshold': 80},
+])
+def test_invalid_rules_are_rejected(rule):
+    assert validate_rule(rule)
+
+
+def test_default_rules_are_valid():
+    assert not any(validate_rule(rule) for rule in DEFAULT_RULES)
+
+
+def test_save_rules_rejects_duplicate_ids(tmp_path):
+    engine = AlertEngine(str(tmp_path / 'alert_rules.json'), str(tmp_path / 'alerts.db'))
+    rule = {'id': 'cpu_high', 'metric': 'cpu', 'type': 'threshold', 'operator': '>=', 'threshold': 85}
+    assert not engine.save_rules([rule, dict(rule, threshold=90)])
+    assert not engine.save_rules([{'id': 'cpu_high', 'metric': 'cpu', 'type': 'threshold'}])
+    assert engine.rules == DEFAULT_RULES
+    assert engine.save_rules([rule])
+    assert engine.load_rules() == [rule]
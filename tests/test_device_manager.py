@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+设备管理测试：后台批量写回与请求线程的增删改并发时不丢失修改；明文密码存入凭据保险库
+"""
+
+import threading  # 并发写入
+
+from modules.device_manager import DeviceManager
+from modules.vault import CredentialVault
+
+
+def test_concurrent_writes_do_not_resurrect_or_lose_edits(tmp_path):
+    manager = DeviceManager(str(tmp_path / 'devices.json'))
+    devices = [manager.add_device(f'10.0.0.{index}', 'admin', 'admin', 'Huawei') for index in range(1, 41)]
+    stop = threading.Event()
+
+    def background_writer():  # 模拟设备发现/设备信息采集的批量写回
+        round_number = 0
+        while not stop.is_set():
+            round_number += 1
+            manager.update_devices({device['id']: {'version': f'V{round_number}'} for device in devices})
+
+    writer = threading.Thread(target=background_writer)
+    writer.start()
+    try:
+        for device in devices[:20]:
+            assert manager.delete_device(device['id'])
+        for device in devices[20:]:
+            assert manager.update_device(device['id'], name=f"renamed-{device['ip']}")
+            assert manager.update_device_status(device['id'], 'online')
+    finally:
+        stop.set()
+        writer.join()
+
+    remaining = {device['id']: device for device in manager.get_all_devices()}
+    assert set(remaining) == {device['id'] for device in devices[20:]}
+    for device in devices[20:]:
+        assert remaining[device['id']]['name'] == f"renamed-{device['ip']}"
+        assert remaining[device['id']]['status'] == 'online'
+
+
+def test_passwords_are_stored_in_vault(tmp_path):
+    vault = CredentialVault(str(tmp_path / 'credentials.json'), str(tmp_path / 'vault.key'))
+    legacy = DeviceManager(str(tmp_path / 'devices.json'))  # 未启用保险库时写入的遗留设备
+    old = legacy.add_device('10.0.0.1', 'admin', 'legacy-pw', 'Huawei')
+    manager = DeviceManager(str(tmp_path / 'devices.json'), credential_store=vault)
+    assert old['id'] in manager.migrate_credentials()
+
+    first = manager.add_device('10.0.0.2', 'admin', 'Secret#1', 'Huawei')
+    result = manager.import_devices([{'ip': '10.0.0.3', 'username': 'admin', 'password': 'Secret#1', 'vendor': 'H3C'},
+                                     {'ip': '10.0.0.4', 'username': 'ops', 'password': 'Other#2', 'vendor': 'Cisco'}])
+    assert len(result['added']) == 2
+    manager.update_device(first['id'], password='Changed#3')
+
+    with open(manager.devices_file, encoding='utf-8') as f:
+        content = f.read()
+    for password in ('legacy-pw', 'Secret#1', 'Other#2', 'Changed#3'):
+        assert password not in content
+    devices = {device['ip']: device for device in manager.get_all_devices()}
+    assert all(device['password'] == '' and device['credential_id'] for device in devices.values())
+    assert vault.resolve(devices['10.0.0.1']) == ('admin', 'legacy-pw')
+    assert vault.resolve(devices['10.0.0.2']) == ('admin', 'Changed#3')
+    assert vault.resolve(devices['10.0.0.3']) == ('admin', 'Secret#1')
+    assert vault.resolve(devices['10.0.0.4']) == ('ops', 'Other#2')
+    assert len(vault.list_credentials()) == 4  # 相同用户名和密码共用一个凭据（10.0.0.3沿用10.0.0.2的原凭据）
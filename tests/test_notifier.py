@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+告警通知测试：本地文件渠道、发送失败重试、渠道间互不阻塞
+"""
+
+import json  # JSON数据处理
+import os  # 文件操作
+import threading  # 阻塞渠道
+import time  # 等待
+
+import pytest
+
+from modules import notifier as notifier_module
+from modules.notifier import NotificationDispatcher
+
+
+def make_event(index, severity='critical', state='firing'):
+    """构造告警事件"""
+    return {
+        'id': index, 'state': state, 'rule_id': 'cpu_high', 'rule_name': 'CPU使用率过高', 'severity': severity,
+        'metric': 'cpu', 'device_id': f'dev-{index}', 'device_name': f'SW-{index}', 'device_ip': f'10.0.0.{index}',
+        'value': 90, 'message': f'SW-{index} CPU使用率过高', 'timestamp': time.time()
+    }
+
+
+def wait_for(condition, timeout=5):
+    """等待条件成立"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def read_lines(path):
+    """读取文件渠道写入的摘要"""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture(autouse=True)
+def file_sink_dir(tmp_path, monkeypatch):
+    """文件渠道只允许写入临时目录"""
+    monkeypatch.setattr(notifier_module.FileSink, 'base_dir', str(tmp_path))
+
+
+def make_dispatcher(tmp_path, channels, window=0.05):
+    """创建使用临时配置文件的分发器"""
+    dispatcher = NotificationDispatcher(config_file=str(tmp_path / 'notify_config.json'))
+    assert dispatcher.save_config({'digest_window': window, 'channels': channels})
+    dispatcher.start()
+    return dispatcher
+
+
+class FlakySink:
+    """前几次发送失败的渠道"""
+
+    failures = 0  # 剩余失败次数
+    sent = []  # 成功发送的事件
+
+    def __init__(self, **_):
+        pass
+
+    def send(self, title, body, events, summary):
+        if FlakySink.failures > 0:
+            FlakySink.failures -= 1
+            raise ConnectionError('接收端不可用')
+        FlakySink.sent.extend(events)
+
+
+class HangingSink:
+    """一直阻塞的渠道（模拟无响应的SMTP服务器）"""
+
+    release = threading.Event()
+
+    def __init__(self, **_):
+        pass
+
+    def send(self, title, body, events, summary):
+        HangingSink.release.wait(10)
+
+
+@pytest.fixture
+def fake_sinks(monkeypatch):
+    """注册测试渠道并缩短重试间隔"""
+    monkeypatch.setitem(notifier_module.SINK_TYPES, 'flaky', FlakySink)
+    monkeypatch.setitem(notifier_module.SINK_TYPES, 'hang', HangingSink)
+    monkeypatch.setattr(notifier_module, 'RETRY_BASE', 0.05)
+    FlakySink.failures, FlakySink.sent = 0, []
+    HangingSink.release.clear()
+    yield
+    HangingSink.release.set()
+
+
+def test_file_sink_receives_one_digest_per_window(tmp_path):
+    path = str(tmp_path / 'notifications.jsonl')
+    dispatcher = make_dispatcher(tmp_path, [{'id': 'local', 'type': 'file', 'path': path}])
+    for index in range(3):
+        dispatcher.enqueue(make_event(index))
+
+    assert wait_for(lambda: read_lines(path))
+    digest = read_lines(path)[0]
+    assert digest['count'] == 3
+    assert digest['groups'][0]['count'] == 3
+    assert dispatcher.get_stats()['sent'] == 1
+
+
+def test_min_severity_filters_events(tmp_path):
+    path = str(tmp_path / 'notifications.jsonl')
+    dispatcher = make_dispatcher(tmp_path, [{'id': 'local', 'type': 'file', 'path': path,
+                                             'min_severity': 'critical'}])
+    dispatcher.enqueue(make_event(1, severity='warning'))
+    dispatcher.enqueue(make_event(2, severity='critical'))
+
+    assert wait_for(lambda: read_lines(path))
+    assert [alert['id'] for alert in read_lines(path)[0]['alerts']] == [2]
+
+
+def test_failed_send_is_retried_with_events_kept(tmp_path, fake_sinks):
+    FlakySink.failures = 2
+    dispatcher = make_dispatcher(tmp_path, [{'id': 'flaky', 'type': 'flaky', 'max_per_minute': 600}])
+    dispatcher.enqueue(make_event(1))
+    dispatcher.enqueue(make_event(2))
+
+    assert wait_for(lambda: len(FlakySink.sent) == 2)
+    stats = dispatcher.get_stats()
+    assert stats['failed'] == 2
+    assert stats['sent'] == 1
+    assert stats['pending'] == 0
+
+
+def test_hanging_channel_does_not_delay_other_channels(tmp_path, fake_sinks):
+    path = str(tmp_path / 'notifications.jsonl')
+    dispatcher = make_dispatcher(tmp_path, [
+        {'id': 'hang', 'type': 'hang'},
+        {'id': 'local', 'type': 'file', 'path': path},
+    ])
+    dispatcher.enqueue(make_event(1))
+
+    assert wait_for(lambda: read_lines(path), timeout=2)
+
+
+def test_rate_limited_events_merge_into_next_digest(tmp_path):
+    path = str(tmp_path / 'notifications.jsonl')
+    dispatcher = make_dispatcher(tmp_path, [{'id': 'local', 'type': 'file', 'path': path, 'max_per_minute': 1}])
+    dispatcher.enqueue(make_event(1))
+    assert wait_for(lambda: read_lines(path))
+    dispatcher.enqueue(make_event(2))
+    dispatcher.enqueue(make_event(3))
+
+    assert wait_for(lambda: dispatcher.get_stats()['rate_limited'] >= 1)
+    assert len(read_lines(path)) == 1
+    assert dispatcher.get_stats()['pending'] == 2
+
+
+def test_file_sink_path_must_stay_inside_base_dir(tmp_path):
+    dispatcher = NotificationDispatcher(config_file=str(tmp_path / 'notify_config.json'))
+    os.symlink('/etc', str(tmp_path / 'link'))
+    for path in ('../escape.jsonl', str(tmp_path / '..' / 'escape.jsonl'), '/etc/passwd', str(tmp_path),
+                 str(tmp_path / 'link' / 'passwd'), '', None):
+        assert not dispatcher.save_config({'channels': [{'id': 'local', 'type': 'file', 'path': path}]})
+        with pytest.raises(ValueError):
+            notifier_module.FileSink(path=path)
+    assert dispatcher.save_config({'channels': [{'id': 'local', 'type': 'file',
+                                                 'path': str(tmp_path / 'logs' / 'notify.jsonl')}]})
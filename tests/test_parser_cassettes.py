@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+解析器回归测试：零延迟回放各厂商的录制会话（含分页和控制字符），
+经过与线上相同的SSH输出处理和解析路径，结果与保存的期望结果逐字段比较
+
+录制文件由 tools/device_simulator.py 模拟设备录制；修改解析器后如确认新结果正确，
+设置环境变量 NETWORK_MONITOR_UPDATE_GOLDEN=1 运行本测试重新生成期望结果
+"""
+
+import glob  # 查找录制文件
+import json  # 期望结果读写
+import os  # 文件操作
+import time  # 启动时间换算
+
+import pytest
+
+from modules.cassette import CassettePlayer, load_cassettes
+from modules.monitor import DeviceMonitor
+from modules.ssh_connector import SSHConnector
+
+
+CASSETTE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'cassettes')
+# 设置后把本次解析结果写为期望结果
+UPDATE_ENV = 'NETWORK_MONITOR_UPDATE_GOLDEN'
+# 启动时间由回放时的当前时间减去运行时长得到，比较运行时长时允许的误差（秒）
+UPTIME_TOLERANCE = 5
+
+CASSETTES = sorted(path for path in glob.glob(os.path.join(CASSETTE_DIR, '*.json'))
+                   if not path.endswith('.expected.json'))
+
+
+def replay(path):
+    """
+    回放一个录制文件，执行一轮完整采集（含设备信息）
+    :param path: 录制文件路径
+    :return: 监控结果字典（启动时间换算为运行时长）
+    """
+    cassette = load_cassettes(path)[0]
+    device = {'id': 'replay', 'name': 'replay', 'ip': cassette['host'], 'port': cassette['port'],
+              'username': '', 'password': '', 'vendor': cassette['vendor']}
+    result = DeviceMonitor().monitor_device(device, include_facts=True)
+    facts = result.get('facts') or {}
+    if facts.get('boot_time'):
+        facts['uptime_seconds'] = int(time.time() - facts.pop('boot_time'))
+    return result
+
+
+@pytest.fixture
+def player(monkeypatch):
+    """替换SSHConnector的回放器（测试结束后恢复）"""
+    def use(path):
+        monkeypatch.setattr(SSHConnector, 'player', CassettePlayer(path))
+    return use
+
+
+def test_every_vendor_has_a_cassette():
+    vendors = {os.path.basename(path)[:-len('.json')] for path in CASSETTES}
+    assert {'huawei', 'h3c', 'cisco_ios', 'cisco_nxos', 'linux'} <= vendors
+
+
+@pytest.mark.parametrize('path', CASSETTES, ids=lambda path: os.path.basename(path)[:-len('.json')])
+def test_replayed_session_parses_to_expected_result(path, player):
+    player(path)
+    result = replay(path)
+    expected_path = path[:-len('.json')] + '.expected.json'
+
+    if os.environ.get(UPDATE_ENV):
+        with open(expected_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=1, sort_keys=True)
+    with open(expected_path, encoding='utf-8') as f:
+        expected = json.load(f)
+
+    assert result['status'] == 'online'
+    uptime = (result.get('facts') or {}).pop('uptime_seconds', None)
+    expected_uptime = (expected.get('facts') or {}).pop('uptime_seconds', None)
+    if expected_uptime is not None:
+        assert uptime is not None and abs(uptime - expected_uptime) <= UPTIME_TOLERANCE
+    assert result == expected
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+分布式采集测试：多个采集节点加入、退出、心跳超时时的一致性哈希重新分配，
+以及采集节点经HTTP批量上报的gzip结果往返（本地中心端桩服务 + 多个CollectorWorker）
+"""
+
+import gzip  # 构造异常批次
+import json  # 请求体解析
+import re  # 路由匹配
+import threading  # 桩服务线程
+import types  # 假时钟
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # 中心端桩服务
+
+import pytest
+import requests
+
+from modules import sharding
+from modules.collector_worker import CollectorWorker
+from modules.sharding import TOKEN_HEADER, CollectorCoordinator, decode_batch, encode_batch, validate_batch
+
+
+TOKEN = 's3cret'
+DEVICES = [{'id': f'dev-{index:04d}', 'name': f'SW-{index}', 'ip': f'10.0.{index // 250}.{index % 250 + 1}',
+            'port': 22, 'vendor': 'Huawei', 'username': 'admin', 'password': 'admin'} for index in range(600)]
+
+
+def owners(coordinator, devices=DEVICES):
+    """当前每台设备所属的节点"""
+    return {device['id']: coordinator.owner(device['id']) for device in devices}
+
+
+def resolve(device):
+    """登录信息解析函数"""
+    return device['username'], device['password']
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可手动推进的时钟（心跳超时判断使用）"""
+    now = [1000.0]
+    monkeypatch.setattr(sharding, 'time', types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_batch_round_trip_and_limits():
+    payload = {'results': [{'device_id': 'dev-1', 'result': {'status': 'online', 'cpu': 12, 'note': '核心交换机'},
+                            'timestamp': 1.5, 'duration': 0.25}]}
+    data = encode_batch(payload)
+    assert data[:2] == b'\x1f\x8b'  # gzip格式
+    assert decode_batch(data) == payload
+
+    with pytest.raises(ValueError):  # 解压后超过上限（压缩炸弹）
+        decode_batch(gzip.compress(b'[' + b'0,' * 100000 + b'0]'), limit=1000)
+    with pytest.raises(ValueError):
+        decode_batch(b'not gzip')
+
+
+@pytest.mark.parametrize('batch', [
+    [], {'results': 5}, {'results': [1, 2]}, {'results': [{'result': {}}]},
+    {'results': [{'device_id': 'dev-1', 'result': 'online'}]},
+    {'results': [{'device_id': 'dev-1', 'result': None, 'timestamp': '1'}]},
+    {'results': [{'device_id': 'dev-1', 'result': None, 'duration': True}]},
+    {'results': [{'device_id': 'dev-1', 'result': None, 'timestamp': float('nan')}]},
+])
+def test_invalid_batches_are_rejected(batch):
+    with pytest.raises(ValueError):
+        validate_batch(batch)
+
+
+def test_every_device_has_exactly_one_owner(clock):
+    coordinator = CollectorCoordinator(token=TOKEN)
+    for worker_id in ('w1', 'w2', 'w3'):
+        coordinator.heartbeat(worker_id)
+
+    assigned = {worker_id: {device['id'] for device in coordinator.assignments(worker_id, DEVICES, resolve)['devices']}
+                for worker_id in ('w1', 'w2', 'w3')}
+    assert sum(len(ids) for ids in assigned.values()) == len(DEVICES)
+    assert set().union(*assigned.values()) == {device['id'] for device in DEVICES}
+    assert all(len(ids) > len(DEVICES) / 6 for ids in assigned.values())  # 虚拟节点使分配大致均匀
+
+
+def test_join_moves_only_devices_to_new_worker(clock):
+    coordinator = CollectorCoordinator(token=TOKEN)
+    for worker_id in ('w1', 'w2', 'w3'):
+        coordinator.heartbeat(worker_id)
+    before, epoch = owners(coordinator), coordinator.epoch
+
+    coordinator.heartbeat('w4')
+    after = owners(coordinator)
+    moved = [device_id for device_id in before if before[device_id] != after[device_id]]
+    assert coordinator.epoch == epoch + 1
+    assert moved and all(after[device_id] == 'w4' for device_id in moved)
+    assert len(moved) < len(DEVICES) / 2
+
+
+def test_leave_and_timeout_reassign_only_departed_devices(clock):
+    coordinator = CollectorCoordinator(token=TOKEN, timeout=15)
+    for worker_id in ('w1', 'w2', 'w3'):
+        coordinator.heartbeat(worker_id)
+    before = owners(coordinator)
+
+    coordinator.leave('w2')  # 主动退出
+    after = owners(coordinator)
+    for device_id, owner in before.items():
+        if owner == 'w2':
+            assert after[device_id] in ('w1', 'w3')
+        else:
+            assert after[device_id] == owner
+
+    clock[0] += 10
+    coordinator.heartbeat('w1')  # w3 停止心跳
+    clock[0] += 10
+    assert coordinator.is_registered('w1')
+    assert not coordinator.is_registered('w3')  # 超时移出哈希环
+    assert set(owners(coordinator).values()) == {'w1'}
+
+    coordinator.leave('w1')
+    assert set(owners(coordinator).values()) == {None}  # 没有存活节点，由中心进程采集
+
+
+class CentralStub(BaseHTTPRequestHandler):
+    """中心端采集节点接口桩：与ai_monitor_app.py的接口协议一致"""
+
+    coordinator = None  # 协调器
+    received = []  # 解码后的上报结果
+    fail_results = False  # 为True时上报接口返回500
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _route(self):
+        if not self.coordinator.check_token(self.headers.get(TOKEN_HEADER)):
+            return self._reply(403, {'success': False})
+        match = re.match(r'^/api/collectors/([^/]+)/(\w+)$', self.path)
+        worker_id, action = match.groups()
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if action == 'heartbeat':
+            stats = json.loads(body or b'{}').get('stats')
+            return self._reply(200, dict(self.coordinator.heartbeat(worker_id, stats), success=True))
+        if action == 'assignments':
+            if not self.coordinator.is_registered(worker_id):
+                return self._reply(409, {'success': False})
+            return self._reply(200, dict(self.coordinator.assignments(worker_id, DEVICES, resolve),
+                                         thresholds={'cpu': 85}, success=True))
+        if action == 'results':
+            if self.fail_results:
+                return self._reply(500, {'success': False})
+            if not self.coordinator.is_registered(worker_id):
+                return self._reply(409, {'success': False})
+            try:
+                batch = decode_batch(body) if self.headers.get('Content-Encoding') == 'gzip' else json.loads(body)
+                items = validate_batch(batch)
+            except ValueError:
+                return self._reply(400, {'success': False})
+            items = [item for item in items if self.coordinator.owner(item['device_id']) == worker_id]
+            self.received.extend(items)
+            self.coordinator.record_batch(worker_id, len(items))
+            return self._reply(200, {'success': True, 'accepted': len(items)})
+        if action == 'leave':
+            self.coordinator.leave(worker_id)
+            return self._reply(200, {'success': True})
+        return self._reply(404, {'success': False})
+
+    do_GET = do_POST = _route
+
+
+@pytest.fixture
+def central():
+    """启动中心端桩服务"""
+    CentralStub.coordinator = CollectorCoordinator(token=TOKEN)
+    CentralStub.received = []
+    CentralStub.fail_results = False
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CentralStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def assigned_ids(worker):
+    """节点当前负责的设备ID集合"""
+    return {device['id'] for device in worker._devices}
+
+
+def test_workers_rebalance_over_http_and_report_batches(central):
+    workers = [CollectorWorker(central, TOKEN, worker_id=f'w{index}') for index in range(1, 4)]
+    for worker in workers:
+        worker.heartbeat()
+    for worker in workers:  # 后加入的节点改变了分配版本号，先加入的节点在下次心跳时重新拉取
+        worker.heartbeat()
+    all_ids = {device['id'] for device in DEVICES}
+    assert set().union(*map(assigned_ids, workers)) == all_ids
+    assert sum(len(assigned_ids(worker)) for worker in workers) == len(DEVICES)
+    assert workers[0].scheduler.thresholds == {'cpu': 85}
+    assert all('password' in device for device in workers[0]._devices)
+
+    for worker in workers:  # 模拟采集完成的结果
+        for device in worker._devices[:3]:
+            worker._pending.append({'device_id': device['id'], 'result': {'status': 'online', 'cpu': 10},
+                                    'timestamp': 1.0, 'duration': 0.5})
+    departed = assigned_ids(workers[1])
+    workers[1]._shutdown()  # 上报剩余结果后退出
+    for worker in (workers[0], workers[2]):
+        worker.heartbeat()
+        assert worker.flush() == 3
+
+    remaining = assigned_ids(workers[0]) | assigned_ids(workers[2])
+    assert remaining == all_ids
+    assert departed <= remaining
+    assert len(CentralStub.received) == 9
+    assert {item['result']['cpu'] for item in CentralStub.received} == {10}
+    stats = {worker['id']: worker for worker in CentralStub.coordinator.get_workers(DEVICES)}
+    assert set(stats) == {'w1', 'w3'}
+    assert stats['w1']['results'] == 3 and stats['w1']['assigned'] == len(assigned_ids(workers[0]))
+
+
+def test_failed_flush_keeps_results_in_order(central):
+    worker = CollectorWorker(central, TOKEN, worker_id='w1', batch_size=2)
+    worker.heartbeat()
+    for index in range(3):
+        worker._pending.append({'device_id': f'dev-{index:04d}', 'result': None, 'timestamp': index,
+                                'duration': 0})
+
+    CentralStub.fail_results = True
+    with pytest.raises(requests.RequestException):
+        worker.flush()
+    assert [item['timestamp'] for item in worker._pending] == [0, 1, 2]
+
+    CentralStub.fail_results = False
+    while worker.flush():
+        pass
+    assert [item['timestamp'] for item in CentralStub.received] == [0, 1, 2]
+
+
+def test_wrong_token_is_rejected(central):
+    worker = CollectorWorker(central, 'wrong', worker_id='w1')
+    with pytest.raises(requests.HTTPError):
+        worker.heartbeat()
+    assert not CentralStub.coordinator.is_registered('w1')
+
+
+def test_results_only_accepted_from_current_owner(central):
+    first = CollectorWorker(central, TOKEN, worker_id='w1')
+    first.heartbeat()
+    stranger = CollectorWorker(central, TOKEN, worker_id='w2')  # 未发送心跳登记
+    stranger._pending.append({'device_id': DEVICES[0]['id'], 'result': None, 'timestamp': 1.0, 'duration': 0})
+    with pytest.raises(requests.HTTPError):  # 409
+        stranger.flush()
+
+    before = owners(CentralStub.coordinator)
+    stranger.heartbeat()  # 加入后接管w1的部分设备，w1尚未上报的这些设备的结果已过期
+    after = owners(CentralStub.coordinator)
+    kept = next(device_id for device_id in before if after[device_id] == 'w1')
+    moved = next(device_id for device_id in before if after[device_id] == 'w2')
+    first._pending.extend([{'device_id': kept, 'result': None, 'timestamp': 2.0, 'duration': 0},
+                           {'device_id': moved, 'result': None, 'timestamp': 3.0, 'duration': 0}])
+    assert first.flush() == 2
+    assert [item['device_id'] for item in CentralStub.received] == [kept]
@@ -0,0 +1,2 @@
+# 工具包初始化文件
+# 用于将tools目录标记为Python包（开发、测试和压测工具）
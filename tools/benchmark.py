@@ -0,0 +1,558 @@
+# -*- coding: utf-8 -*-
+"""
+性能基准测试
+在模拟设备群（tools/device_simulator.py）和本地模拟大模型接口上测量关键路径的性能：
+    parsers    各接口解析函数（parse_*_interfaces等）的吞吐量（--cassettes提供时使用录制的真实输出）
+    ssh        SSHConnector.execute_command 单条命令延迟（含分页）
+    monitor    DeviceMonitor.monitor_device 完整采集周期
+    inspection InspectionManager.perform_inspection 并发巡检吞吐量
+    analysis   InspectionManager.analyze_inspection 分析流程延迟（大模型接口按固定延迟模拟）
+    dashboard  /api/dashboard/data 在N台设备下的请求吞吐量（需要安装Flask）
+结果写入JSON文件，可与基准文件比较，超过阈值的变化标记为性能回退
+
+用法：
+    python -m tools.benchmark run --output outputs/benchmark/baseline.json
+    python -m tools.benchmark run --baseline outputs/benchmark/baseline.json --threshold 0.2
+    python -m tools.benchmark compare outputs/benchmark/baseline.json outputs/benchmark/latest.json
+存在性能回退时退出码为1，可直接用于持续集成
+"""
+
+import argparse  # 命令行参数
+import importlib.util  # 检查可选依赖
+import json  # 结果文件
+import multiprocessing  # 仪表板基准子进程
+import os  # 文件操作
+import platform  # 运行环境信息
+import shutil  # 清理临时目录
+import sys  # 导入主程序、退出码
+import tempfile  # 临时工作目录
+import threading  # 模拟大模型接口线程
+import time  # 计时
+from concurrent.futures import ThreadPoolExecutor  # 并发测量
+from datetime import datetime  # 结果时间戳
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # 模拟大模型接口
+
+# 仓库根目录（仪表板基准子进程在临时目录中导入主程序）
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from modules.cassette import load_corpus  # 录制语料
+from modules.device_manager import DeviceManager  # 设备管理器（仪表板基准的设备清单）
+from modules.inspection import InspectionManager  # 巡检管理器
+from modules.monitor import DeviceMonitor  # 设备监控器
+from modules.parsers import ParserRegistry, registry  # 厂商命令解析器注册表
+from modules.ssh_connector import SSHConnector  # SSH连接器
+from tools.device_simulator import COMMANDS, DeviceFarm, build_fleet  # 模拟设备群
+
+
+# 结果文件格式版本
+RESULT_VERSION = 1
+# 全部基准项（按执行顺序）
+BENCHMARKS = ('parsers', 'ssh', 'monitor', 'inspection', 'analysis', 'dashboard')
+# 需要启动模拟设备群的基准项
+NETWORK_BENCHMARKS = ('ssh', 'monitor', 'inspection', 'dashboard')
+# 默认结果文件
+DEFAULT_OUTPUT = 'outputs/benchmark/latest.json'
+# 默认回退阈值（相对变化超过20%视为回退）
+DEFAULT_THRESHOLD = 0.2
+# 模拟设备登录信息
+USERNAME = 'admin'
+PASSWORD = 'admin'
+# 模拟大模型返回的分析报告
+MOCK_ANALYSIS = "## 巡检分析\n1. CPU、内存使用率正常\n2. 部分接口处于DOWN状态，请确认是否为预期\n3. 未发现温度告警\n"
+
+
+def add_metric(metrics, name, value, unit, better='lower'):
+    """
+    记录一项指标
+    :param metrics: 指标字典
+    :param name: 指标名称（点号分隔，如 ssh.command.huawei.p50_ms）
+    :param value: 数值
+    :param unit: 单位
+    :param better: lower表示越小越好，higher表示越大越好
+    """
+    metrics[name] = {'value': round(value, 3), 'unit': unit, 'better': better}
+
+
+def _percentile(ordered, ratio):
+    """
+    计算分位数（最近秩）
+    :param ordered: 已排序的样本
+    :param ratio: 分位（0-1）
+    :return: 分位数
+    """
+    return ordered[min(len(ordered) - 1, int(round(ratio * (len(ordered) - 1))))]
+
+
+def add_latency(metrics, prefix, samples):
+    """
+    记录延迟样本的P50和P95（毫秒）
+    :param metrics: 指标字典
+    :param prefix: 指标名称前缀
+    :param samples: 延迟样本（秒）
+    """
+    if not samples:
+        return
+    ordered = sorted(samples)
+    add_metric(metrics, f"{prefix}.p50_ms", _percentile(ordered, 0.5) * 1000, 'ms')
+    add_metric(metrics, f"{prefix}.p95_ms", _percentile(ordered, 0.95) * 1000, 'ms')
+
+
+def device_record(device):
+    """
+    将模拟设备转换为设备管理中的设备信息字典
+    :param device: SimulatedDevice
+    :return: 设备信息字典
+    """
+    return {'id': f"sim{device.index}", 'name': device.hostname, 'ip': device.host, 'port': device.port,
+            'vendor': device.profile['label'], 'username': USERNAME, 'password': PASSWORD}
+
+
+def _render(samples, vendor, command):
+    """
+    由模拟设备直接生成命令输出（不经过SSH）
+    :param samples: 模拟设备列表
+    :param vendor: 厂商键（通配厂商键使用任意支持该命令的设备）
+    :param command: 命令
+    :return: 命令输出，没有设备支持该命令返回None
+    """
+    for device in samples:
+        if vendor in (device.vendor, ParserRegistry.DEFAULT_VENDOR) and command in COMMANDS[device.vendor]:
+            return COMMANDS[device.vendor][command](device)
+    return None
+
+
+def _corpus_output(corpus, vendor, command):
+    """
+    从录制语料中取命令输出（通配厂商键使用任意厂商的同名命令）
+    :return: 命令输出，没有返回None
+    """
+    for (corpus_vendor, corpus_command), output in corpus.items():
+        if corpus_command == command and vendor in (corpus_vendor, ParserRegistry.DEFAULT_VENDOR):
+            return output
+    return None
+
+
+def bench_parsers(metrics, samples, duration, corpus=None):
+    """
+    接口解析函数吞吐量（每个解析函数在给定时长内反复解析同一份输出）
+    :param metrics: 指标字典
+    :param samples: 每个厂商一台模拟设备
+    :param duration: 每个解析函数的测量时长（秒）
+    :param corpus: 录制语料 {(厂商键, 命令): 输出}，提供时优先使用真实设备的输出
+    """
+    corpus = corpus or {}
+    vendors = [device.vendor for device in samples] + sorted({vendor for vendor, _ in corpus})
+    seen = set()
+    for vendor in list(dict.fromkeys(vendors)) + [ParserRegistry.DEFAULT_VENDOR]:
+        for metric in ('interfaces', 'interface_details'):
+            spec = registry.lookup(vendor, metric)
+            if spec is None or spec.command is None or spec.parser in seen:
+                continue
+            output = _corpus_output(corpus, vendor, spec.command) or _render(samples, vendor, spec.command)
+            if output is None:  # 语料和模拟器都没有该命令的输出
+                continue
+            seen.add(spec.parser)
+            count, start = 0, time.perf_counter()
+            while time.perf_counter() - start < duration:
+                spec.parser(output)
+                count += 1
+            elapsed = time.perf_counter() - start
+            add_metric(metrics, f"parsers.{spec.parser.__name__}.ops_per_sec", count / elapsed, 'ops/s', 'higher')
+
+
+def _parallel(samples, func):
+    """
+    每台设备一个线程并发执行测量函数（各厂商互不等待，总耗时约等于最慢的厂商）
+    :return: 测量结果列表（与samples顺序一致）
+    """
+    with ThreadPoolExecutor(max_workers=len(samples)) as executor:
+        return list(executor.map(func, samples))
+
+
+def bench_ssh(metrics, samples, repeats):
+    """
+    SSH登录耗时和单条命令延迟（接口表命令，含分页，使用注册表中的等待时间）
+    :param metrics: 指标字典
+    :param samples: 每个厂商一台模拟设备
+    :param repeats: 每个厂商的命令执行次数
+    """
+    def measure(device):
+        ssh = SSHConnector.from_device(device_record(device))
+        start = time.perf_counter()
+        if not ssh.connect():
+            return None, []
+        connect_time = time.perf_counter() - start
+        spec = registry.lookup(device.vendor, 'interfaces')
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            if ssh.execute_command(spec.command, wait_time=spec.wait_time):
+                latencies.append(time.perf_counter() - start)
+        ssh.disconnect()
+        return connect_time, latencies
+
+    for device, (connect_time, latencies) in zip(samples, _parallel(samples, measure)):
+        if connect_time is None:
+            print(f"SSH基准：{device.vendor} 连接失败")
+            continue
+        add_metric(metrics, f"ssh.connect.{device.vendor}.ms", connect_time * 1000, 'ms')
+        add_latency(metrics, f"ssh.command.{device.vendor}", latencies)
+
+
+def bench_monitor(metrics, samples, repeats):
+    """
+    单台设备完整采集周期（登录、CPU、内存、温度、接口表、断开）
+    :param metrics: 指标字典
+    :param samples: 每个厂商一台模拟设备
+    :param repeats: 每个厂商的采集次数
+    """
+    monitor = DeviceMonitor()
+
+    def measure(device):
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = monitor.monitor_device(device_record(device))
+            if result and result.get('status') == 'online':
+                latencies.append(time.perf_counter() - start)
+        return latencies
+
+    for device, latencies in zip(samples, _parallel(samples, measure)):
+        if not latencies:
+            print(f"采集基准：{device.vendor} 采集失败")
+        add_latency(metrics, f"monitor.cycle.{device.vendor}", latencies)
+
+
+def bench_inspection(metrics, devices, workers, workdir):
+    """
+    并发巡检吞吐量（每台设备执行CPU、内存、接口表、版本命令并写入巡检文件）
+    :param metrics: 指标字典
+    :param devices: 参与巡检的模拟设备
+    :param workers: 并发巡检线程数
+    :param workdir: 临时工作目录
+    """
+    manager = InspectionManager(output_dir=os.path.join(workdir, 'inspection_outputs'))
+
+    def measure(device):
+        commands = [spec.command for spec in (registry.lookup(device.vendor, metric)
+                                              for metric in ('cpu', 'memory', 'interfaces', 'version'))
+                    if spec and spec.command]
+        start = time.perf_counter()
+        filepath = manager.perform_inspection(device_record(device), commands)
+        return time.perf_counter() - start if filepath else None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        latencies = [latency for latency in executor.map(measure, devices) if latency is not None]
+    elapsed = time.perf_counter() - start
+    if len(latencies) < len(devices):
+        print(f"巡检基准：{len(devices) - len(latencies)}台设备巡检失败")
+    add_metric(metrics, 'inspection.devices_per_min', len(latencies) / elapsed * 60, 'devices/min', 'higher')
+    add_latency(metrics, 'inspection.device', latencies)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """模拟大模型接口（兼容OpenAI chat/completions格式），按固定延迟返回分析报告"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.request_sizes.append(len(body))
+        time.sleep(self.server.delay)
+        payload = json.dumps({'choices': [{'message': {'role': 'assistant', 'content': MOCK_ANALYSIS}}]})
+        data = payload.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        """不输出访问日志"""
+
+
+def start_mock_llm(delay):
+    """
+    启动模拟大模型接口
+    :param delay: 每次请求的响应延迟（秒，模拟模型推理耗时）
+    :return: ThreadingHTTPServer（server_address中为实际端口）
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockLLMHandler)
+    server.delay = delay  # 响应延迟
+    server.request_sizes = []  # 每次请求的字节数
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench_analysis(metrics, samples, repeats, llm_delay, workdir):
+    """
+    巡检分析流程延迟（读取巡检文件、构造提示词、调用大模型、写入报告、扣除模拟延迟后的本地开销）
+    :param metrics: 指标字典
+    :param samples: 每个厂商一台模拟设备（由其命令输出生成巡检文件）
+    :param repeats: 每个巡检文件的分析次数
+    :param llm_delay: 模拟大模型响应延迟（秒）
+    :param workdir: 临时工作目录
+    """
+    manager = InspectionManager(output_dir=os.path.join(workdir, 'analysis_outputs'))
+    server = start_mock_llm(llm_delay)
+    ai_config = {'api_url': f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions",
+                 'api_key': 'benchmark', 'model': 'mock'}
+    latencies = []
+    try:
+        for device in samples:
+            filepath = os.path.join(manager.inspection_dir, f"{device.hostname}_{device.host}.txt")
+            with open(filepath, 'w', encoding='utf-8') as f:  # 由全部模拟命令的输出组成巡检文件
+                for command, handler in COMMANDS[device.vendor].items():
+                    prompt = device.profile['prompt'].format(host=device.hostname, user=USERNAME)
+                    f.write(f"{prompt}{command}\n{handler(device)}\n")
+            for _ in range(repeats):
+                start = time.perf_counter()
+                if manager.analyze_inspection(filepath, ai_config, device.profile['label']):
+                    latencies.append(time.perf_counter() - start)
+    finally:
+        server.shutdown()
+        server.server_close()
+    add_latency(metrics, 'analysis.latency', latencies)
+    add_latency(metrics, 'analysis.overhead', [max(0.0, latency - llm_delay) for latency in latencies])
+    if server.request_sizes:
+        add_metric(metrics, 'analysis.prompt_kb', sum(server.request_sizes) / len(server.request_sizes) / 1024, 'KB')
+
+
+def _dashboard_worker(records, duration, app_dir, queue):
+    """
+    仪表板基准子进程：在独立目录中导入主程序（其配置文件和后台线程随子进程结束）
+    :param records: 设备信息字典列表
+    :param duration: 测量时长（秒）
+    :param app_dir: 主程序工作目录
+    :param queue: 返回指标字典的队列
+    """
+    metrics = {}
+    try:
+        os.chdir(app_dir)
+        DeviceManager(os.path.join('config', 'devices.json')).import_devices(records)
+        import ai_monitor_app  # 导入时按当前目录加载配置
+        ai_monitor_app.start_background()  # 与实际运行一致，测量时后台采集和探测线程同时运行
+
+        devices = ai_monitor_app.device_manager.get_all_devices()
+        ai_monitor_app.reachability.sweep(devices)  # 先完成一轮可达性探测，只测量稳态请求
+        for index, device in enumerate(devices):  # 模拟调度器已采集过一轮
+            ai_monitor_app.poll_scheduler.record(device['id'], {'status': 'online', 'cpu': 10 + index % 50,
+                                                                'memory': 30 + index % 40, 'temperature': 40})
+        client = ai_monitor_app.app.test_client()
+        if client.get('/api/dashboard/data').status_code == 200:
+            latencies = []
+            start = time.perf_counter()
+            while time.perf_counter() - start < duration:
+                request_start = time.perf_counter()
+                client.get('/api/dashboard/data')
+                latencies.append(time.perf_counter() - request_start)
+            add_metric(metrics, 'dashboard.requests_per_sec', len(latencies) / (time.perf_counter() - start),
+                       'req/s', 'higher')
+            add_latency(metrics, 'dashboard.request', latencies)
+        else:
+            print('仪表板基准：请求失败')
+    except Exception as e:  # 子进程异常时返回空结果
+        print(f"仪表板基准失败: {e}")
+    queue.put(metrics)
+
+
+def bench_dashboard(metrics, devices, duration, workdir):
+    """
+    仪表板接口吞吐量（N台模拟设备均在线且已有采集结果，测量稳态请求）
+    :param metrics: 指标字典
+    :param devices: 全部模拟设备
+    :param duration: 测量时长（秒）
+    :param workdir: 临时工作目录（主程序的config和outputs写在这里）
+    """
+    if importlib.util.find_spec('flask') is None:  # 主程序依赖Flask，不导入只检查是否安装
+        print('仪表板基准需要Flask（pip install -r requirements.txt），已跳过')
+        return
+
+    app_dir = os.path.join(workdir, 'app')
+    os.makedirs(app_dir, exist_ok=True)
+    context = multiprocessing.get_context('spawn')  # 子进程重新导入，不继承本进程的线程
+    queue = context.Queue()
+    process = context.Process(target=_dashboard_worker,
+                              args=([device_record(device) for device in devices], duration, app_dir, queue))
+    process.start()
+    try:
+        metrics.update(queue.get(timeout=duration + 300))
+    except Exception:  # 子进程异常退出
+        print('仪表板基准：子进程未返回结果')
+    process.terminate()  # 主程序的后台线程（轮询调度、可达性扫描等）不会自行退出
+    process.join()
+
+
+def run_benchmarks(args):
+    """
+    执行基准测试
+    :param args: 命令行参数
+    :return: 结果字典 {'version', 'created', 'environment', 'config', 'metrics'}
+    """
+    selected = [name for name in BENCHMARKS if name in args.only]
+    vendors = [vendor.strip() for vendor in args.vendors.split(',') if vendor.strip()]
+    devices = build_fleet(max(args.fleet, len(vendors)), vendors, base_ip=args.base_ip, port=args.port,
+                          interfaces=args.interfaces, seed=args.seed)
+    samples = devices[:len(vendors)]  # 每个厂商一台
+    metrics = {}
+    farm = None
+    workdir = tempfile.mkdtemp(prefix='benchmark_')
+    try:
+        if any(name in NETWORK_BENCHMARKS for name in selected):
+            farm = DeviceFarm(devices, USERNAME, PASSWORD, args.latency, args.jitter, args.page_lines)
+            farm.start()
+        for name in selected:
+            print(f"运行基准：{name}")
+            start = time.perf_counter()
+            if name == 'parsers':
+                bench_parsers(metrics, samples, args.parser_duration,
+                              load_corpus(args.cassettes) if args.cassettes else None)
+            elif name == 'ssh':
+                bench_ssh(metrics, samples, args.repeats)
+            elif name == 'monitor':
+                bench_monitor(metrics, samples, args.repeats)
+            elif name == 'inspection':
+                bench_inspection(metrics, devices[:args.inspection_devices], args.workers, workdir)
+            elif name == 'analysis':
+                bench_analysis(metrics, samples, args.repeats, args.llm_delay, workdir)
+            elif name == 'dashboard':
+                bench_dashboard(metrics, devices, args.duration, workdir)
+            print(f"  完成，用时 {time.perf_counter() - start:.1f} 秒")
+    finally:
+        if farm:
+            farm.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    config = {key: value for key, value in vars(args).items() if key not in ('command', 'output', 'baseline', 'threshold')}
+    return {
+        'version': RESULT_VERSION,
+        'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpus': os.cpu_count()},
+        'config': config,
+        'metrics': metrics
+    }
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    比较两次基准结果
+    :param baseline: 基准结果字典
+    :param current: 本次结果字典
+    :param threshold: 回退阈值（相对变化比例）
+    :return: 比较行列表 [{'name', 'baseline', 'current', 'change', 'status'}]，
+             status为regression / improved / ok / missing / new
+    """
+    rows = []
+    for name, base in sorted(baseline['metrics'].items()):
+        cur = current['metrics'].get(name)
+        if cur is None:
+            rows.append({'name': name, 'baseline': base['value'], 'current': None, 'change': None,
+                         'status': 'missing'})
+            continue
+        change = (cur['value'] - base['value']) / base['value'] if base['value'] else 0.0
+        worse = change if base['better'] == 'lower' else -change  # 正数表示变差
+        status = 'regression' if worse > threshold else 'improved' if worse < -threshold else 'ok'
+        rows.append({'name': name, 'baseline': base['value'], 'current': cur['value'], 'change': change,
+                     'status': status})
+    for name in sorted(set(current['metrics']) - set(baseline['metrics'])):
+        rows.append({'name': name, 'baseline': None, 'current': current['metrics'][name]['value'],
+                     'change': None, 'status': 'new'})
+    return rows
+
+
+def print_metrics(result):
+    """打印本次结果"""
+    for name, metric in sorted(result['metrics'].items()):
+        print(f"  {name:<52} {metric['value']:>12.3f} {metric['unit']}")
+
+
+def print_comparison(rows, baseline, current):
+    """
+    打印比较结果
+    :return: 回退指标数量
+    """
+    if baseline.get('config') != current.get('config'):
+        print('注意：两次运行的参数不同，比较结果仅供参考')
+    labels = {'regression': '回退', 'improved': '改善', 'ok': '', 'missing': '缺失', 'new': '新增'}
+    for row in rows:
+        base = '-' if row['baseline'] is None else f"{row['baseline']:.3f}"
+        cur = '-' if row['current'] is None else f"{row['current']:.3f}"
+        change = '' if row['change'] is None else f"{row['change'] * 100:+.1f}%"
+        print(f"  {row['name']:<52} {base:>12} {cur:>12} {change:>9} {labels[row['status']]}")
+    regressions = sum(1 for row in rows if row['status'] == 'regression')
+    print(f"共{len(rows)}项指标，{regressions}项回退")
+    return regressions
+
+
+def load_result(path):
+    """读取结果文件"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_result(result, path):
+    """保存结果文件（先写临时文件再替换）"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_file = path + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=4)
+    os.replace(temp_file, path)
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description='性能基准测试（模拟设备群 + 模拟大模型接口）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help='执行基准测试')
+    run.add_argument('--only', type=lambda text: [item.strip() for item in text.split(',') if item.strip()],
+                     default=list(BENCHMARKS), help=f"基准项（逗号分隔，可选：{', '.join(BENCHMARKS)}）")
+    run.add_argument('--output', default=DEFAULT_OUTPUT, help='结果文件路径')
+    run.add_argument('--baseline', help='基准结果文件（提供时运行后比较）')
+    run.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='回退阈值（相对变化比例）')
+    run.add_argument('--vendors', default='huawei,h3c,cisco_ios,cisco_nxos,linux', help='厂商列表')
+    run.add_argument('--fleet', type=int, default=200, help='模拟设备数量（仪表板基准的设备规模）')
+    run.add_argument('--base-ip', default='127.2.0.1', help='模拟设备起始回环地址')
+    run.add_argument('--port', type=int, default=2222, help='模拟设备SSH端口')
+    run.add_argument('--interfaces', type=int, default=48, help='每台设备的接口数量')
+    run.add_argument('--latency', type=float, default=0.05, help='模拟设备命令响应延迟（秒）')
+    run.add_argument('--jitter', type=float, default=0.0, help='模拟设备响应延迟抖动（秒）')
+    run.add_argument('--page-lines', type=int, default=24, help='模拟设备分页行数')
+    run.add_argument('--repeats', type=int, default=3, help='SSH、采集、分析基准的重复次数')
+    run.add_argument('--parser-duration', type=float, default=1.0, help='每个解析函数的测量时长（秒）')
+    run.add_argument('--cassettes', help='录制文件或目录（解析器基准优先使用录制的真实输出）')
+    run.add_argument('--inspection-devices', type=int, default=20, help='巡检基准的设备数量')
+    run.add_argument('--workers', type=int, default=10, help='巡检基准的并发线程数')
+    run.add_argument('--llm-delay', type=float, default=0.5, help='模拟大模型响应延迟（秒）')
+    run.add_argument('--duration', type=float, default=5.0, help='仪表板基准的测量时长（秒）')
+    run.add_argument('--seed', type=int, default=0, help='随机种子')
+
+    compare = subparsers.add_parser('compare', help='比较两个结果文件')
+    compare.add_argument('baseline', help='基准结果文件')
+    compare.add_argument('current', help='本次结果文件')
+    compare.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='回退阈值（相对变化比例）')
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        baseline, current = load_result(args.baseline), load_result(args.current)
+    else:
+        unknown = [name for name in args.only if name not in BENCHMARKS]
+        if unknown:
+            parser.error(f"未知基准项: {', '.join(unknown)}")
+        current = run_benchmarks(args)
+        save_result(current, args.output)
+        print(f"结果已保存: {args.output}")
+        print_metrics(current)
+        if not args.baseline:
+            return
+        baseline = load_result(args.baseline)
+
+    rows = compare_results(baseline, current, args.threshold)
+    if print_comparison(rows, baseline, current):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
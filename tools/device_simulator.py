@@ -0,0 +1,868 @@
+# -*- coding: utf-8 -*-
+"""
+SSH设备模拟器
+在本机回环地址上启动N台模拟网络设备（华为、H3C、Cisco IOS、Cisco NX-OS、Linux），
+输出格式与modules/parsers.py中的解析器一致，支持提示符、--More--分页、配置模式、
+可配置的响应延迟和抖动、大输出，以及认证失败、无响应、连接重置等故障模式，
+用于在没有真实交换机的情况下对SSHConnector、DeviceMonitor、InspectionManager等做功能验证和压力测试
+
+用法：
+    python -m tools.device_simulator --count 1000 --export outputs/sim_devices.csv
+    然后通过 POST /api/devices/import 导入生成的CSV文件
+
+说明：每台设备绑定一个独立的回环地址（默认从127.1.0.1开始，Linux下整个127.0.0.0/8都属于回环接口），
+设备管理按IP去重，因此不建议多台设备共用同一个IP
+"""
+
+import argparse  # 命令行参数
+import csv  # 导出设备清单
+import ipaddress  # 回环地址分配
+import logging  # 关闭服务端传输日志
+import os  # 文件操作
+import random  # 随机指标、延迟抖动、故障分配
+import selectors  # 多监听端口统一accept
+import socket  # TCP监听
+import struct  # SO_LINGER（发送RST）
+import threading  # 每个连接一个会话线程
+import time  # 时间处理
+from datetime import datetime  # 配置时间戳
+
+import paramiko  # SSH服务端
+
+
+# 各厂商CLI特征：提示符、配置模式提示符、分页提示及其擦除序列、关闭分页命令、进入/退出配置模式命令、错误提示
+VENDOR_PROFILES = {
+    'huawei': {
+        'label': 'Huawei',  # 导出时的厂商名称（与页面一致）
+        'prompt': '<{host}>', 'config_prompt': '[{host}{context}]',
+        'more': '  ---- More ----', 'more_erase': '\x1b[16D                \x1b[16D',  # ANSI光标回退擦除
+        'pager_off': ('screen-length 0 temporary',),
+        'config_enter': ('system-view',), 'config_exit': ('quit',), 'config_end': ('return',),
+        'error': "Error: Unrecognized command found at '^' position.",
+        'interface': 'GigabitEthernet0/0/{index}',
+    },
+    'h3c': {
+        'label': 'H3C',
+        'prompt': '<{host}>', 'config_prompt': '[{host}{context}]',
+        'more': '  ---- More ----', 'more_erase': '\x1b[16D                \x1b[16D',
+        'pager_off': ('screen-length disable',),
+        'config_enter': ('system-view',), 'config_exit': ('quit',), 'config_end': ('return',),
+        'error': "% Unrecognized command found at '^' position.",
+        'interface': 'GigabitEthernet1/0/{index}',
+    },
+    'cisco_ios': {
+        'label': 'Cisco(IOS)',
+        'prompt': '{host}#', 'config_prompt': '{host}(config{context})#',
+        'more': ' --More-- ', 'more_erase': '\b' * 10 + ' ' * 10 + '\b' * 10,  # 退格擦除
+        'pager_off': ('terminal length 0',),
+        'config_enter': ('configure terminal', 'conf t'), 'config_exit': ('exit',), 'config_end': ('end',),
+        'error': "% Invalid input detected at '^' marker.",
+        'interface': 'GigabitEthernet1/0/{index}',
+    },
+    'cisco_nxos': {
+        'label': 'Cisco(NX-OS)',
+        'prompt': '{host}#', 'config_prompt': '{host}(config{context})#',
+        'more': ' --More-- ', 'more_erase': '\b' * 10 + ' ' * 10 + '\b' * 10,
+        'pager_off': ('terminal length 0',),
+        'config_enter': ('configure terminal', 'conf t'), 'config_exit': ('exit',), 'config_end': ('end',),
+        'error': "% Invalid command at '^' marker.",
+        'interface': 'Ethernet1/{index}',
+    },
+    'linux': {
+        'label': 'Linux',
+        'prompt': '{user}@{host}:~$ ', 'config_prompt': None,
+        'more': None, 'more_erase': None,  # 非交互命令不分页
+        'pager_off': (),
+        'config_enter': (), 'config_exit': (), 'config_end': (),
+        'error': 'bash: {command}: command not found',
+        'interface': 'eth{index}',
+    },
+}
+# 支持的故障模式
+FAILURE_MODES = ('auth_fail', 'hang', 'reset', 'drop')
+# 服务端传输的日志通道（客户端断开时paramiko会记录Socket异常，模拟器中属于正常现象）
+SERVER_LOG_CHANNEL = 'paramiko.transport.simulator'
+logging.getLogger(SERVER_LOG_CHANNEL).setLevel(logging.CRITICAL)
+
+
+class SimulatedDevice:
+    """模拟设备：保存厂商、地址、故障模式和随时间变化的指标"""
+
+    def __init__(self, index, vendor, host, port, interfaces=48, config_lines=200, failure=None, seed=None):
+        """
+        初始化模拟设备
+        :param index: 设备序号
+        :param vendor: 厂商键（VENDOR_PROFILES中的键）
+        :param host: 监听地址
+        :param port: 监听端口
+        :param interfaces: 接口数量（用于生成大输出）
+        :param config_lines: 运行配置中额外的ACL行数（用于生成大配置）
+        :param failure: 故障模式（auth_fail / hang / reset / drop），None表示正常
+        :param seed: 随机种子（相同种子生成相同的设备）
+        """
+        self.index = index  # 序号
+        self.vendor = vendor  # 厂商键
+        self.profile = VENDOR_PROFILES[vendor]  # 厂商CLI特征
+        self.host = host  # 监听地址
+        self.port = port  # 监听端口
+        self.failure = failure  # 故障模式
+        self.hostname = f"SIM-{vendor.upper().replace('_', '-')}-{index:04d}"  # 主机名
+        self.serial_number = f"SIM{index:08d}"  # 序列号
+        self.config_lines = config_lines  # 配置行数
+        self.started = time.time()  # 启动时间（计数器和运行时长的基准）
+        self.boot_time = self.started - random.Random(seed).randint(3600, 90 * 86400)  # 模拟启动时间
+        self._random = random.Random(seed)  # 设备独立的随机数
+        self._cpu = self._random.randint(5, 40)  # 当前CPU使用率
+        self._memory = self._random.randint(20, 70)  # 当前内存使用率
+        self.temperature = self._random.randint(30, 55)  # 温度
+        self.interfaces = [
+            {
+                'name': self.profile['interface'].format(index=number),  # 接口名
+                'up': self._random.random() > 0.2,  # 约80%接口UP
+                'rate': self._random.randint(1000, 10 ** 8),  # 平均速率（字节/秒）
+                'errors': self._random.choice([0, 0, 0, 0, 3, 17]),  # 错误计数
+            }
+            for number in range(1, interfaces + 1)
+        ]
+
+    def next_cpu(self):
+        """CPU使用率随机游走（每次查询变化一次）"""
+        self._cpu = min(99, max(1, self._cpu + self._random.randint(-5, 5)))
+        return self._cpu
+
+    def next_memory(self):
+        """内存使用率随机游走（变化比CPU缓慢）"""
+        self._memory = min(95, max(5, self._memory + self._random.randint(-1, 1)))
+        return self._memory
+
+    def counters(self, interface):
+        """
+        计算接口当前的收发计数器（按平均速率随时间增长）
+        :return: (rx_bytes, tx_bytes, rx_packets, tx_packets)
+        """
+        if not interface['up']:
+            return 0, 0, 0, 0
+        elapsed = time.time() - self.boot_time
+        rx_bytes = int(interface['rate'] * elapsed)
+        tx_bytes = int(interface['rate'] * 0.6 * elapsed)
+        return rx_bytes, tx_bytes, rx_bytes // 800, tx_bytes // 800
+
+    def uptime_text(self):
+        """运行时长文本（如：10 days, 2 hours, 3 minutes）"""
+        seconds = int(time.time() - self.boot_time)
+        days, seconds = divmod(seconds, 86400)
+        hours, seconds = divmod(seconds, 3600)
+        return f"{days} days, {hours} hours, {seconds // 60} minutes"
+
+
+# ==================== 华为 / H3C ====================
+def _huawei_cpu(device):
+    return (f"CPU Usage Stat. Cycle: 60 (Second)\n"
+            f"CPU Usage            : {device.next_cpu()}% Max: 87%\n"
+            f"CPU Usage Stat. Time : {datetime.now():%Y-%m-%d  %H:%M:%S}")
+
+
+def _huawei_memory(device):
+    memory = device.next_memory()
+    return (f"Memory utilization statistics at {datetime.now():%Y-%m-%d %H:%M:%S}\n"
+            f"System Total Memory Is: 2147483648 bytes\n"
+            f"Total Memory Used Is: {2147483648 * memory // 100} bytes\n"
+            f"Memory Utilization Percentage Is: {memory}%")
+
+
+def _huawei_environment(device):
+    return '\n'.join(f"Slot {slot}  Board Temperature: {device.temperature + slot}C  (Lower: 0C, Upper: 68C)"
+                     for slot in range(2))
+
+
+def _huawei_interface_brief(device):
+    lines = ['PHY: Physical', '*down: administratively down',
+             'Interface                   PHY   Protocol  InUti OutUti   inErrors  outErrors']
+    for interface in device.interfaces:
+        state = 'up' if interface['up'] else 'down'
+        lines.append(f"{interface['name']:<27} {state:<5} {state:<9} 0.01%  0.01%  {interface['errors']:>9}  {0:>9}")
+    return '\n'.join(lines)
+
+
+def _huawei_interface(device):
+    blocks = []
+    for interface in device.interfaces:
+        state = 'UP' if interface['up'] else 'DOWN'
+        rx_bytes, tx_bytes, rx_packets, tx_packets = device.counters(interface)
+        blocks.append(
+            f"{interface['name']} current state : {state}\n"
+            f"Line protocol current state : {state}\n"
+            f"Description: {device.hostname} port {interface['name']}\n"
+            f"Speed : 1000,  Loopback: NONE\n"
+            f"Input:  {rx_packets} packets, {rx_bytes} bytes\n"
+            f"Output:  {tx_packets} packets, {tx_bytes} bytes\n"
+            f"Input errors:  {interface['errors']}\n"
+            f"Output errors: 0\n"
+        )
+    return '\n'.join(blocks)
+
+
+def _huawei_version(device):
+    return ("Huawei Versatile Routing Platform Software\n"
+            "VRP (R) software, Version 5.170 (S5700 V200R011C10SPC500)\n"
+            "Copyright (C) 2000-2018 HUAWEI TECH CO., LTD\n"
+            f"HUAWEI S5700-28C-HI Routing Switch uptime is {device.uptime_text()}")
+
+
+def _h3c_version(device):
+    return ("H3C Comware Software, Version 7.1.045, Release 3108P03\n"
+            "Copyright (c) 2004-2018 New H3C Technologies Co., Ltd. All rights reserved.\n"
+            f"H3C S5130-52S-EI uptime is {device.uptime_text()}")
+
+
+def _huawei_config(device):
+    lines = ['!Software Version V200R011C10SPC500',
+             f"!Last configuration was updated at {datetime.now():%Y-%m-%d %H:%M:%S}+08:00",
+             '#', f"sysname {device.hostname}", '#']
+    for interface in device.interfaces:
+        lines += [f"interface {interface['name']}", f" description {device.hostname} port {interface['name']}",
+                  ' port link-type trunk' if interface['up'] else ' shutdown', '#']
+    lines += ['acl number 3000'] + [f" rule {5 * (number + 1)} permit ip source 10.{number // 256 % 256}."
+                                    f"{number % 256}.0 0.0.0.255" for number in range(device.config_lines)] + ['#']
+    lines += ['return']
+    return '\n'.join(lines)
+
+
+# ==================== Cisco IOS / NX-OS ====================
+def _cisco_cpu(device):
+    cpu = device.next_cpu()
+    lines = [f"CPU utilization for five seconds: {cpu}%/0%; one minute: {cpu}%; five minutes: {cpu}%",
+             ' PID Runtime(ms)     Invoked      uSecs   5Sec   1Min   5Min TTY Process']
+    lines += [f"{pid:>4} {pid * 37:>11} {pid * 101:>11} {pid % 900:>10}  0.00%  0.00%  0.00%   0 Process {pid}"
+              for pid in range(1, 120)]
+    return '\n'.join(lines)
+
+
+def _cisco_ios_memory(device):
+    total = 3710293952
+    used = total * device.next_memory() // 100
+    return (f"Processor Pool Total: {total} Used: {used} Free: {total - used}\n"
+            f"      I/O Pool Total:   67108864 Used:   20971520 Free:   46137344")
+
+
+def _cisco_ios_temperature(device):
+    return (f"Temperature Value: {device.temperature} Degree Celsius\n"
+            "Temperature State: GREEN\n"
+            "Yellow Threshold : 46 Degree Celsius\n"
+            "Red Threshold    : 60 Degree Celsius")
+
+
+def _cisco_ios_interface_brief(device):
+    lines = ['Interface              IP-Address      OK? Method Status                Protocol']
+    for number, interface in enumerate(device.interfaces, start=1):
+        state = 'up' if interface['up'] else 'down'
+        address = f"10.{device.index // 256 % 256}.{device.index % 256}.{number % 250 + 1}" if interface['up'] \
+            else 'unassigned'
+        lines.append(f"{interface['name']:<22} {address:<15} YES NVRAM  {state:<21} {state}")
+    return '\n'.join(lines)
+
+
+def _cisco_ios_interfaces(device):
+    blocks = []
+    for interface in device.interfaces:
+        state = 'up' if interface['up'] else 'down'
+        rx_bytes, tx_bytes, rx_packets, tx_packets = device.counters(interface)
+        blocks.append(
+            f"{interface['name']} is {state}, line protocol is {state} (connected)\n"
+            f"  Hardware is Gigabit Ethernet, address is 0011.2233.{device.index % 10000:04d}\n"
+            f"  Description: {device.hostname} port {interface['name']}\n"
+            f"  Full-duplex, 1000Mb/s, media type is 10/100/1000BaseTX\n"
+            f"     {rx_packets} packets input, {rx_bytes} bytes, 0 no buffer\n"
+            f"     {interface['errors']} input errors, 0 CRC, 0 frame, 0 overrun, 0 ignored\n"
+            f"     {tx_packets} packets output, {tx_bytes} bytes, 0 underruns\n"
+            f"     0 output errors, 0 collisions, 1 interface resets"
+        )
+    return '\n'.join(blocks)
+
+
+def _cisco_ios_version(device):
+    return ("Cisco IOS Software, C2960 Software (C2960-LANBASEK9-M), Version 15.0(2)SE4, RELEASE SOFTWARE (fc1)\n"
+            "ROM: Bootstrap program is C2960 boot loader\n"
+            f"{device.hostname} uptime is {device.uptime_text()}\n"
+            "cisco WS-C2960-24TT-L (PowerPC405) processor (revision B0) with 65536K bytes of memory.\n"
+            f"Processor board ID {device.serial_number}\n"
+            "Model number                    : WS-C2960-24TT-L\n"
+            f"System serial number            : {device.serial_number}")
+
+
+def _cisco_inventory(device):
+    model = 'WS-C2960-24TT-L' if device.vendor == 'cisco_ios' else 'N9K-C93180YC-EX'
+    return (f'NAME: "1", DESCR: "{model}"\n'
+            f"PID: {model}   , VID: V02  , SN: {device.serial_number}")
+
+
+def _cisco_config(device):
+    lines = ['Building configuration...', '',
+             f"Current configuration : {device.config_lines * 40} bytes", '!',
+             f"! Last configuration change at {datetime.now():%H:%M:%S UTC %a %b %d %Y}", '!',
+             'version 15.0', f"hostname {device.hostname}", '!']
+    for interface in device.interfaces:
+        lines += [f"interface {interface['name']}", f" description {device.hostname} port {interface['name']}",
+                  ' switchport mode trunk' if interface['up'] else ' shutdown', '!']
+    lines += ['ip access-list extended SIM-ACL'] + [
+        f" permit ip 10.{number // 256 % 256}.{number % 256}.0 0.0.0.255 any" for number in range(device.config_lines)
+    ]
+    lines += ['!', 'end']
+    return '\n'.join(lines)
+
+
+def _nxos_memory(device):
+    used = 1411 * device.next_memory() // 100
+    return f"Shared memory totals - Size: 1411 MB, Used: {used} MB, Available: {1411 - used} MB"
+
+
+def _nxos_temperature(device):
+    lines = ['Temperature:', '-' * 68,
+             'Module   Sensor        MajorThresh   MinorThres   CurTemp     Status',
+             '                       (Celsius)     (Celsius)    (Celsius)', '-' * 68]
+    lines += [f"1        {name:<13} {major:<13} {minor:<12} {device.temperature + offset:<11} Ok"
+              for name, major, minor, offset in (('FRONT', 80, 70, 0), ('BACK', 70, 42, -5), ('CPU', 90, 80, 8))]
+    return '\n'.join(lines)
+
+
+def _nxos_interface_brief(device):
+    lines = ['-' * 80, 'Interface              Status          Description', '-' * 80]
+    lines += [f"{interface['name']:<22} {'up' if interface['up'] else 'down':<15} port {number}"
+              for number, interface in enumerate(device.interfaces, start=1)]
+    return '\n'.join(lines)
+
+
+def _nxos_interfaces(device):
+    blocks = []
+    for interface in device.interfaces:
+        state = 'up' if interface['up'] else 'down'
+        rx_bytes, tx_bytes, rx_packets, tx_packets = device.counters(interface)
+        blocks.append(
+            f"{interface['name']} is {state}\n"
+            f"admin state is {state}, Dedicated Interface\n"
+            f"  Description: {device.hostname} port {interface['name']}\n"
+            f"  full-duplex, 10 Gb/s, media type is 10G\n"
+            f"  RX\n"
+            f"    {rx_packets} input packets  {rx_bytes} bytes\n"
+            f"    {interface['errors']} input error  0 short frame  0 overrun   0 underrun  0 ignored\n"
+            f"  TX\n"
+            f"    {tx_packets} output packets  {tx_bytes} bytes\n"
+            f"    0 output error  0 collision  0 deferred  0 late collision"
+        )
+    return '\n'.join(blocks)
+
+
+def _nxos_version(device):
+    return ("Cisco Nexus Operating System (NX-OS) Software\n"
+            "Software\n"
+            "  BIOS: version 07.67\n"
+            "  NXOS: version 9.3(8)\n"
+            "Hardware\n"
+            "  cisco Nexus9000 C93180YC-EX chassis\n"
+            f"  Processor Board ID {device.serial_number}\n"
+            f"  Device name: {device.hostname}\n"
+            f"Kernel uptime is {device.uptime_text()}")
+
+
+# ==================== Linux ====================
+def _linux_cpu(device):
+    cpu = device.next_cpu()
+    return f"%Cpu(s): {cpu:4.1f} us,  1.0 sy,  0.0 ni, {99 - cpu:4.1f} id,  0.0 wa,  0.0 hi,  0.0 si,  0.0 st"
+
+
+def _linux_memory(device):
+    total = 16303428
+    used = total * device.next_memory() // 100
+    return f"Mem:       {total}    {used}     {total - used}      123456      512000     {total - used}"
+
+
+def _linux_interfaces(device):
+    blocks = ['1: lo: <LOOPBACK,UP,LOWER_UP> mtu 65536 qdisc noqueue state UNKNOWN mode DEFAULT group default qlen 1000',
+              '    link/loopback 00:00:00:00:00:00 brd 00:00:00:00:00:00',
+              '    RX: bytes  packets  errors  dropped overrun mcast',
+              '    1024       16       0       0       0       0',
+              '    TX: bytes  packets  errors  dropped carrier collsns',
+              '    1024       16       0       0       0       0']
+    for number, interface in enumerate(device.interfaces, start=2):
+        flags = '<BROADCAST,MULTICAST,UP,LOWER_UP>' if interface['up'] else '<BROADCAST,MULTICAST>'
+        state = 'UP' if interface['up'] else 'DOWN'
+        rx_bytes, tx_bytes, rx_packets, tx_packets = device.counters(interface)
+        blocks += [f"{number}: {interface['name']}: {flags} mtu 1500 qdisc mq state {state} mode DEFAULT qlen 1000",
+                   f"    link/ether 52:54:00:{device.index // 256 % 256:02x}:{device.index % 256:02x}:{number % 256:02x}"
+                   f" brd ff:ff:ff:ff:ff:ff",
+                   '    RX: bytes  packets  errors  dropped overrun mcast',
+                   f"    {rx_bytes}  {rx_packets}  {interface['errors']}  0  0  0",
+                   '    TX: bytes  packets  errors  dropped carrier collsns',
+                   f"    {tx_bytes}  {tx_packets}  0  0  0  0"]
+    return '\n'.join(blocks)
+
+
+def _linux_version(device):
+    return f"Linux 5.15.0-91-generic\n{time.time() - device.boot_time:.2f} {(time.time() - device.boot_time) * 3:.2f}"
+
+
+# 各厂商支持的命令 {厂商键: {命令: 输出函数}}
+COMMANDS = {
+    'huawei': {
+        'display cpu-usage': _huawei_cpu,
+        'display memory-usage': _huawei_memory,
+        'display environment': _huawei_environment,
+        'display interface brief': _huawei_interface_brief,
+        'display interface': _huawei_interface,
+        'display version': _huawei_version,
+        'display esn': lambda device: f"ESN of slot 0: {device.serial_number}",
+        'display current-configuration': _huawei_config,
+    },
+    'h3c': {
+        'display cpu-usage': _huawei_cpu,
+        'display memory-usage': _huawei_memory,
+        'display environment': _huawei_environment,
+        'display interface brief': _huawei_interface_brief,
+        'display interface': _huawei_interface,
+        'display version': _h3c_version,
+        'display device manuinfo': lambda device: (f"Slot 1 CPU 0:\nDEVICE_NAME          : S5130-52S-EI\n"
+                                                   f"DEVICE_SERIAL_NUMBER : {device.serial_number}"),
+        'display current-configuration': _huawei_config,
+    },
+    'cisco_ios': {
+        'show processes cpu': _cisco_cpu,
+        'show processes memory': _cisco_ios_memory,
+        'show env temperature status': _cisco_ios_temperature,
+        'show ip interface brief': _cisco_ios_interface_brief,
+        'show interfaces': _cisco_ios_interfaces,
+        'show version': _cisco_ios_version,
+        'show inventory': _cisco_inventory,
+        'show running-config': _cisco_config,
+    },
+    'cisco_nxos': {
+        'show processes cpu': _cisco_cpu,
+        'show processes memory shared': _nxos_memory,
+        'show env temperature': _nxos_temperature,
+        'show interface brief': _nxos_interface_brief,
+        'show interface': _nxos_interfaces,
+        'show version': _nxos_version,
+        'show inventory': _cisco_inventory,
+        'show running-config': _cisco_config,
+    },
+    'linux': {
+        'top -bn1': lambda device: f"top - {datetime.now():%H:%M:%S} up 10 days\n{_linux_cpu(device)}",
+        'free': lambda device: ('               total        used        free      shared  buff/cache   available\n'
+                                + _linux_memory(device)),
+        'ip -s link show': _linux_interfaces,
+        'uname -sr': lambda device: 'Linux 5.15.0-91-generic',
+        'cat /proc/uptime': lambda device: _linux_version(device).split('\n')[1],
+        'hostname': lambda device: device.hostname,
+    },
+}
+
+
+class CliSession:
+    """一个SSH Shell会话：逐行读取命令，按厂商特征回显、分页和输出"""
+
+    def __init__(self, channel, device, options, count):
+        """
+        初始化会话
+        :param channel: paramiko通道
+        :param device: 模拟设备
+        :param options: 模拟参数（latency、jitter、page_lines、username）
+        :param count: 统计计数函数 count(key)
+        """
+        self.channel = channel  # SSH通道
+        self.device = device  # 模拟设备
+        self.profile = device.profile  # 厂商CLI特征
+        self.options = options  # 模拟参数
+        self.count = count  # 统计计数
+        self.pager = bool(self.profile['more'])  # 是否分页（执行关闭分页命令后为False）
+        self.context = None  # 配置模式上下文：None为用户视图，''为系统视图，其余为子视图名称
+        self._buffer = b''  # 未处理的输入
+        self._commands = 0  # 已执行命令数
+        self._drop_after = random.randint(1, 5)  # drop故障：执行若干条命令后重置连接
+
+    def prompt(self):
+        """当前提示符"""
+        if self.context is None or not self.profile['config_prompt']:
+            return self.profile['prompt'].format(host=self.device.hostname, user=self.options['username'])
+        context = f"-{self.context}" if self.context else ''  # 华为：[host-GigabitEthernet0/0/1]，Cisco：host(config-if)#
+        return self.profile['config_prompt'].format(host=self.device.hostname, context=context)
+
+    def send(self, text):
+        """发送文本（统一使用CRLF换行）"""
+        self.channel.sendall(text.replace('\n', '\r\n').encode('utf-8'))
+
+    def read_line(self):
+        """
+        读取一行输入（回车或换行结束）
+        :return: 命令行文本，连接关闭返回None
+        """
+        while True:
+            for separator in (b'\r\n', b'\n', b'\r'):
+                if separator in self._buffer:
+                    line, self._buffer = self._buffer.split(separator, 1)
+                    return line.decode('utf-8', errors='ignore')
+            data = self.channel.recv(1024)
+            if not data:
+                return None
+            self._buffer += data
+
+    def read_key(self):
+        """
+        读取分页提示后的单个按键
+        :return: 按键字节，连接关闭返回None
+        """
+        if not self._buffer:
+            data = self.channel.recv(1024)
+            if not data:
+                return None
+            self._buffer = data
+        key, self._buffer = self._buffer[:1], self._buffer[1:]
+        return key
+
+    def run(self):
+        """会话主循环"""
+        self.send(f"\nInfo: simulated device {self.device.hostname}\n\n{self.prompt()}")
+        while True:
+            line = self.read_line()
+            if line is None:
+                return
+            command = ' '.join(line.split())
+            self.send(line + '\n')  # 终端回显
+            if self.context is None and command in ('exit', 'logout', 'quit'):  # 退出登录
+                return
+            if command:
+                self._commands += 1
+                self.count('commands')
+                if self.device.failure == 'drop' and self._commands >= self._drop_after:  # 会话中途重置
+                    raise ConnectionResetError('simulated reset')
+                self._delay()
+                output = self.execute(command)
+                if output:
+                    if not self.send_paged(output + '\n'):
+                        return
+            self.send(self.prompt())
+
+    def _delay(self):
+        """模拟命令响应延迟和抖动"""
+        latency = self.options['latency'] + random.uniform(-self.options['jitter'], self.options['jitter'])
+        if latency > 0:
+            time.sleep(latency)
+
+    def send_paged(self, output):
+        """
+        分页发送输出（关闭分页后一次发送）
+        :return: False表示连接已关闭
+        """
+        lines = output.split('\n')
+        page_lines = self.options['page_lines']
+        if not self.pager or not page_lines or len(lines) <= page_lines:
+            self.send(output)
+            return True
+        more = self.profile['more']
+        for start in range(0, len(lines), page_lines):
+            page = lines[start:start + page_lines]
+            last = start + page_lines >= len(lines)
+            self.send('\n'.join(page) + ('' if last else '\n'))
+            if last:
+                break
+            self.send(more)
+            key = self.read_key()
+            if key is None:
+                return False
+            self.send(self.profile['more_erase'])  # 与真实设备相同的擦除序列（控制字符原样发送）
+            if key in (b'q', b'Q'):  # 中止输出
+                self.send('\n')
+                break
+        return True
+
+    def execute(self, command):
+        """
+        执行一条命令
+        :param command: 规范化后的命令（多个空白合并为一个）
+        :return: 输出文本
+        """
+        profile = self.profile
+        if command in profile['pager_off']:
+            self.pager = False
+            return 'Info: The configuration takes effect on the current user terminal interface only.' \
+                if profile['prompt'].startswith('<') else ''
+        if command in profile['config_enter'] and self.context is None:
+            self.context = ''
+            return 'Enter system view, return user view with return command.' \
+                if profile['prompt'].startswith('<') else 'Enter configuration commands, one per line.  End with CNTL/Z.'
+        if command in profile['config_end'] and self.context is not None:
+            self.context = None
+            return ''
+        if command in profile['config_exit'] and self.context is not None:
+            self.context = '' if self.context else None
+            return ''
+
+        if self.device.vendor == 'linux' and ';' in command:  # Linux：顺序执行多条命令
+            return '\n'.join(filter(None, (self.execute(part.strip()) for part in command.split(';'))))
+
+        base, _, pipe = command.partition(' | ')
+        handler = COMMANDS[self.device.vendor].get(base)
+        if handler is None:
+            if self.context is not None:  # 配置模式：接受所有配置命令
+                if base.startswith('interface '):
+                    self.context = 'if' if not profile['config_prompt'].startswith('[') else base.split(' ', 1)[1]
+                return ''
+            return profile['error'].format(command=base.split(' ')[0])
+        output = handler(self.device)
+        if pipe:  # 输出过滤：| include xxx / | grep "xxx"
+            keyword = pipe.split(' ', 1)[1].strip('"\'') if ' ' in pipe else ''
+            output = '\n'.join(line for line in output.split('\n') if keyword in line)
+        return output
+
+
+class SimulatorServer(paramiko.ServerInterface):
+    """SSH服务端接口：密码认证、会话通道和Shell请求"""
+
+    def __init__(self, device, username, password):
+        self.device = device  # 模拟设备
+        self.username = username  # 用户名
+        self.password = password  # 密码
+        self.shell_ready = threading.Event()  # 客户端已请求Shell
+
+    def check_auth_password(self, username, password):
+        if self.device.failure == 'auth_fail':  # 故障：认证总是失败
+            return paramiko.AUTH_FAILED
+        if username == self.username and password == self.password:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self.shell_ready.set()
+        return True
+
+
+class DeviceFarm:
+    """模拟设备群：每台设备监听独立地址，单线程统一accept，每个连接一个会话线程"""
+
+    def __init__(self, devices, username='admin', password='admin', latency=0.0, jitter=0.0, page_lines=24,
+                 host_key=None):
+        """
+        初始化模拟设备群
+        :param devices: SimulatedDevice列表
+        :param username: 登录用户名
+        :param password: 登录密码
+        :param latency: 命令平均响应延迟（秒）
+        :param jitter: 延迟抖动（秒，均匀分布±jitter）
+        :param page_lines: 分页行数（0表示不分页）
+        :param host_key: SSH主机密钥（paramiko.PKey），默认临时生成
+        """
+        self.devices = devices  # 模拟设备
+        self.username = username  # 用户名
+        self.password = password  # 密码
+        self.options = {'latency': latency, 'jitter': jitter, 'page_lines': page_lines, 'username': username}
+        self.host_key = host_key or paramiko.RSAKey.generate(2048)  # 所有设备共用一个主机密钥
+        self.stats = {'connections': 0, 'active': 0, 'auth_failures': 0, 'commands': 0, 'resets': 0, 'errors': 0}
+        self._selector = selectors.DefaultSelector()  # 监听套接字
+        self._held = []  # hang故障中保持不响应的连接
+        self._running = False
+        self._lock = threading.Lock()  # 统计锁
+
+    def start(self):
+        """绑定所有设备地址并启动accept线程"""
+        for device in self.devices:
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            listener.bind((device.host, device.port))
+            listener.listen(128)
+            listener.setblocking(False)
+            self._selector.register(listener, selectors.EVENT_READ, device)
+        self._running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def stop(self):
+        """停止accept并关闭所有监听套接字和挂起连接"""
+        self._running = False
+        for key in list(self._selector.get_map().values()):
+            self._selector.unregister(key.fileobj)
+            key.fileobj.close()
+        for conn in self._held:
+            conn.close()
+        self._held = []
+
+    def _accept_loop(self):
+        """统一accept所有设备的新连接"""
+        while self._running:
+            try:
+                events = self._selector.select(timeout=0.5)
+            except (OSError, ValueError):  # 已停止
+                return
+            for key, _ in events:
+                try:
+                    conn, _ = key.fileobj.accept()
+                except (BlockingIOError, OSError):
+                    continue
+                conn.setblocking(True)
+                self._count('connections')
+                self._dispatch(conn, key.data)
+
+    def _dispatch(self, conn, device):
+        """按故障模式处理新连接"""
+        if device.failure == 'hang':  # 故障：接受TCP连接但从不发送SSH版本
+            self._held.append(conn)
+            return
+        if device.failure == 'reset':  # 故障：立即发送RST
+            self._reset(conn)
+            return
+        threading.Thread(target=self._serve, args=(conn, device), daemon=True).start()
+
+    def _reset(self, conn):
+        """以RST方式关闭连接"""
+        self._count('resets')
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+        conn.close()
+
+    def _count(self, key, delta=1):
+        """更新统计"""
+        with self._lock:
+            self.stats[key] += delta
+
+    def _serve(self, conn, device):
+        """处理一个SSH连接（会话线程）"""
+        transport = paramiko.Transport(conn)
+        transport.set_log_channel(SERVER_LOG_CHANNEL)
+        transport.add_server_key(self.host_key)
+        server = SimulatorServer(device, self.username, self.password)
+        self._count('active')
+        try:
+            transport.start_server(server=server)
+            channel = transport.accept(timeout=20)
+            if channel is None:  # 认证失败或客户端未打开通道
+                if device.failure == 'auth_fail' or not transport.is_authenticated():
+                    self._count('auth_failures')
+                return
+            if not server.shell_ready.wait(timeout=10):
+                return
+            CliSession(channel, device, self.options, self._count).run()
+            channel.close()
+        except ConnectionResetError:  # drop故障
+            self._reset(conn)
+        except Exception:  # 客户端异常断开等
+            self._count('errors')
+        finally:
+            self._count('active', -1)
+            transport.close()
+
+
+def build_fleet(count, vendors=('huawei', 'h3c', 'cisco_ios', 'cisco_nxos', 'linux'), base_ip='127.1.0.1',
+                port=2222, single_ip=False, interfaces=48, config_lines=200, failures=None, seed=0):
+    """
+    生成模拟设备列表（厂商轮流分配，故障按比例随机分配）
+    :param count: 设备数量
+    :param vendors: 厂商键列表
+    :param base_ip: 起始回环地址
+    :param port: SSH端口（single_ip为True时为起始端口）
+    :param single_ip: 是否所有设备共用base_ip、按端口区分
+    :param interfaces: 每台设备的接口数量
+    :param config_lines: 每台设备配置中额外的ACL行数
+    :param failures: 故障比例 {故障模式: 比例}，如 {'auth_fail': 0.01, 'hang': 0.01}
+    :param seed: 随机种子
+    :return: SimulatedDevice列表
+    """
+    chooser = random.Random(seed)
+    start = ipaddress.IPv4Address(base_ip)
+    devices = []
+    for index in range(count):
+        failure = None
+        roll = chooser.random()
+        for mode, ratio in (failures or {}).items():
+            if roll < ratio:
+                failure = mode
+                break
+            roll -= ratio
+        host = str(start) if single_ip else str(start + index)
+        devices.append(SimulatedDevice(index, vendors[index % len(vendors)], host,
+                                       port + index if single_ip else port, interfaces, config_lines,
+                                       failure, seed=seed * 100003 + index))
+    return devices
+
+
+def export_devices(devices, path, username, password):
+    """
+    导出设备清单CSV（可直接通过 POST /api/devices/import 导入）
+    :param devices: SimulatedDevice列表
+    :param path: 输出文件路径
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['name', 'ip', 'port', 'vendor', 'username', 'password'])
+        for device in devices:
+            writer.writerow([device.hostname, device.host, device.port, device.profile['label'], username, password])
+
+
+def parse_failures(text):
+    """
+    解析故障比例参数
+    :param text: 如 "auth_fail=0.01,hang=0.005"
+    :return: {故障模式: 比例}
+    """
+    failures = {}
+    for item in filter(None, (text or '').split(',')):
+        mode, _, ratio = item.partition('=')
+        if mode not in FAILURE_MODES:
+            raise argparse.ArgumentTypeError(f"未知故障模式: {mode}（可选：{', '.join(FAILURE_MODES)}）")
+        failures[mode] = float(ratio)
+    return failures
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description='启动模拟SSH网络设备群')
+    parser.add_argument('--count', type=int, default=10, help='设备数量')
+    parser.add_argument('--vendors', default='huawei,h3c,cisco_ios,cisco_nxos,linux',
+                        help=f"厂商列表（可选：{', '.join(VENDOR_PROFILES)}）")
+    parser.add_argument('--base-ip', default='127.1.0.1', help='起始回环地址（每台设备一个地址）')
+    parser.add_argument('--port', type=int, default=2222, help='SSH端口')
+    parser.add_argument('--single-ip', action='store_true', help='所有设备共用起始地址，按端口区分')
+    parser.add_argument('--username', default='admin', help='登录用户名')
+    parser.add_argument('--password', default='admin', help='登录密码')
+    parser.add_argument('--latency', type=float, default=0.05, help='命令平均响应延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.02, help='响应延迟抖动（秒）')
+    parser.add_argument('--page-lines', type=int, default=24, help='分页行数（0表示不分页）')
+    parser.add_argument('--interfaces', type=int, default=48, help='每台设备的接口数量')
+    parser.add_argument('--config-lines', type=int, default=200, help='运行配置中额外的ACL行数')
+    parser.add_argument('--failures', type=parse_failures, default={},
+                        help='故障比例，如 auth_fail=0.01,hang=0.01,reset=0.01,drop=0.01')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--export', help='导出设备清单CSV路径')
+    args = parser.parse_args()
+
+    vendors = [vendor.strip() for vendor in args.vendors.split(',') if vendor.strip()]
+    unknown = [vendor for vendor in vendors if vendor not in VENDOR_PROFILES]
+    if unknown:
+        parser.error(f"未知厂商: {', '.join(unknown)}")
+    devices = build_fleet(args.count, vendors, args.base_ip, args.port, args.single_ip, args.interfaces,
+                          args.config_lines, args.failures, args.seed)
+    if args.export:
+        export_devices(devices, args.export, args.username, args.password)
+        print(f"设备清单已导出: {args.export}")
+
+    farm = DeviceFarm(devices, args.username, args.password, args.latency, args.jitter, args.page_lines)
+    farm.start()
+    print(f"已启动{len(devices)}台模拟设备（{devices[0].host}:{devices[0].port} ~ "
+          f"{devices[-1].host}:{devices[-1].port}），按Ctrl+C停止")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"连接 {farm.stats['connections']}，活动 {farm.stats['active']}，命令 {farm.stats['commands']}，"
+                  f"认证失败 {farm.stats['auth_failures']}，重置 {farm.stats['resets']}")
+    except KeyboardInterrupt:
+        farm.stop()
+
+
+if __name__ == '__main__':
+    main()